@@ -3,21 +3,32 @@ Bilibili音频下载器 - 重构后的主应用文件
 """
 import os
 import time
+import hmac
 from io import BytesIO
-from flask import Flask, render_template, request, jsonify, redirect, url_for, send_file, session, flash
+from flask import (
+    Flask, Response, render_template, request, jsonify, redirect, url_for, send_file, session, flash,
+    stream_with_context
+)
 from mutagen.mp3 import MP3
 from mutagen.id3 import ID3
 from dotenv import load_dotenv
 
 # 导入自定义模块
 from utils.logger import Logger
+from utils.json_provider import FastJSONProvider
 from utils.exceptions import ValidationError, DownloadError, TagEditError, AuthenticationError
 from controllers.download_controller import DownloadController
 from controllers.tag_controller import TagController
 from controllers.auth_controller import AuthController
 from controllers.batch_controller import BatchController
-from services.auth_service import AuthService
-from config import LOGIN_REQUIRED, DOWNLOAD_PATH, TEMP_PATH
+from controllers.library_controller import LibraryController
+from controllers.subscription_controller import SubscriptionController
+from controllers.profiling_controller import ProfilingController
+from services.service_container import get_services
+from utils.metrics import REGISTRY
+from config import (
+    LOGIN_REQUIRED, DOWNLOAD_PATH, TEMP_PATH, LIBRARY_WATCH, BATCH_EXECUTOR, METRICS_ENABLED, METRICS_TOKEN
+)
 
 # 加载环境变量
 load_dotenv()
@@ -26,16 +37,32 @@ load_dotenv()
 app = Flask(__name__)
 app.secret_key = os.getenv('SECRET_KEY', os.urandom(24))
 app.config.from_pyfile('config.py')
+app.json = FastJSONProvider(app)
 
 # 初始化日志
 logger = Logger(app)
 
-# 初始化控制器
-download_controller = DownloadController()
-tag_controller = TagController()
-auth_controller = AuthController()
-batch_controller = BatchController()
-auth_service = AuthService()
+# 初始化控制器（共用同一个服务容器）
+services = get_services()
+download_controller = DownloadController(services)
+tag_controller = TagController(services)
+auth_controller = AuthController(services)
+batch_controller = BatchController(services)
+library_controller = LibraryController(services)
+subscription_controller = SubscriptionController(services)
+profiling_controller = ProfilingController()
+auth_service = services.auth_service
+
+# 启动曲库定时增量扫描、目录监听和订阅定时检查（多进程部署时由 worker.py 负责）
+if BATCH_EXECUTOR != 'process':
+    library_controller.library_scanner.start_schedule()
+    services.subscription_service.start_schedule()
+    if LIBRARY_WATCH:
+        library_controller.library_watcher.start()
+
+# 多进程部署时各进程写入指标快照，/metrics 合并后输出
+if METRICS_ENABLED and BATCH_EXECUTOR == 'process':
+    REGISTRY.start_snapshots()
 
 # 错误处理装饰器
 def handle_errors(f):
@@ -113,15 +140,28 @@ def batch_download():
 @auth_service.login_required_decorator
 @handle_errors
 def download():
-    """下载Bilibili音频"""
+    """提交Bilibili音频下载任务，立即返回任务ID和状态地址"""
     result = download_controller.handle_download_request()
-    
-    if result['success']:
-        return redirect(result['redirect_url'])
-    else:
-        return render_template('error.html', 
-                             message=result['message'],
-                             details="请检查输入后重试"), result.get('status_code', 500)
+    status_code = result.pop('status_code', 500)
+    return jsonify(result), status_code
+
+@app.route('/api/download/<job_id>')
+@auth_service.login_required_decorator
+def api_download_status(job_id):
+    """获取单个下载任务状态（完成时返回编辑页面地址）"""
+    result = download_controller.get_download_job(job_id)
+    status_code = result.pop('status_code', 200)
+    return jsonify(result), status_code
+
+@app.route('/api/download/<job_id>/events')
+@auth_service.login_required_decorator
+def api_download_events(job_id):
+    """以Server-Sent Events推送单个下载任务状态"""
+    return Response(
+        stream_with_context(download_controller.stream_download_events(job_id)),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
 
 @app.route('/edit/<filename>')
 @auth_service.login_required_decorator
@@ -282,6 +322,14 @@ def api_batch_create():
     result = batch_controller.create_batch_download()
     return jsonify(result)
 
+@app.route('/api/batch/import', methods=['POST'])
+@auth_service.login_required_decorator
+def api_batch_import():
+    """流式导入URL列表（纯文本请求体或上传文件），自动拆分为多个批量任务并启动"""
+    result = batch_controller.import_batch_download()
+    status_code = result.pop('status_code', 200)
+    return jsonify(result), status_code
+
 @app.route('/api/batch/<batch_id>/start', methods=['POST'])
 @auth_service.login_required_decorator
 def api_batch_start(batch_id):
@@ -296,6 +344,27 @@ def api_batch_cancel(batch_id):
     result = batch_controller.cancel_batch_download(batch_id)
     return jsonify(result)
 
+@app.route('/api/batch/<batch_id>/pause', methods=['POST'])
+@auth_service.login_required_decorator
+def api_batch_pause(batch_id):
+    """暂停批量下载任务"""
+    result = batch_controller.pause_batch_download(batch_id)
+    return jsonify(result)
+
+@app.route('/api/batch/<batch_id>/resume', methods=['POST'])
+@auth_service.login_required_decorator
+def api_batch_resume(batch_id):
+    """恢复批量下载任务"""
+    result = batch_controller.resume_batch_download(batch_id)
+    return jsonify(result)
+
+@app.route('/api/batch/<batch_id>/priority', methods=['POST'])
+@auth_service.login_required_decorator
+def api_batch_priority(batch_id):
+    """修改批量下载任务优先级"""
+    result = batch_controller.set_batch_priority(batch_id)
+    return jsonify(result)
+
 @app.route('/api/batch/<batch_id>/delete', methods=['DELETE'])
 @auth_service.login_required_decorator
 def api_batch_delete(batch_id):
@@ -333,6 +402,105 @@ def api_batch_statistics():
     result = batch_controller.get_batch_statistics()
     return jsonify(result)
 
+# 订阅API路由
+@app.route('/api/subscriptions', methods=['GET', 'POST'])
+@auth_service.login_required_decorator
+def api_subscriptions():
+    """获取订阅列表（GET）或创建订阅（POST）"""
+    if request.method == 'POST':
+        result = subscription_controller.create_subscription()
+    else:
+        result = subscription_controller.list_subscriptions()
+    status_code = result.pop('status_code', 200)
+    return jsonify(result), status_code
+
+@app.route('/api/subscriptions/<subscription_id>/settings', methods=['POST'])
+@auth_service.login_required_decorator
+def api_subscription_settings(subscription_id):
+    """修改订阅设置"""
+    result = subscription_controller.update_subscription(subscription_id)
+    status_code = result.pop('status_code', 200)
+    return jsonify(result), status_code
+
+@app.route('/api/subscriptions/<subscription_id>/sync', methods=['POST'])
+@auth_service.login_required_decorator
+def api_subscription_sync(subscription_id):
+    """立即同步订阅"""
+    result = subscription_controller.sync_subscription(subscription_id)
+    status_code = result.pop('status_code', 200)
+    return jsonify(result), status_code
+
+@app.route('/api/subscriptions/<subscription_id>/delete', methods=['DELETE'])
+@auth_service.login_required_decorator
+def api_subscription_delete(subscription_id):
+    """删除订阅"""
+    result = subscription_controller.delete_subscription(subscription_id)
+    status_code = result.pop('status_code', 200)
+    return jsonify(result), status_code
+
+# 曲库API路由
+@app.route('/api/library')
+@auth_service.login_required_decorator
+def api_library():
+    """分页搜索曲库"""
+    result = library_controller.get_library()
+    return jsonify(result)
+
+@app.route('/api/library/statistics')
+@auth_service.login_required_decorator
+def api_library_statistics():
+    """获取曲库统计信息"""
+    result = library_controller.get_library_statistics()
+    return jsonify(result)
+
+@app.route('/api/library/scan', methods=['GET', 'POST'])
+@auth_service.login_required_decorator
+def api_library_scan():
+    """触发曲库增量扫描（POST）或获取扫描状态（GET）"""
+    if request.method == 'POST':
+        result = library_controller.start_scan()
+    else:
+        result = library_controller.get_scan_status()
+    return jsonify(result)
+
+# 性能分析API路由
+@app.route('/api/profiling', methods=['GET', 'POST'])
+@auth_service.login_required_decorator
+def api_profiling():
+    """开关任务性能分析（POST）或获取最近任务的热点（GET）"""
+    if request.method == 'POST':
+        result = profiling_controller.set_enabled()
+    else:
+        result = profiling_controller.get_status()
+    status_code = result.pop('status_code', 200)
+    return jsonify(result), status_code
+
+@app.route('/api/profiling/<name>')
+@auth_service.login_required_decorator
+def api_profiling_download(name):
+    """下载某个任务的 .prof 文件"""
+    profile_path = profiling_controller.get_profile_path(name)
+    if not profile_path:
+        return jsonify({'success': False, 'message': '性能分析结果不存在'}), 404
+    return send_file(profile_path.resolve(), as_attachment=True, download_name=profile_path.name)
+
+# 运行指标（未启用登录时直接访问；启用登录时使用登录会话，或携带 METRICS_TOKEN 的 Bearer 令牌）
+@app.route('/metrics')
+def metrics():
+    """以Prometheus文本格式输出运行指标"""
+    if not METRICS_ENABLED:
+        return jsonify({'success': False, 'message': '运行指标未启用'}), 404
+
+    authorization = request.headers.get('Authorization', '')
+    token_valid = bool(METRICS_TOKEN) and hmac.compare_digest(
+        authorization.encode(), f"Bearer {METRICS_TOKEN}".encode()
+    )
+    if auth_service.login_required and not auth_service.is_logged_in() and not token_valid:
+        return jsonify({'success': False, 'message': '需要登录或有效的令牌'}), 401
+
+    return Response(REGISTRY.render(), mimetype='text/plain; version=0.0.4; charset=utf-8')
+
 if __name__ == '__main__':
+    # 开发服务器；生产环境使用 gunicorn -c gunicorn.conf.py app:app
     debug = os.environ.get('DEBUG', 'False') == 'True'
     app.run(host='0.0.0.0', port=5000, debug=debug)
@@ -0,0 +1,322 @@
+"""
+批量任务轮询接口负载测试（离线）
+
+模拟多个浏览器标签页在批量任务执行期间轮询接口：
+- progress：/api/batch/<id>/progress（随机选择一个执行中的批量任务）
+- list：/api/batch/list（批量下载页面，读取全部任务和统计信息）
+- statistics：/api/batch/statistics
+
+应用按 BATCH_EXECUTOR=process 部署方式加载（Web进程只读取 batch_storage 中的JSON文件），
+批量任务存储、曲库数据库和下载目录都放在临时目录中，不执行实际下载。写入线程模拟执行进程：
+按 --write-interval 逐个完成执行中批量任务的子任务并保存文件，使轮询接口持续遇到文件变化。
+
+每个轮询线程只请求一种接口，统计：
+- 延迟分位数（p50/p95/p99）和吞吐量
+- 每个请求加载的批量任务文件数（缓存未命中，读取并解码整个JSON文件）和检查文件版本（stat）的次数
+- 每个请求的读取字节数和read系统调用数（来自 /proc/thread-self/io，仅Linux）
+
+请求在进程内通过Flask测试客户端发出，不包含网络开销。需要单独运行（应用配置在导入时读取环境变量）。
+
+运行: python -m benchmarks.bench_api_load --progress-pollers 20 --list-pollers 5 --batches 200 --duration 20
+"""
+import os
+import sys
+import json
+import math
+import random
+import argparse
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from benchmarks.fixtures import build_services, summarize, workspace
+
+ENDPOINTS = ('progress', 'list', 'statistics')
+
+
+def _thread_io() -> Optional[Dict[str, int]]:
+    """当前线程的IO计数（rchar：read读取的字节数，syscr：read调用次数），不支持时返回None"""
+    try:
+        with open('/proc/thread-self/io', 'rb') as f:
+            lines = f.read().decode().splitlines()
+    except OSError:
+        return None
+    values = dict(line.split(': ', 1) for line in lines if ': ' in line)
+    return {'rchar': int(values['rchar']), 'syscr': int(values['syscr'])}
+
+
+class _FileCounters(threading.local):
+    """按线程统计批量任务文件的加载和版本检查次数"""
+
+    def __init__(self):
+        self.loads = 0
+        self.stats = 0
+
+
+def _instrument(batch_service) -> _FileCounters:
+    """包装Web进程批量任务服务的文件读取方法，计数后调用原方法"""
+    counters = _FileCounters()
+    read_batch_file = batch_service._read_batch_file
+    file_version = batch_service._file_version
+
+    def counted_read_batch_file(batch_id):
+        counters.loads += 1
+        return read_batch_file(batch_id)
+
+    def counted_file_version(batch_file):
+        counters.stats += 1
+        return file_version(batch_file)
+
+    batch_service._read_batch_file = counted_read_batch_file
+    batch_service._file_version = counted_file_version
+    return counters
+
+
+def _load_app(root: Path):
+    """使用临时目录的配置导入应用"""
+    if 'config' in sys.modules:
+        raise RuntimeError('应用配置已加载，负载测试需要单独运行')
+
+    os.environ.update({
+        'BATCH_EXECUTOR': 'process',
+        'LOGIN_REQUIRED': 'False',
+        'METRICS_ENABLED': 'False',
+        'LIBRARY_WATCH': 'False',
+        'LIBRARY_SCAN_INTERVAL': '0',
+        'LIBRARY_DB_PATH': str(root / 'library.db'),
+        'MUSIC_LIBRARY': str(root / 'music'),
+        'TEMP_PATH': str(root / 'temp'),
+        'LOG_FILE': '',
+        'LOG_LEVEL': 'WARNING',
+    })
+    import app as app_module
+
+    batch_service = app_module.services.batch_service
+    batch_service.batch_storage_path = root / 'batch_storage'
+    batch_service.batch_storage_path.mkdir(exist_ok=True)
+    return app_module.app, batch_service
+
+
+def _seed_batches(writer_service, batches: int, active: int, tasks: int) -> List[Any]:
+    """写入 batches 个批量任务，其中 active 个为执行中（子任务全部等待），其余已完成"""
+    from models.batch_download import BatchDownload, BatchStatus, TaskStatus
+
+    active_batches = []
+    for index in range(batches):
+        batch = BatchDownload(
+            id='',
+            name=f"load-{index}",
+            urls=[f"https://www.bilibili.com/video/BV1{index:04d}{i:05d}" for i in range(tasks)]
+        )
+        if index < active:
+            batch.status = BatchStatus.DOWNLOADING
+            active_batches.append(batch)
+        else:
+            for task in batch.tasks:
+                task.title = f"标题 {task.url[-5:]}"
+                task.filepath = f"/music/{task.title}.mp3"
+                batch.update_task_status(task.id, TaskStatus.COMPLETED)
+            batch.status = BatchStatus.COMPLETED
+        writer_service._save_batch(batch)
+    return active_batches
+
+
+def _writer(writer_service, batches: List[Any], interval: float, deadline: float, counts: Dict[str, int]):
+    """模拟执行进程：轮流完成各批量任务的下一个子任务并保存"""
+    from models.batch_download import TaskStatus
+
+    while time.monotonic() < deadline:
+        written = False
+        for batch in batches:
+            task = next((task for task in batch.tasks if task.status == TaskStatus.PENDING), None)
+            if task is None:
+                continue
+            batch.update_task_status(task.id, TaskStatus.COMPLETED, title=f"标题 {task.url[-5:]}")
+            writer_service._save_batch(batch)
+            counts['writes'] += 1
+            written = True
+            time.sleep(interval)
+            if time.monotonic() >= deadline:
+                break
+        if not written:
+            # 子任务已全部完成，等待测试结束
+            time.sleep(min(0.1, max(0.0, deadline - time.monotonic())))
+
+
+def _poller(app, endpoint: str, batch_ids: List[str], interval: float, deadline: float,
+            counters: _FileCounters, results: Dict[str, Any], lock: threading.Lock):
+    """轮询一种接口直到结束时间，结束后合并统计"""
+    client = app.test_client()
+    rng = random.Random()
+    latencies = []
+    errors = 0
+    response_bytes = 0
+    io_before = _thread_io()
+
+    while time.monotonic() < deadline:
+        if endpoint == 'progress':
+            url = f"/api/batch/{rng.choice(batch_ids)}/progress"
+        else:
+            url = f"/api/batch/{endpoint}"
+
+        started = time.perf_counter()
+        response = client.get(url)
+        latencies.append(time.perf_counter() - started)
+        response_bytes += len(response.data)
+        if response.status_code != 200 or not (response.get_json() or {}).get('success'):
+            errors += 1
+        if interval:
+            # 加入抖动，避免所有轮询线程同时发出请求
+            time.sleep(interval * rng.uniform(0.5, 1.5))
+
+    io_after = _thread_io()
+    with lock:
+        total = results[endpoint]
+        total['latencies'].extend(latencies)
+        total['errors'] += errors
+        total['response_bytes'] += response_bytes
+        total['file_loads'] += counters.loads
+        total['stat_calls'] += counters.stats
+        if io_before is None or io_after is None:
+            total['io'] = None
+        elif total['io'] is not None:
+            total['io']['rchar'] += io_after['rchar'] - io_before['rchar']
+            total['io']['syscr'] += io_after['syscr'] - io_before['syscr']
+
+
+def _report(total: Dict[str, Any], duration: float) -> Dict[str, Any]:
+    """汇总一种接口的统计结果"""
+    latencies = sorted(total['latencies'])
+    requests = len(latencies)
+    if not requests:
+        return {'requests': 0}
+
+    latency = summarize(latencies)
+    latency['p99_seconds'] = latencies[max(0, math.ceil(0.99 * requests) - 1)]
+    report = {
+        'requests': requests,
+        'errors': total['errors'],
+        'requests_per_second': requests / duration,
+        'latency': latency,
+        'response_bytes_per_request': total['response_bytes'] / requests,
+        'file_loads_per_request': total['file_loads'] / requests,
+        'stat_calls_per_request': total['stat_calls'] / requests,
+        'read_bytes_per_request': None,
+        'read_syscalls_per_request': None
+    }
+    if total['io'] is not None:
+        report['read_bytes_per_request'] = total['io']['rchar'] / requests
+        report['read_syscalls_per_request'] = total['io']['syscr'] / requests
+    return report
+
+
+def run(progress_pollers: int = 20, list_pollers: int = 5, stats_pollers: int = 2, writers: int = 2,
+        batches: int = 200, active: int = 5, tasks: int = 100, duration: float = 20.0,
+        interval: float = 0.5, write_interval: float = 0.2) -> Dict[str, Any]:
+    """执行负载测试"""
+    with workspace() as root:
+        app, batch_service = _load_app(root)
+        counters = _instrument(batch_service)
+
+        writer_service = build_services(root / 'worker')['batch_service']
+        writer_service.batch_storage_path = batch_service.batch_storage_path
+        active_batches = _seed_batches(writer_service, batches, active, tasks)
+        batch_ids = [batch.id for batch in active_batches]
+
+        pollers = {'progress': progress_pollers if batch_ids else 0, 'list': list_pollers, 'statistics': stats_pollers}
+        results = {
+            endpoint: {'latencies': [], 'errors': 0, 'response_bytes': 0, 'file_loads': 0, 'stat_calls': 0,
+                       'io': {'rchar': 0, 'syscr': 0}}
+            for endpoint in ENDPOINTS
+        }
+        write_counts = {'writes': 0}
+        lock = threading.Lock()
+        cache_before = batch_service.get_cache_stats()
+
+        deadline = time.monotonic() + duration
+        threads = [
+            threading.Thread(target=_writer, args=(writer_service, active_batches[i::writers], write_interval,
+                                                   deadline, write_counts), name=f"writer-{i}")
+            for i in range(writers if active_batches else 0)
+        ]
+        for endpoint, count in pollers.items():
+            threads += [
+                threading.Thread(target=_poller, args=(app, endpoint, batch_ids, interval, deadline,
+                                                       counters, results, lock), name=f"{endpoint}-{i}")
+                for i in range(count)
+            ]
+
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        cache_after = batch_service.get_cache_stats()
+        return {
+            'config': {
+                'pollers': pollers,
+                'writers': writers,
+                'batches': batches,
+                'active': active,
+                'tasks': tasks,
+                'interval': interval,
+                'write_interval': write_interval
+            },
+            'elapsed_seconds': elapsed,
+            'writes': write_counts['writes'],
+            'cache': {
+                'hits': cache_after['hits'] - cache_before['hits'],
+                'misses': cache_after['misses'] - cache_before['misses']
+            },
+            'endpoints': {
+                endpoint: _report(results[endpoint], elapsed)
+                for endpoint in ENDPOINTS if pollers[endpoint]
+            }
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='批量任务轮询接口负载测试（离线）')
+    parser.add_argument('--progress-pollers', type=int, default=20, help='轮询进度接口的线程数')
+    parser.add_argument('--list-pollers', type=int, default=5, help='轮询列表接口的线程数')
+    parser.add_argument('--stats-pollers', type=int, default=2, help='轮询统计接口的线程数')
+    parser.add_argument('--writers', type=int, default=2, help='模拟执行进程写入的线程数')
+    parser.add_argument('--batches', type=int, default=200, help='存储中的批量任务数')
+    parser.add_argument('--active', type=int, default=5, help='其中执行中的批量任务数')
+    parser.add_argument('--tasks', type=int, default=100, help='每个批量任务的子任务数')
+    parser.add_argument('--duration', type=float, default=20.0, help='测试时长（秒）')
+    parser.add_argument('--interval', type=float, default=0.5, help='每个轮询线程的请求间隔（秒，0为连续请求）')
+    parser.add_argument('--write-interval', type=float, default=0.2, help='每个写入线程保存文件的间隔（秒）')
+    parser.add_argument('--json', action='store_true', help='以JSON格式输出结果')
+    args = parser.parse_args()
+
+    result = run(
+        args.progress_pollers, args.list_pollers, args.stats_pollers, args.writers,
+        args.batches, args.active, args.tasks, args.duration, args.interval, args.write_interval
+    )
+    if args.json:
+        print(json.dumps(result, indent=2, ensure_ascii=False))
+        return
+
+    print(f"耗时 {result['elapsed_seconds']:.1f}秒，写入 {result['writes']} 次，"
+          f"缓存命中 {result['cache']['hits']} / 未命中 {result['cache']['misses']}")
+    print(f"{'接口':12}{'请求数':>8}{'错误':>6}{'请求/秒':>9}{'p50(ms)':>10}{'p95(ms)':>10}{'p99(ms)':>10}"
+          f"{'加载/请求':>10}{'stat/请求':>10}{'读取KB/请求':>12}")
+    for endpoint, row in result['endpoints'].items():
+        if not row['requests']:
+            continue
+        read_kb = f"{row['read_bytes_per_request'] / 1024:.1f}" if row['read_bytes_per_request'] is not None else '-'
+        latency = row['latency']
+        print(
+            f"{endpoint:12}{row['requests']:>8}{row['errors']:>6}{row['requests_per_second']:>9.1f}"
+            f"{latency['median_seconds'] * 1000:>10.1f}{latency['p95_seconds'] * 1000:>10.1f}"
+            f"{latency['p99_seconds'] * 1000:>10.1f}{row['file_loads_per_request']:>10.2f}"
+            f"{row['stat_calls_per_request']:>10.1f}{read_kb:>12}"
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+"""
+API响应序列化基准测试
+
+对比批量任务详情接口（/api/batch/<id>/detail）的两种响应编码方式：
+旧方式先调用 to_dict 构建完整的嵌套字典，再由Flask默认的JSON提供者
+（标准库json，sort_keys + ensure_ascii）编码；新方式把模型对象直接交给
+utils.serialization，由类型编码器逐个编码子任务。
+
+运行: python -m benchmarks.bench_api_serialization --tasks 1000
+"""
+import json
+import uuid
+import argparse
+from typing import Any, Dict
+
+from models.batch_download import BatchDownload, TaskStatus
+from utils import serialization
+from benchmarks.bench_task_serialization import _best_of
+
+
+def _legacy_default(obj: Any) -> Any:
+    """Flask DefaultJSONProvider 对未知对象的处理（简化）"""
+    if hasattr(obj, 'isoformat'):
+        return obj.isoformat()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def _make_batch(task_count: int) -> BatchDownload:
+    """构造包含 task_count 个子任务的批量任务，约一半已完成"""
+    urls = [f"https://www.bilibili.com/video/BV1{i:09d}" for i in range(task_count)]
+    batch = BatchDownload(id=str(uuid.uuid4()), name='基准测试', urls=urls)
+    for index, task in enumerate(batch.tasks):
+        if index % 2 == 0:
+            batch.update_task_status(task.id, TaskStatus.COMPLETED, title=f'歌曲 {index}',
+                                     artist='UP主', filename=f'{index}.mp3')
+    return batch
+
+
+def run(task_count: int, repeat: int = 20) -> Dict[str, Any]:
+    """执行基准测试"""
+    batch = _make_batch(task_count)
+
+    def legacy_encode():
+        body = {'success': True, 'data': batch.to_dict()}
+        return json.dumps(body, default=_legacy_default, ensure_ascii=True, sort_keys=True).encode('utf-8')
+
+    def current_encode():
+        return serialization.dumps({'success': True, 'data': batch})
+
+    legacy_payload = legacy_encode()
+    current_payload = current_encode()
+    assert json.loads(legacy_payload) == serialization.loads(current_payload)
+
+    legacy_seconds = _best_of(legacy_encode, repeat)
+    current_seconds = _best_of(current_encode, repeat)
+
+    return {
+        'tasks': task_count,
+        'serializer': serialization.backend_name(),
+        'legacy': {
+            'encode_seconds': legacy_seconds,
+            'payload_bytes': len(legacy_payload)
+        },
+        'current': {
+            'encode_seconds': current_seconds,
+            'payload_bytes': len(current_payload)
+        },
+        'speedup': round(legacy_seconds / current_seconds, 2) if current_seconds else None
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='API响应序列化基准测试')
+    parser.add_argument('--tasks', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--backend', choices=['auto', 'orjson', 'json'], default='auto')
+    parser.add_argument('--json', action='store_true', help='以JSON格式输出结果')
+    args = parser.parse_args()
+
+    serialization.set_backend(args.backend)
+    result = run(args.tasks, args.repeat)
+    if args.json:
+        print(json.dumps(result, indent=2))
+        return
+
+    print(f"任务数: {result['tasks']}  序列化后端: {result['serializer']}")
+    print(f"{'':10}{'编码(ms)':>12}{'大小(KB)':>12}")
+    for name in ('legacy', 'current'):
+        row = result[name]
+        print(f"{name:10}{row['encode_seconds'] * 1000:>12.2f}{row['payload_bytes'] / 1024:>12.0f}")
+    print(f"加速比: {result['speedup']}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+"""
+批量任务持久化基准测试（离线）
+
+对不同子任务数的批量任务统计：
+- save：BatchDownloadService._save_batch（编码、写临时文件、原子替换），每个子任务完成时都会调用
+- cold_load：缓存为空时 get_batch_download（读文件、解码、重建任务对象）
+- warm_get：缓存命中时 get_batch_download（只检查文件版本）
+
+运行: python -m benchmarks.bench_persistence --sizes 100,1000,5000 --repeat 5
+"""
+import json
+import argparse
+from typing import Any, Dict, Sequence
+
+from benchmarks.fixtures import build_services, measure, summarize, workspace
+
+
+def _make_batch(size: int):
+    """创建一半子任务已完成的批量任务"""
+    from models.batch_download import BatchDownload, TaskStatus
+
+    batch = BatchDownload(
+        id='',
+        name=f"benchmark-{size}",
+        urls=[f"https://www.bilibili.com/video/BV1{i:09d}" for i in range(size)]
+    )
+    for index, task in enumerate(batch.tasks[:size // 2]):
+        task.title = f"标题 {index}"
+        task.artist = '艺术家'
+        task.filename = f"标题 {index}.mp3"
+        task.filepath = f"/music/标题 {index}.mp3"
+        task.duration = 240
+        task.stage_timings = {'resolve': 0.8, 'download': 6.2, 'transcode': 3.1, 'thumbnail': 0.2}
+        task.downloaded_bytes = 4 * 1024 * 1024
+        batch.update_task_status(task.id, TaskStatus.COMPLETED)
+    return batch
+
+
+def run(sizes: Sequence[int] = (100, 1000, 5000), repeat: int = 5) -> Dict[str, Any]:
+    """执行基准测试"""
+    from utils import serialization
+
+    results = []
+    with workspace() as root:
+        batch_service = build_services(root)['batch_service']
+
+        for size in sizes:
+            batch = _make_batch(size)
+            save_durations = measure(lambda: batch_service._save_batch(batch), repeat)
+            batch_file = batch_service.batch_storage_path / f"{batch.id}.json"
+
+            def cold_load():
+                batch_service.batch_cache.pop(batch.id)
+                if batch_service.get_batch_download(batch.id) is None:
+                    raise RuntimeError(f"加载批量任务失败: {batch.id}")
+
+            cold_durations = measure(cold_load, repeat)
+            warm_durations = measure(lambda: batch_service.get_batch_download(batch.id), repeat)
+
+            results.append({
+                'tasks': size,
+                'file_bytes': batch_file.stat().st_size,
+                'save': summarize(save_durations),
+                'cold_load': summarize(cold_durations),
+                'warm_get': summarize(warm_durations)
+            })
+            batch_service.batch_cache.pop(batch.id)
+
+    return {'serializer': serialization.backend_name(), 'sizes': results}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='批量任务持久化基准测试（离线）')
+    parser.add_argument('--sizes', default='100,1000,5000', help='子任务数，逗号分隔')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--json', action='store_true', help='以JSON格式输出结果')
+    args = parser.parse_args()
+
+    sizes = [int(value) for value in args.sizes.split(',') if value.strip()]
+    result = run(sizes, args.repeat)
+    if args.json:
+        print(json.dumps(result, indent=2, ensure_ascii=False))
+        return
+
+    print(f"序列化后端: {result['serializer']}")
+    print(f"{'任务数':>8}{'文件(KB)':>10}{'保存(ms)':>10}{'冷加载(ms)':>12}{'缓存命中(ms)':>14}")
+    for row in result['sizes']:
+        print(
+            f"{row['tasks']:>8}{row['file_bytes'] / 1024:>10.0f}{row['save']['median_seconds'] * 1000:>10.2f}"
+            f"{row['cold_load']['median_seconds'] * 1000:>12.2f}{row['warm_get']['median_seconds'] * 1000:>14.3f}"
+        )
+
+
+if __name__ == '__main__':
+    main()
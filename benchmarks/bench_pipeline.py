@@ -0,0 +1,142 @@
+"""
+下载流水线基准测试（离线）
+
+本地HTTP服务器提供合成的WAV音频，经 DownloadService 走完整流程：yt-dlp通用提取器解析和下载、
+FFmpeg转码为MP3、下载封面（通用提取器没有封面，记录为一次空请求）、写入曲库索引。
+
+- 单个任务延迟：依次下载 --jobs 个文件，统计每次 download_audio 的耗时和各阶段耗时
+- 批量吞吐量：在不同并发数（--concurrency）下执行包含 --tasks 个子任务的批量任务，
+  经过下载调度器和批量任务持久化，统计每秒完成的任务数
+
+需要安装FFmpeg，未安装时结果中记录 skipped。
+
+运行: python -m benchmarks.bench_pipeline --jobs 5 --tasks 20 --concurrency 1,2,4
+"""
+import json
+import time
+import argparse
+from pathlib import Path
+from typing import Any, Dict, List, Sequence
+
+from benchmarks.fixtures import FixtureServer, build_services, ffmpeg_path, summarize, workspace, write_wav
+
+
+def _prepare_fixtures(directory: Path, count: int, seconds: float) -> List[str]:
+    """生成 count 个不同名的WAV文件（同名文件会被yt-dlp当作已下载而跳过）"""
+    directory.mkdir(parents=True, exist_ok=True)
+    template = write_wav(directory / 'track-0000.wav', seconds)
+    data = template.read_bytes()
+    names = [template.name]
+    for index in range(1, count):
+        path = directory / f"track-{index:04d}.wav"
+        path.write_bytes(data)
+        names.append(path.name)
+    return names
+
+
+def run_single(jobs: int, seconds: float, rate_limit: int = 0) -> Dict[str, Any]:
+    """单个任务延迟"""
+    from utils.metrics import StageRecorder
+
+    with workspace() as root:
+        names = _prepare_fixtures(root / 'fixtures', jobs, seconds)
+        services = build_services(root / 'app', concurrency=1)
+        download_service = services['download_service']
+
+        durations = []
+        stages: Dict[str, List[float]] = {}
+        with FixtureServer(root / 'fixtures', rate_limit) as server:
+            for name in names:
+                recorder = StageRecorder()
+                started = time.perf_counter()
+                download_service.download_audio(server.url(name), recorder=recorder)
+                durations.append(time.perf_counter() - started)
+                for stage, stage_seconds in recorder.stages.items():
+                    stages.setdefault(stage, []).append(stage_seconds)
+
+        return {
+            'jobs': jobs,
+            'audio_seconds': seconds,
+            'latency': summarize(durations),
+            'stages': {stage: summarize(values) for stage, values in stages.items()}
+        }
+
+
+def run_batch(tasks: int, concurrency: int, seconds: float, rate_limit: int = 0) -> Dict[str, Any]:
+    """批量任务吞吐量（一个并发数）"""
+    from models.batch_download import BatchDownload
+
+    with workspace() as root:
+        names = _prepare_fixtures(root / 'fixtures', tasks, seconds)
+        services = build_services(root / 'app', concurrency=concurrency)
+        batch_service = services['batch_service']
+
+        with FixtureServer(root / 'fixtures', rate_limit) as server:
+            # 直接创建批量任务：本地地址不是Bilibili链接，不经过创建接口的URL校验
+            batch = BatchDownload(id='', name='benchmark', urls=[server.url(name) for name in names])
+            batch_service._save_batch(batch)
+
+            started = time.perf_counter()
+            batch_service.run_batch(batch.id)
+            elapsed = time.perf_counter() - started
+
+        return {
+            'concurrency': concurrency,
+            'tasks': tasks,
+            'completed': batch.completed_tasks,
+            'failed': batch.failed_tasks,
+            'elapsed_seconds': elapsed,
+            'tasks_per_second': batch.completed_tasks / elapsed if elapsed else 0.0
+        }
+
+
+def run(jobs: int = 5, tasks: int = 20, concurrency: Sequence[int] = (1, 2, 4),
+        seconds: float = 30.0, rate_limit: int = 0) -> Dict[str, Any]:
+    """执行基准测试"""
+    if not ffmpeg_path():
+        return {'skipped': 'FFmpeg未安装'}
+
+    return {
+        'rate_limit': rate_limit,
+        'single': run_single(jobs, seconds, rate_limit),
+        'batch': [run_batch(tasks, workers, seconds, rate_limit) for workers in concurrency]
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='下载流水线基准测试（离线）')
+    parser.add_argument('--jobs', type=int, default=5, help='单个任务延迟测试的下载次数')
+    parser.add_argument('--tasks', type=int, default=20, help='批量任务的子任务数')
+    parser.add_argument('--concurrency', default='1,2,4', help='批量任务的并发数，逗号分隔')
+    parser.add_argument('--seconds', type=float, default=30.0, help='合成音频时长（秒）')
+    parser.add_argument('--rate-limit', type=int, default=0, help='本地服务器带宽限制（字节/秒，0不限制）')
+    parser.add_argument('--json', action='store_true', help='以JSON格式输出结果')
+    args = parser.parse_args()
+
+    concurrency = [int(value) for value in args.concurrency.split(',') if value.strip()]
+    result = run(args.jobs, args.tasks, concurrency, args.seconds, args.rate_limit)
+    if args.json:
+        print(json.dumps(result, indent=2, ensure_ascii=False))
+        return
+    if 'skipped' in result:
+        print(f"跳过: {result['skipped']}")
+        return
+
+    single = result['single']
+    print(f"单个任务（{single['jobs']}次，音频{single['audio_seconds']:.0f}秒）")
+    print(f"{'':12}{'中位数(ms)':>12}{'p95(ms)':>12}")
+    rows = [('total', single['latency'])] + list(single['stages'].items())
+    for name, row in rows:
+        print(f"{name:12}{row['median_seconds'] * 1000:>12.1f}{row['p95_seconds'] * 1000:>12.1f}")
+
+    print(f"\n批量任务（{args.tasks}个子任务）")
+    print(f"{'并发':>6}{'完成':>8}{'失败':>8}{'耗时(s)':>10}{'任务/秒':>10}")
+    for row in result['batch']:
+        print(
+            f"{row['concurrency']:>6}{row['completed']:>8}{row['failed']:>8}"
+            f"{row['elapsed_seconds']:>10.2f}{row['tasks_per_second']:>10.2f}"
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+"""
+标签写入基准测试（离线）
+
+对不同大小的合成MP3文件调用 TagService.update_audio_tags（备份原文件、写入ID3标签和封面、更新曲库索引），
+分别统计首次写入（文件中还没有ID3标签，需要重写整个文件）和再次写入（标签已存在）的耗时。
+不需要FFmpeg。
+
+运行: python -m benchmarks.bench_tags --sizes 1,10,50 --repeat 5
+"""
+import os
+import json
+import time
+import argparse
+from typing import Any, Dict, Sequence
+
+from benchmarks.fixtures import build_services, measure, summarize, workspace, write_mp3
+
+MB = 1024 * 1024
+
+
+def run(sizes_mb: Sequence[float] = (1, 10, 50), repeat: int = 5, cover_kb: int = 100) -> Dict[str, Any]:
+    """执行基准测试"""
+    results = []
+    with workspace() as root:
+        tag_service = build_services(root)['tag_service']
+        download_path = tag_service.download_path
+
+        cover_path = None
+        if cover_kb:
+            cover_path = root / 'cover.jpg'
+            cover_path.write_bytes(os.urandom(cover_kb * 1024))
+
+        def write_tags(audio_path, tags):
+            if not tag_service.update_audio_tags(str(audio_path), tags, str(cover_path) if cover_path else None):
+                raise RuntimeError(f"写入标签失败: {audio_path}")
+
+        for size in sizes_mb:
+            first_durations = []
+            for index in range(repeat):
+                audio_path = write_mp3(download_path / f"tags-{size}-{index}.mp3", int(size * MB))
+                started = time.perf_counter()
+                write_tags(audio_path, {'title': f"标题 {index}", 'artist': '艺术家', 'album': '专辑'})
+                first_durations.append(time.perf_counter() - started)
+
+            counter = iter(range(repeat))
+            rewrite_durations = measure(
+                lambda: write_tags(audio_path, {'title': f"新标题 {next(counter)}", 'artist': '艺术家'}),
+                repeat
+            )
+
+            results.append({
+                'size_mb': size,
+                'first_write': summarize(first_durations),
+                'rewrite': summarize(rewrite_durations)
+            })
+
+            for path in download_path.glob(f"tags-{size}-*.mp3"):
+                path.unlink()
+
+    return {'cover_kb': cover_kb, 'sizes': results}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='标签写入基准测试（离线）')
+    parser.add_argument('--sizes', default='1,10,50', help='文件大小（MB），逗号分隔')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--cover-kb', type=int, default=100, help='封面图片大小（KB，0不写封面）')
+    parser.add_argument('--json', action='store_true', help='以JSON格式输出结果')
+    args = parser.parse_args()
+
+    sizes = [float(value) for value in args.sizes.split(',') if value.strip()]
+    result = run(sizes, args.repeat, args.cover_kb)
+    if args.json:
+        print(json.dumps(result, indent=2, ensure_ascii=False))
+        return
+
+    print(f"封面大小: {result['cover_kb']}KB")
+    print(f"{'大小(MB)':>10}{'首次写入(ms)':>14}{'再次写入(ms)':>14}")
+    for row in result['sizes']:
+        print(
+            f"{row['size_mb']:>10g}{row['first_write']['median_seconds'] * 1000:>14.1f}"
+            f"{row['rewrite']['median_seconds'] * 1000:>14.1f}"
+        )
+
+
+if __name__ == '__main__':
+    main()
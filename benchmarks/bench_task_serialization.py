@@ -0,0 +1,157 @@
+"""
+DownloadTask 内存占用与序列化基准测试
+
+对比旧版dataclass任务（datetime时间戳 + to_dict + json.dump(indent=2)）与
+当前 __slots__ 任务（epoch秒 + to_dict + utils.serialization）。
+
+运行: python -m benchmarks.bench_task_serialization --tasks 10000
+"""
+import json
+import time
+import uuid
+import argparse
+import tracemalloc
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+
+from models.batch_download import DownloadTask, TaskStatus
+from utils import serialization
+
+
+@dataclass
+class LegacyDownloadTask:
+    """重构前的任务表示，仅用于对比"""
+    id: str
+    url: str
+    title: str = ""
+    artist: str = ""
+    status: TaskStatus = TaskStatus.PENDING
+    progress: float = 0.0
+    error_message: str = ""
+    filename: str = ""
+    filepath: str = ""
+    duration: int = 0
+    created_at: datetime = field(default_factory=datetime.now)
+    completed_at: Optional[datetime] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'id': self.id,
+            'url': self.url,
+            'title': self.title,
+            'artist': self.artist,
+            'status': self.status.value,
+            'progress': self.progress,
+            'error_message': self.error_message,
+            'filename': self.filename,
+            'filepath': self.filepath,
+            'duration': self.duration,
+            'created_at': self.created_at.isoformat(),
+            'completed_at': self.completed_at.isoformat() if self.completed_at else None
+        }
+
+
+def _urls(count: int) -> List[str]:
+    return [f"https://www.bilibili.com/video/BV1{i:09d}" for i in range(count)]
+
+
+def _measure_memory(factory: Callable[[], list]) -> int:
+    """创建对象列表占用的内存（字节）"""
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    objects = factory()
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    size = sum(stat.size_diff for stat in after.compare_to(before, 'filename'))
+    del objects
+    return size
+
+
+def _best_of(func: Callable[[], Any], repeat: int) -> float:
+    """多次运行取最短耗时（秒）"""
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def run(task_count: int, repeat: int = 5) -> Dict[str, Any]:
+    """执行基准测试"""
+    urls = _urls(task_count)
+
+    def make_legacy():
+        tasks = [LegacyDownloadTask(id=str(uuid.uuid4()), url=url) for url in urls]
+        for task in tasks:
+            task.status = TaskStatus.COMPLETED
+            task.completed_at = datetime.now()
+        return tasks
+
+    def make_current():
+        tasks = [DownloadTask(id=str(uuid.uuid4()), url=url) for url in urls]
+        for task in tasks:
+            task.status = TaskStatus.COMPLETED
+            task.completed_at = time.time()
+        return tasks
+
+    legacy_tasks = make_legacy()
+    current_tasks = make_current()
+
+    legacy_encode = lambda: json.dumps([t.to_dict() for t in legacy_tasks], ensure_ascii=False, indent=2)
+    current_encode = lambda: serialization.dumps([t.to_dict() for t in current_tasks])
+
+    legacy_payload = legacy_encode().encode('utf-8')
+    current_payload = current_encode()
+
+    legacy_decode = lambda: [LegacyDownloadTask(**{
+        **item,
+        'status': TaskStatus(item['status']),
+        'created_at': datetime.fromisoformat(item['created_at']),
+        'completed_at': datetime.fromisoformat(item['completed_at'])
+    }) for item in json.loads(legacy_payload)]
+    current_decode = lambda: [DownloadTask.from_dict(item) for item in serialization.loads(current_payload)]
+
+    return {
+        'tasks': task_count,
+        'serializer': serialization.backend_name(),
+        'legacy': {
+            'memory_bytes': _measure_memory(make_legacy),
+            'encode_seconds': _best_of(legacy_encode, repeat),
+            'decode_seconds': _best_of(legacy_decode, repeat),
+            'payload_bytes': len(legacy_payload)
+        },
+        'current': {
+            'memory_bytes': _measure_memory(make_current),
+            'encode_seconds': _best_of(current_encode, repeat),
+            'decode_seconds': _best_of(current_decode, repeat),
+            'payload_bytes': len(current_payload)
+        }
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='DownloadTask 序列化基准测试')
+    parser.add_argument('--tasks', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--json', action='store_true', help='以JSON格式输出结果')
+    args = parser.parse_args()
+
+    result = run(args.tasks, args.repeat)
+    if args.json:
+        print(json.dumps(result, indent=2))
+        return
+
+    print(f"任务数: {result['tasks']}  序列化后端: {result['serializer']}")
+    print(f"{'':10}{'内存(KB)':>12}{'编码(ms)':>12}{'解码(ms)':>12}{'大小(KB)':>12}")
+    for name in ('legacy', 'current'):
+        row = result[name]
+        print(
+            f"{name:10}{row['memory_bytes'] / 1024:>12.0f}{row['encode_seconds'] * 1000:>12.1f}"
+            f"{row['decode_seconds'] * 1000:>12.1f}{row['payload_bytes'] / 1024:>12.0f}"
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+"""
+转码基准测试（离线）
+
+用FFmpeg把合成的WAV音频编码为不同格式，统计每种编码器的耗时、实时倍率和输出大小。
+下载流程固定转码为MP3（192kbps），其他编码器用于比较。需要安装FFmpeg，未安装时结果中记录 skipped；
+FFmpeg未编译某个编码器时，该项记录 error。
+
+运行: python -m benchmarks.bench_transcode --seconds 60 --codecs mp3,aac,opus
+"""
+import json
+import argparse
+import subprocess
+from typing import Any, Dict, Sequence
+
+from benchmarks.fixtures import ffmpeg_path, measure, summarize, workspace, write_wav
+
+# 格式 → (FFmpeg编码器, 输出扩展名, 额外参数)
+CODECS = {
+    'mp3': ('libmp3lame', 'mp3', ['-b:a', '192k']),
+    'aac': ('aac', 'm4a', ['-b:a', '192k']),
+    'opus': ('libopus', 'opus', ['-b:a', '128k']),
+    'vorbis': ('libvorbis', 'ogg', ['-q:a', '5']),
+    'flac': ('flac', 'flac', []),
+}
+
+
+def run(codecs: Sequence[str] = ('mp3', 'aac', 'opus', 'flac'), seconds: float = 60.0,
+        repeat: int = 3) -> Dict[str, Any]:
+    """执行基准测试"""
+    ffmpeg = ffmpeg_path()
+    if not ffmpeg:
+        return {'skipped': 'FFmpeg未安装'}
+
+    results = {}
+    with workspace() as root:
+        source = write_wav(root / 'source.wav', seconds)
+        source_bytes = source.stat().st_size
+        for codec in codecs:
+            if codec not in CODECS:
+                results[codec] = {'error': '未知格式'}
+                continue
+
+            encoder, extension, extra_args = CODECS[codec]
+            output = root / f"output.{extension}"
+            command = [ffmpeg, '-y', '-v', 'error', '-i', str(source), '-vn', '-c:a', encoder] + extra_args + [str(output)]
+
+            def encode():
+                subprocess.run(command, check=True, capture_output=True)
+
+            try:
+                encode()  # 预热，同时检查编码器是否可用
+            except subprocess.CalledProcessError as e:
+                results[codec] = {'error': e.stderr.decode('utf-8', 'replace').strip()[:200]}
+                continue
+
+            timing = summarize(measure(encode, repeat))
+            results[codec] = {
+                'encoder': encoder,
+                **timing,
+                'realtime_factor': seconds / timing['median_seconds'],
+                'output_bytes': output.stat().st_size
+            }
+
+    return {
+        'audio_seconds': seconds,
+        'source_bytes': source_bytes,
+        'codecs': results
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='转码基准测试（离线）')
+    parser.add_argument('--codecs', default='mp3,aac,opus,flac', help=f"逗号分隔，可选 {','.join(CODECS)}")
+    parser.add_argument('--seconds', type=float, default=60.0, help='合成音频时长（秒）')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--json', action='store_true', help='以JSON格式输出结果')
+    args = parser.parse_args()
+
+    codecs = [codec.strip() for codec in args.codecs.split(',') if codec.strip()]
+    result = run(codecs, args.seconds, args.repeat)
+    if args.json:
+        print(json.dumps(result, indent=2, ensure_ascii=False))
+        return
+    if 'skipped' in result:
+        print(f"跳过: {result['skipped']}")
+        return
+
+    print(f"音频时长: {result['audio_seconds']:.0f}秒")
+    print(f"{'格式':8}{'中位数(ms)':>12}{'实时倍率':>10}{'大小(KB)':>10}")
+    for codec, row in result['codecs'].items():
+        if 'error' in row:
+            print(f"{codec:8}  失败: {row['error']}")
+            continue
+        print(
+            f"{codec:8}{row['median_seconds'] * 1000:>12.1f}{row['realtime_factor']:>10.1f}"
+            f"{row['output_bytes'] / 1024:>10.0f}"
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,149 @@
+"""
+批量粘贴URL解析基准测试
+
+对比旧版解析流程（控制器解析、验证接口逐行再解析、请求校验再解析，每次都用未预编译的
+分享文本正则）与当前 URLScanner 单次扫描。输入为混合了视频链接、分享文本、BV号、av号、
+短链接、一行多个链接和无效行的粘贴文本。
+
+运行: python -m benchmarks.bench_url_scan --lines 10000
+"""
+import re
+import json
+import time
+import argparse
+from typing import Any, Callable, Dict, List
+
+from utils.url_scanner import URLScanner
+
+
+class LegacyURLParser:
+    """重构前的解析逻辑，仅用于对比"""
+
+    BILIBILI_PATTERNS = [
+        r'^https?://(www\.)?bilibili\.com/video/((BV|bv)[a-zA-Z0-9]{10})',
+        r'^https?://b23\.tv/[a-zA-Z0-9]+',
+        r'^(BV|bv)[a-zA-Z0-9]{10}$',
+        r'^(av|AV)\d+$'
+    ]
+
+    def __init__(self):
+        self.compiled_patterns = [re.compile(pattern) for pattern in self.BILIBILI_PATTERNS]
+
+    def is_valid_bilibili_url(self, url: str) -> bool:
+        url = url.strip()
+        return any(pattern.match(url) for pattern in self.compiled_patterns)
+
+    def extract_bilibili_url(self, text: str) -> str:
+        share_patterns = [
+            r'【.*?】\s*(https?://(www\.)?(bilibili\.com|b23\.tv)[^\s]+)',
+            r'\[.*?\]\s*(https?://(www\.)?(bilibili\.com|b23\.tv)[^\s]+)'
+        ]
+        for pattern in share_patterns:
+            match = re.search(pattern, text)
+            if match:
+                return match.group(1).split('?')[0].split('#')[0]
+        if self.is_valid_bilibili_url(text):
+            return text
+        return ""
+
+    def parse_urls(self, urls_text: str) -> List[str]:
+        urls = []
+        for line in urls_text.strip().split('\n'):
+            line = line.strip()
+            if not line:
+                continue
+            extracted_url = self.extract_bilibili_url(line)
+            if extracted_url:
+                urls.append(extracted_url)
+            elif self.is_valid_bilibili_url(line):
+                urls.append(line)
+        return list(set(urls))
+
+    def create_batch(self, urls_text: str) -> List[str]:
+        """validate_urls + create_batch_download + BatchDownloadRequest.validate"""
+        self.parse_urls(urls_text)
+        for line in urls_text.strip().split('\n'):
+            line = line.strip()
+            if line:
+                self.extract_bilibili_url(line) or self.is_valid_bilibili_url(line)
+
+        urls = self.parse_urls(urls_text)
+        valid_urls = []
+        for url in urls:
+            extracted_url = self.extract_bilibili_url(url)
+            if extracted_url:
+                valid_urls.append(extracted_url)
+            elif self.is_valid_bilibili_url(url):
+                valid_urls.append(url)
+        return valid_urls
+
+
+def make_paste(line_count: int) -> str:
+    """生成混合格式的粘贴文本"""
+    templates = [
+        'https://www.bilibili.com/video/BV1{n:09d}',
+        'https://www.bilibili.com/video/BV1{n:09d}/?spm_id_from=333.999.0.0&p=2',
+        '【某UP主的投稿{n}】 https://www.bilibili.com/video/BV1{n:09d}?share_source=copy_web',
+        'BV1{n:09d}',
+        'av{n}',
+        'https://b23.tv/a{n:06d}',
+        'BV1{n:09d} BV2{n:09d}, https://www.bilibili.com/video/av{n}',
+        '这一行没有链接 {n}',
+    ]
+    return '\n'.join(templates[i % len(templates)].format(n=i) for i in range(line_count))
+
+
+def _best_of(func: Callable[[], Any], repeat: int) -> float:
+    """多次运行取最短耗时（秒）"""
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def run(line_count: int, repeat: int = 5) -> Dict[str, Any]:
+    """执行基准测试"""
+    text = make_paste(line_count)
+    legacy = LegacyURLParser()
+    scanner = URLScanner()
+
+    legacy_urls = legacy.create_batch(text)
+    scan_result = scanner.scan(text)
+
+    return {
+        'lines': line_count,
+        'legacy': {
+            'seconds': _best_of(lambda: legacy.create_batch(text), repeat),
+            'urls': len(legacy_urls)
+        },
+        'current': {
+            'seconds': _best_of(lambda: scanner.scan(text), repeat),
+            'urls': len(scan_result.urls),
+            'invalid_lines': len(scan_result.invalid_lines)
+        }
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='批量粘贴URL解析基准测试')
+    parser.add_argument('--lines', type=int, default=10000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--json', action='store_true', help='以JSON格式输出结果')
+    args = parser.parse_args()
+
+    result = run(args.lines, args.repeat)
+    if args.json:
+        print(json.dumps(result, indent=2))
+        return
+
+    print(f"行数: {result['lines']}")
+    print(f"{'':10}{'耗时(ms)':>12}{'链接数':>10}")
+    for name in ('legacy', 'current'):
+        row = result[name]
+        print(f"{name:10}{row['seconds'] * 1000:>12.1f}{row['urls']:>10}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,188 @@
+"""
+基准测试的离线夹具
+
+- 合成音频：WAV正弦波（交给yt-dlp下载和FFmpeg转码）、由静音MPEG帧组成的MP3（用于标签写入，不需要FFmpeg）
+- 本地HTTP服务器：在127.0.0.1上提供合成音频，yt-dlp通过通用提取器（generic）下载，可限制带宽模拟网络
+- 隔离的服务实例：下载目录、临时目录、曲库数据库和批量任务存储都放在临时目录中
+"""
+import math
+import time
+import wave
+import array
+import shutil
+import tempfile
+import threading
+import statistics
+from contextlib import contextmanager
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+# MPEG-1 Layer III，128kbps，44.1kHz，无填充：每帧 144 * 128000 / 44100 = 417 字节
+MP3_FRAME_HEADER = b'\xff\xfb\x90\x64'
+MP3_FRAME_SIZE = 417
+
+
+def write_wav(path: Path, seconds: float, sample_rate: int = 44100, frequency: float = 440.0) -> Path:
+    """写入双声道16位正弦波WAV文件"""
+    one_second = array.array('h', (
+        int(12000 * math.sin(2 * math.pi * frequency * i / sample_rate))
+        for i in range(sample_rate)
+        for _ in range(2)
+    )).tobytes()
+
+    with wave.open(str(path), 'wb') as wav:
+        wav.setnchannels(2)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        whole_seconds = int(seconds)
+        for _ in range(whole_seconds):
+            wav.writeframes(one_second)
+        remainder = int((seconds - whole_seconds) * sample_rate) * 4
+        if remainder:
+            wav.writeframes(one_second[:remainder])
+    return path
+
+
+def write_mp3(path: Path, size_bytes: int) -> Path:
+    """写入由静音帧组成的MP3文件（大小约为 size_bytes，mutagen可正常读写标签）"""
+    frame = MP3_FRAME_HEADER + bytes(MP3_FRAME_SIZE - len(MP3_FRAME_HEADER))
+    frames = max(1, size_bytes // MP3_FRAME_SIZE)
+    chunk = frame * 256
+    with open(path, 'wb') as f:
+        for _ in range(frames // 256):
+            f.write(chunk)
+        f.write(frame * (frames % 256))
+    return path
+
+
+class _FixtureHandler(SimpleHTTPRequestHandler):
+    """静态文件处理器：不输出访问日志，可按带宽限制发送"""
+
+    rate_limit = 0  # 字节/秒，0表示不限制
+
+    def log_message(self, format, *args):
+        pass
+
+    def copyfile(self, source, outputfile):
+        if not self.rate_limit:
+            return super().copyfile(source, outputfile)
+
+        chunk_size = 64 * 1024
+        started = time.perf_counter()
+        sent = 0
+        while True:
+            chunk = source.read(chunk_size)
+            if not chunk:
+                break
+            outputfile.write(chunk)
+            sent += len(chunk)
+            delay = sent / self.rate_limit - (time.perf_counter() - started)
+            if delay > 0:
+                time.sleep(delay)
+
+
+class FixtureServer:
+    """在后台线程中运行的本地HTTP服务器"""
+
+    def __init__(self, directory: Path, rate_limit: int = 0):
+        self.directory = Path(directory)
+        handler = type('Handler', (_FixtureHandler,), {'rate_limit': rate_limit})
+        self._server = ThreadingHTTPServer(
+            ('127.0.0.1', 0),
+            lambda *args, **kwargs: handler(*args, directory=str(self.directory), **kwargs)
+        )
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    def url(self, filename: str) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/{filename}"
+
+    def __enter__(self) -> 'FixtureServer':
+        self._thread = threading.Thread(target=self._server.serve_forever, name='fixture-server', daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+@contextmanager
+def workspace(prefix: str = 'bench-') -> Iterator[Path]:
+    """临时工作目录，结束后删除"""
+    root = Path(tempfile.mkdtemp(prefix=prefix))
+    try:
+        yield root
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+def build_services(root: Path, concurrency: int = 1) -> Dict[str, Any]:
+    """创建使用 root 下目录的服务实例（不影响正式的下载目录、曲库和批量任务）"""
+    from services.library_service import LibraryService
+    from services.download_service import DownloadService
+    from services.download_scheduler import DownloadScheduler
+    from services.tag_service import TagService
+    from services.batch_download_service import BatchDownloadService
+
+    download_path = root / 'downloads'
+    download_path.mkdir(parents=True, exist_ok=True)
+
+    library_service = LibraryService(db_path=str(root / 'library.db'))
+    library_service.download_path = download_path
+
+    download_service = DownloadService(
+        library_service=library_service,
+        download_slots=threading.BoundedSemaphore(concurrency)
+    )
+    download_service.download_path = download_path
+    download_service.temp_path = root / 'temp'
+    download_service.temp_path.mkdir(exist_ok=True)
+
+    tag_service = TagService(library_service=library_service)
+    tag_service.download_path = download_path
+
+    batch_service = BatchDownloadService(
+        runs_batches=True,
+        download_service=download_service,
+        tag_service=tag_service,
+        scheduler=DownloadScheduler(concurrency)
+    )
+    batch_service.batch_storage_path = root / 'batch_storage'
+    batch_service.batch_storage_path.mkdir(exist_ok=True)
+
+    return {
+        'library_service': library_service,
+        'download_service': download_service,
+        'tag_service': tag_service,
+        'batch_service': batch_service
+    }
+
+
+def ffmpeg_path() -> Optional[str]:
+    """FFmpeg可执行文件路径，未安装时为None"""
+    return shutil.which('ffmpeg')
+
+
+def summarize(values: List[float]) -> Dict[str, float]:
+    """耗时样本的统计值（秒）"""
+    ordered = sorted(values)
+    return {
+        'runs': len(ordered),
+        'min_seconds': ordered[0],
+        'median_seconds': statistics.median(ordered),
+        'p95_seconds': ordered[max(0, math.ceil(0.95 * len(ordered)) - 1)],
+        'max_seconds': ordered[-1]
+    }
+
+
+def measure(func: Callable[[], Any], repeat: int) -> List[float]:
+    """运行 repeat 次，返回每次的耗时（秒）"""
+    durations = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        durations.append(time.perf_counter() - started)
+    return durations
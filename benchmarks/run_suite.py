@@ -0,0 +1,186 @@
+"""
+运行全部离线基准测试，输出JSON结果并与基线比较
+
+结果包含运行环境（Python、平台、序列化后端、yt-dlp和FFmpeg版本、git版本），
+保存后可作为下一个版本的基线：
+
+    python -m benchmarks.run_suite --output results/v1.2.json
+    python -m benchmarks.run_suite --compare results/v1.2.json --output results/v1.3.json
+
+比较时把结果展开为点分路径的数值，只比较受抖动影响小的指标：median_seconds 越小越好，
+*_per_second 和 realtime_factor 越大越好，变化超过 --threshold 时标记为退化（退出码为1）。
+"""
+import sys
+import json
+import time
+import argparse
+import platform
+import subprocess
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from benchmarks import bench_pipeline, bench_transcode, bench_tags, bench_persistence
+from benchmarks.fixtures import ffmpeg_path
+
+# 预设 → 各基准测试的参数
+PRESETS: Dict[str, Dict[str, Dict[str, Any]]] = {
+    'quick': {
+        'pipeline': {'jobs': 3, 'tasks': 8, 'concurrency': (1, 4), 'seconds': 10.0},
+        'transcode': {'codecs': ('mp3', 'aac', 'opus', 'flac'), 'seconds': 30.0, 'repeat': 2},
+        'tags': {'sizes_mb': (1, 10), 'repeat': 3},
+        'persistence': {'sizes': (100, 1000), 'repeat': 3},
+    },
+    'full': {
+        'pipeline': {'jobs': 5, 'tasks': 20, 'concurrency': (1, 2, 4, 8), 'seconds': 30.0},
+        'transcode': {'codecs': ('mp3', 'aac', 'opus', 'vorbis', 'flac'), 'seconds': 60.0, 'repeat': 3},
+        'tags': {'sizes_mb': (1, 10, 50), 'repeat': 5},
+        'persistence': {'sizes': (100, 1000, 5000), 'repeat': 5},
+    },
+}
+
+BENCHMARKS: Dict[str, Callable[..., Dict[str, Any]]] = {
+    'pipeline': bench_pipeline.run,
+    'transcode': bench_transcode.run,
+    'tags': bench_tags.run,
+    'persistence': bench_persistence.run,
+}
+
+
+def _command_output(command) -> Optional[str]:
+    try:
+        result = subprocess.run(command, capture_output=True, text=True, timeout=10)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    if result.returncode != 0:
+        return None
+    return result.stdout.strip().splitlines()[0] if result.stdout.strip() else None
+
+
+def environment() -> Dict[str, Any]:
+    """运行环境信息，用于判断两次结果是否可比"""
+    from utils import serialization
+
+    try:
+        from yt_dlp.version import __version__ as ytdlp_version
+    except ImportError:
+        ytdlp_version = None
+
+    ffmpeg = ffmpeg_path()
+    return {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'serializer': serialization.backend_name(),
+        'yt_dlp': ytdlp_version,
+        'ffmpeg': _command_output([ffmpeg, '-version']) if ffmpeg else None,
+        'git': _command_output(['git', 'describe', '--always', '--dirty', '--tags']),
+    }
+
+
+def run_suite(preset: str = 'quick', only=None) -> Dict[str, Any]:
+    """按预设运行基准测试，单个基准测试失败时记录错误并继续"""
+    results = {}
+    for name, params in PRESETS[preset].items():
+        if only and name not in only:
+            continue
+        print(f"运行 {name} ...", file=sys.stderr)
+        started = time.perf_counter()
+        try:
+            results[name] = BENCHMARKS[name](**params)
+        except Exception as e:
+            results[name] = {'error': str(e)}
+        print(f"  完成，耗时 {time.perf_counter() - started:.1f}秒", file=sys.stderr)
+
+    return {'preset': preset, 'environment': environment(), 'results': results}
+
+
+def flatten(value: Any, prefix: str = '') -> Dict[str, float]:
+    """把嵌套结果展开为 {点分路径: 数值}；列表元素用其标识字段（如 concurrency、tasks）命名"""
+    flat = {}
+    if isinstance(value, dict):
+        for key, item in value.items():
+            flat.update(flatten(item, f"{prefix}.{key}" if prefix else str(key)))
+    elif isinstance(value, list):
+        for index, item in enumerate(value):
+            label = str(index)
+            if isinstance(item, dict):
+                for key in ('concurrency', 'tasks', 'size_mb'):
+                    if key in item:
+                        label = f"{key}={item[key]}"
+                        break
+            flat.update(flatten(item, f"{prefix}[{label}]"))
+    elif isinstance(value, (int, float)) and not isinstance(value, bool):
+        flat[prefix] = float(value)
+    return flat
+
+
+def _direction(key: str) -> int:
+    """1：越大越好，-1：越小越好，0：不比较"""
+    name = key.rsplit('.', 1)[-1]
+    if name.endswith('per_second') or name == 'realtime_factor':
+        return 1
+    if name == 'median_seconds':
+        return -1
+    return 0
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any],
+            threshold: float = 0.1) -> Tuple[list, int]:
+    """比较两次结果，返回 (每项的 [路径, 基线, 当前, 比例, 是否退化], 退化数)"""
+    old = flatten(baseline.get('results', {}))
+    new = flatten(current.get('results', {}))
+
+    rows = []
+    regressions = 0
+    for key in sorted(old.keys() & new.keys()):
+        direction = _direction(key)
+        if not direction or not old[key]:
+            continue
+        ratio = new[key] / old[key]
+        regressed = ratio > 1 + threshold if direction < 0 else ratio < 1 - threshold
+        regressions += regressed
+        rows.append([key, old[key], new[key], ratio, regressed])
+    return rows, regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='运行全部离线基准测试')
+    parser.add_argument('--preset', choices=sorted(PRESETS), default='quick')
+    parser.add_argument('--only', default='', help=f"只运行指定的基准测试，逗号分隔，可选 {','.join(BENCHMARKS)}")
+    parser.add_argument('--output', help='结果保存路径（JSON）')
+    parser.add_argument('--compare', help='基线结果路径（JSON）')
+    parser.add_argument('--threshold', type=float, default=0.1, help='判定退化的变化比例')
+    args = parser.parse_args()
+
+    only = {name.strip() for name in args.only.split(',') if name.strip()}
+    result = run_suite(args.preset, only)
+
+    if args.output:
+        output = Path(args.output)
+        output.parent.mkdir(parents=True, exist_ok=True)
+        output.write_text(json.dumps(result, indent=2, ensure_ascii=False), encoding='utf-8')
+        print(f"结果已保存: {output}", file=sys.stderr)
+
+    if not args.compare:
+        if not args.output:
+            print(json.dumps(result, indent=2, ensure_ascii=False))
+        return
+
+    baseline = json.loads(Path(args.compare).read_text(encoding='utf-8'))
+    for key in ('python', 'serializer', 'yt_dlp', 'ffmpeg'):
+        old_value = baseline.get('environment', {}).get(key)
+        new_value = result['environment'].get(key)
+        if old_value != new_value:
+            print(f"注意: 运行环境不同 {key}: {old_value} → {new_value}")
+
+    rows, regressions = compare(result, baseline, args.threshold)
+    print(f"{'指标':60}{'基线':>12}{'当前':>12}{'比例':>8}")
+    for key, old_value, new_value, ratio, regressed in rows:
+        mark = '  退化' if regressed else ''
+        print(f"{key:60}{old_value:>12.4g}{new_value:>12.4g}{ratio:>8.2f}{mark}")
+    print(f"\n{len(rows)}项指标，{regressions}项退化（阈值 {args.threshold:.0%}）")
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
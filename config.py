@@ -25,9 +25,13 @@ DEFAULT_TAGS = {
 
 # 日志配置
 LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')  # DEBUG, INFO, WARNING, ERROR, CRITICAL
-LOG_FILE = os.getenv('LOG_FILE', 'app.log')
+LOG_FILE = os.getenv('LOG_FILE', 'logs/app.log')
 LOG_MAX_SIZE = 10 * 1024 * 1024  # 10MB
 LOG_BACKUP_COUNT = 5
+# 日志格式：json（每行一个JSON对象，附带job_id/batch_id等上下文）或 text
+LOG_FORMAT = os.getenv('LOG_FORMAT', 'json').lower()
+# yt-dlp下载进度行的最小输出间隔（秒，每个下载线程分别计算，仅DEBUG级别输出）
+LOG_PROGRESS_INTERVAL = float(os.getenv('LOG_PROGRESS_INTERVAL', '5'))
 
 # 认证配置
 LOGIN_REQUIRED = os.getenv('LOGIN_REQUIRED', 'True').lower() == 'true'
@@ -38,10 +42,81 @@ SESSION_TIMEOUT = int(os.getenv('SESSION_TIMEOUT', '3600'))
 # Navidrome配置
 NAVIDROME_URL = os.getenv('NAVIDROME_URL')
 NAVIDROME_API_KEY = os.getenv('NAVIDROME_API_KEY')
+# Subsonic API认证（设置后优先于API Key）
+NAVIDROME_USERNAME = os.getenv('NAVIDROME_USERNAME')
+NAVIDROME_PASSWORD = os.getenv('NAVIDROME_PASSWORD')
+# 服务器支持时只扫描发生变化的目录，MUSIC_LIBRARY需对应Navidrome的音乐库根目录
+NAVIDROME_TARGETED_SCAN = os.getenv('NAVIDROME_TARGETED_SCAN', 'True').lower() == 'true'
+NAVIDROME_LIBRARY_ID = int(os.getenv('NAVIDROME_LIBRARY_ID', '1'))
+NAVIDROME_SCAN_DEBOUNCE = float(os.getenv('NAVIDROME_SCAN_DEBOUNCE', '10'))  # 秒，合并窗口
+NAVIDROME_SCAN_MAX_DELAY = float(os.getenv('NAVIDROME_SCAN_MAX_DELAY', '120'))  # 秒，持续有请求时的最长等待
+NAVIDROME_SCAN_POLL_INTERVAL = 5  # 秒，Navidrome正在扫描时的轮询间隔
+NAVIDROME_POOL_SIZE = int(os.getenv('NAVIDROME_POOL_SIZE', '4'))  # 连接池大小
+NAVIDROME_MAX_RETRIES = int(os.getenv('NAVIDROME_MAX_RETRIES', '3'))  # 连接错误重试次数
+NAVIDROME_STATUS_CACHE_TTL = float(os.getenv('NAVIDROME_STATUS_CACHE_TTL', '3'))  # 秒，状态响应缓存
 
 # 下载配置
+MAX_CONCURRENT_DOWNLOADS = int(os.getenv('MAX_CONCURRENT_DOWNLOADS', '2'))  # 单个下载和批量下载共用；按执行下载的进程计算（process模式下即worker.py）
+FFMPEG_CHECK_TTL = 300  # 秒，FFmpeg已安装的检查结果缓存时间
+# 单个下载的限制（0表示不限制）：总耗时、下载大小、视频时长；超出时中止下载并清理文件
 DOWNLOAD_TIMEOUT = int(os.getenv('DOWNLOAD_TIMEOUT', '300'))  # 5分钟
 MAX_DOWNLOAD_SIZE = int(os.getenv('MAX_DOWNLOAD_SIZE', '500'))  # 500MB
+MAX_DOWNLOAD_DURATION = int(os.getenv('MAX_DOWNLOAD_DURATION', '14400'))  # 秒，4小时
+DOWNLOAD_SOCKET_TIMEOUT = int(os.getenv('DOWNLOAD_SOCKET_TIMEOUT', '30'))  # 秒，网络读取无响应的超时
+# 首页单个下载任务：状态文件保留天数、每个进程内存中保留的任务数、
+# 排队超过多少秒仍未开始视为执行进程未运行并标记为失败（0表示不限制）
+DOWNLOAD_JOB_RETENTION_DAYS = int(os.getenv('DOWNLOAD_JOB_RETENTION_DAYS', '7'))
+DOWNLOAD_JOB_CACHE_SIZE = int(os.getenv('DOWNLOAD_JOB_CACHE_SIZE', '256'))
+DOWNLOAD_JOB_QUEUE_TIMEOUT = int(os.getenv('DOWNLOAD_JOB_QUEUE_TIMEOUT', '900'))
+# 单个下载状态事件流：每个Web进程同时保持的连接数（超出时浏览器改为轮询）、每次连接的最长时间（秒，之后浏览器自动重连）
+DOWNLOAD_EVENT_STREAMS = int(os.getenv('DOWNLOAD_EVENT_STREAMS', '4'))
+DOWNLOAD_EVENT_STREAM_DURATION = int(os.getenv('DOWNLOAD_EVENT_STREAM_DURATION', '30'))
+
+# 批量下载执行配置
+BATCH_MAX_URLS = int(os.getenv('BATCH_MAX_URLS', '5000'))  # 单个批量任务的URL数量上限
+# 流式导入：每个子批量任务的URL数量、请求体大小上限（MB）
+BATCH_IMPORT_CHUNK_SIZE = int(os.getenv('BATCH_IMPORT_CHUNK_SIZE', '200'))
+BATCH_IMPORT_MAX_SIZE = int(os.getenv('BATCH_IMPORT_MAX_SIZE', '64'))
+
+# 任务性能分析：是否始终开启（也可在运行时通过 /api/profiling 开关）、结果目录、
+# 每个任务记录的热点函数数、接口返回的最近任务数、目录中保留的任务数
+PROFILE_ENABLED = os.getenv('PROFILE_ENABLED', 'False').lower() == 'true'
+PROFILE_DIR = os.getenv('PROFILE_DIR', 'logs/profiles')
+PROFILE_TOP = int(os.getenv('PROFILE_TOP', '20'))
+PROFILE_HISTORY = int(os.getenv('PROFILE_HISTORY', '20'))
+PROFILE_KEEP = int(os.getenv('PROFILE_KEEP', '200'))
+
+# 运行指标（/metrics）：是否启用、访问令牌（启用登录时未登录的请求需携带）、多进程快照目录、快照间隔（秒）
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'True').lower() == 'true'
+METRICS_TOKEN = os.getenv('METRICS_TOKEN', '')
+METRICS_DIR = os.getenv('METRICS_DIR', 'batch_storage/metrics')
+METRICS_FLUSH_INTERVAL = float(os.getenv('METRICS_FLUSH_INTERVAL', '15'))
+
+# 订阅配置：检查到期订阅的间隔（秒，0表示禁用定时检查）、默认/最小检查间隔（秒）、单次检查最多读取的列表条目数
+SUBSCRIPTION_CHECK_INTERVAL = int(os.getenv('SUBSCRIPTION_CHECK_INTERVAL', '60'))
+SUBSCRIPTION_DEFAULT_INTERVAL = int(os.getenv('SUBSCRIPTION_DEFAULT_INTERVAL', '3600'))
+SUBSCRIPTION_MIN_INTERVAL = int(os.getenv('SUBSCRIPTION_MIN_INTERVAL', '600'))
+SUBSCRIPTION_MAX_ENTRIES = int(os.getenv('SUBSCRIPTION_MAX_ENTRIES', '2000'))
+# 单个下载和批量下载的执行方式 thread: 在Web进程的后台线程中执行（开发服务器）；process: 由独立的 worker.py 进程执行（gunicorn多进程部署）
+BATCH_EXECUTOR = os.getenv('BATCH_EXECUTOR', 'thread').lower()
+BATCH_EXECUTOR_POLL_INTERVAL = float(os.getenv('BATCH_EXECUTOR_POLL_INTERVAL', '2'))  # 秒，执行进程检查新任务的间隔
+# 批量任务内存缓存：条目数上限、任务总数上限（近似内存上限）、未访问过期时间（秒）
+# 执行中（下载中、已暂停）的任务不受限制，未启动和已结束的任务按LRU淘汰
+BATCH_CACHE_SIZE = int(os.getenv('BATCH_CACHE_SIZE', '256'))
+BATCH_CACHE_MAX_TASKS = int(os.getenv('BATCH_CACHE_MAX_TASKS', '20000'))
+BATCH_CACHE_TTL = float(os.getenv('BATCH_CACHE_TTL', '600'))
+
+# JSON序列化后端（API响应和批量任务持久化共用）：auto（优先orjson）、orjson、json
+JSON_BACKEND = os.getenv('JSON_BACKEND', 'auto').lower()
+
+# 曲库索引配置
+LIBRARY_DB_PATH = os.getenv('LIBRARY_DB_PATH', os.path.join('batch_storage', 'library.db'))
+LIBRARY_PAGE_SIZE = int(os.getenv('LIBRARY_PAGE_SIZE', '50'))
+LIBRARY_MAX_PAGE_SIZE = 200
+LIBRARY_SCAN_INTERVAL = int(os.getenv('LIBRARY_SCAN_INTERVAL', '3600'))  # 秒，0表示禁用定时扫描
+LIBRARY_SCAN_BATCH_SIZE = 500  # 每个事务写入的记录数
+LIBRARY_WATCH = os.getenv('LIBRARY_WATCH', 'False').lower() == 'true'  # 仅Linux，基于inotify
+LIBRARY_WATCH_DEBOUNCE = float(os.getenv('LIBRARY_WATCH_DEBOUNCE', '2'))  # 秒
 
 # 文件验证配置
 ALLOWED_IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.gif', '.bmp', '.webp'}
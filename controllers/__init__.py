@@ -5,10 +5,12 @@ from .download_controller import DownloadController
 from .tag_controller import TagController
 from .auth_controller import AuthController
 from .batch_controller import BatchController
+from .library_controller import LibraryController
 
 __all__ = [
     'DownloadController',
     'TagController',
     'AuthController',
-    'BatchController'
+    'BatchController',
+    'LibraryController'
 ]
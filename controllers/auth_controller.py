@@ -3,9 +3,9 @@
 """
 import logging
 from flask import request, redirect, url_for, flash, session
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 
-from services.auth_service import AuthService
+from services.service_container import ServiceContainer, get_services
 from utils.exceptions import AuthenticationError
 from models.user import LoginRequest
 
@@ -15,8 +15,9 @@ logger = logging.getLogger(__name__)
 class AuthController:
     """认证控制器类"""
     
-    def __init__(self):
-        self.auth_service = AuthService()
+    def __init__(self, services: Optional[ServiceContainer] = None):
+        services = services or get_services()
+        self.auth_service = services.auth_service
     
     def handle_login_request(self) -> Dict[str, Any]:
         """处理登录请求"""
@@ -66,7 +67,7 @@ class AuthController:
             }
             
         except Exception as e:
-            logger.error(f"登录处理失败: {str(e)}")
+            logger.error("登录处理失败: %s", e)
             return {
                 'success': False,
                 'error': 'internal',
@@ -92,7 +93,7 @@ class AuthController:
             }
             
         except Exception as e:
-            logger.error(f"登出处理失败: {str(e)}")
+            logger.error("登出处理失败: %s", e)
             return {
                 'success': False,
                 'error': 'internal',
@@ -113,7 +114,7 @@ class AuthController:
             }
             
         except Exception as e:
-            logger.error(f"检查认证状态失败: {str(e)}")
+            logger.error("检查认证状态失败: %s", e)
             return {
                 'success': False,
                 'error': 'internal',
@@ -146,7 +147,7 @@ class AuthController:
             }
             
         except Exception as e:
-            logger.error(f"获取登录页面数据失败: {str(e)}")
+            logger.error("获取登录页面数据失败: %s", e)
             return {
                 'success': False,
                 'error': 'internal',
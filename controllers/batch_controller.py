@@ -2,13 +2,21 @@
 批量下载控制器模块
 """
 import logging
+from pathlib import Path
 from flask import request, jsonify, render_template
-from typing import Dict, Any
+from typing import Dict, Any, Optional
+from werkzeug.exceptions import RequestEntityTooLarge
 
-from services.batch_download_service import BatchDownloadService
+from services.service_container import ServiceContainer, get_services
 from models.batch_download import BatchDownloadRequest, BatchStatus
 from utils.exceptions import ValidationError, DownloadError
 from utils.validators import URLValidator
+from utils.url_scanner import URLScanner, URLScanResult, iter_text_lines
+from utils.multipart import MultipartFileStream
+from config import BATCH_IMPORT_CHUNK_SIZE, BATCH_IMPORT_MAX_SIZE
+
+# 导入结果中最多返回的无效行和重复行明细
+IMPORT_REPORT_LIMIT = 100
 
 logger = logging.getLogger(__name__)
 
@@ -16,9 +24,11 @@ logger = logging.getLogger(__name__)
 class BatchController:
     """批量下载控制器类"""
     
-    def __init__(self):
-        self.batch_service = BatchDownloadService()
+    def __init__(self, services: Optional[ServiceContainer] = None):
+        services = services or get_services()
+        self.batch_service = services.batch_service
         self.url_validator = URLValidator()
+        self.url_scanner = URLScanner()
     
     def get_batch_page(self) -> Dict[str, Any]:
         """获取批量下载页面数据"""
@@ -32,13 +42,13 @@ class BatchController:
             return {
                 'success': True,
                 'data': {
-                    'batches': [batch.to_dict() for batch in batches],
+                    'batches': batches,
                     'statistics': statistics
                 }
             }
             
         except Exception as e:
-            logger.error(f"获取批量下载页面数据失败: {str(e)}")
+            logger.error("获取批量下载页面数据失败: %s", e)
             return {
                 'success': False,
                 'error': 'internal',
@@ -55,6 +65,7 @@ class BatchController:
             urls_text = data.get('urls', '')
             auto_edit_tags = data.get('auto_edit_tags', True)
             default_tags = data.get('default_tags', {})
+            priority = data.get('priority', 0)
             
             # 验证输入
             if not name:
@@ -71,8 +82,18 @@ class BatchController:
                     'message': '请输入要下载的URL列表'
                 }
             
-            # 解析URL列表
-            urls = self._parse_urls(urls_text)
+            try:
+                priority = int(priority)
+            except (TypeError, ValueError):
+                return {
+                    'success': False,
+                    'error': 'validation',
+                    'message': '优先级必须是整数'
+                }
+            
+            # 解析URL列表（只解析一次，结果随请求传给服务层）
+            scan_result = self._parse_urls(urls_text)
+            urls = scan_result.url_list
             if not urls:
                 return {
                     'success': False,
@@ -85,33 +106,141 @@ class BatchController:
                 name=name,
                 urls=urls,
                 auto_edit_tags=auto_edit_tags,
-                default_tags=default_tags
+                default_tags=default_tags,
+                priority=priority,
+                scan_result=scan_result
             )
             
             # 创建批量下载任务
             batch = self.batch_service.create_batch_download(batch_request)
             
+            message = f'批量下载任务创建成功，包含 {len(urls)} 个URL'
+            if scan_result.merged:
+                message += f'，合并了 {len(scan_result.merged)} 个重复链接'
+            
             return {
                 'success': True,
-                'data': batch.to_dict(),
-                'message': f'批量下载任务创建成功，包含 {len(urls)} 个URL'
+                'data': batch,
+                'merged_lines': scan_result.merged,
+                'message': message
             }
             
         except ValidationError as e:
-            logger.warning(f"批量下载验证错误: {str(e)}")
+            logger.warning("批量下载验证错误: %s", e)
             return {
                 'success': False,
                 'error': 'validation',
                 'message': str(e)
             }
         except Exception as e:
-            logger.error(f"创建批量下载任务失败: {str(e)}")
+            logger.error("创建批量下载任务失败: %s", e)
             return {
                 'success': False,
                 'error': 'internal',
                 'message': '创建批量下载任务失败'
             }
     
+    def import_batch_download(self) -> Dict[str, Any]:
+        """流式导入URL列表
+        
+        请求体可以是逐行的纯文本（参数放在查询字符串中），也可以是 multipart 上传的文件
+        （字段名 file，参数放在文件之前的表单字段或查询字符串中）。两种方式都直接解析请求流，
+        边读取边解析，每凑满一块就创建并启动一个子批量任务。
+        """
+        batches = []
+        scan_result = URLScanResult()
+        try:
+            # 导入接口单独放宽请求体大小上限
+            request.max_content_length = BATCH_IMPORT_MAX_SIZE * 1024 * 1024
+            
+            if request.mimetype == 'multipart/form-data':
+                # 不使用 request.files：它会先把整个上传写入临时文件
+                boundary = request.mimetype_params.get('boundary', '')
+                upload = MultipartFileStream(request.stream, boundary.encode()) if boundary else None
+                if not upload or not upload.filename:
+                    return {
+                        'success': False,
+                        'error': 'validation',
+                        'message': '请选择要导入的文件',
+                        'status_code': 400
+                    }
+                params = {**request.args.to_dict(), **upload.form}
+                stream = upload
+                default_name = Path(upload.filename).stem
+            else:
+                params = request.args
+                stream = request.stream
+                default_name = '批量导入'
+            
+            name = (params.get('name') or '').strip() or default_name
+            auto_edit_tags = params.get('auto_edit_tags', 'true').lower() != 'false'
+            try:
+                priority = int(params.get('priority', 0))
+                chunk_size = int(params.get('chunk_size', BATCH_IMPORT_CHUNK_SIZE))
+            except (TypeError, ValueError):
+                return {
+                    'success': False,
+                    'error': 'validation',
+                    'message': '优先级和分块大小必须是整数',
+                    'status_code': 400
+                }
+            
+            for batch in self.batch_service.iter_import_batch_downloads(
+                name, iter_text_lines(stream), scan_result,
+                chunk_size=chunk_size, priority=priority, auto_edit_tags=auto_edit_tags
+            ):
+                batches.append(batch)
+            
+            if not batches:
+                return {
+                    'success': False,
+                    'error': 'validation',
+                    'message': '没有找到有效的Bilibili URL',
+                    'data': self._import_report(batches, scan_result),
+                    'status_code': 400
+                }
+            
+            return {
+                'success': True,
+                'data': self._import_report(batches, scan_result),
+                'message': f'导入完成，创建了 {len(batches)} 个批量任务，共 {len(scan_result.urls)} 个URL',
+                'status_code': 201
+            }
+            
+        except RequestEntityTooLarge:
+            logger.warning("批量导入超过大小上限，已创建 %s 个批量任务", len(batches))
+            return {
+                'success': False,
+                'error': 'too_large',
+                'message': f'导入内容超过 {BATCH_IMPORT_MAX_SIZE}MB，已导入前 {len(batches)} 个批量任务',
+                'data': self._import_report(batches, scan_result),
+                'status_code': 413
+            }
+        except Exception as e:
+            logger.error("批量导入失败: %s", e)
+            return {
+                'success': False,
+                'error': 'internal',
+                'message': '批量导入失败',
+                'data': self._import_report(batches, scan_result),
+                'status_code': 500
+            }
+    
+    def _import_report(self, batches: list, scan_result: URLScanResult) -> Dict[str, Any]:
+        """导入结果（明细只返回前 IMPORT_REPORT_LIMIT 条）"""
+        return {
+            'batches': [
+                {'id': batch.id, 'name': batch.name, 'total_tasks': batch.total_tasks}
+                for batch in batches
+            ],
+            'total_valid': len(scan_result.urls),
+            'total_invalid': len(scan_result.invalid_lines),
+            'total_merged': len(scan_result.merged),
+            'total_lines': scan_result.total_lines,
+            'invalid_lines': scan_result.invalid_lines[:IMPORT_REPORT_LIMIT],
+            'merged_lines': scan_result.merged[:IMPORT_REPORT_LIMIT]
+        }
+    
     def start_batch_download(self, batch_id: str) -> Dict[str, Any]:
         """启动批量下载任务"""
         try:
@@ -130,7 +259,7 @@ class BatchController:
                 }
                 
         except Exception as e:
-            logger.error(f"启动批量下载任务失败: {str(e)}")
+            logger.error("启动批量下载任务失败: %s", e)
             return {
                 'success': False,
                 'error': 'internal',
@@ -155,13 +284,98 @@ class BatchController:
                 }
                 
         except Exception as e:
-            logger.error(f"取消批量下载任务失败: {str(e)}")
+            logger.error("取消批量下载任务失败: %s", e)
             return {
                 'success': False,
                 'error': 'internal',
                 'message': '取消批量下载任务失败'
             }
     
+    def pause_batch_download(self, batch_id: str) -> Dict[str, Any]:
+        """暂停批量下载任务"""
+        try:
+            success = self.batch_service.pause_batch_download(batch_id)
+            
+            if success:
+                return {
+                    'success': True,
+                    'message': '批量下载任务已暂停'
+                }
+            else:
+                return {
+                    'success': False,
+                    'error': 'pause_failed',
+                    'message': '只能暂停下载中的任务'
+                }
+                
+        except Exception as e:
+            logger.error("暂停批量下载任务失败: %s", e)
+            return {
+                'success': False,
+                'error': 'internal',
+                'message': '暂停批量下载任务失败'
+            }
+    
+    def resume_batch_download(self, batch_id: str) -> Dict[str, Any]:
+        """恢复批量下载任务"""
+        try:
+            success = self.batch_service.resume_batch_download(batch_id)
+            
+            if success:
+                return {
+                    'success': True,
+                    'message': '批量下载任务已恢复'
+                }
+            else:
+                return {
+                    'success': False,
+                    'error': 'resume_failed',
+                    'message': '只能恢复已暂停的任务'
+                }
+                
+        except Exception as e:
+            logger.error("恢复批量下载任务失败: %s", e)
+            return {
+                'success': False,
+                'error': 'internal',
+                'message': '恢复批量下载任务失败'
+            }
+    
+    def set_batch_priority(self, batch_id: str) -> Dict[str, Any]:
+        """修改批量下载任务优先级"""
+        try:
+            data = request.get_json() or {}
+            try:
+                priority = int(data.get('priority'))
+            except (TypeError, ValueError):
+                return {
+                    'success': False,
+                    'error': 'validation',
+                    'message': '优先级必须是整数'
+                }
+            
+            success = self.batch_service.set_batch_priority(batch_id, priority)
+            
+            if success:
+                return {
+                    'success': True,
+                    'message': f'优先级已修改为 {priority}'
+                }
+            else:
+                return {
+                    'success': False,
+                    'error': 'priority_failed',
+                    'message': '只能修改未结束任务的优先级'
+                }
+                
+        except Exception as e:
+            logger.error("修改批量下载任务优先级失败: %s", e)
+            return {
+                'success': False,
+                'error': 'internal',
+                'message': '修改优先级失败'
+            }
+    
     def get_batch_progress(self, batch_id: str) -> Dict[str, Any]:
         """获取批量下载进度"""
         try:
@@ -169,7 +383,7 @@ class BatchController:
             return result
             
         except Exception as e:
-            logger.error(f"获取批量下载进度失败: {str(e)}")
+            logger.error("获取批量下载进度失败: %s", e)
             return {
                 'success': False,
                 'error': 'internal',
@@ -190,11 +404,12 @@ class BatchController:
             
             return {
                 'success': True,
-                'data': batch.to_dict()
+                'data': batch,
+                'stage_statistics': batch.get_stage_statistics()
             }
             
         except Exception as e:
-            logger.error(f"获取批量下载详情失败: {str(e)}")
+            logger.error("获取批量下载详情失败: %s", e)
             return {
                 'success': False,
                 'error': 'internal',
@@ -219,7 +434,7 @@ class BatchController:
                 }
                 
         except Exception as e:
-            logger.error(f"删除批量下载任务失败: {str(e)}")
+            logger.error("删除批量下载任务失败: %s", e)
             return {
                 'success': False,
                 'error': 'internal',
@@ -237,78 +452,33 @@ class BatchController:
             }
             
         except Exception as e:
-            logger.error(f"获取批量下载统计信息失败: {str(e)}")
+            logger.error("获取批量下载统计信息失败: %s", e)
             return {
                 'success': False,
                 'error': 'internal',
                 'message': '获取统计信息失败'
             }
     
-    def _parse_urls(self, urls_text: str) -> list:
-        """解析URL文本"""
+    def _parse_urls(self, urls_text: str) -> URLScanResult:
+        """解析URL文本（单次扫描，一行可包含多个链接，重复链接按输入顺序合并）"""
         try:
-            urls = []
-            
-            # 按行分割
-            lines = urls_text.strip().split('\n')
-            
-            for line in lines:
-                line = line.strip()
-                if not line:
-                    continue
-                
-                # 尝试提取URL
-                extracted_url = self.url_validator.extract_bilibili_url(line)
-                if extracted_url:
-                    urls.append(extracted_url)
-                elif self.url_validator.is_valid_bilibili_url(line):
-                    urls.append(line)
-            
-            # 去重
-            return list(set(urls))
-            
+            return self.url_scanner.scan(urls_text)
         except Exception as e:
-            logger.error(f"解析URL失败: {str(e)}")
-            return []
+            logger.error("解析URL失败: %s", e)
+            return URLScanResult()
     
     def validate_urls(self, urls_text: str) -> Dict[str, Any]:
         """验证URL列表"""
         try:
-            urls = self._parse_urls(urls_text)
-            
-            valid_urls = []
-            invalid_lines = []
-            
-            lines = urls_text.strip().split('\n')
-            for i, line in enumerate(lines, 1):
-                line = line.strip()
-                if not line:
-                    continue
-                
-                extracted_url = self.url_validator.extract_bilibili_url(line)
-                if extracted_url:
-                    valid_urls.append(extracted_url)
-                elif self.url_validator.is_valid_bilibili_url(line):
-                    valid_urls.append(line)
-                else:
-                    invalid_lines.append({
-                        'line_number': i,
-                        'content': line,
-                        'reason': '不是有效的Bilibili URL'
-                    })
+            scan_result = self._parse_urls(urls_text)
             
             return {
                 'success': True,
-                'data': {
-                    'valid_urls': valid_urls,
-                    'invalid_lines': invalid_lines,
-                    'total_valid': len(valid_urls),
-                    'total_invalid': len(invalid_lines)
-                }
+                'data': scan_result.to_dict()
             }
             
         except Exception as e:
-            logger.error(f"验证URL列表失败: {str(e)}")
+            logger.error("验证URL列表失败: %s", e)
             return {
                 'success': False,
                 'error': 'internal',
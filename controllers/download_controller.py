@@ -1,16 +1,20 @@
 """
 下载控制器模块
 """
+import time
 import logging
-from flask import request, jsonify, redirect, url_for, session
-from typing import Dict, Any
+import threading
+from flask import request, jsonify, redirect, url_for
+from typing import Dict, Any, Iterator, Optional
 
-from services.download_service import DownloadService
-from services.tag_service import TagService
-from services.navidrome_service import NavidromeService
+from services.service_container import ServiceContainer, get_services
 from utils.validators import URLValidator, FileValidator
+from utils.url_scanner import URLScanner
 from utils.exceptions import ValidationError, DownloadError, FFmpegError
-from models.audio_file import DownloadResult, AudioFile
+from models.audio_file import DownloadResult
+from models.download_job import DownloadJob, JobStatus
+from utils import serialization
+from config import DOWNLOAD_EVENT_STREAMS, DOWNLOAD_EVENT_STREAM_DURATION
 
 logger = logging.getLogger(__name__)
 
@@ -18,12 +22,17 @@ logger = logging.getLogger(__name__)
 class DownloadController:
     """下载控制器类"""
     
-    def __init__(self):
-        self.download_service = DownloadService()
-        self.tag_service = TagService()
-        self.navidrome_service = NavidromeService()
+    def __init__(self, services: Optional[ServiceContainer] = None):
+        services = services or get_services()
+        self.download_service = services.download_service
+        self.download_job_service = services.download_job_service
+        self.tag_service = services.tag_service
+        self.navidrome_service = services.navidrome_service
         self.url_validator = URLValidator()
+        self.url_scanner = URLScanner()
         self.file_validator = FileValidator()
+        # 事件流连接占用gunicorn线程，限制每个进程同时保持的连接数
+        self.event_streams = threading.BoundedSemaphore(max(1, DOWNLOAD_EVENT_STREAMS))
     
     def handle_download_request(self) -> Dict[str, Any]:
         """处理下载请求"""
@@ -33,51 +42,30 @@ class DownloadController:
             if not url:
                 raise ValidationError("请输入URL")
             
-            # 尝试从文本中提取URL
-            extracted_url = self.url_validator.extract_bilibili_url(url)
-            if extracted_url:
-                url = extracted_url
-            
-            # 验证URL格式
-            if not self.url_validator.is_valid_bilibili_url(url):
+            # 从文本（URL、BV号、分享文本）中提取第一个链接
+            extracted = self.url_scanner.extract_first(url)
+            if not extracted:
                 raise ValidationError("无效的Bilibili URL，请确保URL来自bilibili.com或b23.tv，或输入有效的BV号")
+            url = extracted.url
             
             # 提前检查FFmpeg
             if not self.download_service.check_ffmpeg_installed():
                 raise FFmpegError("FFmpeg未安装，请安装FFmpeg并添加到系统PATH")
             
-            # 执行下载
-            result = self.download_service.download_audio(url)
-            
-            if result['status'] == 'error':
-                raise DownloadError(result['message'])
-            
-            # 验证下载结果
-            if 'filename' not in result:
-                raise DownloadError("未获取到文件名")
-            
-            # 创建音频文件对象
-            audio_file = AudioFile(
-                filename=result['filename'],
-                filepath=result['filepath'],
-                title=result['title'],
-                artist=result['artist'],
-                duration=result['duration'],
-                cover_filename=result.get('cover_filename'),
-                original_url=result['original_url']
-            )
+            # 加入下载队列（插到批量任务之前），不在请求线程中等待下载完成
+            job = self.download_job_service.submit(url)
             
-            # 保存当前文件名到session
-            session['current_filename'] = result['filename']
-            
-            # 返回重定向信息
             return {
                 'success': True,
-                'redirect_url': url_for('edit_tags', filename=result['filename'])
+                'job_id': job.id,
+                'status_url': url_for('api_download_status', job_id=job.id),
+                'events_url': url_for('api_download_events', job_id=job.id),
+                'message': '已加入下载队列',
+                'status_code': 202
             }
             
         except ValidationError as e:
-            logger.warning(f"验证错误: {str(e)}")
+            logger.warning("验证错误: %s", e)
             return {
                 'success': False,
                 'error': 'validation',
@@ -85,7 +73,7 @@ class DownloadController:
                 'status_code': 400
             }
         except FFmpegError as e:
-            logger.error(f"FFmpeg错误: {str(e)}")
+            logger.error("FFmpeg错误: %s", e)
             return {
                 'success': False,
                 'error': 'ffmpeg',
@@ -93,7 +81,7 @@ class DownloadController:
                 'status_code': 500
             }
         except DownloadError as e:
-            logger.error(f"下载错误: {str(e)}")
+            logger.error("下载错误: %s", e)
             return {
                 'success': False,
                 'error': 'download',
@@ -101,7 +89,7 @@ class DownloadController:
                 'status_code': 500
             }
         except Exception as e:
-            logger.error(f"下载过程中出错: {str(e)}")
+            logger.error("下载过程中出错: %s", e)
             return {
                 'success': False,
                 'error': 'internal',
@@ -109,6 +97,69 @@ class DownloadController:
                 'status_code': 500
             }
     
+    def get_download_job(self, job_id: str) -> Dict[str, Any]:
+        """获取单个下载任务状态"""
+        job = self.download_job_service.get_job(job_id)
+        if not job:
+            return {
+                'success': False,
+                'error': 'not_found',
+                'message': '下载任务不存在',
+                'status_code': 404
+            }
+        return self._job_payload(job)
+    
+    def stream_download_events(self, job_id: str) -> Iterator[str]:
+        """以Server-Sent Events推送下载任务状态
+
+        每次连接最多保持 DOWNLOAD_EVENT_STREAM_DURATION 秒，之后关闭连接由浏览器自动重连，
+        不会在下载期间一直占用gunicorn线程。连接数已满时发送 busy 事件，浏览器改为轮询状态接口。
+        """
+        if not self.event_streams.acquire(blocking=False):
+            yield "event: busy\ndata: {}\n\n"
+            return
+        
+        try:
+            deadline = time.monotonic() + DOWNLOAD_EVENT_STREAM_DURATION
+            last_state = None
+            # 连接关闭后浏览器1秒后重连
+            yield "retry: 1000\n\n"
+            
+            while True:
+                job = self.download_job_service.get_job(job_id)
+                if not job:
+                    payload = {'success': False, 'error': 'not_found', 'message': '下载任务不存在'}
+                    yield f"event: error\ndata: {serialization.dumps(payload).decode('utf-8')}\n\n"
+                    return
+                
+                state = (job.status, job.progress)
+                if state != last_state:
+                    last_state = state
+                    yield f"data: {serialization.dumps(self._job_payload(job)).decode('utf-8')}\n\n"
+                    if job.is_finished:
+                        return
+                else:
+                    # 保持连接，避免代理超时断开
+                    yield ": keep-alive\n\n"
+                
+                if time.monotonic() >= deadline:
+                    return
+                time.sleep(1)
+        finally:
+            self.event_streams.release()
+    
+    def _job_payload(self, job: DownloadJob) -> Dict[str, Any]:
+        """下载任务状态响应，完成时附带编辑页面地址"""
+        result = {
+            'success': True,
+            'data': job
+        }
+        if job.status == JobStatus.COMPLETED:
+            result['redirect_url'] = url_for('edit_tags', filename=job.filename)
+        elif job.status == JobStatus.FAILED:
+            result['message'] = job.error_message
+        return result
+    
     def check_ffmpeg_status(self) -> Dict[str, Any]:
         """检查FFmpeg状态"""
         try:
@@ -118,7 +169,7 @@ class DownloadController:
                 'installed': installed
             }
         except Exception as e:
-            logger.error(f"检查FFmpeg状态失败: {str(e)}")
+            logger.error("检查FFmpeg状态失败: %s", e)
             return {
                 'success': False,
                 'installed': False,
@@ -134,7 +185,7 @@ class DownloadController:
                 'progress': progress
             }
         except Exception as e:
-            logger.error(f"获取下载进度失败: {str(e)}")
+            logger.error("获取下载进度失败: %s", e)
             return {
                 'success': False,
                 'error': str(e)
@@ -0,0 +1,104 @@
+"""
+曲库控制器模块
+"""
+import logging
+from flask import request
+from typing import Dict, Any, Optional
+
+from services.service_container import ServiceContainer, get_services
+from config import LIBRARY_PAGE_SIZE
+
+logger = logging.getLogger(__name__)
+
+
+class LibraryController:
+    """曲库控制器类"""
+
+    def __init__(self, services: Optional[ServiceContainer] = None):
+        services = services or get_services()
+        self.library_service = services.library_service
+        self.library_scanner = services.library_scanner
+        self.library_watcher = services.library_watcher
+
+    def get_library(self) -> Dict[str, Any]:
+        """分页搜索曲库"""
+        try:
+            query = request.args.get('q', '').strip()
+            sort = request.args.get('sort', '').strip()
+
+            try:
+                page = int(request.args.get('page', 1))
+                per_page = int(request.args.get('per_page', LIBRARY_PAGE_SIZE))
+            except ValueError:
+                return {
+                    'success': False,
+                    'error': 'validation',
+                    'message': '分页参数无效'
+                }
+
+            if len(query) > 200:
+                query = query[:200]
+
+            result = self.library_service.search(query, page=page, per_page=per_page, sort=sort)
+
+            return {
+                'success': True,
+                'data': result
+            }
+
+        except Exception as e:
+            logger.error("搜索曲库失败: %s", e)
+            return {
+                'success': False,
+                'error': 'internal',
+                'message': '搜索曲库失败'
+            }
+
+    def get_library_statistics(self) -> Dict[str, Any]:
+        """获取曲库统计信息"""
+        try:
+            return {
+                'success': True,
+                'data': self.library_service.get_statistics()
+            }
+        except Exception as e:
+            logger.error("获取曲库统计信息失败: %s", e)
+            return {
+                'success': False,
+                'error': 'internal',
+                'message': '获取曲库统计信息失败'
+            }
+
+    def start_scan(self) -> Dict[str, Any]:
+        """按需触发曲库增量扫描"""
+        try:
+            started = self.library_scanner.request_scan()
+            return {
+                'success': True,
+                'message': '曲库扫描已启动' if started else '曲库扫描正在进行中',
+                'data': self.library_scanner.get_status()
+            }
+        except Exception as e:
+            logger.error("启动曲库扫描失败: %s", e)
+            return {
+                'success': False,
+                'error': 'internal',
+                'message': '启动曲库扫描失败'
+            }
+
+    def get_scan_status(self) -> Dict[str, Any]:
+        """获取曲库扫描状态"""
+        try:
+            status = self.library_scanner.get_status()
+            status['watcher'] = self.library_watcher.get_status()
+            return {
+                'success': True,
+                'data': status
+            }
+        except Exception as e:
+            logger.error("获取曲库扫描状态失败: %s", e)
+            return {
+                'success': False,
+                'error': 'internal',
+                'message': '获取曲库扫描状态失败'
+            }
@@ -0,0 +1,85 @@
+"""
+性能分析控制器模块
+"""
+import logging
+from flask import request
+from pathlib import Path
+from typing import Dict, Any, Optional
+
+from utils.profiler import JobProfiler, PROFILER
+from config import PROFILE_HISTORY
+
+logger = logging.getLogger(__name__)
+
+
+class ProfilingController:
+    """性能分析控制器类"""
+
+    def __init__(self, profiler: Optional[JobProfiler] = None):
+        self.profiler = profiler or PROFILER
+
+    def get_status(self) -> Dict[str, Any]:
+        """获取开关状态、最近任务的热点和汇总热点"""
+        try:
+            try:
+                limit = int(request.args.get('limit', PROFILE_HISTORY))
+            except ValueError:
+                return {
+                    'success': False,
+                    'error': 'validation',
+                    'message': 'limit必须是整数',
+                    'status_code': 400
+                }
+
+            return {
+                'success': True,
+                'data': self.profiler.get_status(max(1, min(limit, 200)))
+            }
+        except Exception as e:
+            logger.error("获取性能分析结果失败: %s", e)
+            return {
+                'success': False,
+                'error': 'internal',
+                'message': '获取性能分析结果失败',
+                'status_code': 500
+            }
+
+    def set_enabled(self) -> Dict[str, Any]:
+        """开启或关闭任务性能分析"""
+        try:
+            data = request.get_json() or {}
+            if not isinstance(data.get('enabled'), bool):
+                return {
+                    'success': False,
+                    'error': 'validation',
+                    'message': '请提供 enabled（true/false）',
+                    'status_code': 400
+                }
+
+            self.profiler.set_enabled(data['enabled'])
+            status = {'enabled': self.profiler.is_enabled(), 'forced': self.profiler.is_forced}
+            if status['forced'] and not data['enabled']:
+                message = 'PROFILE_ENABLED=True，性能分析始终开启'
+            else:
+                message = '性能分析已开启' if data['enabled'] else '性能分析已关闭'
+
+            return {
+                'success': True,
+                'data': status,
+                'message': message
+            }
+        except Exception as e:
+            logger.error("修改性能分析开关失败: %s", e)
+            return {
+                'success': False,
+                'error': 'internal',
+                'message': '修改性能分析开关失败',
+                'status_code': 500
+            }
+
+    def get_profile_path(self, name: str) -> Optional[Path]:
+        """获取某个任务的 .prof 文件路径（名称必须是摘要中的名称）"""
+        profile_file = self.profiler.profile_dir / f"{name}.prof"
+        if profile_file.parent != self.profiler.profile_dir or not profile_file.is_file():
+            return None
+        return profile_file
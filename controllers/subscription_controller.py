@@ -0,0 +1,165 @@
+"""
+订阅控制器模块
+"""
+import logging
+from flask import request
+from typing import Dict, Any, Optional
+
+from services.service_container import ServiceContainer, get_services
+from utils.exceptions import ValidationError
+from config import SUBSCRIPTION_DEFAULT_INTERVAL
+
+logger = logging.getLogger(__name__)
+
+
+class SubscriptionController:
+    """订阅控制器类"""
+
+    def __init__(self, services: Optional[ServiceContainer] = None):
+        services = services or get_services()
+        self.subscription_service = services.subscription_service
+
+    def list_subscriptions(self) -> Dict[str, Any]:
+        """获取订阅列表"""
+        try:
+            return {
+                'success': True,
+                'data': {
+                    'subscriptions': self.subscription_service.list_subscriptions(),
+                    'status': self.subscription_service.get_status()
+                }
+            }
+        except Exception as e:
+            logger.error("获取订阅列表失败: %s", e)
+            return {
+                'success': False,
+                'error': 'internal',
+                'message': '获取订阅列表失败',
+                'status_code': 500
+            }
+
+    def create_subscription(self) -> Dict[str, Any]:
+        """创建订阅"""
+        try:
+            data = request.get_json() or {}
+
+            url = (data.get('url') or '').strip()
+            if not url:
+                raise ValidationError("请输入订阅地址")
+
+            try:
+                interval = int(data.get('interval', SUBSCRIPTION_DEFAULT_INTERVAL))
+                priority = int(data.get('priority', 0))
+            except (TypeError, ValueError):
+                raise ValidationError("检查间隔和优先级必须是整数")
+
+            subscription = self.subscription_service.create_subscription(
+                url,
+                name=data.get('name') or '',
+                interval=interval,
+                priority=priority,
+                auto_edit_tags=bool(data.get('auto_edit_tags', True)),
+                backfill=bool(data.get('backfill', True))
+            )
+
+            return {
+                'success': True,
+                'data': subscription,
+                'message': '订阅创建成功，稍后开始首次同步',
+                'status_code': 201
+            }
+
+        except ValidationError as e:
+            return {
+                'success': False,
+                'error': 'validation',
+                'message': str(e),
+                'status_code': 400
+            }
+        except Exception as e:
+            logger.error("创建订阅失败: %s", e)
+            return {
+                'success': False,
+                'error': 'internal',
+                'message': '创建订阅失败',
+                'status_code': 500
+            }
+
+    def update_subscription(self, subscription_id: str) -> Dict[str, Any]:
+        """修改订阅设置"""
+        try:
+            data = request.get_json() or {}
+            try:
+                subscription = self.subscription_service.update_subscription(subscription_id, **data)
+            except (TypeError, ValueError):
+                raise ValidationError("设置值无效")
+
+            return {
+                'success': True,
+                'data': subscription,
+                'message': '订阅设置已更新'
+            }
+
+        except ValidationError as e:
+            return {
+                'success': False,
+                'error': 'validation',
+                'message': str(e),
+                'status_code': 400
+            }
+        except Exception as e:
+            logger.error("修改订阅失败: %s", e)
+            return {
+                'success': False,
+                'error': 'internal',
+                'message': '修改订阅失败',
+                'status_code': 500
+            }
+
+    def sync_subscription(self, subscription_id: str) -> Dict[str, Any]:
+        """立即同步订阅"""
+        try:
+            subscription = self.subscription_service.request_sync(subscription_id)
+            return {
+                'success': True,
+                'data': subscription,
+                'message': '订阅将在下一次检查时同步'
+            }
+        except ValidationError as e:
+            return {
+                'success': False,
+                'error': 'validation',
+                'message': str(e),
+                'status_code': 404
+            }
+        except Exception as e:
+            logger.error("同步订阅失败: %s", e)
+            return {
+                'success': False,
+                'error': 'internal',
+                'message': '同步订阅失败',
+                'status_code': 500
+            }
+
+    def delete_subscription(self, subscription_id: str) -> Dict[str, Any]:
+        """删除订阅"""
+        try:
+            if not self.subscription_service.delete_subscription(subscription_id):
+                return {
+                    'success': False,
+                    'error': 'validation',
+                    'message': '订阅不存在',
+                    'status_code': 404
+                }
+            return {
+                'success': True,
+                'message': '订阅已删除'
+            }
+        except Exception as e:
+            logger.error("删除订阅失败: %s", e)
+            return {
+                'success': False,
+                'error': 'internal',
+                'message': '删除订阅失败',
+                'status_code': 500
+            }
@@ -3,10 +3,9 @@
 """
 import logging
 from flask import request, jsonify, session
-from typing import Dict, Any
+from typing import Dict, Any, Optional
 
-from services.tag_service import TagService
-from services.navidrome_service import NavidromeService
+from services.service_container import ServiceContainer, get_services
 from utils.validators import FileValidator
 from utils.exceptions import ValidationError, TagEditError, FileError
 from models.audio_file import AudioFile
@@ -17,9 +16,10 @@ logger = logging.getLogger(__name__)
 class TagController:
     """标签控制器类"""
     
-    def __init__(self):
-        self.tag_service = TagService()
-        self.navidrome_service = NavidromeService()
+    def __init__(self, services: Optional[ServiceContainer] = None):
+        services = services or get_services()
+        self.tag_service = services.tag_service
+        self.scan_coordinator = services.scan_coordinator
         self.file_validator = FileValidator()
     
     def get_edit_page_data(self, filename: str) -> Dict[str, Any]:
@@ -64,7 +64,7 @@ class TagController:
             }
             
         except ValidationError as e:
-            logger.warning(f"验证错误: {str(e)}")
+            logger.warning("验证错误: %s", e)
             return {
                 'success': False,
                 'error': 'validation',
@@ -72,7 +72,7 @@ class TagController:
                 'status_code': 400
             }
         except FileError as e:
-            logger.warning(f"文件错误: {str(e)}")
+            logger.warning("文件错误: %s", e)
             return {
                 'success': False,
                 'error': 'file',
@@ -80,7 +80,7 @@ class TagController:
                 'status_code': 404
             }
         except Exception as e:
-            logger.error(f"获取编辑页面数据失败: {str(e)}")
+            logger.error("获取编辑页面数据失败: %s", e)
             return {
                 'success': False,
                 'error': 'internal',
@@ -160,17 +160,16 @@ class TagController:
             if not success:
                 raise TagEditError("标签更新失败")
             
-            # 触发Navidrome扫描
-            scan_success = self.navidrome_service.trigger_scan()
-            scan_message = "，曲库更新成功" if scan_success else "，但曲库更新失败"
+            # 登记Navidrome扫描（后台合并执行，不阻塞请求）
+            self.scan_coordinator.request_scan(f"标签更新: {filename}", paths=[filepath])
             
             return {
                 'success': True,
-                'message': f"标签更新成功{scan_message}"
+                'message': "标签更新成功，曲库将在稍后自动更新"
             }
             
         except ValidationError as e:
-            logger.warning(f"验证错误: {str(e)}")
+            logger.warning("验证错误: %s", e)
             return {
                 'success': False,
                 'error': 'validation',
@@ -178,7 +177,7 @@ class TagController:
                 'status_code': 400
             }
         except TagEditError as e:
-            logger.error(f"标签编辑错误: {str(e)}")
+            logger.error("标签编辑错误: %s", e)
             return {
                 'success': False,
                 'error': 'tag_edit',
@@ -186,7 +185,7 @@ class TagController:
                 'status_code': 500
             }
         except FileError as e:
-            logger.warning(f"文件错误: {str(e)}")
+            logger.warning("文件错误: %s", e)
             return {
                 'success': False,
                 'error': 'file',
@@ -194,7 +193,7 @@ class TagController:
                 'status_code': 404
             }
         except Exception as e:
-            logger.error(f"保存标签失败: {str(e)}")
+            logger.error("保存标签失败: %s", e)
             return {
                 'success': False,
                 'error': 'internal',
@@ -252,7 +251,7 @@ class TagController:
             }
             
         except Exception as e:
-            logger.error(f"获取封面失败: {str(e)}")
+            logger.error("获取封面失败: %s", e)
             return {
                 'success': False,
                 'error': 'internal',
@@ -0,0 +1,81 @@
+"""
+Gunicorn生产环境配置
+
+启动: gunicorn -c gunicorn.conf.py app:app
+
+Web进程使用gthread工作模式，可以被安全回收；单个下载、批量下载、曲库扫描等后台任务
+交给独立的 worker.py 进程执行，默认由gunicorn主进程启动并在退出时停止。
+"""
+import os
+import sys
+import time
+import subprocess
+import threading
+import multiprocessing
+from dotenv import load_dotenv
+
+# 在fork之前加载环境变量，Web进程和执行进程使用同一份配置
+load_dotenv()
+os.environ.setdefault('BATCH_EXECUTOR', 'process')
+
+bind = os.getenv('GUNICORN_BIND', f"0.0.0.0:{os.getenv('PORT', '5000')}")
+worker_class = 'gthread'
+workers = int(os.getenv('GUNICORN_WORKERS', str(min(multiprocessing.cpu_count() * 2 + 1, 8))))
+threads = int(os.getenv('GUNICORN_THREADS', '8'))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '120'))
+# 下载都由执行进程完成，回收Web进程时只需等待进行中的请求和事件流连接（最长 DOWNLOAD_EVENT_STREAM_DURATION 秒）结束
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', '45'))
+keepalive = 5
+
+# 定期回收Web进程释放内存，随机抖动避免所有进程同时重启
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', '1000'))
+max_requests_jitter = max_requests // 10
+
+# 不预加载应用，后台线程在各Web进程中按需启动
+preload_app = False
+
+accesslog = '-'
+errorlog = '-'
+loglevel = os.getenv('LOG_LEVEL', 'info').lower()
+
+_worker_process = None
+_stopping = threading.Event()
+
+
+def _embedded_worker_enabled() -> bool:
+    """是否由gunicorn主进程托管后台执行进程"""
+    return (os.environ.get('BATCH_EXECUTOR') == 'process' and
+            os.getenv('BATCH_WORKER_EMBEDDED', 'True').lower() == 'true')
+
+
+def _supervise_worker(server):
+    """启动后台执行进程，异常退出后自动重启"""
+    global _worker_process
+    worker_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'worker.py')
+
+    while not _stopping.is_set():
+        _worker_process = subprocess.Popen([sys.executable, worker_path])
+        server.log.info(f"后台执行进程已启动 (pid: {_worker_process.pid})")
+
+        returncode = _worker_process.wait()
+        if _stopping.is_set():
+            break
+        server.log.warning(f"后台执行进程退出 (code: {returncode})，5秒后重启")
+        time.sleep(5)
+
+
+def on_starting(server):
+    """主进程启动时启动后台执行进程"""
+    if _embedded_worker_enabled():
+        threading.Thread(target=_supervise_worker, args=(server,), daemon=True).start()
+
+
+def on_exit(server):
+    """主进程退出时停止后台执行进程"""
+    _stopping.set()
+    if _worker_process and _worker_process.poll() is None:
+        _worker_process.terminate()
+        try:
+            _worker_process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            _worker_process.kill()
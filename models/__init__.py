@@ -4,6 +4,8 @@
 from .audio_file import AudioFile, DownloadResult
 from .user import User, LoginRequest, SessionInfo
 from .batch_download import BatchDownload, DownloadTask, BatchStatus, TaskStatus, BatchDownloadRequest
+from .library_track import LibraryTrack
+from .download_job import DownloadJob, JobStatus
 
 __all__ = [
     'AudioFile',
@@ -15,5 +17,8 @@ __all__ = [
     'DownloadTask',
     'BatchStatus',
     'TaskStatus',
-    'BatchDownloadRequest'
+    'BatchDownloadRequest',
+    'LibraryTrack',
+    'DownloadJob',
+    'JobStatus'
 ]
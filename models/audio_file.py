@@ -5,6 +5,8 @@ from dataclasses import dataclass
 from typing import Dict, Any, Optional
 from pathlib import Path
 
+from utils.serialization import register_encoder
+
 
 @dataclass
 class AudioFile:
@@ -147,3 +149,7 @@ class DownloadResult:
     def error(cls, message: str, error_details: str = None) -> 'DownloadResult':
         """创建错误结果"""
         return cls(status='error', message=message, error_details=error_details)
+
+
+register_encoder(AudioFile, AudioFile.to_dict)
+register_encoder(DownloadResult, DownloadResult.to_dict)
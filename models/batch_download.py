@@ -5,13 +5,21 @@ from dataclasses import dataclass, field
 from typing import List, Dict, Any, Optional
 from enum import Enum
 from datetime import datetime
+import threading
+import math
+import time
 import uuid
 
+from config import BATCH_MAX_URLS
+from utils.serialization import register_encoder
+from utils.url_scanner import URLScanner, URLScanResult
+
 
 class BatchStatus(Enum):
     """批量下载状态枚举"""
     PENDING = "pending"      # 等待中
     DOWNLOADING = "downloading"  # 下载中
+    PAUSED = "paused"        # 已暂停
     COMPLETED = "completed"  # 已完成
     FAILED = "failed"        # 失败
     CANCELLED = "cancelled"  # 已取消
@@ -26,44 +34,84 @@ class TaskStatus(Enum):
     SKIPPED = "skipped"      # 跳过
 
 
-@dataclass
+# 不会再变化的任务状态
+FINISHED_TASK_STATUSES = (TaskStatus.COMPLETED, TaskStatus.FAILED, TaskStatus.SKIPPED)
+
+# 状态码 → 枚举单例
+TASK_STATUS_BY_CODE = {status.value: status for status in TaskStatus}
+
+
+def _percentile(values: List[float], q: float) -> float:
+    """最近秩百分位数（values 已排序且非空）"""
+    return values[max(0, math.ceil(q * len(values)) - 1)]
+
+
+def _to_timestamp(value: Any) -> Optional[float]:
+    """将存储中的时间（epoch秒或旧版ISO字符串）转换为epoch秒"""
+    if value is None or value == '':
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    return datetime.fromisoformat(value).timestamp()
+
+
 class DownloadTask:
-    """单个下载任务"""
-    id: str
-    url: str
-    title: str = ""
-    artist: str = ""
-    status: TaskStatus = TaskStatus.PENDING
-    progress: float = 0.0
-    error_message: str = ""
-    filename: str = ""
-    filepath: str = ""
-    duration: int = 0
-    created_at: datetime = field(default_factory=datetime.now)
-    completed_at: Optional[datetime] = None
+    """单个下载任务
     
-    def __post_init__(self):
-        """初始化后处理"""
-        if not self.id:
-            self.id = str(uuid.uuid4())
+    大批量任务会创建成千上万个实例，因此使用 __slots__ 并以epoch秒保存时间戳；
+    状态直接引用 TaskStatus 单例，反序列化时通过状态码表查找。
+    """
+    
+    __slots__ = (
+        'id', 'url', 'title', 'artist', 'status', 'progress', 'error_message',
+        'failure_reason', 'filename', 'filepath', 'duration', 'created_at', 'completed_at',
+        'stage_timings', 'downloaded_bytes'
+    )
+    
+    def __init__(self, id: str, url: str, title: str = "", artist: str = "",
+                 status: TaskStatus = TaskStatus.PENDING, progress: float = 0.0,
+                 error_message: str = "", filename: str = "", filepath: str = "",
+                 duration: int = 0, created_at: Optional[float] = None,
+                 completed_at: Optional[float] = None, failure_reason: str = "",
+                 stage_timings: Optional[Dict[str, float]] = None, downloaded_bytes: int = 0):
+        self.id = id or str(uuid.uuid4())
+        self.url = url
+        self.title = title
+        self.artist = artist
+        self.status = status
+        self.progress = progress
+        self.error_message = error_message
+        # 被下载限制中止时的原因（too_large/too_long/timeout）
+        self.failure_reason = failure_reason
+        self.filename = filename
+        self.filepath = filepath
+        self.duration = duration
+        self.created_at = created_at if created_at is not None else time.time()
+        self.completed_at = completed_at
+        # 最近一次执行的各阶段耗时（秒）：resolve、download、transcode、thumbnail，未执行时为None
+        self.stage_timings = stage_timings
+        self.downloaded_bytes = downloaded_bytes
+    
+    def __repr__(self) -> str:
+        return f"DownloadTask(id={self.id!r}, url={self.url!r}, status={self.status.value})"
     
     @property
     def is_completed(self) -> bool:
         """检查是否已完成"""
-        return self.status == TaskStatus.COMPLETED
+        return self.status is TaskStatus.COMPLETED
     
     @property
     def is_failed(self) -> bool:
         """检查是否失败"""
-        return self.status == TaskStatus.FAILED
+        return self.status is TaskStatus.FAILED
     
     @property
     def is_pending(self) -> bool:
         """检查是否等待中"""
-        return self.status == TaskStatus.PENDING
+        return self.status is TaskStatus.PENDING
     
     def to_dict(self) -> Dict[str, Any]:
-        """转换为字典"""
+        """转换为字典（时间戳为epoch秒）"""
         return {
             'id': self.id,
             'url': self.url,
@@ -72,40 +120,45 @@ class DownloadTask:
             'status': self.status.value,
             'progress': self.progress,
             'error_message': self.error_message,
+            'failure_reason': self.failure_reason,
             'filename': self.filename,
             'filepath': self.filepath,
             'duration': self.duration,
-            'created_at': self.created_at.isoformat(),
-            'completed_at': self.completed_at.isoformat() if self.completed_at else None
+            'created_at': self.created_at,
+            'completed_at': self.completed_at,
+            'stage_timings': self.stage_timings or {},
+            'downloaded_bytes': self.downloaded_bytes
         }
     
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> 'DownloadTask':
-        """从字典创建实例"""
-        task = cls(
+        """从字典创建实例（兼容ISO格式的时间戳）"""
+        return cls(
             id=data['id'],
             url=data['url'],
             title=data.get('title', ''),
             artist=data.get('artist', ''),
-            status=TaskStatus(data.get('status', 'pending')),
+            status=TASK_STATUS_BY_CODE[data.get('status', 'pending')],
             progress=data.get('progress', 0.0),
             error_message=data.get('error_message', ''),
             filename=data.get('filename', ''),
             filepath=data.get('filepath', ''),
-            duration=data.get('duration', 0)
+            duration=data.get('duration', 0),
+            created_at=_to_timestamp(data.get('created_at')),
+            completed_at=_to_timestamp(data.get('completed_at')),
+            failure_reason=data.get('failure_reason', ''),
+            stage_timings=data.get('stage_timings') or None,
+            downloaded_bytes=data.get('downloaded_bytes', 0)
         )
-        
-        if data.get('created_at'):
-            task.created_at = datetime.fromisoformat(data['created_at'])
-        if data.get('completed_at'):
-            task.completed_at = datetime.fromisoformat(data['completed_at'])
-        
-        return task
 
 
 @dataclass
 class BatchDownload:
-    """批量下载任务"""
+    """批量下载任务
+    
+    维护 id→任务 索引和各状态的任务计数，任务状态必须通过 update_task_status 修改，
+    计数在每次状态转换时增减，查询和进度计算不需要遍历任务列表。
+    """
     id: str
     name: str
     urls: List[str]
@@ -117,6 +170,10 @@ class BatchDownload:
     total_tasks: int = 0
     completed_tasks: int = 0
     failed_tasks: int = 0
+    priority: int = 0  # 调度优先级，数值大的先执行
+    _task_index: Dict[str, DownloadTask] = field(default_factory=dict, init=False, repr=False, compare=False)
+    _status_counts: Dict[TaskStatus, int] = field(default_factory=dict, init=False, repr=False, compare=False)
+    _lock: Any = field(default_factory=threading.RLock, init=False, repr=False, compare=False)
     
     def __post_init__(self):
         """初始化后处理"""
@@ -126,7 +183,28 @@ class BatchDownload:
         # 初始化任务列表
         if not self.tasks and self.urls:
             self.tasks = [DownloadTask(id=str(uuid.uuid4()), url=url) for url in self.urls]
+        
+        if self.tasks:
+            self.rebuild_index()
+    
+    def rebuild_index(self):
+        """根据任务列表重建索引和状态计数（替换 tasks 后调用）"""
+        with self._lock:
+            self._task_index = {task.id: task for task in self.tasks}
+            self._status_counts = {status: 0 for status in TaskStatus}
+            for task in self.tasks:
+                self._status_counts[task.status] += 1
             self.total_tasks = len(self.tasks)
+            self._sync_counters()
+    
+    def _sync_counters(self):
+        """同步对外的计数字段（调用方需持有锁）"""
+        self.completed_tasks = self._status_counts[TaskStatus.COMPLETED]
+        self.failed_tasks = self._status_counts[TaskStatus.FAILED]
+    
+    def count_tasks(self, status: TaskStatus) -> int:
+        """获取某一状态的任务数"""
+        return self._status_counts.get(status, 0)
     
     @property
     def progress(self) -> float:
@@ -152,32 +230,41 @@ class BatchDownload:
     
     def get_task_by_id(self, task_id: str) -> Optional[DownloadTask]:
         """根据ID获取任务"""
-        for task in self.tasks:
-            if task.id == task_id:
-                return task
-        return None
+        return self._task_index.get(task_id)
     
     def update_task_status(self, task_id: str, status: TaskStatus, **kwargs):
-        """更新任务状态"""
-        task = self.get_task_by_id(task_id)
-        if task:
+        """更新任务状态（状态计数同步增减，重试时不会重复计数）"""
+        with self._lock:
+            task = self._task_index.get(task_id)
+            if not task:
+                return
+            
+            previous = task.status
             task.status = status
             for key, value in kwargs.items():
                 if hasattr(task, key):
                     setattr(task, key, value)
             
+            if previous != status:
+                self._status_counts[previous] -= 1
+                self._status_counts[status] += 1
+                self._sync_counters()
+            
             if status == TaskStatus.COMPLETED:
-                task.completed_at = datetime.now()
-                self.completed_tasks += 1
-            elif status == TaskStatus.FAILED:
-                self.failed_tasks += 1
+                task.completed_at = time.time()
+            elif previous == TaskStatus.COMPLETED:
+                task.completed_at = None
             
             # 更新批量任务状态
             self._update_batch_status()
     
     def _update_batch_status(self):
-        """更新批量任务状态"""
-        if self.completed_tasks + self.failed_tasks >= self.total_tasks:
+        """更新批量任务状态（调用方需持有锁）"""
+        if self.status == BatchStatus.CANCELLED:
+            return
+        
+        finished = sum(self._status_counts[status] for status in FINISHED_TASK_STATUSES)
+        if finished >= self.total_tasks:
             if self.failed_tasks == 0:
                 self.status = BatchStatus.COMPLETED
             elif self.completed_tasks == 0:
@@ -185,28 +272,66 @@ class BatchDownload:
             else:
                 self.status = BatchStatus.COMPLETED  # 部分成功也算完成
             self.completed_at = datetime.now()
-        elif self.status == BatchStatus.PENDING and any(task.status == TaskStatus.DOWNLOADING for task in self.tasks):
-            self.status = BatchStatus.DOWNLOADING
+        elif self._status_counts[TaskStatus.DOWNLOADING] > 0:
+            if self.status in [BatchStatus.PENDING, BatchStatus.COMPLETED, BatchStatus.FAILED]:
+                # 首次开始或重试已结束的任务
+                self.status = BatchStatus.DOWNLOADING
+                self.completed_at = None
             if not self.started_at:
                 self.started_at = datetime.now()
     
     def get_summary(self) -> Dict[str, Any]:
         """获取任务摘要"""
+        with self._lock:
+            return {
+                'total': self.total_tasks,
+                'completed': self.completed_tasks,
+                'failed': self.failed_tasks,
+                'pending': self.total_tasks - self.completed_tasks - self.failed_tasks,
+                'downloading': self._status_counts.get(TaskStatus.DOWNLOADING, 0),
+                'skipped': self._status_counts.get(TaskStatus.SKIPPED, 0),
+                'progress': self.progress
+            }
+    
+    def get_stage_statistics(self) -> Dict[str, Any]:
+        """按阶段汇总子任务耗时（p50/p95/最大值，秒）和下载字节数"""
+        with self._lock:
+            timings = [task.stage_timings for task in self.tasks if task.stage_timings]
+            downloaded_bytes = sum(task.downloaded_bytes for task in self.tasks)
+        
+        values_by_stage: Dict[str, List[float]] = {}
+        for stage_timings in timings:
+            for stage, seconds in stage_timings.items():
+                values_by_stage.setdefault(stage, []).append(seconds)
+        
+        stages = {}
+        for stage, values in values_by_stage.items():
+            values.sort()
+            stages[stage] = {
+                'count': len(values),
+                'p50': _percentile(values, 0.5),
+                'p95': _percentile(values, 0.95),
+                'max': values[-1],
+                'total': round(sum(values), 3)
+            }
+        
         return {
-            'total': self.total_tasks,
-            'completed': self.completed_tasks,
-            'failed': self.failed_tasks,
-            'pending': self.total_tasks - self.completed_tasks - self.failed_tasks,
-            'progress': self.progress
+            'timed_tasks': len(timings),
+            'downloaded_bytes': downloaded_bytes,
+            'stages': stages
         }
     
     def to_dict(self) -> Dict[str, Any]:
         """转换为字典"""
+        return self._fields([task.to_dict() for task in self.tasks])
+    
+    def _fields(self, tasks: List[Any]) -> Dict[str, Any]:
+        """顶层字段，tasks 由调用方决定是字典还是任务对象"""
         return {
             'id': self.id,
             'name': self.name,
             'urls': self.urls,
-            'tasks': [task.to_dict() for task in self.tasks],
+            'tasks': tasks,
             'status': self.status.value,
             'created_at': self.created_at.isoformat(),
             'started_at': self.started_at.isoformat() if self.started_at else None,
@@ -215,6 +340,7 @@ class BatchDownload:
             'completed_tasks': self.completed_tasks,
             'failed_tasks': self.failed_tasks,
             'progress': self.progress,
+            'priority': self.priority,
             'summary': self.get_summary()
         }
     
@@ -228,12 +354,14 @@ class BatchDownload:
             status=BatchStatus(data.get('status', 'pending')),
             total_tasks=data.get('total_tasks', 0),
             completed_tasks=data.get('completed_tasks', 0),
-            failed_tasks=data.get('failed_tasks', 0)
+            failed_tasks=data.get('failed_tasks', 0),
+            priority=data.get('priority', 0)
         )
         
-        # 恢复任务列表
+        # 恢复任务列表，计数以任务状态为准
         if data.get('tasks'):
             batch.tasks = [DownloadTask.from_dict(task_data) for task_data in data['tasks']]
+            batch.rebuild_index()
         
         # 恢复时间戳
         if data.get('created_at'):
@@ -246,6 +374,11 @@ class BatchDownload:
         return batch
 
 
+# 序列化时直接编码模型对象：批量任务的子任务列表保持为对象，由序列化后端逐个编码
+register_encoder(DownloadTask, DownloadTask.to_dict)
+register_encoder(BatchDownload, lambda batch: batch._fields(list(batch.tasks)))
+
+
 @dataclass
 class BatchDownloadRequest:
     """批量下载请求"""
@@ -253,6 +386,9 @@ class BatchDownloadRequest:
     urls: List[str]
     auto_edit_tags: bool = True
     default_tags: Dict[str, str] = field(default_factory=dict)
+    priority: int = 0
+    # 控制器解析输入得到的扫描结果；提供时 urls 已经是规范化的地址，不再重复解析
+    scan_result: Optional[URLScanResult] = field(default=None, repr=False, compare=False)
     
     def validate(self) -> tuple[bool, str]:
         """验证请求数据"""
@@ -262,30 +398,17 @@ class BatchDownloadRequest:
         if not self.urls:
             return False, "至少需要提供一个URL"
         
-        if len(self.urls) > 50:  # 限制批量下载数量
-            return False, "批量下载数量不能超过50个"
+        if len(self.urls) > BATCH_MAX_URLS:  # 限制批量下载数量
+            return False, f"批量下载数量不能超过{BATCH_MAX_URLS}个"
         
-        # 验证URL格式
-        from utils.validators import URLValidator
-        validator = URLValidator()
+        if self.scan_result is None:
+            # 直接传入的URL列表，扫描一次并规范化
+            self.scan_result = URLScanner().scan('\n'.join(self.urls))
+            self.urls = self.scan_result.url_list
         
-        valid_urls = []
-        for url in self.urls:
-            url = url.strip()
-            if not url:
-                continue
-            
-            # 尝试提取URL
-            extracted_url = validator.extract_bilibili_url(url)
-            if extracted_url:
-                valid_urls.append(extracted_url)
-            elif validator.is_valid_bilibili_url(url):
-                valid_urls.append(url)
-        
-        if not valid_urls:
+        if not self.urls:
             return False, "没有找到有效的Bilibili URL"
         
-        self.urls = valid_urls
         return True, ""
     
     def to_dict(self) -> Dict[str, Any]:
@@ -294,5 +417,6 @@ class BatchDownloadRequest:
             'name': self.name,
             'urls': self.urls,
             'auto_edit_tags': self.auto_edit_tags,
-            'default_tags': self.default_tags
+            'default_tags': self.default_tags,
+            'priority': self.priority
         }
@@ -0,0 +1,91 @@
+"""
+单个下载任务数据模型
+"""
+from dataclasses import dataclass, field
+from enum import Enum
+from typing import Dict, Any, Optional
+import time
+import uuid
+
+from utils.serialization import register_encoder
+
+
+class JobStatus(Enum):
+    """单个下载任务状态枚举"""
+    QUEUED = "queued"            # 排队中
+    DOWNLOADING = "downloading"  # 下载中
+    COMPLETED = "completed"      # 已完成
+    FAILED = "failed"            # 失败
+
+
+# 不会再变化的任务状态
+FINISHED_JOB_STATUSES = (JobStatus.COMPLETED, JobStatus.FAILED)
+
+
+@dataclass
+class DownloadJob:
+    """首页提交的单个下载任务（时间戳为epoch秒）"""
+    url: str
+    id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    status: JobStatus = JobStatus.QUEUED
+    progress: float = 0.0
+    filename: str = ""
+    filepath: str = ""
+    title: str = ""
+    artist: str = ""
+    duration: int = 0
+    cover_filename: Optional[str] = None
+    error_message: str = ""
+    failure_reason: str = ""  # 被下载限制中止时的原因（too_large/too_long/timeout），执行进程中断时为interrupted
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    completed_at: Optional[float] = None
+
+    @property
+    def is_finished(self) -> bool:
+        """是否已结束"""
+        return self.status in FINISHED_JOB_STATUSES
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为字典"""
+        return {
+            'id': self.id,
+            'url': self.url,
+            'status': self.status.value,
+            'progress': self.progress,
+            'filename': self.filename,
+            'filepath': self.filepath,
+            'title': self.title,
+            'artist': self.artist,
+            'duration': self.duration,
+            'cover_filename': self.cover_filename,
+            'error_message': self.error_message,
+            'failure_reason': self.failure_reason,
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'completed_at': self.completed_at
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'DownloadJob':
+        """从字典创建实例"""
+        return cls(
+            url=data['url'],
+            id=data['id'],
+            status=JobStatus(data.get('status', 'queued')),
+            progress=data.get('progress', 0.0),
+            filename=data.get('filename', ''),
+            filepath=data.get('filepath', ''),
+            title=data.get('title', ''),
+            artist=data.get('artist', ''),
+            duration=data.get('duration', 0),
+            cover_filename=data.get('cover_filename'),
+            error_message=data.get('error_message', ''),
+            failure_reason=data.get('failure_reason', ''),
+            created_at=data.get('created_at') or time.time(),
+            started_at=data.get('started_at'),
+            completed_at=data.get('completed_at')
+        )
+
+
+register_encoder(DownloadJob, DownloadJob.to_dict)
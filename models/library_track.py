@@ -0,0 +1,75 @@
+"""
+曲库曲目数据模型
+"""
+from dataclasses import dataclass
+from typing import Dict, Any, Mapping
+
+
+@dataclass
+class LibraryTrack:
+    """曲库索引中的单个曲目"""
+    path: str  # 相对于下载目录的路径
+    filename: str
+    title: str = ""
+    artist: str = ""
+    album: str = ""
+    albumartist: str = ""
+    date: str = ""
+    tracknumber: str = ""
+    genre: str = ""
+    duration: float = 0.0
+    size: int = 0
+    mtime: float = 0.0
+    bvid: str = ""
+    source_url: str = ""
+    has_cover: bool = False
+    indexed_at: float = 0.0
+
+    @property
+    def size_mb(self) -> float:
+        """文件大小（MB）"""
+        return round(self.size / (1024 * 1024), 2)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为字典"""
+        return {
+            'path': self.path,
+            'filename': self.filename,
+            'title': self.title,
+            'artist': self.artist,
+            'album': self.album,
+            'albumartist': self.albumartist,
+            'date': self.date,
+            'tracknumber': self.tracknumber,
+            'genre': self.genre,
+            'duration': self.duration,
+            'size': self.size,
+            'size_mb': self.size_mb,
+            'mtime': self.mtime,
+            'bvid': self.bvid,
+            'source_url': self.source_url,
+            'has_cover': self.has_cover,
+            'indexed_at': self.indexed_at
+        }
+
+    @classmethod
+    def from_row(cls, row: Mapping[str, Any]) -> 'LibraryTrack':
+        """从数据库行创建实例"""
+        return cls(
+            path=row['path'],
+            filename=row['filename'],
+            title=row['title'] or '',
+            artist=row['artist'] or '',
+            album=row['album'] or '',
+            albumartist=row['albumartist'] or '',
+            date=row['date'] or '',
+            tracknumber=row['tracknumber'] or '',
+            genre=row['genre'] or '',
+            duration=row['duration'] or 0.0,
+            size=row['size'] or 0,
+            mtime=row['mtime'] or 0.0,
+            bvid=row['bvid'] or '',
+            source_url=row['source_url'] or '',
+            has_cover=bool(row['has_cover']),
+            indexed_at=row['indexed_at'] or 0.0
+        )
@@ -0,0 +1,113 @@
+"""
+订阅数据模型
+"""
+from dataclasses import dataclass, field
+from enum import Enum
+from typing import Dict, Any, List, Optional
+import time
+import uuid
+
+from utils.serialization import register_encoder
+
+
+class SourceType(Enum):
+    """订阅来源类型枚举"""
+    UPLOADER = "uploader"    # UP主投稿
+    FAVORITES = "favorites"  # 收藏夹
+    SERIES = "series"        # 合集/视频列表
+
+
+# 列表按时间从新到旧排列的来源：增量检查遇到上次的最新条目即可停止
+NEWEST_FIRST_SOURCES = (SourceType.UPLOADER, SourceType.FAVORITES)
+
+
+@dataclass
+class Subscription:
+    """订阅的来源（时间戳为epoch秒）"""
+    source_type: SourceType
+    source_id: str                # 来源ID（UP主mid、收藏夹ID、合集ID）
+    url: str                      # 交给yt-dlp的列表地址
+    name: str
+    id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    enabled: bool = True
+    interval: int = 3600          # 检查间隔（秒）
+    priority: int = 0
+    auto_edit_tags: bool = True
+    # 首次检查时是否下载来源中已有的视频；否则只记录为已加入，之后只下载新投稿
+    backfill: bool = True
+    # 已加入下载的视频ID（按加入顺序）
+    seen_ids: List[str] = field(default_factory=list)
+    # 高水位：上次检查时列表中最新的视频ID
+    high_water_mark: str = ""
+    total_enqueued: int = 0
+    last_batch_ids: List[str] = field(default_factory=list)
+    last_error: str = ""
+    created_at: float = field(default_factory=time.time)
+    last_polled_at: Optional[float] = None
+    next_poll_at: float = 0.0
+
+    @property
+    def newest_first(self) -> bool:
+        """来源列表是否按时间从新到旧排列"""
+        return self.source_type in NEWEST_FIRST_SOURCES
+
+    @property
+    def is_due(self) -> bool:
+        """是否到了检查时间"""
+        return self.enabled and self.next_poll_at <= time.time()
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为字典"""
+        return {
+            'id': self.id,
+            'source_type': self.source_type.value,
+            'source_id': self.source_id,
+            'url': self.url,
+            'name': self.name,
+            'enabled': self.enabled,
+            'interval': self.interval,
+            'priority': self.priority,
+            'auto_edit_tags': self.auto_edit_tags,
+            'backfill': self.backfill,
+            'seen_ids': self.seen_ids,
+            'high_water_mark': self.high_water_mark,
+            'total_enqueued': self.total_enqueued,
+            'last_batch_ids': self.last_batch_ids,
+            'last_error': self.last_error,
+            'created_at': self.created_at,
+            'last_polled_at': self.last_polled_at,
+            'next_poll_at': self.next_poll_at
+        }
+
+    def to_summary(self) -> Dict[str, Any]:
+        """列表接口使用的摘要（不含已加入的视频ID列表）"""
+        data = self.to_dict()
+        data['seen_count'] = len(data.pop('seen_ids'))
+        return data
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'Subscription':
+        """从字典创建实例"""
+        return cls(
+            source_type=SourceType(data['source_type']),
+            source_id=data['source_id'],
+            url=data['url'],
+            name=data.get('name', ''),
+            id=data['id'],
+            enabled=data.get('enabled', True),
+            interval=data.get('interval', 3600),
+            priority=data.get('priority', 0),
+            auto_edit_tags=data.get('auto_edit_tags', True),
+            backfill=data.get('backfill', True),
+            seen_ids=data.get('seen_ids', []),
+            high_water_mark=data.get('high_water_mark', ''),
+            total_enqueued=data.get('total_enqueued', 0),
+            last_batch_ids=data.get('last_batch_ids', []),
+            last_error=data.get('last_error', ''),
+            created_at=data.get('created_at') or time.time(),
+            last_polled_at=data.get('last_polled_at'),
+            next_poll_at=data.get('next_poll_at', 0.0)
+        )
+
+
+register_encoder(Subscription, Subscription.to_summary)
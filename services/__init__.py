@@ -2,15 +2,32 @@
 服务层模块初始化
 """
 from .download_service import DownloadService
+from .download_scheduler import DownloadScheduler
+from .download_job_service import DownloadJobService
 from .tag_service import TagService
 from .navidrome_service import NavidromeService
 from .auth_service import AuthService
 from .batch_download_service import BatchDownloadService
+from .library_service import LibraryService
+from .library_scanner import LibraryScanner
+from .library_watcher import LibraryWatcher
+from .scan_coordinator import ScanCoordinator
+from .batch_executor import BatchExecutor
+from .service_container import ServiceContainer, get_services
 
 __all__ = [
     'DownloadService',
+    'DownloadScheduler',
+    'DownloadJobService',
     'TagService', 
     'NavidromeService',
     'AuthService',
-    'BatchDownloadService'
+    'BatchDownloadService',
+    'LibraryService',
+    'LibraryScanner',
+    'LibraryWatcher',
+    'ScanCoordinator',
+    'BatchExecutor',
+    'ServiceContainer',
+    'get_services'
 ]
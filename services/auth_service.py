@@ -42,15 +42,15 @@ class AuthService:
             # 验证凭据
             if username == self.admin_username and password == self.admin_password:
                 # 记录登录成功
-                logger.info(f"用户 {username} 登录成功")
+                logger.info("用户 %s 登录成功", username)
                 return True
             else:
                 # 记录登录失败
-                logger.warning(f"登录失败: 用户名={username}")
+                logger.warning("登录失败: 用户名=%s", username)
                 return False
                 
         except Exception as e:
-            logger.error(f"认证过程出错: {str(e)}")
+            logger.error("认证过程出错: %s", e)
             return False
     
     def create_session(self, username: str):
@@ -61,7 +61,7 @@ class AuthService:
             session.permanent = True
             return True
         except Exception as e:
-            logger.error(f"创建会话失败: {str(e)}")
+            logger.error("创建会话失败: %s", e)
             return False
     
     def destroy_session(self):
@@ -70,7 +70,7 @@ class AuthService:
             session.clear()
             return True
         except Exception as e:
-            logger.error(f"销毁会话失败: {str(e)}")
+            logger.error("销毁会话失败: %s", e)
             return False
     
     def is_logged_in(self) -> bool:
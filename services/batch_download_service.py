@@ -1,41 +1,82 @@
 """
 批量下载服务模块
 """
-import os
-import json
+import time
 import logging
 import threading
 from pathlib import Path
-from typing import Dict, Any, List, Optional
+from typing import Dict, Any, Iterable, Iterator, List, Optional, Tuple
 from datetime import datetime
 
-from models.batch_download import BatchDownload, DownloadTask, BatchStatus, TaskStatus, BatchDownloadRequest
+from models.batch_download import (
+    BatchDownload, DownloadTask, BatchStatus, TaskStatus, BatchDownloadRequest, FINISHED_TASK_STATUSES
+)
 from services.download_service import DownloadService
+from services.download_scheduler import DownloadScheduler
 from services.tag_service import TagService
-from services.navidrome_service import NavidromeService
-from utils.exceptions import ValidationError, DownloadError
+from services.scan_coordinator import ScanCoordinator, get_scan_coordinator
+from utils.exceptions import ValidationError, DownloadError, DownloadLimitError
 from utils.validators import URLValidator
-from config import DOWNLOAD_PATH, TEMP_PATH
+from utils.url_scanner import URLScanner, URLScanResult
+from utils.cache import LRUCache
+from utils.metrics import StageRecorder
+from utils.logger import log_context
+from utils.profiler import PROFILER
+from utils import serialization
+from config import DOWNLOAD_PATH, TEMP_PATH, BATCH_EXECUTOR, BATCH_CACHE_SIZE, BATCH_CACHE_MAX_TASKS, BATCH_CACHE_TTL
+from config import BATCH_MAX_URLS, BATCH_IMPORT_CHUNK_SIZE
 
 logger = logging.getLogger(__name__)
 
+# 仍在进行中的批量任务状态
+ACTIVE_STATUSES = (BatchStatus.PENDING, BatchStatus.DOWNLOADING, BatchStatus.PAUSED)
+# 已启动、由执行进程持有内存状态的批量任务状态（未启动的任务随时可以从文件重新加载）
+RUNNING_STATUSES = (BatchStatus.DOWNLOADING, BatchStatus.PAUSED)
+
 
 class BatchDownloadService:
-    """批量下载服务类"""
+    """批量下载服务类
+    
+    BATCH_EXECUTOR=process 时Web进程只负责创建任务和修改状态，批量任务由独立的
+    执行进程（worker.py）通过 run_batch 执行，进程之间通过 batch_storage 中的JSON文件同步。
+    任务文件由执行进程持续写入进度，Web进程的暂停、恢复、取消和优先级修改另外写入
+    batch_storage/control 中的控制文件（只由Web进程写入），执行进程每次保存前先同步控制文件，
+    不会用内存中的旧状态覆盖这些操作。
+    
+    子任务由全局下载调度器（DownloadScheduler）按优先级和轮询顺序执行，多个批量任务共用下载槽位。
+    
+    已加载的批量任务保存在LRU/TTL缓存中，并记录对应文件的 (mtime_ns, size)：文件未变化时直接使用内存对象，
+    已结束的任务按容量淘汰；本进程正在执行的任务固定在缓存中，并以内存中的状态为准。
+    """
     
-    def __init__(self):
-        self.download_service = DownloadService()
-        self.tag_service = TagService()
-        self.navidrome_service = NavidromeService()
+    def __init__(self, runs_batches: Optional[bool] = None,
+                 download_service: Optional[DownloadService] = None,
+                 tag_service: Optional[TagService] = None,
+                 scan_coordinator: Optional[ScanCoordinator] = None,
+                 scheduler: Optional[DownloadScheduler] = None):
+        self.download_service = download_service or DownloadService()
+        self.scheduler = scheduler or DownloadScheduler()
+        self.tag_service = tag_service or TagService()
+        self.scan_coordinator = scan_coordinator or get_scan_coordinator()
         self.url_validator = URLValidator()
         
-        # 存储活跃的批量下载任务
-        self.active_batches: Dict[str, BatchDownload] = {}
+        # 当前进程是否执行批量任务
+        self.executor_mode = BATCH_EXECUTOR
+        self.runs_batches = runs_batches if runs_batches is not None else BATCH_EXECUTOR != 'process'
+        
+        # 批量任务缓存 {batch_id: (BatchDownload, 文件版本)}，按任务数计算容量
+        self.batch_cache = LRUCache(
+            max_entries=BATCH_CACHE_SIZE,
+            max_weight=BATCH_CACHE_MAX_TASKS,
+            ttl=BATCH_CACHE_TTL,
+            weigher=lambda entry: 1 + len(entry[0].tasks),
+            # 只固定本进程执行中的任务（创建后未启动的任务不固定）；其他进程的任务随文件变化重新加载
+            pinned=lambda entry: self.runs_batches and entry[0].status in RUNNING_STATUSES
+        )
         self.batch_storage_path = Path("batch_storage")
         self.batch_storage_path.mkdir(exist_ok=True)
-        
-        # 线程锁
-        self.lock = threading.Lock()
+        # 同一批量任务的多个子任务可能同时完成，写文件需要串行
+        self._save_lock = threading.Lock()
     
     def create_batch_download(self, request: BatchDownloadRequest) -> BatchDownload:
         """创建批量下载任务"""
@@ -49,24 +90,69 @@ class BatchDownloadService:
             batch = BatchDownload(
                 id="",  # 会自动生成
                 name=request.name,
-                urls=request.urls
+                urls=request.urls,
+                priority=request.priority
             )
             
-            # 保存到存储
+            # 保存到存储（同时写入缓存）
             self._save_batch(batch)
             
-            # 添加到活跃任务
-            with self.lock:
-                self.active_batches[batch.id] = batch
-            
-            logger.info(f"创建批量下载任务: {batch.id}, 包含 {len(batch.urls)} 个URL")
+            logger.info("创建批量下载任务: %s, 包含 %s 个URL", batch.id, len(batch.urls))
+            if request.scan_result is not None and request.scan_result.invalid_lines:
+                logger.info("批量下载任务 %s 输入中有 %s 行无效内容", batch.id, len(request.scan_result.invalid_lines))
             
             return batch
             
         except Exception as e:
-            logger.error(f"创建批量下载任务失败: {str(e)}")
+            logger.error("创建批量下载任务失败: %s", e)
             raise
     
+    def iter_import_batch_downloads(self, name: str, lines: Iterable[str],
+                                    scan_result: Optional[URLScanResult] = None,
+                                    chunk_size: int = BATCH_IMPORT_CHUNK_SIZE,
+                                    priority: int = 0, auto_edit_tags: bool = True,
+                                    default_tags: Optional[Dict[str, str]] = None,
+                                    start: bool = True) -> Iterator[BatchDownload]:
+        """流式导入URL列表
+        
+        边读取边解析，每凑满 chunk_size 个链接就创建一个子批量任务并立即启动，
+        不必等待全部输入读完。去重范围是整个导入，统计信息写入 scan_result。
+        """
+        scan_result = scan_result if scan_result is not None else URLScanResult()
+        chunk_size = max(1, min(chunk_size, BATCH_MAX_URLS))
+        chunk = []
+        index = 0
+        
+        def flush() -> BatchDownload:
+            request = BatchDownloadRequest(
+                name=f"{name} #{index}",
+                urls=[item.url for item in chunk],
+                auto_edit_tags=auto_edit_tags,
+                default_tags=default_tags or {},
+                priority=priority,
+                scan_result=URLScanResult(urls=list(chunk))
+            )
+            batch = self.create_batch_download(request)
+            if start:
+                self.start_batch_download(batch.id)
+            chunk.clear()
+            return batch
+        
+        for item in URLScanner().iter_scan(lines, scan_result):
+            chunk.append(item)
+            if len(chunk) >= chunk_size:
+                index += 1
+                yield flush()
+        
+        if chunk:
+            index += 1
+            yield flush()
+        
+        logger.info(
+            "批量导入完成: %s, %s 个批量任务, %s 个URL, %s 行无效, %s 个重复",
+            name, index, len(scan_result.urls), len(scan_result.invalid_lines), len(scan_result.merged)
+        )
+    
     def start_batch_download(self, batch_id: str) -> bool:
         """启动批量下载任务"""
         try:
@@ -82,84 +168,67 @@ class BatchDownloadService:
             batch.started_at = datetime.now()
             self._save_batch(batch)
             
-            # 启动下载线程
-            download_thread = threading.Thread(
-                target=self._download_batch_worker,
-                args=(batch_id,),
-                daemon=True
-            )
-            download_thread.start()
+            if not self.runs_batches or self.executor_mode == 'process':
+                # 由执行进程读取状态后开始下载（执行进程内创建的任务同样交给BatchExecutor统一启动）
+                logger.info("批量下载任务已提交给执行进程: %s", batch_id)
+                return True
             
-            logger.info(f"启动批量下载任务: {batch_id}")
+            self._start_batch_thread(batch_id)
+            logger.info("启动批量下载任务: %s", batch_id)
             return True
             
         except Exception as e:
-            logger.error(f"启动批量下载任务失败: {str(e)}")
+            logger.error("启动批量下载任务失败: %s", e)
             return False
     
-    def _download_batch_worker(self, batch_id: str):
-        """批量下载工作线程"""
+    def _start_batch_thread(self, batch_id: str):
+        """在后台线程中执行批量任务（线程只负责提交和收尾，子任务由调度器执行）"""
+        download_thread = threading.Thread(
+            target=self.run_batch,
+            args=(batch_id,),
+            daemon=True
+        )
+        download_thread.start()
+    
+    def run_batch(self, batch_id: str):
+        """执行批量下载任务，等待全部子任务结束（已完成的任务会被跳过，可用于恢复中断的任务）"""
         try:
             batch = self.get_batch_download(batch_id)
             if not batch:
                 return
             
-            logger.info(f"开始执行批量下载任务: {batch_id}")
+            logger.info("开始执行批量下载任务: %s, 优先级: %s", batch_id, batch.priority)
             
-            for task in batch.tasks:
-                if batch.status == BatchStatus.CANCELLED:
-                    break
-                
-                try:
-                    # 更新任务状态为下载中
-                    batch.update_task_status(task.id, TaskStatus.DOWNLOADING)
+            # 交给调度器执行，与其他批量任务轮流占用下载槽位
+            done = self.scheduler.add_batch(
+                batch_id,
+                [task.id for task in batch.tasks if task.status not in FINISHED_TASK_STATUSES],
+                runner=lambda task_id: self._run_task(batch, task_id),
+                priority=batch.priority,
+                paused=batch.status == BatchStatus.PAUSED
+            )
+            done.wait()
+            
+            # 批量下载完成（最后一个任务结束时模型已更新批量任务状态）
+            self._sync_control(batch)
+            if batch.status != BatchStatus.CANCELLED:
+                if batch.status == BatchStatus.DOWNLOADING:
+                    batch.status = BatchStatus.COMPLETED if batch.completed_tasks > 0 else BatchStatus.FAILED
+                    batch.completed_at = datetime.now()
                     self._save_batch(batch)
-                    
-                    # 执行下载
-                    result = self.download_service.download_audio(task.url)
-                    
-                    if result['status'] == 'success':
-                        # 下载成功
-                        task.title = result.get('title', '')
-                        task.artist = result.get('artist', '')
-                        task.filename = result['filename']
-                        task.filepath = result['filepath']
-                        task.duration = result.get('duration', 0)
-                        
-                        batch.update_task_status(task.id, TaskStatus.COMPLETED)
-                        logger.info(f"任务下载成功: {task.id} - {task.title}")
-                    else:
-                        # 下载失败
-                        task.error_message = result.get('message', '下载失败')
-                        batch.update_task_status(task.id, TaskStatus.FAILED)
-                        logger.error(f"任务下载失败: {task.id} - {task.error_message}")
-                    
-                except Exception as e:
-                    # 任务执行异常
-                    task.error_message = str(e)
-                    batch.update_task_status(task.id, TaskStatus.FAILED)
-                    logger.error(f"任务执行异常: {task.id} - {str(e)}")
-                
-                # 保存进度
-                self._save_batch(batch)
-            
-            # 批量下载完成
-            if batch.status == BatchStatus.DOWNLOADING:
-                if batch.completed_tasks > 0:
-                    batch.status = BatchStatus.COMPLETED
-                else:
-                    batch.status = BatchStatus.FAILED
-                batch.completed_at = datetime.now()
-                self._save_batch(batch)
                 
                 # 触发Navidrome扫描
                 if batch.completed_tasks > 0:
-                    self.navidrome_service.trigger_scan()
+                    self.scan_coordinator.request_scan(
+                        f"批量下载完成: {batch_id}",
+                        paths=[task.filepath for task in batch.tasks if task.filepath]
+                    )
                 
-                logger.info(f"批量下载任务完成: {batch_id}, 成功: {batch.completed_tasks}, 失败: {batch.failed_tasks}")
+                logger.info("批量下载任务完成: %s, 成功: %s, 失败: %s", batch_id, batch.completed_tasks, batch.failed_tasks)
             
         except Exception as e:
-            logger.error(f"批量下载工作线程异常: {str(e)}")
+            logger.error("批量下载工作线程异常: %s", e)
+            self.scheduler.cancel(batch_id)
             # 更新批量任务状态为失败
             batch = self.get_batch_download(batch_id)
             if batch:
@@ -167,6 +236,124 @@ class BatchDownloadService:
                 batch.completed_at = datetime.now()
                 self._save_batch(batch)
     
+    def _run_task(self, batch: BatchDownload, task_id: str):
+        """执行单个子任务（在调度器的工作线程中调用）"""
+        with log_context(batch_id=batch.id, task_id=task_id), PROFILER.profile('batch_task', task_id):
+            task = batch.get_task_by_id(task_id)
+            if not task or batch.status == BatchStatus.CANCELLED:
+                return
+        
+            recorder = StageRecorder()
+            try:
+                # 更新任务状态为下载中（每次保存前先同步控制文件，避免覆盖Web进程的操作）
+                batch.update_task_status(task.id, TaskStatus.DOWNLOADING)
+                self._sync_control(batch)
+                self._save_batch(batch)
+            
+                # 执行下载（记录各阶段耗时和下载字节数，失败时同样保存）
+                result = self.download_service.download_audio(task.url, recorder=recorder)
+            
+                if result['status'] == 'success':
+                    # 下载成功
+                    task.title = result.get('title', '')
+                    task.artist = result.get('artist', '')
+                    task.filename = result['filename']
+                    task.filepath = result['filepath']
+                    task.duration = result.get('duration', 0)
+                
+                    batch.update_task_status(task.id, TaskStatus.COMPLETED)
+                    logger.info("任务下载成功: %s - %s", task.id, task.title)
+                else:
+                    # 下载失败
+                    task.error_message = result.get('message', '下载失败')
+                    batch.update_task_status(task.id, TaskStatus.FAILED)
+                    logger.error("任务下载失败: %s - %s", task.id, task.error_message)
+            
+            except DownloadLimitError as e:
+                # 超出大小、时长或超时限制
+                task.error_message = str(e)
+                task.failure_reason = e.reason
+                batch.update_task_status(task.id, TaskStatus.FAILED)
+                logger.warning("任务超出下载限制: %s - %s", task.id, e)
+            except Exception as e:
+                # 任务执行异常
+                task.error_message = str(e)
+                batch.update_task_status(task.id, TaskStatus.FAILED)
+                logger.error("任务执行异常: %s - %s", task.id, e)
+        
+            task.stage_timings = recorder.stages or None
+            task.downloaded_bytes = recorder.downloaded_bytes
+        
+            # 保存进度
+            self._sync_control(batch)
+            self._save_batch(batch)
+    
+    def _sync_control(self, batch: BatchDownload):
+        """同步Web进程对执行中任务的控制操作；独立执行进程模式下以控制文件中的状态和优先级为准"""
+        if self.executor_mode != 'process' or batch.status == BatchStatus.CANCELLED:
+            return
+        
+        control = self._read_control(batch.id)
+        if not control:
+            return
+        
+        status = BatchStatus(control.get('status', batch.status.value))
+        if status == BatchStatus.CANCELLED:
+            batch.status = BatchStatus.CANCELLED
+            batch.completed_at = datetime.now()
+            self.scheduler.cancel(batch.id)
+        elif status == BatchStatus.PAUSED and batch.status == BatchStatus.DOWNLOADING:
+            batch.status = BatchStatus.PAUSED
+            self.scheduler.pause(batch.id)
+        elif status == BatchStatus.DOWNLOADING and batch.status == BatchStatus.PAUSED:
+            batch.status = BatchStatus.DOWNLOADING
+            self.scheduler.resume(batch.id)
+        
+        priority = control.get('priority', batch.priority)
+        if priority != batch.priority:
+            batch.priority = priority
+            self.scheduler.set_priority(batch.id, priority)
+    
+    @property
+    def control_path(self) -> Path:
+        """控制文件目录"""
+        return self.batch_storage_path / "control"
+    
+    def _write_control(self, batch: BatchDownload):
+        """独立执行进程模式下把控制操作写入控制文件（先于任务文件写入）"""
+        if self.executor_mode != 'process':
+            return
+        self.control_path.mkdir(exist_ok=True)
+        serialization.dump_file({
+            'status': batch.status.value,
+            'priority': batch.priority,
+            'updated_at': time.time()
+        }, self.control_path / f"{batch.id}.json")
+    
+    def _read_control(self, batch_id: str) -> Optional[Dict[str, Any]]:
+        """读取控制文件，不存在或无法解析时返回None"""
+        try:
+            with open(self.control_path / f"{batch_id}.json", 'rb') as f:
+                return serialization.loads(f.read())
+        except FileNotFoundError:
+            return None
+        except (OSError,) + serialization.DECODE_ERRORS as e:
+            logger.warning("读取批量任务控制文件失败: %s - %s", batch_id, e)
+            return None
+    
+    def _remove_control(self, batch_id: str):
+        """删除控制文件"""
+        try:
+            (self.control_path / f"{batch_id}.json").unlink()
+        except FileNotFoundError:
+            pass
+    
+    def sync_batch_control(self, batch_id: str):
+        """存储中的任务文件变化时，同步到本进程正在执行的批量任务（由执行进程调用）"""
+        entry = self.batch_cache.get(batch_id)
+        if entry and self.scheduler.has_batch(batch_id):
+            self._sync_control(entry[0])
+    
     def cancel_batch_download(self, batch_id: str) -> bool:
         """取消批量下载任务"""
         try:
@@ -174,62 +361,157 @@ class BatchDownloadService:
             if not batch:
                 return False
             
-            if batch.status not in [BatchStatus.PENDING, BatchStatus.DOWNLOADING]:
+            if batch.status not in ACTIVE_STATUSES:
                 return False
             
             batch.status = BatchStatus.CANCELLED
             batch.completed_at = datetime.now()
+            self._write_control(batch)
+            self._save_batch(batch)
+            if self.runs_batches:
+                self.scheduler.cancel(batch_id)
+            
+            logger.info("取消批量下载任务: %s", batch_id)
+            return True
+            
+        except Exception as e:
+            logger.error("取消批量下载任务失败: %s", e)
+            return False
+    
+    def pause_batch_download(self, batch_id: str) -> bool:
+        """暂停批量下载任务（正在下载的子任务会继续完成）"""
+        try:
+            batch = self.get_batch_download(batch_id)
+            if not batch or batch.status != BatchStatus.DOWNLOADING:
+                return False
+            
+            batch.status = BatchStatus.PAUSED
+            self._write_control(batch)
+            self._save_batch(batch)
+            if self.runs_batches:
+                self.scheduler.pause(batch_id)
+            
+            logger.info("暂停批量下载任务: %s", batch_id)
+            return True
+            
+        except Exception as e:
+            logger.error("暂停批量下载任务失败: %s", e)
+            return False
+    
+    def resume_batch_download(self, batch_id: str) -> bool:
+        """恢复已暂停的批量下载任务"""
+        try:
+            batch = self.get_batch_download(batch_id)
+            if not batch or batch.status != BatchStatus.PAUSED:
+                return False
+            
+            batch.status = BatchStatus.DOWNLOADING
+            self._write_control(batch)
+            self._save_batch(batch)
+            if self.runs_batches and not self.scheduler.resume(batch_id):
+                # 暂停期间服务重启过，重新提交
+                self._start_batch_thread(batch_id)
+            
+            logger.info("恢复批量下载任务: %s", batch_id)
+            return True
+            
+        except Exception as e:
+            logger.error("恢复批量下载任务失败: %s", e)
+            return False
+    
+    def set_batch_priority(self, batch_id: str, priority: int) -> bool:
+        """修改批量下载任务的优先级（数值大的先执行）"""
+        try:
+            batch = self.get_batch_download(batch_id)
+            if not batch or batch.status not in ACTIVE_STATUSES:
+                return False
+            
+            batch.priority = priority
+            self._write_control(batch)
             self._save_batch(batch)
+            if self.runs_batches:
+                self.scheduler.set_priority(batch_id, priority)
             
-            logger.info(f"取消批量下载任务: {batch_id}")
+            logger.info("批量下载任务优先级已修改: %s -> %s", batch_id, priority)
             return True
             
         except Exception as e:
-            logger.error(f"取消批量下载任务失败: {str(e)}")
+            logger.error("修改批量下载任务优先级失败: %s", e)
             return False
     
     def get_batch_download(self, batch_id: str) -> Optional[BatchDownload]:
         """获取批量下载任务"""
         try:
-            # 先从内存中查找
-            with self.lock:
-                if batch_id in self.active_batches:
-                    return self.active_batches[batch_id]
-            
-            # 从存储中加载
             batch_file = self.batch_storage_path / f"{batch_id}.json"
-            if batch_file.exists():
-                with open(batch_file, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    batch = BatchDownload.from_dict(data)
-                    
-                    # 如果任务还在进行中，添加到活跃任务
-                    if batch.status in [BatchStatus.PENDING, BatchStatus.DOWNLOADING]:
-                        with self.lock:
-                            self.active_batches[batch_id] = batch
-                    
-                    return batch
+            entry = self.batch_cache.get(
+                batch_id,
+                validate=lambda entry: self._is_current(entry, self._file_version(batch_file))
+            )
+            if entry:
+                return entry[0]
             
-            return None
+            # 从存储中加载
+            return self._load_batch(batch_id)
             
         except Exception as e:
-            logger.error(f"获取批量下载任务失败: {str(e)}")
+            logger.error("获取批量下载任务失败: %s", e)
             return None
     
+    def _is_current(self, entry: Tuple[BatchDownload, Any], version: Optional[Tuple[int, int]]) -> bool:
+        """缓存条目是否仍然有效"""
+        batch, cached_version = entry
+        # 本进程正在执行的任务以内存为准
+        if self.runs_batches and batch.status in RUNNING_STATUSES:
+            return True
+        return version is not None and version == cached_version
+    
+    def _file_version(self, batch_file: Path) -> Optional[Tuple[int, int]]:
+        """获取文件版本 (mtime_ns, size)，文件不存在时返回None"""
+        try:
+            stat = batch_file.stat()
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+    
+    def _read_batch_file(self, batch_id: str) -> Tuple[Optional[BatchDownload], Optional[Tuple[int, int]]]:
+        """读取存储中的批量任务，返回 (BatchDownload, 文件版本)，不经过缓存"""
+        batch_file = self.batch_storage_path / f"{batch_id}.json"
+        version = self._file_version(batch_file)
+        if version is None:
+            return None, None
+        
+        with open(batch_file, 'rb') as f:
+            data = serialization.loads(f.read())
+        return BatchDownload.from_dict(data), version
+    
+    def _load_batch(self, batch_id: str) -> Optional[BatchDownload]:
+        """从存储中加载批量下载任务并写入缓存"""
+        batch, version = self._read_batch_file(batch_id)
+        if batch is None:
+            self.batch_cache.pop(batch_id)
+            return None
+        
+        self.batch_cache.put(batch_id, (batch, version))
+        return batch
+    
     def get_all_batches(self) -> List[BatchDownload]:
         """获取所有批量下载任务"""
         try:
             batches = []
             
-            # 从存储中加载所有任务
+            # 从存储中加载所有任务（文件未变化的使用缓存）
             for batch_file in self.batch_storage_path.glob("*.json"):
                 try:
-                    with open(batch_file, 'r', encoding='utf-8') as f:
-                        data = json.load(f)
-                        batch = BatchDownload.from_dict(data)
+                    version = self._file_version(batch_file)
+                    entry = self.batch_cache.get(
+                        batch_file.stem,
+                        validate=lambda entry: self._is_current(entry, version)
+                    )
+                    batch = entry[0] if entry else self._load_batch(batch_file.stem)
+                    if batch:
                         batches.append(batch)
                 except Exception as e:
-                    logger.warning(f"加载批量任务文件失败: {batch_file} - {str(e)}")
+                    logger.warning("加载批量任务文件失败: %s - %s", batch_file, e)
             
             # 按创建时间倒序排列
             batches.sort(key=lambda x: x.created_at, reverse=True)
@@ -237,29 +519,36 @@ class BatchDownloadService:
             return batches
             
         except Exception as e:
-            logger.error(f"获取所有批量下载任务失败: {str(e)}")
+            logger.error("获取所有批量下载任务失败: %s", e)
             return []
     
     def delete_batch_download(self, batch_id: str) -> bool:
         """删除批量下载任务"""
         try:
             # 从内存中移除
-            with self.lock:
-                if batch_id in self.active_batches:
-                    del self.active_batches[batch_id]
+            self.release_batch(batch_id)
             
             # 删除存储文件
             batch_file = self.batch_storage_path / f"{batch_id}.json"
             if batch_file.exists():
                 batch_file.unlink()
+            self._remove_control(batch_id)
             
-            logger.info(f"删除批量下载任务: {batch_id}")
+            logger.info("删除批量下载任务: %s", batch_id)
             return True
             
         except Exception as e:
-            logger.error(f"删除批量下载任务失败: {str(e)}")
+            logger.error("删除批量下载任务失败: %s", e)
             return False
     
+    def release_batch(self, batch_id: str):
+        """从缓存中移除（不删除存储）"""
+        self.batch_cache.pop(batch_id)
+    
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """获取批量任务缓存统计信息（命中/未命中/淘汰次数）"""
+        return self.batch_cache.get_stats()
+    
     def get_batch_progress(self, batch_id: str) -> Dict[str, Any]:
         """获取批量下载进度"""
         try:
@@ -278,12 +567,12 @@ class BatchDownloadService:
                     'status': batch.status.value,
                     'progress': batch.progress,
                     'summary': batch.get_summary(),
-                    'tasks': [task.to_dict() for task in batch.tasks]
+                    'tasks': list(batch.tasks)
                 }
             }
             
         except Exception as e:
-            logger.error(f"获取批量下载进度失败: {str(e)}")
+            logger.error("获取批量下载进度失败: %s", e)
             return {
                 'success': False,
                 'message': str(e)
@@ -293,10 +582,12 @@ class BatchDownloadService:
         """保存批量下载任务到存储"""
         try:
             batch_file = self.batch_storage_path / f"{batch.id}.json"
-            with open(batch_file, 'w', encoding='utf-8') as f:
-                json.dump(batch.to_dict(), f, ensure_ascii=False, indent=2)
+            with self._save_lock:
+                # 原子替换，其他进程不会读到写了一半的文件
+                serialization.dump_file(batch, batch_file)
+                self.batch_cache.put(batch.id, (batch, self._file_version(batch_file)))
         except Exception as e:
-            logger.error(f"保存批量下载任务失败: {str(e)}")
+            logger.error("保存批量下载任务失败: %s", e)
     
     def cleanup_old_batches(self, days: int = 7):
         """清理旧的批量下载任务"""
@@ -309,14 +600,16 @@ class BatchDownloadService:
                     # 检查文件修改时间
                     if batch_file.stat().st_mtime < cutoff_time:
                         batch_file.unlink()
+                        self._remove_control(batch_file.stem)
+                        self.batch_cache.pop(batch_file.stem)
                         deleted_count += 1
                 except Exception as e:
-                    logger.warning(f"清理批量任务文件失败: {batch_file} - {str(e)}")
+                    logger.warning("清理批量任务文件失败: %s - %s", batch_file, e)
             
-            logger.info(f"清理了 {deleted_count} 个旧的批量下载任务")
+            logger.info("清理了 %s 个旧的批量下载任务", deleted_count)
             
         except Exception as e:
-            logger.error(f"清理旧批量下载任务失败: {str(e)}")
+            logger.error("清理旧批量下载任务失败: %s", e)
     
     def get_batch_statistics(self) -> Dict[str, Any]:
         """获取批量下载统计信息"""
@@ -327,6 +620,7 @@ class BatchDownloadService:
             completed_batches = len([b for b in batches if b.status == BatchStatus.COMPLETED])
             failed_batches = len([b for b in batches if b.status == BatchStatus.FAILED])
             running_batches = len([b for b in batches if b.status == BatchStatus.DOWNLOADING])
+            paused_batches = len([b for b in batches if b.status == BatchStatus.PAUSED])
             
             total_tasks = sum(b.total_tasks for b in batches)
             completed_tasks = sum(b.completed_tasks for b in batches)
@@ -337,12 +631,15 @@ class BatchDownloadService:
                 'completed_batches': completed_batches,
                 'failed_batches': failed_batches,
                 'running_batches': running_batches,
+                'paused_batches': paused_batches,
                 'total_tasks': total_tasks,
                 'completed_tasks': completed_tasks,
                 'failed_tasks': failed_tasks,
-                'success_rate': (completed_tasks / total_tasks * 100) if total_tasks > 0 else 0
+                'success_rate': (completed_tasks / total_tasks * 100) if total_tasks > 0 else 0,
+                'cache': self.get_cache_stats(),
+                'queue': self.scheduler.get_status()
             }
             
         except Exception as e:
-            logger.error(f"获取批量下载统计信息失败: {str(e)}")
+            logger.error("获取批量下载统计信息失败: %s", e)
             return {}
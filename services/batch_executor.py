@@ -0,0 +1,168 @@
+"""
+批量下载执行器模块（独立执行进程）
+"""
+import time
+import logging
+import threading
+from typing import Dict, Any, Optional
+
+from models.batch_download import BatchStatus
+from utils import serialization
+from services.batch_download_service import BatchDownloadService
+from services.download_job_service import DownloadJobService
+from config import BATCH_EXECUTOR_POLL_INTERVAL
+
+logger = logging.getLogger(__name__)
+
+
+class BatchExecutor:
+    """批量下载执行器
+
+    在独立进程中运行，定期检查 batch_storage 中被Web进程标记为下载中的批量任务并执行。
+    Web进程被gunicorn回收不会影响正在执行的任务；执行进程重启后会从中断处继续。
+    只重新解析修改时间发生变化的任务文件；执行中任务的控制文件（batch_storage/control，
+    由Web进程写入）变化时同步暂停、恢复、取消和优先级。
+    传入 job_service 时同时认领Web进程提交的单个下载任务（batch_storage/jobs）。
+    """
+
+    def __init__(self, batch_service: Optional[BatchDownloadService] = None,
+                 job_service: Optional[DownloadJobService] = None):
+        self.batch_service = batch_service or BatchDownloadService(runs_batches=True)
+        self.job_service = job_service
+        self.storage_path = self.batch_service.batch_storage_path
+        self.poll_interval = BATCH_EXECUTOR_POLL_INTERVAL
+
+        # 已检查过的任务文件和控制文件 {文件名: mtime_ns}
+        self._mtimes: Dict[str, int] = {}
+        self._control_mtimes: Dict[str, int] = {}
+        self._running: Dict[str, threading.Thread] = {}
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.total_started = 0
+
+    @property
+    def is_running(self) -> bool:
+        """执行器是否在运行"""
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """启动轮询线程"""
+        if self.is_running:
+            return
+
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._poll_worker, name='batch-executor', daemon=True)
+        self._thread.start()
+        logger.info("批量下载执行器已启动，轮询间隔 %s 秒", self.poll_interval)
+
+    def stop(self):
+        """停止轮询（正在执行的任务在进程退出时中断，重启后继续）"""
+        self._stop_event.set()
+
+    def _poll_worker(self):
+        """轮询工作线程"""
+        while not self._stop_event.is_set():
+            try:
+                self.poll()
+            except Exception as e:
+                logger.error("检查批量下载任务失败: %s", e)
+            self._stop_event.wait(self.poll_interval)
+
+    def poll(self) -> int:
+        """检查一次存储，启动新的下载中任务，返回启动的批量任务数量"""
+        if self.job_service is not None:
+            self.job_service.claim_queued_jobs()
+
+        started = 0
+        seen = set()
+
+        for batch_file in self.storage_path.glob("*.json"):
+            seen.add(batch_file.name)
+            try:
+                mtime = batch_file.stat().st_mtime_ns
+            except OSError:
+                continue
+
+            if self._mtimes.get(batch_file.name) == mtime:
+                continue
+            self._mtimes[batch_file.name] = mtime
+
+            batch_id = batch_file.stem
+            with self._lock:
+                running = batch_id in self._running
+            if running:
+                # 执行中的任务文件由本进程写入，控制操作通过控制文件同步
+                continue
+
+            try:
+                with open(batch_file, 'rb') as f:
+                    status = serialization.loads(f.read()).get('status')
+            except (OSError,) + serialization.DECODE_ERRORS:
+                # 文件可能正在写入，下次轮询重新检查
+                self._mtimes.pop(batch_file.name, None)
+                continue
+
+            if status == BatchStatus.DOWNLOADING.value:
+                self._start_batch(batch_id)
+                started += 1
+
+        for name in set(self._mtimes) - seen:
+            del self._mtimes[name]
+
+        self._poll_control()
+        return started
+
+    def _poll_control(self):
+        """执行中任务的控制文件变化时同步到内存（Web进程可能暂停、恢复、取消了任务或修改了优先级）"""
+        with self._lock:
+            running = list(self._running)
+
+        control_path = self.batch_service.control_path
+        for batch_id in running:
+            try:
+                mtime = (control_path / f"{batch_id}.json").stat().st_mtime_ns
+            except OSError:
+                continue
+            if self._control_mtimes.get(batch_id) == mtime:
+                continue
+            self._control_mtimes[batch_id] = mtime
+            self.batch_service.sync_batch_control(batch_id)
+
+        for batch_id in set(self._control_mtimes) - set(running):
+            del self._control_mtimes[batch_id]
+
+    def _start_batch(self, batch_id: str):
+        """在新线程中执行批量任务"""
+        thread = threading.Thread(
+            target=self._run_batch,
+            args=(batch_id,),
+            name=f'batch-{batch_id[:8]}',
+            daemon=True
+        )
+        with self._lock:
+            self._running[batch_id] = thread
+            self.total_started += 1
+        thread.start()
+        logger.info("执行进程开始处理批量下载任务: %s", batch_id)
+
+    def _run_batch(self, batch_id: str):
+        """执行批量任务，结束后释放内存"""
+        try:
+            self.batch_service.run_batch(batch_id)
+        finally:
+            self.batch_service.release_batch(batch_id)
+            with self._lock:
+                self._running.pop(batch_id, None)
+
+    def get_status(self) -> Dict[str, Any]:
+        """获取执行器状态"""
+        with self._lock:
+            running = list(self._running)
+        return {
+            'running': self.is_running,
+            'running_batches': running,
+            'total_started': self.total_started,
+            'poll_interval': self.poll_interval,
+            'checked_at': time.time()
+        }
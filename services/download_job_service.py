@@ -0,0 +1,250 @@
+"""
+单个下载任务服务模块
+"""
+import time
+import logging
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Optional
+
+from models.download_job import DownloadJob, JobStatus
+from services.download_service import DownloadService
+from services.download_scheduler import DownloadScheduler
+from utils.exceptions import DownloadError, DownloadLimitError
+from utils.cache import LRUCache
+from utils.logger import log_context
+from utils.profiler import PROFILER
+from utils import serialization
+from config import (
+    DOWNLOAD_JOB_RETENTION_DAYS, DOWNLOAD_JOB_CACHE_SIZE, DOWNLOAD_JOB_QUEUE_TIMEOUT, DOWNLOAD_TIMEOUT, BATCH_EXECUTOR
+)
+
+logger = logging.getLogger(__name__)
+
+# 下载进度写入状态文件的最小间隔（秒）
+PROGRESS_SAVE_INTERVAL = 1.0
+# 下载超时之后留给转码和写标签的时间（秒），超过后仍未结束的任务视为已中断
+STALE_JOB_GRACE = 120
+
+
+class DownloadJobService:
+    """单个下载任务服务
+
+    首页的下载请求只创建任务并交给下载调度器（插到批量任务之前），请求线程立即返回任务ID，
+    浏览器通过状态接口或事件流等待任务结束。任务状态写入 batch_storage/jobs，
+    多进程部署时任何一个Web进程都能查询；本进程执行的任务同时保存在内存中。
+
+    BATCH_EXECUTOR=process 时Web进程只写入排队中的任务文件，由独立的执行进程
+    （worker.py）认领并下载，Web进程被gunicorn回收不会中断下载。
+    执行进程退出、超过 DOWNLOAD_TIMEOUT 仍未结束或排队超过 DOWNLOAD_JOB_QUEUE_TIMEOUT 仍未开始
+    的任务标记为失败，浏览器不会一直等待。
+    """
+
+    def __init__(self, download_service: Optional[DownloadService] = None,
+                 scheduler: Optional[DownloadScheduler] = None,
+                 runs_jobs: Optional[bool] = None):
+        self.download_service = download_service or DownloadService()
+        self.scheduler = scheduler or DownloadScheduler()
+        # 是否在本进程中执行下载；process 模式下只有执行进程执行
+        self.runs_jobs = runs_jobs if runs_jobs is not None else BATCH_EXECUTOR != 'process'
+        self.storage_path = Path("batch_storage") / "jobs"
+        self.storage_path.mkdir(parents=True, exist_ok=True)
+
+        # 本进程执行的任务，未结束的任务不会被淘汰
+        self.jobs = LRUCache(
+            max_entries=DOWNLOAD_JOB_CACHE_SIZE,
+            pinned=lambda job: not job.is_finished
+        )
+        self._save_lock = threading.Lock()
+        # 已检查过的任务文件 {文件名: mtime_ns}（执行进程认领排队任务时使用）
+        self._mtimes: Dict[str, int] = {}
+        self.cleanup_old_jobs(DOWNLOAD_JOB_RETENTION_DAYS)
+
+    def submit(self, url: str) -> DownloadJob:
+        """创建下载任务并加入调度队列（process 模式下只写入任务文件，等待执行进程认领）"""
+        job = DownloadJob(url=url)
+        self._save_job(job)
+
+        # 只有执行下载的进程在内存中保存任务，其他进程从任务文件读取最新状态
+        if self.runs_jobs:
+            self.jobs.put(job.id, job)
+            self.scheduler.submit(self._run_job, job)
+        logger.info("单个下载任务已加入队列: %s - %s", job.id, url)
+        return job
+
+    def claim_queued_jobs(self) -> int:
+        """认领其他进程写入的排队任务并加入调度队列，返回认领的数量（在执行进程中定期调用）
+
+        只重新读取修改时间发生变化的任务文件。状态为下载中、但不在本进程内存中的任务
+        属于已退出的执行进程，直接标记为失败。
+        """
+        claimed = 0
+        seen = set()
+
+        for job_file in self.storage_path.glob("*.json"):
+            seen.add(job_file.name)
+            try:
+                mtime = job_file.stat().st_mtime_ns
+            except OSError:
+                continue
+            if self._mtimes.get(job_file.name) == mtime:
+                continue
+            self._mtimes[job_file.name] = mtime
+
+            if self.jobs.get(job_file.stem) is not None:
+                continue
+            try:
+                with open(job_file, 'rb') as f:
+                    job = DownloadJob.from_dict(serialization.loads(f.read()))
+            except FileNotFoundError:
+                continue
+            except (OSError, KeyError, ValueError) + serialization.DECODE_ERRORS:
+                # 文件可能正在写入，下次重新检查
+                self._mtimes.pop(job_file.name, None)
+                continue
+
+            if self._is_stale(job):
+                self._mark_interrupted(job, self._stale_message(job))
+            elif job.status == JobStatus.QUEUED:
+                self.jobs.put(job.id, job)
+                self.scheduler.submit(self._run_job, job)
+                claimed += 1
+                logger.info("执行进程认领单个下载任务: %s - %s", job.id, job.url)
+            elif job.status == JobStatus.DOWNLOADING:
+                self._mark_interrupted(job, "执行进程已重启，下载被中断")
+
+        for name in set(self._mtimes) - seen:
+            del self._mtimes[name]
+        return claimed
+
+    def _run_job(self, job: DownloadJob):
+        """执行下载任务（在调度器的工作线程中调用）"""
+        # 排队期间其他进程读取状态时已判定排队超时
+        stored = self._read_job(job.id)
+        if stored is not None and stored.status == JobStatus.FAILED:
+            self.jobs.put(job.id, stored)
+            return
+
+        with log_context(job_id=job.id), PROFILER.profile('download', job.id):
+            job.status = JobStatus.DOWNLOADING
+            job.started_at = time.time()
+            self._save_job(job)
+
+            last_saved = [0.0]
+
+            def on_progress(progress: float):
+                job.progress = round(progress, 1)
+                now = time.monotonic()
+                if now - last_saved[0] >= PROGRESS_SAVE_INTERVAL:
+                    last_saved[0] = now
+                    self._save_job(job)
+
+            try:
+                result = self.download_service.download_audio(job.url, progress_callback=on_progress)
+                if result.get('status') != 'success':
+                    raise DownloadError(result.get('message', '下载失败'))
+
+                job.filename = result['filename']
+                job.filepath = result['filepath']
+                job.title = result.get('title', '')
+                job.artist = result.get('artist', '')
+                job.duration = result.get('duration', 0)
+                job.cover_filename = result.get('cover_filename')
+                job.progress = 100.0
+                job.status = JobStatus.COMPLETED
+                logger.info("单个下载任务完成: %s - %s", job.id, job.filename)
+            except DownloadLimitError as e:
+                job.error_message = str(e)
+                job.failure_reason = e.reason
+                job.status = JobStatus.FAILED
+                logger.warning("单个下载任务超出限制: %s - %s", job.id, e)
+            except Exception as e:
+                job.error_message = str(e)
+                job.status = JobStatus.FAILED
+                logger.error("单个下载任务失败: %s - %s", job.id, e)
+            finally:
+                job.completed_at = time.time()
+                self._save_job(job)
+
+    def get_job(self, job_id: str) -> Optional[DownloadJob]:
+        """获取下载任务（本进程的任务直接返回内存对象，否则读取状态文件）"""
+        job = self.jobs.get(job_id)
+        if job:
+            return job
+
+        job = self._read_job(job_id)
+        if job is not None and self._is_stale(job):
+            self._mark_interrupted(job, self._stale_message(job))
+        return job
+
+    def _read_job(self, job_id: str) -> Optional[DownloadJob]:
+        """读取任务状态文件"""
+        job_file = self._job_file(job_id)
+        if job_file is None:
+            return None
+        try:
+            with open(job_file, 'rb') as f:
+                return DownloadJob.from_dict(serialization.loads(f.read()))
+        except FileNotFoundError:
+            return None
+        except (OSError, KeyError, ValueError) as e:
+            logger.warning("读取下载任务失败: %s - %s", job_id, e)
+            return None
+
+    @staticmethod
+    def _is_stale(job: DownloadJob) -> bool:
+        """任务已无人执行：排队超过 DOWNLOAD_JOB_QUEUE_TIMEOUT 仍未开始，或下载超过 DOWNLOAD_TIMEOUT
+        仍未结束（对应配置为0时不判断）"""
+        if job.status == JobStatus.QUEUED:
+            return DOWNLOAD_JOB_QUEUE_TIMEOUT > 0 and time.time() > job.created_at + DOWNLOAD_JOB_QUEUE_TIMEOUT
+        if job.status != JobStatus.DOWNLOADING or not job.started_at or DOWNLOAD_TIMEOUT <= 0:
+            return False
+        return time.time() > job.started_at + DOWNLOAD_TIMEOUT + STALE_JOB_GRACE
+
+    @staticmethod
+    def _stale_message(job: DownloadJob) -> str:
+        """无人执行的任务的失败原因"""
+        if job.status == JobStatus.QUEUED:
+            return "排队超时未开始，执行下载的进程可能未运行"
+        return "下载超时未结束，执行下载的进程可能已退出"
+
+    def _mark_interrupted(self, job: DownloadJob, message: str):
+        """把已中断的任务标记为失败并保存"""
+        job.status = JobStatus.FAILED
+        job.error_message = message
+        job.failure_reason = 'interrupted'
+        job.completed_at = time.time()
+        self._save_job(job)
+        logger.warning("单个下载任务已中断: %s - %s", job.id, message)
+
+    def _job_file(self, job_id: str) -> Optional[Path]:
+        """任务状态文件路径（任务ID只允许十六进制字符）"""
+        if not job_id or not all(c in '0123456789abcdef' for c in job_id):
+            return None
+        return self.storage_path / f"{job_id}.json"
+
+    def _save_job(self, job: DownloadJob):
+        """保存任务状态（原子替换）"""
+        try:
+            job_file = self.storage_path / f"{job.id}.json"
+            with self._save_lock:
+                serialization.dump_file(job, job_file)
+        except Exception as e:
+            logger.error("保存下载任务失败: %s - %s", job.id, e)
+
+    def cleanup_old_jobs(self, days: int = DOWNLOAD_JOB_RETENTION_DAYS):
+        """清理旧的下载任务状态文件"""
+        cutoff_time = datetime.now().timestamp() - (days * 24 * 3600)
+        deleted_count = 0
+
+        for job_file in self.storage_path.glob("*.json"):
+            try:
+                if job_file.stat().st_mtime < cutoff_time:
+                    job_file.unlink()
+                    deleted_count += 1
+            except OSError as e:
+                logger.warning("清理下载任务文件失败: %s - %s", job_file, e)
+
+        if deleted_count:
+            logger.info("清理了 %s 个旧的下载任务", deleted_count)
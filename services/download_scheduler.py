@@ -0,0 +1,216 @@
+"""
+下载调度器模块
+"""
+import logging
+import threading
+from collections import deque
+from concurrent.futures import Future
+from typing import Dict, Any, Callable, Deque, Iterable, Optional
+
+from config import MAX_CONCURRENT_DOWNLOADS
+
+logger = logging.getLogger(__name__)
+
+
+class _BatchQueue:
+    """调度器中的一个批量任务"""
+
+    __slots__ = ('batch_id', 'runner', 'priority', 'paused', 'pending', 'in_flight', 'last_served', 'done')
+
+    def __init__(self, batch_id: str, runner: Callable[[str], Any], priority: int, paused: bool):
+        self.batch_id = batch_id
+        self.runner = runner
+        self.priority = priority
+        self.paused = paused
+        self.pending: Deque[str] = deque()
+        self.in_flight = 0
+        # 最近一次被调度的序号，越小越久没有轮到
+        self.last_served = 0
+        self.done = threading.Event()
+
+
+class DownloadScheduler:
+    """全局下载调度器
+
+    固定数量的工作线程（MAX_CONCURRENT_DOWNLOADS）从同一个队列中取下载任务：
+    单个下载（submit）优先于所有批量任务；批量任务之间先比较优先级（数值大的先执行），
+    同一优先级按轮询方式交替执行，小批量任务不会被排在大批量任务后面一直等待。
+    暂停的批量任务不再分配新的下载，正在进行的下载会继续完成。
+    """
+
+    def __init__(self, workers: int = MAX_CONCURRENT_DOWNLOADS):
+        self.workers = max(1, workers)
+        self._urgent: Deque[tuple] = deque()
+        self._batches: Dict[str, _BatchQueue] = {}
+        self._cond = threading.Condition()
+        self._threads = []
+        self._serial = 0
+        self._active = 0
+        self.total_dispatched = 0
+
+    def _ensure_workers(self):
+        """按需启动工作线程（调用方需持有锁）"""
+        if self._threads:
+            return
+        for index in range(self.workers):
+            thread = threading.Thread(target=self._worker, name=f'download-worker-{index}', daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        logger.info("下载调度器已启动，工作线程数: %s", self.workers)
+
+    def submit(self, func: Callable[..., Any], *args, **kwargs) -> Future:
+        """提交单个下载，插到所有批量任务之前"""
+        future = Future()
+        with self._cond:
+            self._ensure_workers()
+            self._urgent.append((future, func, args, kwargs))
+            self._cond.notify()
+        return future
+
+    def run(self, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """提交单个下载并等待结果"""
+        return self.submit(func, *args, **kwargs).result()
+
+    def add_batch(self, batch_id: str, task_ids: Iterable[str], runner: Callable[[str], Any],
+                  priority: int = 0, paused: bool = False) -> threading.Event:
+        """加入批量任务，runner(task_id) 执行单个子任务；返回全部子任务结束（或取消）时触发的事件"""
+        entry = _BatchQueue(batch_id, runner, priority, paused)
+        entry.pending.extend(task_ids)
+
+        with self._cond:
+            if batch_id in self._batches:
+                raise ValueError(f"批量任务已在调度队列中: {batch_id}")
+            if not entry.pending:
+                entry.done.set()
+                return entry.done
+
+            self._ensure_workers()
+            self._batches[batch_id] = entry
+            self._cond.notify_all()
+        return entry.done
+
+    def has_batch(self, batch_id: str) -> bool:
+        """批量任务是否在调度队列中"""
+        with self._cond:
+            return batch_id in self._batches
+
+    def pause(self, batch_id: str) -> bool:
+        """暂停批量任务"""
+        with self._cond:
+            entry = self._batches.get(batch_id)
+            if entry is None:
+                return False
+            entry.paused = True
+            return True
+
+    def resume(self, batch_id: str) -> bool:
+        """恢复批量任务"""
+        with self._cond:
+            entry = self._batches.get(batch_id)
+            if entry is None:
+                return False
+            entry.paused = False
+            self._cond.notify_all()
+            return True
+
+    def set_priority(self, batch_id: str, priority: int) -> bool:
+        """修改批量任务优先级"""
+        with self._cond:
+            entry = self._batches.get(batch_id)
+            if entry is None:
+                return False
+            entry.priority = priority
+            return True
+
+    def cancel(self, batch_id: str) -> bool:
+        """取消批量任务中尚未开始的子任务"""
+        with self._cond:
+            entry = self._batches.get(batch_id)
+            if entry is None:
+                return False
+            entry.pending.clear()
+            self._finish_if_drained(entry)
+            return True
+
+    def _finish_if_drained(self, entry: _BatchQueue):
+        """子任务全部结束时移出队列（调用方需持有锁）"""
+        if not entry.pending and entry.in_flight == 0:
+            self._batches.pop(entry.batch_id, None)
+            entry.done.set()
+
+    def _next_batch(self) -> Optional[_BatchQueue]:
+        """选出下一个执行的批量任务：优先级高的优先，同优先级中最久没有轮到的优先（调用方需持有锁）"""
+        best = None
+        for entry in self._batches.values():
+            if entry.paused or not entry.pending:
+                continue
+            if best is None or (entry.priority, -entry.last_served) > (best.priority, -best.last_served):
+                best = entry
+        return best
+
+    def _worker(self):
+        """工作线程"""
+        while True:
+            with self._cond:
+                while True:
+                    if self._urgent:
+                        job = self._urgent.popleft()
+                        entry = None
+                        break
+                    entry = self._next_batch()
+                    if entry is not None:
+                        task_id = entry.pending.popleft()
+                        entry.in_flight += 1
+                        self._serial += 1
+                        entry.last_served = self._serial
+                        break
+                    self._cond.wait()
+                self._active += 1
+                self.total_dispatched += 1
+
+            try:
+                if entry is None:
+                    self._run_urgent(job)
+                else:
+                    try:
+                        entry.runner(task_id)
+                    except Exception as e:
+                        logger.error("批量子任务执行异常: %s/%s - %s", entry.batch_id, task_id, e)
+            finally:
+                with self._cond:
+                    self._active -= 1
+                    if entry is not None:
+                        entry.in_flight -= 1
+                        self._finish_if_drained(entry)
+
+    def _run_urgent(self, job: tuple):
+        """执行单个下载并写入结果"""
+        future, func, args, kwargs = job
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            future.set_result(func(*args, **kwargs))
+        except Exception as e:
+            future.set_exception(e)
+
+    def get_status(self) -> Dict[str, Any]:
+        """获取调度队列状态"""
+        with self._cond:
+            batches = [
+                {
+                    'batch_id': entry.batch_id,
+                    'priority': entry.priority,
+                    'paused': entry.paused,
+                    'pending': len(entry.pending),
+                    'in_flight': entry.in_flight
+                }
+                for entry in self._batches.values()
+            ]
+            batches.sort(key=lambda item: -item['priority'])
+            return {
+                'workers': self.workers,
+                'active': self._active,
+                'queued_single': len(self._urgent),
+                'batches': batches,
+                'total_dispatched': self.total_dispatched
+            }
@@ -3,26 +3,179 @@
 """
 import os
 import re
+import glob
+import time
 import shutil
 import subprocess
 import logging
+import threading
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Callable, Iterator, List, Optional, Set, Tuple
 import yt_dlp
+from yt_dlp.utils import DownloadCancelled, YoutubeDLError
 
-from utils.exceptions import DownloadError, FFmpegError
-from utils.validators import InputSanitizer
-from config import DOWNLOAD_PATH, TEMP_PATH
+from utils.exceptions import DownloadError, DownloadLimitError, FFmpegError
+from utils.validators import InputSanitizer, URLValidator
+from utils.metrics import DOWNLOADED_BYTES, DOWNLOADS, CACHE_REQUESTS, StageRecorder
+from utils.logger import YtDlpLogger
+from services.library_service import LibraryService
+from config import (
+    DOWNLOAD_PATH, TEMP_PATH, MAX_CONCURRENT_DOWNLOADS, FFMPEG_CHECK_TTL,
+    DOWNLOAD_TIMEOUT, MAX_DOWNLOAD_SIZE, MAX_DOWNLOAD_DURATION, DOWNLOAD_SOCKET_TIMEOUT
+)
 
 logger = logging.getLogger(__name__)
+# yt-dlp的输出单独使用子日志器，下载进度行限流
+ytdlp_logger = YtDlpLogger(logging.getLogger(f'{__name__}.yt_dlp'))
+
+
+class DownloadGuard:
+    """单个下载的限制检查
+    
+    下载前根据视频信息检查时长和预估大小；下载过程中在yt-dlp进度回调里累计字节数，
+    超过 MAX_DOWNLOAD_SIZE 立即中止。看门狗定时器在 DOWNLOAD_TIMEOUT 到期时结束正在运行的
+    FFmpeg进程；网络读取卡住时由 socket_timeout 结束等待，随后的重试回调中止下载。
+    """
+    
+    def __init__(self, url: str, timeout: float = DOWNLOAD_TIMEOUT,
+                 max_bytes: int = MAX_DOWNLOAD_SIZE * 1024 * 1024,
+                 max_duration: float = MAX_DOWNLOAD_DURATION):
+        self.url = url
+        self.timeout = timeout
+        self.max_bytes = max_bytes
+        self.max_duration = max_duration
+        self.started_at = time.monotonic()
+        self.timed_out = False
+        self.error: Optional[DownloadLimitError] = None
+        # 每个下载文件已下载的字节数（音视频分开下载时合计）
+        self._file_bytes: Dict[str, int] = {}
+        self._timer: Optional[threading.Timer] = None
+        # 正在运行的外部进程（音频转换），看门狗到期时结束
+        self._process: Optional[subprocess.Popen] = None
+        self._process_lock = threading.Lock()
+    
+    @property
+    def downloaded_bytes(self) -> int:
+        """已下载的字节数"""
+        return sum(self._file_bytes.values())
+    
+    def start(self):
+        """启动看门狗"""
+        if self.timeout > 0:
+            self._timer = threading.Timer(self.timeout, self._expire)
+            self._timer.daemon = True
+            self._timer.start()
+    
+    def stop(self):
+        """停止看门狗"""
+        if self._timer:
+            self._timer.cancel()
+    
+    def _expire(self):
+        """看门狗到期：标记超时并结束正在运行的外部进程"""
+        with self._process_lock:
+            self.timed_out = True
+            process = self._process
+            if process and process.poll() is None:
+                process.kill()
+        logger.warning("下载超过 %s 秒，正在中止: %s", self.timeout, self.url)
+    
+    def _abort(self, reason: str, message: str):
+        """记录原因并通过yt-dlp的取消异常中止下载"""
+        if self.error is None:
+            self.error = DownloadLimitError(reason, message)
+        raise DownloadCancelled(message)
+    
+    def check_deadline(self):
+        """超时则中止"""
+        if self.timed_out or (self.timeout > 0 and time.monotonic() - self.started_at > self.timeout):
+            self._abort(DownloadLimitError.TIMEOUT, f"下载超时（超过 {self.timeout} 秒）")
+    
+    def preflight(self, info: Dict[str, Any]):
+        """下载前检查视频时长和预估大小"""
+        duration = info.get('duration') or 0
+        if self.max_duration > 0 and duration > self.max_duration:
+            raise DownloadLimitError(
+                DownloadLimitError.TOO_LONG,
+                f"视频时长 {int(duration)} 秒超过限制 {self.max_duration} 秒"
+            )
+        
+        estimated = self.estimate_size(info)
+        if self.max_bytes > 0 and estimated > self.max_bytes:
+            raise DownloadLimitError(
+                DownloadLimitError.TOO_LARGE,
+                f"预计大小 {estimated / 1024 / 1024:.0f}MB 超过限制 {self.max_bytes / 1024 / 1024:.0f}MB"
+            )
+    
+    @staticmethod
+    def estimate_size(info: Dict[str, Any]) -> int:
+        """根据选中格式的文件大小（或码率×时长）预估下载字节数，未知时返回0"""
+        total = 0
+        for fmt in info.get('requested_formats') or [info]:
+            size = fmt.get('filesize') or fmt.get('filesize_approx')
+            if not size:
+                bitrate = fmt.get('tbr') or fmt.get('abr') or 0  # kbps
+                size = bitrate * 125 * (info.get('duration') or 0)
+            total += int(size or 0)
+        return total
+    
+    def progress_hook(self, d: Dict[str, Any]):
+        """yt-dlp进度回调：累计字节数并检查限制"""
+        if d.get('status') == 'downloading':
+            self._file_bytes[d.get('filename', '')] = d.get('downloaded_bytes') or 0
+            if self.max_bytes > 0 and self.downloaded_bytes > self.max_bytes:
+                self._abort(
+                    DownloadLimitError.TOO_LARGE,
+                    f"下载大小超过限制 {self.max_bytes / 1024 / 1024:.0f}MB"
+                )
+        elif d.get('status') == 'finished':
+            filename = d.get('filename', '')
+            if filename in self._file_bytes:
+                self._file_bytes[filename] = d.get('total_bytes') or self._file_bytes[filename]
+        self.check_deadline()
+    
+    def retry_sleep(self, n: int) -> float:
+        """yt-dlp重试前的等待时间回调：网络读取超时后重试前检查是否已超时"""
+        self.check_deadline()
+        return 0
+    
+    def run_process(self, command: List[str]) -> Tuple[int, str]:
+        """运行外部命令，返回退出码和错误输出；看门狗到期时进程被结束，抛出超时中止"""
+        self.check_deadline()
+        with self._process_lock:
+            self._process = subprocess.Popen(
+                command, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE
+            )
+            process = self._process
+            # 启动进程之前看门狗已到期
+            if self.timed_out:
+                process.kill()
+        try:
+            _, stderr = process.communicate()
+        finally:
+            with self._process_lock:
+                self._process = None
+        self.check_deadline()
+        return process.returncode, stderr.decode('utf-8', 'replace')
 
 
 class DownloadService:
-    """下载服务类"""
+    """下载服务类
     
-    def __init__(self):
+    同时进行的下载数受 download_slots 限制；由服务容器创建时，所有使用者共用同一组槽位。
+    """
+    
+    def __init__(self, library_service: Optional[LibraryService] = None,
+                 download_slots: Optional[threading.Semaphore] = None):
         self.download_path = Path(DOWNLOAD_PATH)
         self.temp_path = Path(TEMP_PATH)
+        self.library_service = library_service or LibraryService()
+        self.download_slots = download_slots or threading.BoundedSemaphore(MAX_CONCURRENT_DOWNLOADS)
+        self.active_downloads = 0
+        self._active_lock = threading.Lock()
+        # FFmpeg检查结果缓存（只缓存已安装的结果，未安装时每次重新检查）
+        self._ffmpeg_checked_until = 0.0
         self._ensure_directories()
     
     def _ensure_directories(self):
@@ -32,6 +185,18 @@ class DownloadService:
     
     def check_ffmpeg_installed(self) -> bool:
         """检查FFmpeg是否安装"""
+        if time.monotonic() < self._ffmpeg_checked_until:
+            CACHE_REQUESTS.inc(cache='ffmpeg_check', result='hit')
+            return True
+        
+        CACHE_REQUESTS.inc(cache='ffmpeg_check', result='miss')
+        installed = self._run_ffmpeg_check()
+        if installed:
+            self._ffmpeg_checked_until = time.monotonic() + FFMPEG_CHECK_TTL
+        return installed
+    
+    def _run_ffmpeg_check(self) -> bool:
+        """执行 ffmpeg -version 检查"""
         try:
             result = subprocess.run(
                 ['ffmpeg', '-version'],
@@ -57,23 +222,43 @@ class DownloadService:
         return {
             'format': 'bestaudio/best',
             'outtmpl': str(self.download_path / '%(title)s.%(ext)s'),
-            'postprocessors': [{
-                'key': 'FFmpegExtractAudio',
-                'preferredcodec': 'mp3',
-                'preferredquality': '192',
-            }],
+            # 下载完成后由 _transcode 转换为MP3，超时时可以结束FFmpeg进程
             'writethumbnail': True,
-            'postprocessor_args': [
-                '-metadata', 'comment=Downloaded from Bilibili'
-            ],
             'ignoreerrors': True,
-            'logger': logger,
+            'logger': ytdlp_logger,
             'format_sort': ['res:720', 'ext:mp4'],
             'cookies': str(cookies_path) if cookies_path.exists() else None,
             'extract_flat': False,
             'no_warnings': False,
+            'socket_timeout': DOWNLOAD_SOCKET_TIMEOUT,
         }
     
+    def iter_playlist_entries(self, url: str) -> Iterator[Dict[str, Any]]:
+        """平铺提取列表（UP主投稿、收藏夹、合集）中的条目，不解析单个视频
+        
+        分页列表在迭代时才逐页请求，调用方提前停止迭代就不会请求后面的页。
+        """
+        cookies_path = self.temp_path / 'cookies.txt'
+        ydl_opts = {
+            'extract_flat': 'in_playlist',
+            'skip_download': True,
+            'quiet': True,
+            'logger': ytdlp_logger,
+            'cookiefile': str(cookies_path) if cookies_path.exists() else None,
+            'socket_timeout': DOWNLOAD_SOCKET_TIMEOUT,
+        }
+        
+        try:
+            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+                info = ydl.extract_info(url, download=False, process=False)
+                if not info:
+                    raise DownloadError("无法获取列表信息")
+                for entry in info.get('entries') or []:
+                    if entry:
+                        yield entry
+        except YoutubeDLError as e:
+            raise DownloadError(f"获取列表失败: {str(e)}")
+    
     def _download_thumbnail(self, url: str, base_name: str) -> Optional[str]:
         """下载缩略图"""
         try:
@@ -94,11 +279,73 @@ class DownloadService:
             
             return cover_filename if cover_path.exists() else None
         except Exception as e:
-            logger.warning(f"缩略图下载失败: {str(e)}")
+            logger.warning("缩略图下载失败: %s", e)
             return None
     
-    def download_audio(self, url: str) -> Dict[str, Any]:
+    @contextmanager
+    def _download_slot(self):
+        """占用一个下载槽位，槽位用完时等待"""
+        with self.download_slots:
+            with self._active_lock:
+                self.active_downloads += 1
+            try:
+                yield
+            finally:
+                with self._active_lock:
+                    self.active_downloads -= 1
+    
+    def download_audio(self, url: str,
+                       progress_callback: Optional[Callable[[float], None]] = None,
+                       recorder: Optional[StageRecorder] = None) -> Dict[str, Any]:
+        """下载Bilibili音频（受并发槽位限制；超出大小、时长或超时限制时抛出 DownloadLimitError）
+        
+        传入 recorder 时，各阶段耗时和下载字节数（失败时为已完成的部分）写入其中。
+        """
+        recorder = recorder or StageRecorder()
+        with self._download_slot():
+            guard = DownloadGuard(url)
+            guard.start()
+            try:
+                result = self._download_audio(url, progress_callback, guard, recorder)
+                DOWNLOADS.inc(result='success', error='')
+                return result
+            except Exception as e:
+                DOWNLOADS.inc(result='failure', error=self._error_class(e))
+                raise
+            finally:
+                guard.stop()
+                recorder.downloaded_bytes = guard.downloaded_bytes
+                if guard.downloaded_bytes:
+                    DOWNLOADED_BYTES.inc(guard.downloaded_bytes)
+    
+    @staticmethod
+    def _error_class(error: Exception) -> str:
+        """失败原因：下载限制的原因，或被包装为DownloadError之前的原始异常类型"""
+        if isinstance(error, DownloadLimitError):
+            return error.reason
+        if type(error) is DownloadError and error.__context__ is not None:
+            return type(error.__context__).__name__
+        return type(error).__name__
+    
+    def _progress_hook(self, progress_callback: Callable[[float], None]) -> Callable[[Dict[str, Any]], None]:
+        """yt-dlp进度回调：下载阶段占0-90%，之后是音频转换"""
+        def hook(d: Dict[str, Any]):
+            if d.get('status') == 'downloading':
+                total = d.get('total_bytes') or d.get('total_bytes_estimate')
+                if total:
+                    progress_callback(min(d.get('downloaded_bytes', 0) / total, 1.0) * 90)
+            elif d.get('status') == 'finished':
+                progress_callback(90.0)
+        return hook
+    
+    def _download_audio(self, url: str,
+                        progress_callback: Optional[Callable[[float], None]] = None,
+                        guard: Optional[DownloadGuard] = None,
+                        recorder: Optional[StageRecorder] = None) -> Dict[str, Any]:
         """下载Bilibili音频"""
+        guard = guard or DownloadGuard(url)
+        recorder = recorder or StageRecorder()
+        existing_files: Optional[Set[str]] = None
         try:
             # 检查FFmpeg
             if not self.check_ffmpeg_installed():
@@ -109,14 +356,25 @@ class DownloadService:
             
             # 配置yt-dlp
             ydl_opts = self._get_ydl_opts()
+            ydl_opts['progress_hooks'] = [guard.progress_hook]
+            ydl_opts['retry_sleep_functions'] = {
+                'http': guard.retry_sleep, 'fragment': guard.retry_sleep, 'extractor': guard.retry_sleep
+            }
+            if progress_callback:
+                ydl_opts['progress_hooks'].append(self._progress_hook(progress_callback))
             
             with yt_dlp.YoutubeDL(ydl_opts) as ydl:
                 # 提取视频信息
-                info = ydl.extract_info(url, download=False)
+                with recorder.time('resolve'):
+                    info = ydl.extract_info(url, download=False)
                 
                 if not info or 'title' not in info:
                     raise DownloadError("无法获取视频信息")
                 
+                # 下载前检查时长、预估大小和耗时
+                guard.preflight(info)
+                guard.check_deadline()
+                
                 # 清理标题作为文件名
                 safe_title = InputSanitizer.sanitize_filename(info['title'])
                 if not safe_title:
@@ -124,21 +382,30 @@ class DownloadService:
                 
                 # 设置输出模板
                 ydl_opts['outtmpl'] = str(self.download_path / f"{safe_title}.%(ext)s")
+                existing_files = self._output_files(safe_title)
                 
                 # 重新创建yt-dlp实例并下载
-                with yt_dlp.YoutubeDL(ydl_opts) as download_ydl:
-                    download_ydl.download([url])
+                with recorder.time('download'):
+                    with yt_dlp.YoutubeDL(ydl_opts) as download_ydl:
+                        downloaded = download_ydl.extract_info(url)
                 
-                # 查找生成的MP3文件
-                mp3_files = list(self.download_path.glob(f"{safe_title}.mp3"))
-                if not mp3_files:
-                    raise DownloadError("文件转换失败，未生成MP3文件")
+                requested = (downloaded or {}).get('requested_downloads') or []
+                source_path = requested[0].get('filepath') if requested else None
+                if not source_path or not os.path.exists(source_path):
+                    raise DownloadError("下载失败，未生成音频文件")
                 
-                final_file = mp3_files[0]
+                # 转换为MP3
+                with recorder.time('transcode'):
+                    final_file = self._transcode(Path(source_path), guard)
                 final_filename = final_file.name
                 
                 # 下载缩略图
-                cover_filename = self._download_thumbnail(url, safe_title)
+                with recorder.time('thumbnail'):
+                    cover_filename = self._download_thumbnail(url, safe_title)
+                
+                # 更新曲库索引
+                bvid = URLValidator.extract_bvid(info.get('id', '')) or URLValidator.extract_bvid(url)
+                self.library_service.index_file(final_file, bvid=bvid, source_url=url)
                 
                 return {
                     "status": "success",
@@ -148,18 +415,60 @@ class DownloadService:
                     "artist": info.get('uploader', '未知艺术家'),
                     "duration": info.get('duration', 0),
                     "cover_filename": cover_filename,
-                    "original_url": url
+                    "original_url": url,
+                    "bvid": bvid
                 }
                 
         except FFmpegError:
             raise
+        except (DownloadLimitError, DownloadCancelled) as e:
+            error = guard.error or e
+            logger.warning("下载已中止: %s - %s", url, error)
+            if existing_files is not None:
+                self._remove_new_files(safe_title, existing_files)
+            if isinstance(error, DownloadLimitError):
+                raise error
+            raise DownloadError(f"下载已取消: {str(error)}")
         except Exception as e:
-            logger.error(f"下载失败: {str(e)}")
+            logger.error("下载失败: %s", e)
             # 清理可能的部分下载文件
             if 'final_file' in locals() and final_file.exists():
                 final_file.unlink()
             raise DownloadError(f"下载失败: {str(e)}")
     
+    @staticmethod
+    def _transcode(source: Path, guard: DownloadGuard) -> Path:
+        """把下载的音频转换为MP3（192kbps）并删除原文件，超时时FFmpeg进程被看门狗结束"""
+        if source.suffix.lower() == '.mp3':
+            return source
+        
+        target = source.with_suffix('.mp3')
+        returncode, stderr = guard.run_process([
+            'ffmpeg', '-y', '-loglevel', 'error', '-i', str(source), '-vn',
+            '-codec:a', 'libmp3lame', '-b:a', '192k',
+            '-metadata', 'comment=Downloaded from Bilibili', str(target)
+        ])
+        if returncode != 0:
+            message = stderr.strip().splitlines()[-1] if stderr.strip() else f"退出码 {returncode}"
+            raise DownloadError(f"文件转换失败: {message}")
+        
+        source.unlink(missing_ok=True)
+        return target
+    
+    def _output_files(self, safe_title: str) -> Set[str]:
+        """下载目录中以该标题命名的文件（包括 .part 等中间文件）"""
+        pattern = str(self.download_path / f"{glob.escape(safe_title)}.*")
+        return set(glob.glob(pattern))
+    
+    def _remove_new_files(self, safe_title: str, existing_files: Set[str]):
+        """删除本次下载产生的文件，保留下载前已存在的同名文件"""
+        for path in self._output_files(safe_title) - existing_files:
+            try:
+                os.remove(path)
+                logger.info("已删除中止下载的文件: %s", path)
+            except OSError as e:
+                logger.warning("删除文件失败: %s - %s", path, e)
+    
     def get_download_progress(self, url: str) -> Dict[str, Any]:
         """获取下载进度（用于实时更新）"""
         # 这里可以实现进度回调
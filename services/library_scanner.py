@@ -0,0 +1,200 @@
+"""
+曲库增量扫描服务模块
+"""
+import os
+import time
+import logging
+import threading
+from pathlib import Path
+from typing import Dict, Any, List, Optional
+
+from services.library_service import LibraryService
+from config import DOWNLOAD_PATH, LIBRARY_SCAN_INTERVAL, LIBRARY_SCAN_BATCH_SIZE
+
+logger = logging.getLogger(__name__)
+
+# 参与索引的音频扩展名
+AUDIO_EXTENSIONS = {'.mp3'}
+
+
+class LibraryScanner:
+    """曲库增量扫描器
+
+    使用os.scandir遍历下载目录，只有 (size, mtime_ns, inode) 指纹发生变化的文件
+    才会用mutagen重新解析标签；索引中存在但磁盘上已不存在的文件会被移除。
+    """
+
+    def __init__(self, library_service: Optional[LibraryService] = None):
+        self.library_service = library_service or LibraryService()
+        self.download_path = Path(DOWNLOAD_PATH)
+        self.interval = LIBRARY_SCAN_INTERVAL
+        self.batch_size = LIBRARY_SCAN_BATCH_SIZE
+
+        self._scan_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._schedule_thread: Optional[threading.Thread] = None
+        self.last_result: Dict[str, Any] = {}
+
+    @property
+    def is_scanning(self) -> bool:
+        """是否正在扫描"""
+        return self._scan_lock.locked()
+
+    def _walk(self, root: str, unreadable: List[str]):
+        """递归遍历目录，产出 (相对路径, DirEntry, 同目录封面文件名集合)
+
+        无法读取的目录和条目记录到 unreadable（相对路径），其中已索引的文件保留原有记录。
+        """
+        stack = ['']
+        while stack:
+            rel_dir = stack.pop()
+            abs_dir = os.path.join(root, rel_dir) if rel_dir else root
+            try:
+                with os.scandir(abs_dir) as iterator:
+                    entries = list(iterator)
+            except OSError as e:
+                logger.warning("无法读取目录: %s - %s", abs_dir, e)
+                unreadable.append(rel_dir)
+                continue
+
+            covers = {entry.name[:-4] for entry in entries if entry.name.lower().endswith('.jpg')}
+
+            for entry in entries:
+                rel_path = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(rel_path)
+                    elif entry.is_file() and os.path.splitext(entry.name)[1].lower() in AUDIO_EXTENSIONS:
+                        yield rel_path, entry, covers
+                except OSError:
+                    unreadable.append(rel_path)
+                    continue
+
+    @staticmethod
+    def _is_under(path: str, prefixes: List[str]) -> bool:
+        """路径是否等于或位于某个前缀目录下（空前缀表示根目录）"""
+        return any(not prefix or path == prefix or path.startswith(prefix + '/') for prefix in prefixes)
+
+    def scan(self) -> Dict[str, Any]:
+        """执行一次增量扫描"""
+        if not self._scan_lock.acquire(blocking=False):
+            return {'status': 'running'}
+
+        try:
+            started = time.monotonic()
+            result = {
+                'scanned': 0,
+                'added': 0,
+                'updated': 0,
+                'removed': 0,
+                'unchanged': 0,
+                'errors': 0
+            }
+
+            if not self.download_path.exists():
+                self.library_service.apply_changes([], list(self.library_service.get_fingerprints()))
+                result['elapsed'] = round(time.monotonic() - started, 3)
+                return result
+
+            root = str(self.download_path.resolve())
+            known = self.library_service.get_fingerprints()
+            seen = set()
+            unreadable: List[str] = []
+            upserts: List[Dict[str, Any]] = []
+            cover_updates: Dict[str, bool] = {}
+
+            for rel_path, entry, covers in self._walk(root, unreadable):
+                result['scanned'] += 1
+                seen.add(rel_path)
+
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    result['errors'] += 1
+                    continue
+
+                fingerprint = known.get(rel_path)
+                if fingerprint and fingerprint[:3] == (stat.st_size, stat.st_mtime_ns, stat.st_ino):
+                    # 封面文件的添加和删除不会改变音频指纹，根据同名封面和内嵌封面重新计算
+                    has_cover, embedded_cover = fingerprint[3], fingerprint[4]
+                    side_cover = entry.name[:-4] in covers
+                    if embedded_cover is not None or side_cover or not has_cover:
+                        result['unchanged'] += 1
+                        if (side_cover or bool(embedded_cover)) != has_cover:
+                            cover_updates[rel_path] = not has_cover
+                        continue
+                    # 旧版本索引未记录内嵌封面且同名封面已删除，重新解析
+
+                metadata = self.library_service.read_file_metadata(entry.path, stat=stat)
+                metadata['path'] = rel_path
+                upserts.append(metadata)
+                result['updated' if fingerprint else 'added'] += 1
+
+                if len(upserts) >= self.batch_size:
+                    self.library_service.apply_changes(upserts, [])
+                    upserts = []
+
+            # 无法读取的目录中的文件保留原有记录，下次扫描时再确认
+            removed = [
+                path for path in known
+                if path not in seen and not self._is_under(path, unreadable)
+            ]
+            result['removed'] = len(removed)
+            self.library_service.apply_changes(upserts, removed, cover_updates)
+
+            result['elapsed'] = round(time.monotonic() - started, 3)
+            result['finished_at'] = time.time()
+            self.last_result = result
+
+            logger.info(
+                "曲库扫描完成: 扫描 %d, 新增 %d, 更新 %d, 移除 %d, 用时 %ss",
+                result['scanned'], result['added'], result['updated'], result['removed'], result['elapsed']
+            )
+            return result
+
+        except Exception as e:
+            logger.error("曲库扫描失败: %s", e)
+            self.last_result = {'status': 'error', 'message': str(e), 'finished_at': time.time()}
+            return self.last_result
+        finally:
+            self._scan_lock.release()
+
+    def request_scan(self) -> bool:
+        """在后台线程中按需触发扫描，已在扫描时返回False"""
+        if self.is_scanning:
+            return False
+
+        threading.Thread(target=self.scan, name='library-scan', daemon=True).start()
+        return True
+
+    def get_status(self) -> Dict[str, Any]:
+        """获取扫描状态"""
+        return {
+            'scanning': self.is_scanning,
+            'interval': self.interval,
+            'last_result': self.last_result
+        }
+
+    def start_schedule(self):
+        """启动定时扫描线程（启动时立即扫描一次）"""
+        if self.interval <= 0 or (self._schedule_thread and self._schedule_thread.is_alive()):
+            return
+
+        self._stop_event.clear()
+        self._schedule_thread = threading.Thread(
+            target=self._schedule_worker,
+            name='library-scan-schedule',
+            daemon=True
+        )
+        self._schedule_thread.start()
+        logger.info("曲库定时扫描已启动，间隔 %s 秒", self.interval)
+
+    def stop_schedule(self):
+        """停止定时扫描线程"""
+        self._stop_event.set()
+
+    def _schedule_worker(self):
+        """定时扫描工作线程"""
+        while not self._stop_event.is_set():
+            self.scan()
+            self._stop_event.wait(self.interval)
@@ -0,0 +1,433 @@
+"""
+曲库索引服务模块
+"""
+import os
+import time
+import sqlite3
+import logging
+import threading
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Tuple
+from mutagen.mp3 import MP3
+
+from models.library_track import LibraryTrack
+from config import DOWNLOAD_PATH, LIBRARY_DB_PATH, LIBRARY_PAGE_SIZE, LIBRARY_MAX_PAGE_SIZE
+
+logger = logging.getLogger(__name__)
+
+# 建表语句
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tracks (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    path TEXT NOT NULL UNIQUE,
+    filename TEXT NOT NULL,
+    title TEXT NOT NULL DEFAULT '',
+    artist TEXT NOT NULL DEFAULT '',
+    album TEXT NOT NULL DEFAULT '',
+    albumartist TEXT NOT NULL DEFAULT '',
+    date TEXT NOT NULL DEFAULT '',
+    tracknumber TEXT NOT NULL DEFAULT '',
+    genre TEXT NOT NULL DEFAULT '',
+    duration REAL NOT NULL DEFAULT 0,
+    size INTEGER NOT NULL DEFAULT 0,
+    mtime REAL NOT NULL DEFAULT 0,
+    mtime_ns INTEGER NOT NULL DEFAULT 0,
+    inode INTEGER NOT NULL DEFAULT 0,
+    bvid TEXT NOT NULL DEFAULT '',
+    source_url TEXT NOT NULL DEFAULT '',
+    has_cover INTEGER NOT NULL DEFAULT 0,
+    embedded_cover INTEGER,
+    indexed_at REAL NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_tracks_mtime ON tracks(mtime);
+CREATE INDEX IF NOT EXISTS idx_tracks_bvid ON tracks(bvid);
+CREATE TRIGGER IF NOT EXISTS tracks_ai AFTER INSERT ON tracks BEGIN
+    INSERT INTO tracks_fts(rowid, title, artist, album, albumartist, genre, filename, bvid)
+    VALUES (new.id, new.title, new.artist, new.album, new.albumartist, new.genre, new.filename, new.bvid);
+END;
+CREATE TRIGGER IF NOT EXISTS tracks_ad AFTER DELETE ON tracks BEGIN
+    INSERT INTO tracks_fts(tracks_fts, rowid, title, artist, album, albumartist, genre, filename, bvid)
+    VALUES ('delete', old.id, old.title, old.artist, old.album, old.albumartist, old.genre, old.filename, old.bvid);
+END;
+CREATE TRIGGER IF NOT EXISTS tracks_au AFTER UPDATE ON tracks BEGIN
+    INSERT INTO tracks_fts(tracks_fts, rowid, title, artist, album, albumartist, genre, filename, bvid)
+    VALUES ('delete', old.id, old.title, old.artist, old.album, old.albumartist, old.genre, old.filename, old.bvid);
+    INSERT INTO tracks_fts(rowid, title, artist, album, albumartist, genre, filename, bvid)
+    VALUES (new.id, new.title, new.artist, new.album, new.albumartist, new.genre, new.filename, new.bvid);
+END;
+"""
+
+# 旧版本数据库缺少的列（列名 -> 定义）
+MIGRATION_COLUMNS = {
+    'mtime_ns': 'INTEGER NOT NULL DEFAULT 0',
+    'inode': 'INTEGER NOT NULL DEFAULT 0',
+    # 是否有内嵌封面，旧记录为NULL（未知，下次扫描时重新解析）
+    'embedded_cover': 'INTEGER'
+}
+
+FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS tracks_fts USING fts5(
+    title, artist, album, albumartist, genre, filename, bvid,
+    content='tracks', content_rowid='id', tokenize='{tokenizer}'
+);
+"""
+
+# ID3帧与标签名的对应关系
+ID3_FRAMES = {
+    'title': 'TIT2',
+    'artist': 'TPE1',
+    'album': 'TALB',
+    'albumartist': 'TPE2',
+    'date': 'TDRC',
+    'tracknumber': 'TRCK',
+    'genre': 'TCON'
+}
+
+# 参与LIKE回退搜索的列
+SEARCH_COLUMNS = ('title', 'artist', 'album', 'albumartist', 'genre', 'filename', 'bvid')
+
+# 排序方式
+SORT_ORDERS = {
+    'recent': 'tracks.mtime DESC',
+    'title': 'tracks.title COLLATE NOCASE ASC',
+    'artist': 'tracks.artist COLLATE NOCASE ASC, tracks.title COLLATE NOCASE ASC',
+    'duration': 'tracks.duration DESC'
+}
+
+# trigram分词器要求的最短词长
+TRIGRAM_MIN_LENGTH = 3
+
+
+class LibraryService:
+    """曲库索引服务类
+
+    使用SQLite FTS5保存下载目录中音频文件的标签、时长、大小、来源BV号等信息，
+    查询时只读数据库，不遍历目录。
+    """
+
+    _schema_lock = threading.Lock()
+    _initialized_paths = set()
+
+    def __init__(self, db_path: Optional[str] = None):
+        self.download_path = Path(DOWNLOAD_PATH)
+        self.db_path = Path(db_path or LIBRARY_DB_PATH)
+        self.tokenizer = 'unicode61'
+        self._ensure_schema()
+
+    def _connect(self) -> sqlite3.Connection:
+        """创建数据库连接（每次操作独立连接，线程安全）"""
+        conn = sqlite3.connect(str(self.db_path), timeout=30)
+        conn.row_factory = sqlite3.Row
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        return conn
+
+    def _ensure_schema(self):
+        """确保数据库表结构存在"""
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+
+        with self._schema_lock:
+            conn = self._connect()
+            try:
+                key = str(self.db_path.resolve())
+                if key not in self._initialized_paths:
+                    self._create_fts_table(conn)
+                    conn.executescript(SCHEMA)
+                    self._migrate(conn)
+                    conn.commit()
+                    self._initialized_paths.add(key)
+
+                row = conn.execute(
+                    "SELECT sql FROM sqlite_master WHERE name = 'tracks_fts'"
+                ).fetchone()
+                if row and 'trigram' in row['sql']:
+                    self.tokenizer = 'trigram'
+            finally:
+                conn.close()
+
+    def _create_fts_table(self, conn: sqlite3.Connection):
+        """创建全文索引表，优先使用支持中文子串匹配的trigram分词器"""
+        try:
+            conn.execute(FTS_SCHEMA.format(tokenizer='trigram'))
+        except sqlite3.OperationalError:
+            # SQLite < 3.34 不支持trigram
+            conn.execute(FTS_SCHEMA.format(tokenizer='unicode61'))
+
+    def _migrate(self, conn: sqlite3.Connection):
+        """为旧版本数据库补充缺少的列"""
+        existing = {row['name'] for row in conn.execute("PRAGMA table_info(tracks)")}
+        for column, definition in MIGRATION_COLUMNS.items():
+            if column not in existing:
+                conn.execute(f"ALTER TABLE tracks ADD COLUMN {column} {definition}")
+
+    def relative_path(self, filepath) -> str:
+        """获取相对于下载目录的路径"""
+        file_path = Path(filepath)
+        try:
+            return file_path.resolve().relative_to(self.download_path.resolve()).as_posix()
+        except ValueError:
+            return file_path.name
+
+    def read_file_metadata(self, filepath, stat: Optional[os.stat_result] = None) -> Dict[str, Any]:
+        """一次解析读取音频文件的标签、时长和封面信息"""
+        file_path = Path(filepath)
+        if stat is None:
+            stat = file_path.stat()
+
+        metadata = {tag: '' for tag in ID3_FRAMES}
+        metadata.update({
+            'filename': file_path.name,
+            'duration': 0.0,
+            'size': stat.st_size,
+            'mtime': stat.st_mtime,
+            'mtime_ns': stat.st_mtime_ns,
+            'inode': stat.st_ino,
+            'has_cover': file_path.with_suffix('.jpg').exists(),
+            'embedded_cover': False
+        })
+
+        try:
+            audio = MP3(str(file_path))
+            if audio.info:
+                metadata['duration'] = round(audio.info.length, 3)
+
+            if audio.tags is not None:
+                for tag_name, frame_id in ID3_FRAMES.items():
+                    frame = audio.tags.get(frame_id)
+                    if frame and frame.text:
+                        metadata[tag_name] = str(frame.text[0])
+
+                if metadata['tracknumber'] and '/' in metadata['tracknumber']:
+                    metadata['tracknumber'] = metadata['tracknumber'].split('/')[0]
+
+                metadata['embedded_cover'] = bool(audio.tags.getall('APIC'))
+                metadata['has_cover'] = metadata['has_cover'] or metadata['embedded_cover']
+        except Exception as e:
+            logger.warning("读取音频元数据失败: %s - %s", filepath, e)
+
+        return metadata
+
+    def index_file(self, filepath, bvid: str = "", source_url: str = "") -> Optional[LibraryTrack]:
+        """将音频文件写入索引（已存在则更新）
+
+        未提供的BV号和来源URL会保留索引中原有的值。
+        """
+        try:
+            file_path = Path(filepath)
+            if not file_path.exists():
+                self.remove_file(file_path)
+                return None
+
+            metadata = self.read_file_metadata(file_path)
+            metadata['path'] = self.relative_path(file_path)
+            metadata['bvid'] = bvid
+            metadata['source_url'] = source_url
+
+            conn = self._connect()
+            try:
+                with conn:
+                    self._upsert(conn, metadata)
+            finally:
+                conn.close()
+
+            return self.get_track(metadata['path'])
+
+        except Exception as e:
+            logger.error("更新曲库索引失败: %s - %s", filepath, e)
+            return None
+
+    def get_fingerprints(self) -> Dict[str, Tuple[int, int, int, bool, Optional[bool]]]:
+        """获取所有已索引文件的指纹 {相对路径: (size, mtime_ns, inode, has_cover, embedded_cover)}
+
+        embedded_cover 为None表示旧版本索引中未记录是否有内嵌封面。
+        """
+        conn = self._connect()
+        try:
+            return {
+                row[0]: (row[1], row[2], row[3], bool(row[4]), None if row[5] is None else bool(row[5]))
+                for row in conn.execute(
+                    "SELECT path, size, mtime_ns, inode, has_cover, embedded_cover FROM tracks"
+                )
+            }
+        finally:
+            conn.close()
+
+    def apply_changes(self, upserts: List[Dict[str, Any]], removed: List[str],
+                      cover_updates: Optional[Dict[str, bool]] = None):
+        """在单个事务中批量写入、删除索引记录并更新封面标记"""
+        conn = self._connect()
+        try:
+            with conn:
+                for metadata in upserts:
+                    self._upsert(conn, metadata)
+                if removed:
+                    conn.executemany(
+                        "DELETE FROM tracks WHERE path = ?",
+                        [(path,) for path in removed]
+                    )
+                if cover_updates:
+                    conn.executemany(
+                        "UPDATE tracks SET has_cover = ? WHERE path = ?",
+                        [(1 if has_cover else 0, path) for path, has_cover in cover_updates.items()]
+                    )
+        finally:
+            conn.close()
+
+    def _upsert(self, conn: sqlite3.Connection, metadata: Dict[str, Any]):
+        """插入或更新一条索引记录"""
+        conn.execute(
+            """
+            INSERT INTO tracks (path, filename, title, artist, album, albumartist, date,
+                                tracknumber, genre, duration, size, mtime, mtime_ns, inode,
+                                bvid, source_url, has_cover, embedded_cover, indexed_at)
+            VALUES (:path, :filename, :title, :artist, :album, :albumartist, :date,
+                    :tracknumber, :genre, :duration, :size, :mtime, :mtime_ns, :inode,
+                    :bvid, :source_url, :has_cover, :embedded_cover, :indexed_at)
+            ON CONFLICT(path) DO UPDATE SET
+                filename = excluded.filename,
+                title = excluded.title,
+                artist = excluded.artist,
+                album = excluded.album,
+                albumartist = excluded.albumartist,
+                date = excluded.date,
+                tracknumber = excluded.tracknumber,
+                genre = excluded.genre,
+                duration = excluded.duration,
+                size = excluded.size,
+                mtime = excluded.mtime,
+                mtime_ns = excluded.mtime_ns,
+                inode = excluded.inode,
+                bvid = CASE WHEN excluded.bvid != '' THEN excluded.bvid ELSE tracks.bvid END,
+                source_url = CASE WHEN excluded.source_url != '' THEN excluded.source_url ELSE tracks.source_url END,
+                has_cover = excluded.has_cover,
+                embedded_cover = excluded.embedded_cover,
+                indexed_at = excluded.indexed_at
+            """,
+            {
+                **metadata,
+                'bvid': metadata.get('bvid') or '',
+                'source_url': metadata.get('source_url') or '',
+                'has_cover': 1 if metadata.get('has_cover') else 0,
+                'embedded_cover': 1 if metadata.get('embedded_cover') else 0,
+                'indexed_at': time.time()
+            }
+        )
+
+    def remove_file(self, filepath) -> bool:
+        """从索引中移除文件"""
+        try:
+            conn = self._connect()
+            try:
+                with conn:
+                    cursor = conn.execute(
+                        "DELETE FROM tracks WHERE path = ?",
+                        (self.relative_path(filepath),)
+                    )
+                return cursor.rowcount > 0
+            finally:
+                conn.close()
+        except Exception as e:
+            logger.error("从曲库索引移除文件失败: %s - %s", filepath, e)
+            return False
+
+    def get_track(self, path: str) -> Optional[LibraryTrack]:
+        """根据相对路径获取曲目"""
+        conn = self._connect()
+        try:
+            row = conn.execute("SELECT * FROM tracks WHERE path = ?", (path,)).fetchone()
+            return LibraryTrack.from_row(row) if row else None
+        finally:
+            conn.close()
+
+    def _build_search(self, query: str) -> Tuple[str, str, List[Any]]:
+        """构建搜索条件
+
+        返回 (JOIN子句, WHERE子句, 参数)。trigram分词器无法匹配少于3个字符的词，
+        这些词回退为LIKE匹配。
+        """
+        terms = [term for term in query.split() if term]
+        if not terms:
+            return '', '', []
+
+        fts_terms = []
+        like_terms = []
+        for term in terms:
+            if self.tokenizer == 'trigram' and len(term) < TRIGRAM_MIN_LENGTH:
+                like_terms.append(term)
+            elif self.tokenizer == 'trigram':
+                fts_terms.append('"{}"'.format(term.replace('"', '""')))
+            else:
+                fts_terms.append('"{}"*'.format(term.replace('"', '""')))
+
+        join = ''
+        conditions = []
+        params: List[Any] = []
+
+        if fts_terms:
+            join = 'JOIN tracks_fts ON tracks_fts.rowid = tracks.id'
+            conditions.append('tracks_fts MATCH ?')
+            params.append(' AND '.join(fts_terms))
+
+        for term in like_terms:
+            escaped = term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+            conditions.append('(' + ' OR '.join(
+                f"tracks.{column} LIKE ? ESCAPE '\\'" for column in SEARCH_COLUMNS
+            ) + ')')
+            params.extend([f'%{escaped}%'] * len(SEARCH_COLUMNS))
+
+        return join, 'WHERE ' + ' AND '.join(conditions), params
+
+    def search(self, query: str = "", page: int = 1, per_page: int = LIBRARY_PAGE_SIZE,
+               sort: str = "") -> Dict[str, Any]:
+        """分页全文搜索曲库"""
+        page = max(1, page)
+        per_page = max(1, min(per_page, LIBRARY_MAX_PAGE_SIZE))
+
+        join, where, params = self._build_search(query or '')
+
+        if sort == 'relevance' and join:
+            order_by = 'bm25(tracks_fts)'
+        else:
+            order_by = SORT_ORDERS.get(sort) or (
+                'bm25(tracks_fts)' if join else SORT_ORDERS['recent']
+            )
+
+        conn = self._connect()
+        try:
+            total = conn.execute(
+                f"SELECT COUNT(*) FROM tracks {join} {where}", params
+            ).fetchone()[0]
+
+            rows = conn.execute(
+                f"SELECT tracks.* FROM tracks {join} {where} "
+                f"ORDER BY {order_by} LIMIT ? OFFSET ?",
+                params + [per_page, (page - 1) * per_page]
+            ).fetchall()
+        finally:
+            conn.close()
+
+        return {
+            'items': [LibraryTrack.from_row(row).to_dict() for row in rows],
+            'total': total,
+            'page': page,
+            'per_page': per_page,
+            'pages': (total + per_page - 1) // per_page
+        }
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """获取曲库统计信息"""
+        conn = self._connect()
+        try:
+            row = conn.execute(
+                "SELECT COUNT(*) AS tracks, COALESCE(SUM(size), 0) AS total_size, "
+                "COALESCE(SUM(duration), 0) AS total_duration, "
+                "COALESCE(SUM(has_cover), 0) AS with_cover FROM tracks"
+            ).fetchone()
+            return {
+                'tracks': row['tracks'],
+                'total_size': row['total_size'],
+                'total_duration': row['total_duration'],
+                'with_cover': row['with_cover']
+            }
+        finally:
+            conn.close()
@@ -0,0 +1,289 @@
+"""
+曲库目录监听服务模块（Linux inotify）
+"""
+import os
+import time
+import logging
+import threading
+from pathlib import Path
+from typing import Dict, Any, Optional, Tuple
+
+from services.library_service import LibraryService
+from services.library_scanner import LibraryScanner, AUDIO_EXTENSIONS
+from services.scan_coordinator import ScanCoordinator, get_scan_coordinator
+from utils import inotify
+from config import DOWNLOAD_PATH, LIBRARY_WATCH_DEBOUNCE
+
+logger = logging.getLogger(__name__)
+
+# 监听的事件类型
+WATCH_MASK = (
+    inotify.IN_CLOSE_WRITE | inotify.IN_MODIFY | inotify.IN_ATTRIB |
+    inotify.IN_CREATE | inotify.IN_DELETE |
+    inotify.IN_MOVED_FROM | inotify.IN_MOVED_TO |
+    inotify.IN_DELETE_SELF | inotify.IN_ONLYDIR
+)
+
+# yt-dlp/FFmpeg写入过程中使用的临时文件后缀
+TEMP_SUFFIXES = ('.part', '.temp.mp3', '.ytdl')
+
+# 目录级变化无法逐文件处理，交给增量扫描
+DIR_CHANGE_MASK = inotify.IN_MOVED_FROM | inotify.IN_MOVED_TO | inotify.IN_DELETE
+
+
+class LibraryWatcher:
+    """曲库目录监听器
+
+    通过inotify接收下载目录中的创建/修改/删除/移动事件，放入去抖队列；
+    在安静期结束后统一更新内存目录和曲库索引，并且每个安静期最多登记一次Navidrome扫描。
+    """
+
+    def __init__(self, library_service: Optional[LibraryService] = None,
+                 library_scanner: Optional[LibraryScanner] = None,
+                 scan_coordinator: Optional[ScanCoordinator] = None):
+        self.library_service = library_service or LibraryService()
+        self.library_scanner = library_scanner or LibraryScanner(self.library_service)
+        self.scan_coordinator = scan_coordinator or get_scan_coordinator()
+        self.download_path = Path(DOWNLOAD_PATH)
+        self.debounce = LIBRARY_WATCH_DEBOUNCE
+
+        # 内存目录 {相对路径: (size, mtime_ns, inode)}
+        self.catalog: Dict[str, Tuple[int, int, int]] = {}
+        self.catalog_lock = threading.Lock()
+
+        # 去抖队列 {绝对路径: 最后事件时间}
+        self._pending: Dict[str, float] = {}
+        self._pending_rescan = False
+        self._last_event = 0.0
+        self._condition = threading.Condition()
+
+        self._inotify: Optional[inotify.Inotify] = None
+        self._watches: Dict[int, str] = {}
+        self._stop_event = threading.Event()
+        self._threads = []
+        self.last_flush: Dict[str, Any] = {}
+
+    @property
+    def is_running(self) -> bool:
+        """监听器是否在运行"""
+        return any(thread.is_alive() for thread in self._threads)
+
+    def start(self) -> bool:
+        """启动监听，不支持inotify的平台返回False"""
+        if self.is_running:
+            return True
+
+        if not inotify.is_supported():
+            logger.info("当前平台不支持inotify，曲库目录监听未启用")
+            return False
+
+        try:
+            self.download_path.mkdir(parents=True, exist_ok=True)
+            self._inotify = inotify.Inotify()
+            self._add_watch_tree(str(self.download_path.resolve()))
+        except OSError as e:
+            logger.error("启动曲库目录监听失败: %s", e)
+            return False
+
+        # 以索引中的指纹初始化内存目录，无需遍历目录
+        with self.catalog_lock:
+            self.catalog = {
+                path: fingerprint[:3]
+                for path, fingerprint in self.library_service.get_fingerprints().items()
+            }
+
+        self._stop_event.clear()
+        self._threads = [
+            threading.Thread(target=self._read_worker, name='library-watch-read', daemon=True),
+            threading.Thread(target=self._flush_worker, name='library-watch-flush', daemon=True)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+        logger.info("曲库目录监听已启动，监听 %s 个目录", len(self._watches))
+        return True
+
+    def stop(self):
+        """停止监听"""
+        self._stop_event.set()
+        with self._condition:
+            self._condition.notify_all()
+        for thread in self._threads:
+            thread.join(timeout=5)
+        if self._inotify:
+            self._inotify.close()
+            self._inotify = None
+        self._watches.clear()
+
+    def _add_watch_tree(self, root: str):
+        """为目录及其子目录添加监听"""
+        stack = [root]
+        while stack:
+            directory = stack.pop()
+            try:
+                wd = self._inotify.add_watch(directory, WATCH_MASK)
+                self._watches[wd] = directory
+                with os.scandir(directory) as iterator:
+                    for entry in iterator:
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append(entry.path)
+            except OSError as e:
+                logger.warning("无法监听目录: %s - %s", directory, e)
+
+    def _read_worker(self):
+        """读取inotify事件并放入去抖队列"""
+        while not self._stop_event.is_set():
+            try:
+                events = self._inotify.read_events(timeout=1.0)
+            except (OSError, ValueError) as e:
+                if not self._stop_event.is_set():
+                    logger.error("读取inotify事件失败: %s", e)
+                break
+
+            for event in events:
+                self._handle_event(event)
+
+    def _handle_event(self, event: inotify.InotifyEvent):
+        """处理单个inotify事件"""
+        if event.mask & inotify.IN_Q_OVERFLOW:
+            # 事件队列溢出，交给增量扫描兜底
+            self._enqueue(rescan=True)
+            return
+
+        if event.mask & inotify.IN_IGNORED:
+            self._watches.pop(event.wd, None)
+            return
+
+        directory = self._watches.get(event.wd)
+        if directory is None or not event.name:
+            return
+
+        path = os.path.join(directory, event.name)
+
+        if event.is_dir:
+            if event.mask & (inotify.IN_CREATE | inotify.IN_MOVED_TO):
+                self._add_watch_tree(path)
+            if event.mask & (DIR_CHANGE_MASK | inotify.IN_CREATE):
+                # 目录内的文件可能在添加监听前已存在，或整个目录被移走/删除
+                self._enqueue(rescan=True)
+            return
+
+        if event.name.endswith(TEMP_SUFFIXES):
+            return
+
+        extension = os.path.splitext(event.name)[1].lower()
+        if extension in AUDIO_EXTENSIONS:
+            self._enqueue(path)
+        elif extension == '.jpg':
+            # 封面变化影响同名音频文件的封面标记
+            for audio_extension in AUDIO_EXTENSIONS:
+                self._enqueue(os.path.splitext(path)[0] + audio_extension)
+
+    def _enqueue(self, path: Optional[str] = None, rescan: bool = False):
+        """将变化加入去抖队列"""
+        with self._condition:
+            now = time.monotonic()
+            if path:
+                self._pending[path] = now
+            if rescan:
+                self._pending_rescan = True
+            self._last_event = now
+            self._condition.notify()
+
+    def _flush_worker(self):
+        """等待安静期后批量处理队列中的变化"""
+        while not self._stop_event.is_set():
+            with self._condition:
+                while not (self._pending or self._pending_rescan) and not self._stop_event.is_set():
+                    self._condition.wait()
+
+                # 等待事件安静下来
+                while not self._stop_event.is_set():
+                    remaining = self._last_event + self.debounce - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._condition.wait(remaining)
+
+                if self._stop_event.is_set():
+                    return
+
+                pending = list(self._pending)
+                rescan = self._pending_rescan
+                self._pending.clear()
+                self._pending_rescan = False
+
+            try:
+                self._flush(pending, rescan)
+            except Exception as e:
+                logger.error("处理曲库目录变化失败: %s", e)
+
+    def _flush(self, paths, rescan: bool):
+        """更新内存目录和索引，并触发一次Navidrome扫描"""
+        changed = 0
+        changed_paths = []
+
+        for path in paths:
+            rel_path = self.library_service.relative_path(path)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                stat = None
+
+            with self.catalog_lock:
+                previous = self.catalog.get(rel_path)
+
+            if stat is None:
+                if previous is not None:
+                    self.library_service.remove_file(path)
+                    with self.catalog_lock:
+                        self.catalog.pop(rel_path, None)
+                    changed_paths.append(path)
+                    changed += 1
+                continue
+
+            self.library_service.index_file(path)
+            with self.catalog_lock:
+                self.catalog[rel_path] = (stat.st_size, stat.st_mtime_ns, stat.st_ino)
+            changed_paths.append(path)
+            changed += 1
+
+        if rescan:
+            result = self.library_scanner.scan()
+            if result.get('status') == 'running':
+                # 定时扫描正在写入索引：推迟到下一个安静期重新扫描，不用写了一半的索引重建内存目录
+                logger.info("曲库正在扫描，目录重新扫描推迟 %s 秒", self.debounce)
+                self._enqueue(rescan=True)
+                rescan = False
+            else:
+                changed += result.get('added', 0) + result.get('updated', 0) + result.get('removed', 0)
+                with self.catalog_lock:
+                    self.catalog = {
+                        path: fingerprint[:3]
+                        for path, fingerprint in self.library_service.get_fingerprints().items()
+                    }
+
+        self.last_flush = {
+            'changed': changed,
+            'rescan': rescan,
+            'finished_at': time.time()
+        }
+
+        if changed:
+            logger.info("曲库目录变化已同步: %s 个文件", changed)
+            # 目录级变化无法确定具体目录，扫描不限定目录
+            self.scan_coordinator.request_scan("曲库目录变化", paths=None if rescan else changed_paths)
+
+    def get_status(self) -> Dict[str, Any]:
+        """获取监听状态"""
+        with self._condition:
+            pending = len(self._pending)
+        with self.catalog_lock:
+            catalog_size = len(self.catalog)
+        return {
+            'running': self.is_running,
+            'watched_directories': len(self._watches),
+            'catalog_size': catalog_size,
+            'pending_events': pending,
+            'debounce': self.debounce,
+            'last_flush': self.last_flush
+        }
@@ -1,81 +1,285 @@
 """
 Navidrome服务模块
 """
+import os
+import re
+import time
+import hashlib
+import secrets
+import threading
 import requests
 import logging
-from typing import Dict, Any, Optional
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from typing import Dict, Any, Iterable, List, Optional, Tuple
 from utils.exceptions import NavidromeError
-from config import NAVIDROME_URL, NAVIDROME_API_KEY
+from utils.metrics import STAGE_DURATION, CACHE_REQUESTS
+from config import (
+    NAVIDROME_URL, NAVIDROME_API_KEY, NAVIDROME_USERNAME, NAVIDROME_PASSWORD,
+    NAVIDROME_POOL_SIZE, NAVIDROME_MAX_RETRIES, NAVIDROME_STATUS_CACHE_TTL,
+    NAVIDROME_TARGETED_SCAN, NAVIDROME_LIBRARY_ID, MUSIC_LIBRARY
+)
 
 logger = logging.getLogger(__name__)
 
+# Subsonic协议参数
+SUBSONIC_API_VERSION = '1.16.1'
+SUBSONIC_CLIENT = 'bilibili2navidrome'
+
+# 支持startScan按目录扫描（target参数）的最低Navidrome版本
+TARGETED_SCAN_MIN_VERSION = (0, 58, 0)
+
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+
+
+def get_session() -> requests.Session:
+    """获取进程内共享的HTTP会话（连接池 + keep-alive + 连接错误重试）"""
+    global _session
+    with _session_lock:
+        if _session is None:
+            retry = Retry(
+                total=NAVIDROME_MAX_RETRIES,
+                connect=NAVIDROME_MAX_RETRIES,
+                read=0,
+                status=0,
+                backoff_factor=0.5,
+                # 只在建立连接失败时重试，请求尚未送达，POST也可安全重试
+                allowed_methods=None
+            )
+            adapter = HTTPAdapter(
+                pool_connections=2,
+                pool_maxsize=NAVIDROME_POOL_SIZE,
+                max_retries=retry
+            )
+            session = requests.Session()
+            session.mount('http://', adapter)
+            session.mount('https://', adapter)
+            _session = session
+        return _session
+
 
 class NavidromeService:
-    """Navidrome音乐库服务类"""
+    """Navidrome音乐库服务类
+    
+    配置了用户名和密码时使用Subsonic API（token认证）；只配置API Key时沿用旧接口。
+    """
+    
+    # 状态类响应的短期缓存 {key: (过期时间, 响应)}，所有实例共享
+    _cache: Dict[str, Tuple[float, Dict[str, Any]]] = {}
+    _cache_lock = threading.Lock()
     
     def __init__(self):
         self.base_url = NAVIDROME_URL
         self.api_key = NAVIDROME_API_KEY
+        self.username = NAVIDROME_USERNAME
+        self.password = NAVIDROME_PASSWORD
+        self.targeted_scan = NAVIDROME_TARGETED_SCAN
+        self.library_id = NAVIDROME_LIBRARY_ID
+        self.music_library = MUSIC_LIBRARY
         self.timeout = 10
+        self.cache_ttl = NAVIDROME_STATUS_CACHE_TTL
+        self.session = get_session()
+        self.headers = {
+            'X-API-Key': self.api_key or '',
+            'Content-Type': 'application/json'
+        }
+    
+    @property
+    def is_configured(self) -> bool:
+        """是否已配置Navidrome"""
+        return bool(self.base_url and (self.uses_subsonic or self.api_key))
+    
+    @property
+    def uses_subsonic(self) -> bool:
+        """是否使用Subsonic API"""
+        return bool(self.username and self.password)
+    
+    def _url(self, path: str) -> str:
+        """构建API URL"""
+        return f"{self.base_url.rstrip('/')}{path}"
+    
+    def _auth_params(self) -> Dict[str, str]:
+        """生成Subsonic token认证参数：t = md5(password + salt)"""
+        salt = secrets.token_hex(6)
+        token = hashlib.md5((self.password + salt).encode('utf-8')).hexdigest()
+        return {
+            'u': self.username,
+            't': token,
+            's': salt,
+            'v': SUBSONIC_API_VERSION,
+            'c': SUBSONIC_CLIENT,
+            'f': 'json'
+        }
+    
+    def _subsonic_request(self, endpoint: str, params: Optional[List[Tuple[str, str]]] = None) -> Dict[str, Any]:
+        """调用Subsonic API，返回subsonic-response内容"""
+        query = list(self._auth_params().items()) + (params or [])
+        response = self.session.get(
+            self._url(f'/rest/{endpoint}'),
+            params=query,
+            timeout=self.timeout
+        )
+        response.raise_for_status()
+        
+        body = response.json().get('subsonic-response', {})
+        if body.get('status') != 'ok':
+            error = body.get('error', {})
+            raise NavidromeError(f"Subsonic错误 {error.get('code', '')}: {error.get('message', '未知错误')}")
+        return body
+    
+    def _supports_targeted_scan(self) -> bool:
+        """服务器是否支持按目录扫描（根据ping返回的服务器版本判断）"""
+        status = self.get_library_status()
+        if status.get('type') != 'navidrome':
+            return False
+        
+        match = re.match(r'(\d+)\.(\d+)\.(\d+)', str(status.get('serverVersion', '')))
+        if not match:
+            return False
+        return tuple(int(part) for part in match.groups()) >= TARGETED_SCAN_MIN_VERSION
+    
+    def _scan_targets(self, folders: Iterable[str]) -> List[str]:
+        """将本地目录转换为Navidrome的扫描目标（libraryID:相对路径）"""
+        root = os.path.abspath(self.music_library)
+        targets = set()
+        for folder in folders:
+            relative = os.path.relpath(os.path.abspath(folder), root)
+            if relative.startswith('..'):
+                # 不在音乐库内的目录无法定向扫描
+                return []
+            relative = '' if relative == '.' else relative.replace(os.sep, '/')
+            targets.add(f"{self.library_id}:{relative}")
+        return sorted(targets)
+    
+    def _get_cached(self, key: str) -> Optional[Dict[str, Any]]:
+        """读取未过期的缓存"""
+        with self._cache_lock:
+            entry = self._cache.get(key)
+            if entry and entry[0] > time.monotonic():
+                CACHE_REQUESTS.inc(cache='navidrome', result='hit')
+                return entry[1]
+        CACHE_REQUESTS.inc(cache='navidrome', result='miss')
+        return None
     
-    def trigger_scan(self) -> bool:
+    def _set_cached(self, key: str, value: Dict[str, Any]):
+        """写入缓存"""
+        if self.cache_ttl <= 0:
+            return
+        with self._cache_lock:
+            self._cache[key] = (time.monotonic() + self.cache_ttl, value)
+    
+    def invalidate_cache(self, key: Optional[str] = None):
+        """清除缓存"""
+        with self._cache_lock:
+            if key:
+                self._cache.pop(key, None)
+            else:
+                self._cache.clear()
+    
+    def trigger_scan(self, folders: Optional[Iterable[str]] = None) -> bool:
+        """触发Navidrome扫描
+        
+        传入发生变化的本地目录时，若服务器支持则只扫描这些目录，否则执行快速（增量）扫描。
+        """
+        if not self.is_configured:
+            logger.info("Navidrome配置未设置，跳过扫描")
+            return True
+        
+        with STAGE_DURATION.time(stage='scan'):
+            return self._trigger_scan(folders)
+    
+    def _trigger_scan(self, folders: Optional[Iterable[str]]) -> bool:
         """触发Navidrome扫描"""
         try:
-            if not self.base_url or not self.api_key:
-                logger.info("Navidrome配置未设置，跳过扫描")
-                return True
-            
-            # 构建API URL
-            scan_url = f"{self.base_url.rstrip('/')}/api/scan"
-            
-            headers = {
-                'X-API-Key': self.api_key,
-                'Content-Type': 'application/json'
-            }
+            if self.uses_subsonic:
+                return self._trigger_subsonic_scan(folders)
             
             # 发送扫描请求
-            response = requests.post(
-                scan_url,
-                headers=headers,
+            response = self.session.post(
+                self._url('/api/scan'),
+                headers=self.headers,
                 timeout=self.timeout
             )
             
+            # 扫描状态已改变
+            self.invalidate_cache('scan_status')
+            
             if response.status_code == 200:
                 logger.info("Navidrome扫描触发成功")
                 return True
             else:
-                logger.warning(f"Navidrome扫描失败: {response.status_code} - {response.text}")
+                logger.warning("Navidrome扫描失败: %s - %s", response.status_code, response.text)
                 return False
                 
         except requests.exceptions.RequestException as e:
-            logger.error(f"Navidrome扫描请求失败: {str(e)}")
+            logger.error("Navidrome扫描请求失败: %s", e)
             return False
         except Exception as e:
-            logger.error(f"Navidrome扫描出错: {str(e)}")
+            logger.error("Navidrome扫描出错: %s", e)
             return False
     
+    def _trigger_subsonic_scan(self, folders: Optional[Iterable[str]]) -> bool:
+        """通过Subsonic startScan触发扫描"""
+        params = [('fullScan', 'false')]
+        
+        targets = []
+        if folders and self.targeted_scan and self._supports_targeted_scan():
+            targets = self._scan_targets(folders)
+        
+        try:
+            try:
+                self._subsonic_request('startScan', params + [('target', target) for target in targets])
+            except NavidromeError as e:
+                if not targets:
+                    raise
+                # 服务器拒绝定向扫描时退回快速扫描
+                logger.warning("定向扫描失败，改为快速扫描: %s", e)
+                targets = []
+                self._subsonic_request('startScan', params)
+        except (requests.exceptions.RequestException, NavidromeError) as e:
+            logger.error("Navidrome扫描请求失败: %s", e)
+            return False
+        finally:
+            self.invalidate_cache('scan_status')
+        
+        if targets:
+            logger.info("Navidrome定向扫描触发成功: %s", ', '.join(targets))
+        else:
+            logger.info("Navidrome扫描触发成功")
+        return True
+    
     def get_library_status(self) -> Dict[str, Any]:
         """获取音乐库状态"""
         try:
-            if not self.base_url or not self.api_key:
+            if not self.is_configured:
                 return {"status": "not_configured", "message": "Navidrome未配置"}
             
-            # 构建API URL
-            status_url = f"{self.base_url.rstrip('/')}/api/status"
+            cached = self._get_cached('library_status')
+            if cached is not None:
+                return cached
             
-            headers = {
-                'X-API-Key': self.api_key,
-                'Content-Type': 'application/json'
-            }
+            if self.uses_subsonic:
+                body = self._subsonic_request('ping')
+                result = {
+                    'status': 'ok',
+                    'version': body.get('version', ''),
+                    'type': body.get('type', ''),
+                    'serverVersion': body.get('serverVersion', '')
+                }
+                self._set_cached('library_status', result)
+                return result
             
-            response = requests.get(
-                status_url,
-                headers=headers,
+            response = self.session.get(
+                self._url('/api/status'),
+                headers=self.headers,
                 timeout=self.timeout
             )
             
             if response.status_code == 200:
-                return response.json()
+                result = response.json()
+                self._set_cached('library_status', result)
+                return result
             else:
                 return {
                     "status": "error",
@@ -87,6 +291,11 @@ class NavidromeService:
                 "status": "error",
                 "message": f"请求失败: {str(e)}"
             }
+        except NavidromeError as e:
+            return {
+                "status": "error",
+                "message": str(e)
+            }
         except Exception as e:
             return {
                 "status": "error",
@@ -94,35 +303,46 @@ class NavidromeService:
             }
     
     def test_connection(self) -> bool:
-        """测试Navidrome连接"""
+        """测试Navidrome连接（复用状态缓存）"""
         try:
             status = self.get_library_status()
             return status.get("status") != "error"
         except Exception:
             return False
     
+    def is_scanning(self) -> bool:
+        """Navidrome是否正在扫描"""
+        status = self.get_scan_status()
+        if 'scanStatus' in status:
+            status = status['scanStatus']
+        return bool(status.get('scanning'))
+    
     def get_scan_status(self) -> Dict[str, Any]:
         """获取扫描状态"""
         try:
-            if not self.base_url or not self.api_key:
+            if not self.is_configured:
                 return {"status": "not_configured"}
             
-            # 构建API URL
-            status_url = f"{self.base_url.rstrip('/')}/api/scan/status"
+            cached = self._get_cached('scan_status')
+            if cached is not None:
+                return cached
             
-            headers = {
-                'X-API-Key': self.api_key,
-                'Content-Type': 'application/json'
-            }
+            if self.uses_subsonic:
+                body = self._subsonic_request('getScanStatus')
+                result = {'scanStatus': body.get('scanStatus', {})}
+                self._set_cached('scan_status', result)
+                return result
             
-            response = requests.get(
-                status_url,
-                headers=headers,
+            response = self.session.get(
+                self._url('/api/scan/status'),
+                headers=self.headers,
                 timeout=self.timeout
             )
             
             if response.status_code == 200:
-                return response.json()
+                result = response.json()
+                self._set_cached('scan_status', result)
+                return result
             else:
                 return {
                     "status": "error",
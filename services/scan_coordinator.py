@@ -0,0 +1,232 @@
+"""
+Navidrome扫描协调服务模块
+"""
+import os
+import time
+import uuid
+import logging
+import threading
+from pathlib import Path
+from typing import Dict, Any, Iterable, Optional, Set
+
+from services.navidrome_service import NavidromeService
+from utils import serialization
+from config import NAVIDROME_SCAN_DEBOUNCE, NAVIDROME_SCAN_MAX_DELAY, NAVIDROME_SCAN_POLL_INTERVAL
+
+logger = logging.getLogger(__name__)
+
+
+class ScanCoordinator:
+    """Navidrome扫描协调器
+
+    调用方通过 request_scan 登记扫描请求后立即返回；后台线程在去抖窗口内合并请求，
+    Navidrome正在扫描时推迟而不是重复排队（最多推迟 max_delay 秒），最终只触发一次扫描。
+    登记时附带变化文件的路径，则合并后只请求扫描这些文件所在的目录。
+
+    多进程部署（BATCH_EXECUTOR=process）时每个进程有自己的协调器，Web进程开启 forward_requests
+    后只把请求写入 batch_storage/scan_requests，由执行进程（worker.py）的协调器读取后统一合并，
+    所有进程的请求共用同一个去抖窗口。
+    """
+
+    def __init__(self, navidrome_service: Optional[NavidromeService] = None):
+        self.navidrome_service = navidrome_service or NavidromeService()
+        self.debounce = NAVIDROME_SCAN_DEBOUNCE
+        self.max_delay = NAVIDROME_SCAN_MAX_DELAY
+        self.poll_interval = NAVIDROME_SCAN_POLL_INTERVAL
+        self.inbox_path = Path("batch_storage") / "scan_requests"
+        self.forward_requests = False
+        self._inbox_thread: Optional[threading.Thread] = None
+        self._inbox_stop = threading.Event()
+
+        self._condition = threading.Condition()
+        self._first_request: Optional[float] = None
+        self._last_request = 0.0
+        self._pending_requests = 0
+        self._pending_folders: Set[str] = set()
+        self._full_scan = False
+        self._thread: Optional[threading.Thread] = None
+
+        self.total_requests = 0
+        self.total_scans = 0
+        self.last_scan_at: Optional[float] = None
+        self.last_scan_success: Optional[bool] = None
+
+    def request_scan(self, reason: str = "", paths: Optional[Iterable[str]] = None) -> bool:
+        """登记一次扫描请求，立即返回
+
+        paths为发生变化的文件路径；未提供时扫描不限定目录。
+        """
+        if self.forward_requests:
+            return self._forward(reason, paths)
+
+        folders = {os.path.dirname(os.path.abspath(path)) for path in paths or [] if path}
+
+        with self._condition:
+            if folders:
+                self._pending_folders.update(folders)
+            else:
+                self._full_scan = True
+            now = time.monotonic()
+            if self._first_request is None:
+                self._first_request = now
+            self._last_request = now
+            self._pending_requests += 1
+            self.total_requests += 1
+            self._ensure_worker()
+            self._condition.notify()
+
+        if reason:
+            logger.debug("登记Navidrome扫描请求: %s", reason)
+        return True
+
+    def _forward(self, reason: str, paths: Optional[Iterable[str]]) -> bool:
+        """把请求写入收件目录，交给执行进程合并"""
+        request = {
+            'reason': reason,
+            'paths': [os.path.abspath(path) for path in paths if path] if paths else None,
+            'created_at': time.time()
+        }
+        try:
+            self.inbox_path.mkdir(parents=True, exist_ok=True)
+            serialization.dump_file(request, self.inbox_path / f"{uuid.uuid4().hex}.json")
+        except Exception as e:
+            logger.error("转交Navidrome扫描请求失败: %s", e)
+            return False
+        self.total_requests += 1
+        return True
+
+    def claim_forwarded_requests(self) -> int:
+        """读取其他进程转交的扫描请求并登记，返回读取的数量"""
+        claimed = 0
+        for request_file in sorted(self.inbox_path.glob("*.json")):
+            try:
+                with open(request_file, 'rb') as f:
+                    request = serialization.loads(f.read())
+            except FileNotFoundError:
+                continue
+            except (OSError,) + serialization.DECODE_ERRORS as e:
+                logger.warning("读取扫描请求失败: %s - %s", request_file.name, e)
+                request = None
+
+            try:
+                request_file.unlink()
+            except OSError:
+                continue
+            if request is not None:
+                self.request_scan(request.get('reason', ''), request.get('paths'))
+                claimed += 1
+        return claimed
+
+    def start_inbox(self):
+        """启动读取转交请求的线程（在执行进程中调用）"""
+        if self._inbox_thread is not None and self._inbox_thread.is_alive():
+            return
+        self._inbox_stop.clear()
+        self._inbox_thread = threading.Thread(target=self._inbox_worker, name='navidrome-scan-inbox', daemon=True)
+        self._inbox_thread.start()
+
+    def stop_inbox(self):
+        """停止读取转交请求"""
+        self._inbox_stop.set()
+
+    def _inbox_worker(self):
+        """定期读取转交的扫描请求"""
+        while not self._inbox_stop.is_set():
+            try:
+                self.claim_forwarded_requests()
+            except Exception as e:
+                logger.warning("读取转交的扫描请求失败: %s", e)
+            self._inbox_stop.wait(self.poll_interval)
+
+    def _ensure_worker(self):
+        """按需启动后台线程（调用方需持有锁）"""
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(
+                target=self._worker,
+                name='navidrome-scan-coordinator',
+                daemon=True
+            )
+            self._thread.start()
+
+    def _wait_for_quiet_period(self):
+        """等待请求安静下来，最长不超过max_delay（调用方需持有锁）"""
+        while True:
+            now = time.monotonic()
+            quiet_deadline = self._last_request + self.debounce
+            hard_deadline = self._first_request + self.max_delay
+            remaining = min(quiet_deadline, hard_deadline) - now
+            if remaining <= 0:
+                return
+            self._condition.wait(remaining)
+
+    def _wait_while_scanning(self):
+        """Navidrome正在扫描时推迟，期间的新请求继续合并
+
+        最多等待 max_delay 秒：服务器一直报告扫描中（例如扫描卡住）时不再等待，照常触发扫描。
+        """
+        deadline = time.monotonic() + self.max_delay
+        try:
+            while self.navidrome_service.is_scanning():
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    logger.warning("Navidrome扫描超过 %s 秒仍未结束，不再等待", self.max_delay)
+                    return
+                time.sleep(min(self.poll_interval, remaining))
+        except Exception as e:
+            logger.warning("检查Navidrome扫描状态失败: %s", e)
+
+    def _worker(self):
+        """后台合并并执行扫描请求"""
+        while True:
+            with self._condition:
+                while self._first_request is None:
+                    self._condition.wait()
+                self._wait_for_quiet_period()
+
+            self._wait_while_scanning()
+
+            with self._condition:
+                merged = self._pending_requests
+                folders = None if self._full_scan else sorted(self._pending_folders)
+                self._pending_requests = 0
+                self._pending_folders = set()
+                self._full_scan = False
+                self._first_request = None
+
+            # 单次触发失败不能结束后台线程，否则之后的请求都不会再被处理
+            try:
+                success = self.navidrome_service.trigger_scan(folders)
+            except Exception as e:
+                logger.error("触发Navidrome扫描失败: %s", e)
+                success = False
+            self.total_scans += 1
+            self.last_scan_at = time.time()
+            self.last_scan_success = success
+            logger.info("已合并 %s 个扫描请求并触发Navidrome扫描", merged)
+
+    def get_status(self) -> Dict[str, Any]:
+        """获取协调器状态"""
+        with self._condition:
+            pending = self._pending_requests
+        return {
+            'pending_requests': pending,
+            'pending_folders': len(self._pending_folders),
+            'total_requests': self.total_requests,
+            'total_scans': self.total_scans,
+            'last_scan_at': self.last_scan_at,
+            'last_scan_success': self.last_scan_success,
+            'debounce': self.debounce
+        }
+
+
+_shared_coordinator: Optional[ScanCoordinator] = None
+_shared_lock = threading.Lock()
+
+
+def get_scan_coordinator() -> ScanCoordinator:
+    """获取进程内共享的扫描协调器"""
+    global _shared_coordinator
+    with _shared_lock:
+        if _shared_coordinator is None:
+            _shared_coordinator = ScanCoordinator()
+        return _shared_coordinator
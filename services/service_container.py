@@ -0,0 +1,216 @@
+"""
+应用级服务容器模块
+"""
+import threading
+from typing import Dict, Any, Callable, Optional
+
+from services.auth_service import AuthService
+from services.library_service import LibraryService
+from services.library_scanner import LibraryScanner
+from services.library_watcher import LibraryWatcher
+from services.download_service import DownloadService
+from services.download_scheduler import DownloadScheduler
+from services.download_job_service import DownloadJobService
+from services.tag_service import TagService
+from services.navidrome_service import NavidromeService
+from services.scan_coordinator import ScanCoordinator, get_scan_coordinator
+from services.batch_download_service import BatchDownloadService
+from services.subscription_service import SubscriptionService
+from utils.metrics import REGISTRY, Family, gauge_family, counter_family
+from config import MAX_CONCURRENT_DOWNLOADS, BATCH_EXECUTOR
+
+
+class ServiceContainer:
+    """应用级服务容器
+
+    每个进程只创建一份服务实例，控制器之间共享缓存、HTTP连接、FFmpeg检查结果和批量任务状态。
+    并发限制也在这里统一创建：所有下载（单个下载和批量下载）共用同一组下载槽位，
+    并由同一个下载调度器排队（单个下载优先，批量任务之间按优先级轮询）。
+    槽位和调度器属于进程本身；BATCH_EXECUTOR=process 时只有执行进程（worker.py）执行下载，
+    MAX_CONCURRENT_DOWNLOADS 即整个部署的并发上限，Web进程的Navidrome扫描请求也转交给执行进程合并。
+    """
+
+    def __init__(self, runs_batches: Optional[bool] = None):
+        self.runs_batches = runs_batches
+        self.max_concurrent_downloads = MAX_CONCURRENT_DOWNLOADS
+        self.download_slots = threading.BoundedSemaphore(MAX_CONCURRENT_DOWNLOADS)
+
+        self._instances: Dict[str, Any] = {}
+        self._lock = threading.RLock()
+
+    def _get(self, name: str, factory: Callable[[], Any]) -> Any:
+        """按需创建并缓存服务实例"""
+        with self._lock:
+            if name not in self._instances:
+                self._instances[name] = factory()
+            return self._instances[name]
+
+    @property
+    def auth_service(self) -> AuthService:
+        """认证服务"""
+        return self._get('auth_service', AuthService)
+
+    @property
+    def library_service(self) -> LibraryService:
+        """曲库索引服务"""
+        return self._get('library_service', LibraryService)
+
+    @property
+    def library_scanner(self) -> LibraryScanner:
+        """曲库增量扫描器"""
+        return self._get('library_scanner', lambda: LibraryScanner(self.library_service))
+
+    @property
+    def library_watcher(self) -> LibraryWatcher:
+        """曲库目录监听器"""
+        return self._get('library_watcher', lambda: LibraryWatcher(
+            self.library_service, self.library_scanner, self.scan_coordinator
+        ))
+
+    @property
+    def scan_coordinator(self) -> ScanCoordinator:
+        """Navidrome扫描协调器（与 get_scan_coordinator 共用同一实例）"""
+        return self._get('scan_coordinator', self._create_scan_coordinator)
+
+    def _create_scan_coordinator(self) -> ScanCoordinator:
+        """process 模式下Web进程的扫描请求转交给执行进程合并"""
+        coordinator = get_scan_coordinator()
+        if BATCH_EXECUTOR == 'process' and not self.runs_batches:
+            coordinator.forward_requests = True
+        return coordinator
+
+    @property
+    def navidrome_service(self) -> NavidromeService:
+        """Navidrome服务（复用扫描协调器的实例）"""
+        return self.scan_coordinator.navidrome_service
+
+    @property
+    def download_service(self) -> DownloadService:
+        """下载服务（使用共享的下载槽位）"""
+        return self._get('download_service', lambda: DownloadService(
+            library_service=self.library_service,
+            download_slots=self.download_slots
+        ))
+
+    @property
+    def download_scheduler(self) -> DownloadScheduler:
+        """全局下载调度器（工作线程数与下载槽位数相同）"""
+        return self._get('download_scheduler', lambda: DownloadScheduler(self.max_concurrent_downloads))
+
+    @property
+    def download_job_service(self) -> DownloadJobService:
+        """首页单个下载任务服务"""
+        return self._get('download_job_service', lambda: DownloadJobService(
+            download_service=self.download_service,
+            scheduler=self.download_scheduler,
+            runs_jobs=self.runs_batches
+        ))
+
+    @property
+    def tag_service(self) -> TagService:
+        """音频标签服务"""
+        return self._get('tag_service', lambda: TagService(library_service=self.library_service))
+
+    @property
+    def batch_service(self) -> BatchDownloadService:
+        """批量下载服务"""
+        return self._get('batch_service', lambda: BatchDownloadService(
+            runs_batches=self.runs_batches,
+            download_service=self.download_service,
+            tag_service=self.tag_service,
+            scan_coordinator=self.scan_coordinator,
+            scheduler=self.download_scheduler
+        ))
+
+    @property
+    def subscription_service(self) -> SubscriptionService:
+        """订阅服务"""
+        return self._get('subscription_service', lambda: SubscriptionService(
+            batch_service=self.batch_service,
+            download_service=self.download_service
+        ))
+
+    def get_status(self) -> Dict[str, Any]:
+        """获取容器状态（已创建的服务和并发占用）"""
+        with self._lock:
+            created = sorted(self._instances)
+        return {
+            'services': created,
+            'max_concurrent_downloads': self.max_concurrent_downloads,
+            'active_downloads': self.download_service.active_downloads,
+            'queue': self.download_scheduler.get_status()
+        }
+
+
+    def collect_metrics(self) -> Dict[str, Family]:
+        """采集队列长度、工作线程和缓存命中的指标（只读取已创建的服务）"""
+        with self._lock:
+            scheduler = self._instances.get('download_scheduler')
+            batch_service = self._instances.get('batch_service')
+            job_service = self._instances.get('download_job_service')
+
+        families: Dict[str, Family] = {}
+        if scheduler is not None:
+            status = scheduler.get_status()
+            families['bilibili_download_queue_depth'] = gauge_family(
+                'bilibili_download_queue_depth', '等待下载的任务数', [
+                    ({'kind': 'single'}, status['queued_single']),
+                    ({'kind': 'batch'}, sum(batch['pending'] for batch in status['batches']))
+                ]
+            )
+            families['bilibili_download_workers'] = gauge_family(
+                'bilibili_download_workers', '下载工作线程数', [({}, status['workers'])]
+            )
+            families['bilibili_download_workers_active'] = gauge_family(
+                'bilibili_download_workers_active', '正在执行下载的工作线程数', [({}, status['active'])]
+            )
+            families['bilibili_scheduled_batches'] = gauge_family(
+                'bilibili_scheduled_batches', '调度队列中的批量任务数', [({}, len(status['batches']))]
+            )
+
+        caches = []
+        if batch_service is not None:
+            caches.append(('batch', batch_service.batch_cache.get_stats()))
+        if job_service is not None:
+            caches.append(('download_job', job_service.jobs.get_stats()))
+        if caches:
+            families['bilibili_cache_requests_total'] = counter_family(
+                'bilibili_cache_requests_total', '缓存查询次数',
+                [({'cache': name, 'result': 'hit'}, stats['hits']) for name, stats in caches] +
+                [({'cache': name, 'result': 'miss'}, stats['misses']) for name, stats in caches]
+            )
+            families['bilibili_cache_entries'] = gauge_family(
+                'bilibili_cache_entries', '缓存条目数',
+                [({'cache': name}, stats['size']) for name, stats in caches]
+            )
+        return families
+
+
+def _create_container(**kwargs) -> ServiceContainer:
+    """创建服务容器并注册指标采集"""
+    container = ServiceContainer(**kwargs)
+    REGISTRY.register_collector(container.collect_metrics)
+    return container
+
+
+_shared_container: Optional[ServiceContainer] = None
+_shared_lock = threading.Lock()
+
+
+def init_services(**kwargs) -> ServiceContainer:
+    """创建进程内共享的服务容器（须在首次 get_services 之前调用）"""
+    global _shared_container
+    with _shared_lock:
+        if _shared_container is not None:
+            raise RuntimeError("服务容器已初始化")
+        _shared_container = _create_container(**kwargs)
+        return _shared_container
+
+
+def get_services() -> ServiceContainer:
+    """获取进程内共享的服务容器"""
+    global _shared_container
+    with _shared_lock:
+        if _shared_container is None:
+            _shared_container = _create_container()
+        return _shared_container
@@ -0,0 +1,356 @@
+"""
+订阅服务模块
+"""
+import time
+import logging
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Tuple
+
+from models.subscription import Subscription, SourceType
+from services.batch_download_service import BatchDownloadService
+from services.download_service import DownloadService
+from utils.exceptions import ValidationError
+from utils.validators import URLValidator
+from utils.url_scanner import URLScanner, ExtractedURL
+from utils import serialization
+from config import (
+    SUBSCRIPTION_CHECK_INTERVAL, SUBSCRIPTION_DEFAULT_INTERVAL, SUBSCRIPTION_MIN_INTERVAL,
+    SUBSCRIPTION_MAX_ENTRIES, BATCH_IMPORT_CHUNK_SIZE
+)
+
+logger = logging.getLogger(__name__)
+
+# 高水位条目已不在列表中（视频被删除或取消收藏）时，连续遇到这么多已加入的条目就停止读取
+SEEN_STREAK_LIMIT = 20
+
+# 允许通过接口修改的订阅设置
+EDITABLE_FIELDS = ('name', 'enabled', 'interval', 'priority', 'auto_edit_tags')
+
+SOURCE_LABELS = {
+    SourceType.UPLOADER: 'UP主',
+    SourceType.FAVORITES: '收藏夹',
+    SourceType.SERIES: '合集',
+}
+
+
+class SubscriptionService:
+    """订阅服务
+
+    订阅保存在 batch_storage/subscriptions 中，每个订阅一个JSON文件。定时线程检查到期的订阅，
+    用yt-dlp平铺提取来源列表（不解析单个视频），跳过已加入下载的视频ID，新视频按
+    BATCH_IMPORT_CHUNK_SIZE 拆分为批量任务并启动。按时间从新到旧排列的来源（UP主投稿、收藏夹）
+    读到上次记录的高水位条目即停止，后面的分页不会被请求。
+
+    定时检查只在执行批量任务的进程中运行（开发服务器的Web进程或 worker.py），
+    Web进程的"立即同步"只把订阅标记为到期。
+    """
+
+    def __init__(self, batch_service: Optional[BatchDownloadService] = None,
+                 download_service: Optional[DownloadService] = None):
+        self.batch_service = batch_service or BatchDownloadService()
+        self.download_service = download_service or self.batch_service.download_service
+        self.url_scanner = URLScanner()
+        self.storage_path = Path("batch_storage") / "subscriptions"
+        self.storage_path.mkdir(parents=True, exist_ok=True)
+        self.check_interval = SUBSCRIPTION_CHECK_INTERVAL
+
+        self._save_lock = threading.Lock()
+        self._poll_lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._wake_event = threading.Event()
+        self._schedule_thread: Optional[threading.Thread] = None
+        self.polling: Optional[str] = None
+
+    def create_subscription(self, url: str, name: str = '',
+                            interval: int = SUBSCRIPTION_DEFAULT_INTERVAL,
+                            priority: int = 0, auto_edit_tags: bool = True,
+                            backfill: bool = True) -> Subscription:
+        """创建订阅（在下一次检查时进行首次同步）"""
+        parsed = URLValidator.parse_subscription_url(url)
+        if not parsed:
+            raise ValidationError("不支持的订阅地址，请输入UP主空间、收藏夹或合集/视频列表的地址")
+        source_type, source_id, list_url = parsed
+        source_type = SourceType(source_type)
+
+        for existing in self.list_subscriptions():
+            if existing.source_type == source_type and existing.source_id == source_id:
+                raise ValidationError(f"该来源已订阅: {existing.name}")
+
+        subscription = Subscription(
+            source_type=source_type,
+            source_id=source_id,
+            url=list_url,
+            name=name.strip() or f"{SOURCE_LABELS[source_type]} {source_id}",
+            interval=max(SUBSCRIPTION_MIN_INTERVAL, interval),
+            priority=priority,
+            auto_edit_tags=auto_edit_tags,
+            backfill=backfill
+        )
+        self._save_subscription(subscription)
+        self._wake_event.set()
+
+        logger.info("创建订阅: %s - %s (%s)", subscription.id, subscription.name, list_url)
+        return subscription
+
+    def list_subscriptions(self) -> List[Subscription]:
+        """获取所有订阅（按创建时间排序）"""
+        subscriptions = []
+        for subscription_file in self.storage_path.glob("*.json"):
+            subscription = self._load_file(subscription_file)
+            if subscription:
+                subscriptions.append(subscription)
+        subscriptions.sort(key=lambda item: item.created_at)
+        return subscriptions
+
+    def get_subscription(self, subscription_id: str) -> Optional[Subscription]:
+        """获取订阅"""
+        subscription_file = self._subscription_file(subscription_id)
+        if subscription_file is None:
+            return None
+        return self._load_file(subscription_file)
+
+    def update_subscription(self, subscription_id: str, **settings) -> Subscription:
+        """修改订阅设置（名称、启用、检查间隔、优先级、自动编辑标签）"""
+        subscription = self.get_subscription(subscription_id)
+        if not subscription:
+            raise ValidationError("订阅不存在")
+
+        for key, value in settings.items():
+            if key not in EDITABLE_FIELDS:
+                raise ValidationError(f"不支持修改的设置: {key}")
+            if key == 'interval':
+                value = max(SUBSCRIPTION_MIN_INTERVAL, int(value))
+            setattr(subscription, key, value)
+
+        if 'interval' in settings and subscription.last_polled_at:
+            subscription.next_poll_at = subscription.last_polled_at + subscription.interval
+        self._save_subscription(subscription)
+        return subscription
+
+    def delete_subscription(self, subscription_id: str) -> bool:
+        """删除订阅（已创建的批量任务不受影响）"""
+        subscription_file = self._subscription_file(subscription_id)
+        if subscription_file is None:
+            return False
+        try:
+            subscription_file.unlink()
+        except FileNotFoundError:
+            return False
+        logger.info("删除订阅: %s", subscription_id)
+        return True
+
+    def request_sync(self, subscription_id: str) -> Subscription:
+        """标记订阅立即到期，由定时检查线程尽快同步"""
+        subscription = self.get_subscription(subscription_id)
+        if not subscription:
+            raise ValidationError("订阅不存在")
+
+        subscription.enabled = True
+        subscription.next_poll_at = 0.0
+        self._save_subscription(subscription)
+        self._wake_event.set()
+        return subscription
+
+    def poll_subscription(self, subscription_id: str) -> Dict[str, Any]:
+        """检查一个订阅，把新视频加入批量下载，返回本次结果"""
+        with self._poll_lock:
+            subscription = self.get_subscription(subscription_id)
+            if not subscription:
+                return {'subscription_id': subscription_id, 'enqueued': 0, 'error': '订阅不存在'}
+
+            self.polling = subscription_id
+            started = time.time()
+            try:
+                entries, newest_id = self._fetch_new_entries(subscription)
+            except Exception as e:
+                logger.warning("检查订阅失败: %s - %s", subscription.name, e)
+                self._record_poll(subscription_id, started, error=str(e))
+                return {'subscription_id': subscription_id, 'enqueued': 0, 'error': str(e)}
+            finally:
+                self.polling = None
+
+            first_poll = subscription.last_polled_at is None
+            batch_ids = []
+            enqueued = 0
+            error = ''
+            if entries and (subscription.backfill or not first_poll):
+                # 每个子批量任务创建后立即记录，导入中途出错时已加入下载的视频不会在下次检查时重复加入
+                video_ids = {item.url: item.video_id for item in entries}
+                batch_name = f"{subscription.name} {datetime.now().strftime('%Y-%m-%d %H:%M')}"
+                try:
+                    for batch in self.batch_service.iter_import_batch_downloads(
+                        batch_name, [item.url for item in entries],
+                        chunk_size=BATCH_IMPORT_CHUNK_SIZE,
+                        priority=subscription.priority,
+                        auto_edit_tags=subscription.auto_edit_tags
+                    ):
+                        batch_ids.append(batch.id)
+                        enqueued += len(batch.urls)
+                        self._record_progress(subscription_id, [video_ids[url] for url in batch.urls], batch_ids)
+                except Exception as e:
+                    error = str(e)
+                    logger.error("订阅加入下载失败: %s - 已加入 %s 个 - %s", subscription.name, enqueued, error)
+                seen_ids = None
+            else:
+                seen_ids = [item.video_id for item in entries]
+
+            # 导入未完成时不更新最新视频位置，下次检查重新读取剩余的视频
+            self._record_poll(
+                subscription_id, started,
+                seen_ids=seen_ids,
+                high_water_mark=newest_id if subscription.newest_first and not error else '',
+                batch_ids=batch_ids,
+                error=error
+            )
+
+            logger.info(
+                "订阅检查完成: %s, 新视频 %d 个, 加入下载 %d 个, 耗时 %.1f 秒",
+                subscription.name, len(entries), enqueued, time.time() - started
+            )
+            result = {
+                'subscription_id': subscription_id,
+                'new_entries': len(entries),
+                'enqueued': enqueued,
+                'batch_ids': batch_ids
+            }
+            if error:
+                result['error'] = error
+            return result
+
+    def _fetch_new_entries(self, subscription: Subscription) -> Tuple[List[ExtractedURL], str]:
+        """平铺读取来源列表中未加入过的视频（按发布时间从旧到新），并返回列表中最新的视频ID"""
+        seen = set(subscription.seen_ids)
+        new_entries: List[ExtractedURL] = []
+        newest_id = ''
+        seen_streak = 0
+        incremental = subscription.newest_first and bool(subscription.high_water_mark)
+
+        for index, entry in enumerate(self.download_service.iter_playlist_entries(subscription.url)):
+            if index >= SUBSCRIPTION_MAX_ENTRIES:
+                logger.warning("订阅 %s 的列表超过 %s 个条目，只读取前面的部分", subscription.name, SUBSCRIPTION_MAX_ENTRIES)
+                break
+
+            # 隐藏的合集等非视频条目没有视频ID，跳过
+            item = self.url_scanner.extract_first(entry.get('url') or entry.get('id') or '')
+            if not item or item.video_id == item.url:
+                continue
+            if not newest_id:
+                newest_id = item.video_id
+
+            if incremental and item.video_id == subscription.high_water_mark:
+                break
+            if item.video_id in seen:
+                seen_streak += 1
+                if incremental and seen_streak >= SEEN_STREAK_LIMIT:
+                    break
+                continue
+
+            seen_streak = 0
+            seen.add(item.video_id)
+            new_entries.append(item)
+
+        if subscription.newest_first:
+            new_entries.reverse()
+        return new_entries, newest_id
+
+    def _record_progress(self, subscription_id: str, seen_ids: List[str], batch_ids: List[str]):
+        """保存导入进度：已加入下载的视频和子批量任务（重新读取文件，保留检查期间通过接口修改的设置）"""
+        subscription = self.get_subscription(subscription_id)
+        if not subscription:
+            return
+
+        subscription.seen_ids.extend(seen_ids)
+        subscription.total_enqueued += len(seen_ids)
+        subscription.last_batch_ids = list(batch_ids)
+        self._save_subscription(subscription)
+
+    def _record_poll(self, subscription_id: str, started: float, seen_ids: Optional[List[str]] = None,
+                     high_water_mark: str = '', batch_ids: Optional[List[str]] = None, error: str = ''):
+        """保存检查结果（重新读取文件，保留检查期间通过接口修改的设置）"""
+        subscription = self.get_subscription(subscription_id)
+        if not subscription:
+            return
+
+        if seen_ids:
+            subscription.seen_ids.extend(seen_ids)
+        if high_water_mark:
+            subscription.high_water_mark = high_water_mark
+        if batch_ids:
+            subscription.last_batch_ids = batch_ids
+        subscription.last_error = error
+        subscription.last_polled_at = started
+        subscription.next_poll_at = started + subscription.interval
+        self._save_subscription(subscription)
+
+    def poll_due(self) -> int:
+        """检查所有到期的订阅，返回检查的数量"""
+        polled = 0
+        for subscription in self.list_subscriptions():
+            if self._stop_event.is_set():
+                break
+            if subscription.is_due:
+                self.poll_subscription(subscription.id)
+                polled += 1
+        return polled
+
+    def start_schedule(self):
+        """启动定时检查线程"""
+        if self.check_interval <= 0 or (self._schedule_thread and self._schedule_thread.is_alive()):
+            return
+
+        self._stop_event.clear()
+        self._schedule_thread = threading.Thread(
+            target=self._schedule_worker,
+            name='subscription-schedule',
+            daemon=True
+        )
+        self._schedule_thread.start()
+        logger.info("订阅定时检查已启动，间隔 %s 秒", self.check_interval)
+
+    def stop_schedule(self):
+        """停止定时检查线程"""
+        self._stop_event.set()
+        self._wake_event.set()
+
+    def _schedule_worker(self):
+        """定时检查工作线程"""
+        while not self._stop_event.is_set():
+            try:
+                self.poll_due()
+            except Exception as e:
+                logger.error("检查订阅失败: %s", e)
+            self._wake_event.wait(self.check_interval)
+            self._wake_event.clear()
+
+    def get_status(self) -> Dict[str, Any]:
+        """获取订阅检查状态"""
+        return {
+            'scheduled': self._schedule_thread is not None and self._schedule_thread.is_alive(),
+            'check_interval': self.check_interval,
+            'polling': self.polling
+        }
+
+    def _subscription_file(self, subscription_id: str) -> Optional[Path]:
+        """订阅文件路径（订阅ID只允许十六进制字符）"""
+        if not subscription_id or not all(c in '0123456789abcdef' for c in subscription_id):
+            return None
+        return self.storage_path / f"{subscription_id}.json"
+
+    def _load_file(self, subscription_file: Path) -> Optional[Subscription]:
+        """读取订阅文件"""
+        try:
+            with open(subscription_file, 'rb') as f:
+                return Subscription.from_dict(serialization.loads(f.read()))
+        except FileNotFoundError:
+            return None
+        except (OSError, KeyError, ValueError) as e:
+            logger.warning("读取订阅失败: %s - %s", subscription_file.name, e)
+            return None
+
+    def _save_subscription(self, subscription: Subscription):
+        """保存订阅（原子替换）"""
+        subscription_file = self.storage_path / f"{subscription.id}.json"
+        with self._save_lock:
+            serialization.dump_file(subscription.to_dict(), subscription_file)
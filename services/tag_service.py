@@ -11,6 +11,9 @@ from mutagen.id3 import ID3, APIC, error
 from mutagen.mp3 import MP3
 
 from utils.exceptions import TagEditError, FileError
+from utils.metrics import STAGE_DURATION
+from utils.profiler import PROFILER
+from services.library_service import LibraryService
 from config import DOWNLOAD_PATH, DEFAULT_TAGS
 
 logger = logging.getLogger(__name__)
@@ -19,9 +22,10 @@ logger = logging.getLogger(__name__)
 class TagService:
     """音频标签服务类"""
     
-    def __init__(self):
+    def __init__(self, library_service: Optional[LibraryService] = None):
         self.download_path = Path(DOWNLOAD_PATH)
         self.default_tags = DEFAULT_TAGS
+        self.library_service = library_service or LibraryService()
     
     def get_audio_tags(self, filepath: str) -> Dict[str, str]:
         """获取音频文件的元数据标签"""
@@ -46,11 +50,11 @@ class TagService:
                 return tags
             except error:
                 # 如果ID3标签不存在，返回默认值
-                logger.warning(f"无法读取ID3标签: {filepath}")
+                logger.warning("无法读取ID3标签: %s", filepath)
                 return self.default_tags.copy()
                 
         except Exception as e:
-            logger.error(f"读取标签失败: {str(e)}")
+            logger.error("读取标签失败: %s", e)
             return self.default_tags.copy()
     
     def _get_tag_value(self, audio: MP3, tag_name: str) -> str:
@@ -90,10 +94,15 @@ class TagService:
                 return False
                 
         except Exception as e:
-            logger.warning(f"检查封面失败: {str(e)}")
+            logger.warning("检查封面失败: %s", e)
             return False
     
     def update_audio_tags(self, filepath: str, tags: Dict[str, str], cover_path: Optional[str] = None) -> bool:
+        """更新音频文件的元数据标签"""
+        with STAGE_DURATION.time(stage='tag'), PROFILER.profile('tag', Path(filepath).stem):
+            return self._update_audio_tags(filepath, tags, cover_path)
+    
+    def _update_audio_tags(self, filepath: str, tags: Dict[str, str], cover_path: Optional[str] = None) -> bool:
         """更新音频文件的元数据标签"""
         try:
             file_path = Path(filepath)
@@ -131,6 +140,9 @@ class TagService:
                 
                 # 删除备份
                 backup_path.unlink()
+                
+                # 更新曲库索引
+                self.library_service.index_file(file_path)
                 return True
                 
             except Exception as e:
@@ -141,7 +153,7 @@ class TagService:
         except TagEditError:
             raise
         except Exception as e:
-            logger.error(f"更新标签失败: {str(e)}")
+            logger.error("更新标签失败: %s", e)
             return False
     
     def _update_cover_image(self, filepath: str, cover_path: str):
@@ -167,7 +179,7 @@ class TagService:
             audio.save()
             
         except Exception as e:
-            logger.error(f"更新封面失败: {str(e)}")
+            logger.error("更新封面失败: %s", e)
             raise TagEditError(f"更新封面失败: {str(e)}")
     
     def get_audio_duration(self, filepath: str) -> float:
@@ -176,7 +188,7 @@ class TagService:
             audio = MP3(filepath)
             return audio.info.length if audio.info else 0.0
         except Exception as e:
-            logger.warning(f"获取音频时长失败: {str(e)}")
+            logger.warning("获取音频时长失败: %s", e)
             return 0.0
     
     def validate_tags(self, tags: Dict[str, str]) -> Dict[str, str]:
@@ -0,0 +1,153 @@
+"""
+独立执行进程模式下的批量任务控制测试：Web进程的操作不会被执行进程保存的进度覆盖
+"""
+import time
+import threading
+
+import pytest
+
+from models.batch_download import BatchDownload, BatchStatus, TaskStatus
+from services.batch_download_service import BatchDownloadService
+from services.batch_executor import BatchExecutor
+from services.download_scheduler import DownloadScheduler
+from services.library_service import LibraryService
+from services.tag_service import TagService
+
+
+class SlowDownloadService:
+    """每次下载等待 delay 秒后成功"""
+
+    def __init__(self, delay):
+        self.delay = delay
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def download_audio(self, url, progress_callback=None, recorder=None):
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.delay)
+        return {'status': 'success', 'title': url, 'filename': 'a.mp3', 'filepath': ''}
+
+
+class NullScanCoordinator:
+    def request_scan(self, reason='', paths=None):
+        return True
+
+
+def make_service(storage, runs_batches, download_service=None):
+    library_service = LibraryService(db_path=str(storage / 'library.db'))
+    service = BatchDownloadService(
+        runs_batches=runs_batches,
+        download_service=download_service or SlowDownloadService(0),
+        tag_service=TagService(library_service=library_service),
+        scan_coordinator=NullScanCoordinator(),
+        scheduler=DownloadScheduler(1)
+    )
+    service.executor_mode = 'process'
+    service.batch_storage_path = storage
+    return service
+
+
+def wait_until(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.02)
+    return predicate()
+
+
+@pytest.fixture
+def storage(tmp_path):
+    path = tmp_path / 'batch_storage'
+    path.mkdir()
+    return path
+
+
+@pytest.fixture
+def started_batch(storage):
+    """Web进程创建并启动的批量任务，以及执行该任务的执行进程"""
+    web = make_service(storage, runs_batches=False)
+    downloads = SlowDownloadService(0.2)
+    worker = make_service(storage, runs_batches=True, download_service=downloads)
+    executor = BatchExecutor(worker)
+
+    batch = BatchDownload(id='', name='测试', urls=[f"https://www.bilibili.com/video/BV1xx411c7m{i}" for i in range(6)])
+    web._save_batch(batch)
+    assert web.start_batch_download(batch.id)
+    assert executor.poll() == 1
+    assert wait_until(lambda: downloads.calls >= 1)
+    return web, worker, executor, downloads, batch.id
+
+
+def stored_batch(web, batch_id):
+    return web._read_batch_file(batch_id)[0]
+
+
+def test_pause_survives_task_start_save(storage):
+    web = make_service(storage, runs_batches=False)
+    downloads = SlowDownloadService(0.05)
+    worker = make_service(storage, runs_batches=True, download_service=downloads)
+    executor = BatchExecutor(worker)
+
+    # 第二个子任务开始之前（执行进程尚未轮询），Web进程暂停任务
+    run_task = worker._run_task
+
+    def run_task_with_pause(batch, task_id):
+        if downloads.calls == 1:
+            assert web.pause_batch_download(batch.id)
+        run_task(batch, task_id)
+
+    worker._run_task = run_task_with_pause
+
+    batch = BatchDownload(id='', name='测试', urls=[f"https://www.bilibili.com/video/BV1xx411c7m{i}" for i in range(6)])
+    web._save_batch(batch)
+    assert web.start_batch_download(batch.id)
+    assert executor.poll() == 1
+    assert wait_until(lambda: worker.get_batch_download(batch.id).status == BatchStatus.PAUSED)
+    time.sleep(0.3)
+
+    # 已分配的子任务继续完成，之后不再开始新的子任务，暂停状态保留在文件中
+    assert downloads.calls == 2
+    stored = stored_batch(web, batch.id)
+    assert stored.status == BatchStatus.PAUSED
+    assert stored.completed_tasks == 2
+
+    assert web.resume_batch_download(batch.id)
+    executor.poll()
+    assert wait_until(lambda: stored_batch(web, batch.id).status == BatchStatus.COMPLETED)
+    assert downloads.calls == 6
+
+
+def test_cancel_and_priority_are_kept(started_batch):
+    web, worker, executor, downloads, batch_id = started_batch
+
+    assert web.set_batch_priority(batch_id, 5)
+    assert wait_until(lambda: worker.get_batch_download(batch_id).priority == 5)
+    assert web.cancel_batch_download(batch_id)
+    assert wait_until(lambda: worker.get_batch_download(batch_id).status == BatchStatus.CANCELLED)
+    time.sleep(0.3)
+
+    stored = stored_batch(web, batch_id)
+    assert stored.status == BatchStatus.CANCELLED
+    assert stored.priority == 5
+    assert stored.count_tasks(TaskStatus.COMPLETED) < len(stored.tasks)
+
+
+def test_executor_polls_control_file(started_batch):
+    web, worker, executor, downloads, batch_id = started_batch
+    worker_batch = worker.get_batch_download(batch_id)
+
+    assert web.set_batch_priority(batch_id, 3)
+    executor.poll()
+    assert worker_batch.priority == 3
+    assert worker.scheduler.get_status()['batches'][0]['priority'] == 3
+
+
+def test_delete_removes_control_file(started_batch):
+    web, worker, executor, downloads, batch_id = started_batch
+    assert web.cancel_batch_download(batch_id)
+    assert (web.control_path / f"{batch_id}.json").exists()
+
+    assert web.delete_batch_download(batch_id)
+    assert not (web.control_path / f"{batch_id}.json").exists()
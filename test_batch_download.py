@@ -0,0 +1,116 @@
+"""
+批量下载模型测试：增量状态计数与全量重新统计一致
+"""
+from collections import Counter
+
+import pytest
+
+from models.batch_download import BatchDownload, BatchStatus, TaskStatus
+from utils import serialization
+
+
+def recount(batch):
+    """遍历任务列表重新统计各状态任务数"""
+    return Counter(task.status for task in batch.tasks)
+
+
+def assert_counters_match(batch):
+    counts = recount(batch)
+    for status in TaskStatus:
+        assert batch.count_tasks(status) == counts.get(status, 0), status
+    assert batch.total_tasks == len(batch.tasks)
+    assert batch.completed_tasks == counts.get(TaskStatus.COMPLETED, 0)
+    assert batch.failed_tasks == counts.get(TaskStatus.FAILED, 0)
+
+    summary = batch.get_summary()
+    assert summary['downloading'] == counts.get(TaskStatus.DOWNLOADING, 0)
+    assert summary['pending'] == len(batch.tasks) - batch.completed_tasks - batch.failed_tasks
+    assert batch.progress == pytest.approx((batch.completed_tasks + batch.failed_tasks) / len(batch.tasks) * 100)
+
+
+def reload(batch):
+    """序列化后重新加载（与写入 batch_storage 的格式相同）"""
+    return BatchDownload.from_dict(serialization.loads(serialization.dumps(batch)))
+
+
+@pytest.fixture
+def batch():
+    return BatchDownload(id='', name='测试', urls=[f"https://www.bilibili.com/video/BV1xx411c7m{i}" for i in range(4)])
+
+
+def test_task_lifecycle_with_retry(batch):
+    task = batch.tasks[0]
+    assert_counters_match(batch)
+
+    steps = [
+        (TaskStatus.DOWNLOADING, BatchStatus.DOWNLOADING),
+        (TaskStatus.FAILED, BatchStatus.DOWNLOADING),
+        # 重试：失败的任务重新开始下载，失败计数减回去
+        (TaskStatus.DOWNLOADING, BatchStatus.DOWNLOADING),
+        (TaskStatus.COMPLETED, BatchStatus.DOWNLOADING),
+    ]
+    for status, batch_status in steps:
+        batch.update_task_status(task.id, status)
+        assert task.status == status
+        assert batch.status == batch_status
+        assert_counters_match(batch)
+        assert_counters_match(reload(batch))
+
+    assert batch.completed_tasks == 1
+    assert batch.failed_tasks == 0
+    assert task.completed_at is not None
+
+
+def test_repeated_status_is_counted_once(batch):
+    task = batch.tasks[0]
+    for _ in range(3):
+        batch.update_task_status(task.id, TaskStatus.FAILED)
+    assert batch.failed_tasks == 1
+    assert_counters_match(batch)
+
+
+def test_retry_after_completion_reopens_batch(batch):
+    for task in batch.tasks:
+        batch.update_task_status(task.id, TaskStatus.DOWNLOADING)
+        batch.update_task_status(task.id, TaskStatus.COMPLETED if task is not batch.tasks[-1] else TaskStatus.FAILED)
+    assert batch.status == BatchStatus.COMPLETED
+    assert_counters_match(batch)
+
+    retried = batch.tasks[-1]
+    batch.update_task_status(retried.id, TaskStatus.DOWNLOADING)
+    assert batch.status == BatchStatus.DOWNLOADING
+    assert batch.completed_at is None
+    assert_counters_match(batch)
+
+    batch.update_task_status(retried.id, TaskStatus.COMPLETED)
+    assert batch.status == BatchStatus.COMPLETED
+    assert batch.completed_tasks == len(batch.tasks)
+    assert_counters_match(reload(batch))
+
+
+def test_reload_recounts_from_tasks(batch):
+    batch.update_task_status(batch.tasks[0].id, TaskStatus.COMPLETED)
+    batch.update_task_status(batch.tasks[1].id, TaskStatus.FAILED)
+    batch.update_task_status(batch.tasks[2].id, TaskStatus.SKIPPED)
+
+    data = serialization.loads(serialization.dumps(batch))
+    # 文件中的计数字段过期时，以任务状态为准
+    data['completed_tasks'] = 0
+    data['failed_tasks'] = 3
+    loaded = BatchDownload.from_dict(data)
+
+    assert loaded.completed_tasks == 1
+    assert loaded.failed_tasks == 1
+    assert loaded.count_tasks(TaskStatus.SKIPPED) == 1
+    assert_counters_match(loaded)
+
+    # 重新加载后继续增量更新
+    loaded.update_task_status(loaded.tasks[3].id, TaskStatus.DOWNLOADING)
+    loaded.update_task_status(loaded.tasks[1].id, TaskStatus.DOWNLOADING)
+    assert_counters_match(loaded)
+
+
+def test_unknown_task_is_ignored(batch):
+    batch.update_task_status('missing', TaskStatus.COMPLETED)
+    assert_counters_match(batch)
+    assert batch.status == BatchStatus.PENDING
@@ -0,0 +1,212 @@
+"""
+单个下载任务测试：独立执行进程模式下的任务交接、中断和排队超时任务检测、事件流连接限制
+"""
+import time
+import threading
+
+import pytest
+from flask import Flask
+
+from models.download_job import DownloadJob, JobStatus
+from services import download_job_service as job_module
+from services.download_job_service import DownloadJobService
+from services.batch_executor import BatchExecutor
+from services.download_scheduler import DownloadScheduler
+from controllers.download_controller import DownloadController
+
+
+class FakeDownloadService:
+    def __init__(self):
+        self.urls = []
+
+    def download_audio(self, url, progress_callback=None, recorder=None):
+        self.urls.append(url)
+        progress_callback(50.0)
+        return {'status': 'success', 'title': '标题', 'filename': 'a.mp3', 'filepath': '/tmp/a.mp3'}
+
+
+def make_service(storage, runs_jobs, download_service=None):
+    service = DownloadJobService(
+        download_service=download_service or FakeDownloadService(),
+        scheduler=DownloadScheduler(1),
+        runs_jobs=runs_jobs
+    )
+    service.storage_path = storage
+    return service
+
+
+def wait_until(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.02)
+    return predicate()
+
+
+@pytest.fixture
+def storage(tmp_path):
+    path = tmp_path / 'jobs'
+    path.mkdir()
+    return path
+
+
+def test_web_process_only_queues_job(storage):
+    downloads = FakeDownloadService()
+    web = make_service(storage, runs_jobs=False, download_service=downloads)
+    job = web.submit('https://www.bilibili.com/video/BV1xx411c7mD')
+
+    time.sleep(0.1)
+    assert downloads.urls == []
+    assert web.scheduler.total_dispatched == 0
+    assert (storage / f"{job.id}.json").exists()
+
+
+def test_worker_claims_queued_job_once(storage):
+    web = make_service(storage, runs_jobs=False)
+    downloads = FakeDownloadService()
+    worker = make_service(storage, runs_jobs=True, download_service=downloads)
+    job = web.submit('https://www.bilibili.com/video/BV1xx411c7mD')
+
+    assert worker.claim_queued_jobs() == 1
+    assert worker.claim_queued_jobs() == 0
+    assert wait_until(lambda: worker.get_job(job.id).is_finished)
+    assert downloads.urls == [job.url]
+
+    # 其他Web进程读取任务文件得到结果
+    other = make_service(storage, runs_jobs=False)
+    stored = other.get_job(job.id)
+    assert stored.status == JobStatus.COMPLETED
+    assert stored.filename == 'a.mp3'
+    assert worker.claim_queued_jobs() == 0
+
+
+def test_executor_poll_claims_jobs(storage, tmp_path):
+    web = make_service(storage, runs_jobs=False)
+    worker = make_service(storage, runs_jobs=True)
+    batch_service = type('BatchService', (), {
+        'batch_storage_path': tmp_path,
+        'control_path': tmp_path / 'control'
+    })()
+    executor = BatchExecutor(batch_service, worker)
+
+    job = web.submit('https://www.bilibili.com/video/BV1xx411c7mD')
+    assert executor.poll() == 0
+    assert wait_until(lambda: web.get_job(job.id).status == JobStatus.COMPLETED)
+
+
+def test_restarted_worker_fails_orphaned_job(storage):
+    web = make_service(storage, runs_jobs=False)
+    job = DownloadJob(url='https://www.bilibili.com/video/BV1xx411c7mD',
+                      status=JobStatus.DOWNLOADING, started_at=time.time())
+    web._save_job(job)
+
+    worker = make_service(storage, runs_jobs=True)
+    assert worker.claim_queued_jobs() == 0
+
+    stored = web.get_job(job.id)
+    assert stored.status == JobStatus.FAILED
+    assert stored.failure_reason == 'interrupted'
+    assert stored.completed_at is not None
+
+
+def test_stale_job_is_marked_failed(storage, monkeypatch):
+    monkeypatch.setattr(job_module, 'DOWNLOAD_TIMEOUT', 60)
+    writer = make_service(storage, runs_jobs=False)
+    reader = make_service(storage, runs_jobs=False)
+
+    fresh = DownloadJob(url='u1', status=JobStatus.DOWNLOADING, started_at=time.time())
+    stale = DownloadJob(url='u2', status=JobStatus.DOWNLOADING,
+                        started_at=time.time() - 60 - job_module.STALE_JOB_GRACE - 1)
+    writer._save_job(fresh)
+    writer._save_job(stale)
+
+    assert reader.get_job(fresh.id).status == JobStatus.DOWNLOADING
+    assert reader.get_job(stale.id).status == JobStatus.FAILED
+    # 结果写回任务文件
+    assert make_service(storage, runs_jobs=False).get_job(stale.id).failure_reason == 'interrupted'
+
+    # DOWNLOAD_TIMEOUT 为0（不限制）时不判断
+    monkeypatch.setattr(job_module, 'DOWNLOAD_TIMEOUT', 0)
+    stale.status = JobStatus.DOWNLOADING
+    writer._save_job(stale)
+    assert reader.get_job(stale.id).status == JobStatus.DOWNLOADING
+
+
+def test_stale_queued_job_is_marked_failed(storage, monkeypatch):
+    monkeypatch.setattr(job_module, 'DOWNLOAD_JOB_QUEUE_TIMEOUT', 60)
+    web = make_service(storage, runs_jobs=False)
+    fresh = DownloadJob(url='u1')
+    stale = DownloadJob(url='u2', created_at=time.time() - 61)
+    web._save_job(fresh)
+    web._save_job(stale)
+
+    assert web.get_job(fresh.id).status == JobStatus.QUEUED
+    stored = web.get_job(stale.id)
+    assert stored.status == JobStatus.FAILED
+    assert stored.failure_reason == 'interrupted'
+    assert '排队超时' in stored.error_message
+
+    # DOWNLOAD_JOB_QUEUE_TIMEOUT 为0（不限制）时不判断
+    monkeypatch.setattr(job_module, 'DOWNLOAD_JOB_QUEUE_TIMEOUT', 0)
+    stale.status = JobStatus.QUEUED
+    web._save_job(stale)
+    assert web.get_job(stale.id).status == JobStatus.QUEUED
+
+
+def test_worker_skips_stale_queued_jobs(storage, monkeypatch):
+    monkeypatch.setattr(job_module, 'DOWNLOAD_JOB_QUEUE_TIMEOUT', 60)
+    web = make_service(storage, runs_jobs=False)
+    stale = DownloadJob(url='u1', created_at=time.time() - 61)
+    web._save_job(stale)
+
+    downloads = FakeDownloadService()
+    worker = make_service(storage, runs_jobs=True, download_service=downloads)
+    assert worker.claim_queued_jobs() == 0
+    assert web.get_job(stale.id).status == JobStatus.FAILED
+    assert downloads.urls == []
+
+
+def test_claimed_job_failed_by_web_is_not_downloaded(storage, monkeypatch):
+    web = make_service(storage, runs_jobs=False)
+    downloads = FakeDownloadService()
+    worker = make_service(storage, runs_jobs=True, download_service=downloads)
+    job = web.submit('https://www.bilibili.com/video/BV1xx411c7mD')
+    claimed = DownloadJob.from_dict(job.to_dict())
+
+    # 任务在执行进程的队列中等待时，Web进程判定排队超时
+    monkeypatch.setattr(job_module, 'DOWNLOAD_JOB_QUEUE_TIMEOUT', 60)
+    job.created_at = time.time() - 61
+    web._save_job(job)
+    assert web.get_job(job.id).status == JobStatus.FAILED
+
+    worker._run_job(claimed)
+    assert downloads.urls == []
+    assert worker.get_job(job.id).status == JobStatus.FAILED
+
+
+def make_controller(job_service):
+    controller = DownloadController.__new__(DownloadController)
+    controller.download_job_service = job_service
+    controller.event_streams = threading.BoundedSemaphore(1)
+    return controller
+
+
+def test_event_stream_limit_and_duration(storage, monkeypatch):
+    monkeypatch.setattr('controllers.download_controller.DOWNLOAD_EVENT_STREAM_DURATION', 0)
+    web = make_service(storage, runs_jobs=False)
+    job = web.submit('https://www.bilibili.com/video/BV1xx411c7mD')
+    controller = make_controller(web)
+
+    app = Flask(__name__)
+    with app.test_request_context():
+        first = controller.stream_download_events(job.id)
+        assert next(first) == "retry: 1000\n\n"
+
+        # 连接数已满时通知浏览器改为轮询
+        assert list(controller.stream_download_events(job.id)) == ["event: busy\ndata: {}\n\n"]
+
+        # 超过连接时长后关闭连接并释放名额
+        assert next(first).startswith('data: ')
+        assert list(first) == []
+        assert next(controller.stream_download_events(job.id)) == "retry: 1000\n\n"
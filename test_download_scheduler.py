@@ -0,0 +1,186 @@
+"""
+下载调度器测试：批量任务轮询、优先级、单个下载插队以及暂停/恢复/取消
+"""
+import threading
+
+import pytest
+
+from services.download_scheduler import DownloadScheduler
+
+
+class Recorder:
+    """记录子任务执行顺序的 runner"""
+
+    def __init__(self):
+        self.order = []
+        self._lock = threading.Lock()
+
+    def runner(self, batch_id):
+        def run(task_id):
+            with self._lock:
+                self.order.append((batch_id, task_id))
+        return run
+
+
+@pytest.fixture
+def scheduler():
+    """单工作线程的调度器，执行顺序确定"""
+    return DownloadScheduler(1)
+
+
+@pytest.fixture
+def gate(scheduler):
+    """占住工作线程，在放开之前排好队列"""
+    event = threading.Event()
+    started = threading.Event()
+
+    def hold():
+        started.set()
+        event.wait(5)
+
+    scheduler.submit(hold)
+    assert started.wait(5)
+    yield event
+    event.set()
+
+
+def test_batches_with_same_priority_take_turns(scheduler, gate):
+    recorder = Recorder()
+    large = scheduler.add_batch('large', [f"l{i}" for i in range(4)], recorder.runner('large'))
+    small = scheduler.add_batch('small', ['s0', 's1'], recorder.runner('small'))
+    gate.set()
+
+    assert large.wait(5) and small.wait(5)
+    assert [batch_id for batch_id, _ in recorder.order] == ['large', 'small', 'large', 'small', 'large', 'large']
+    # 同一批量任务内部保持原顺序
+    assert [task_id for batch_id, task_id in recorder.order if batch_id == 'large'] == ['l0', 'l1', 'l2', 'l3']
+
+
+def test_higher_priority_batch_runs_first(scheduler, gate):
+    recorder = Recorder()
+    low = scheduler.add_batch('low', ['a', 'b'], recorder.runner('low'))
+    high = scheduler.add_batch('high', ['c', 'd'], recorder.runner('high'), priority=5)
+    gate.set()
+
+    assert low.wait(5) and high.wait(5)
+    assert [batch_id for batch_id, _ in recorder.order] == ['high', 'high', 'low', 'low']
+
+
+def test_priority_change_applies_to_remaining_tasks(scheduler, gate):
+    recorder = Recorder()
+    first = scheduler.add_batch('first', ['a', 'b', 'c'], recorder.runner('first'), priority=1)
+    second = scheduler.add_batch('second', ['d', 'e'], recorder.runner('second'))
+    assert scheduler.set_priority('second', 2)
+    gate.set()
+
+    assert first.wait(5) and second.wait(5)
+    assert [batch_id for batch_id, _ in recorder.order] == ['second', 'second', 'first', 'first', 'first']
+
+
+def test_single_download_goes_ahead_of_batches(scheduler, gate):
+    recorder = Recorder()
+    done = scheduler.add_batch('batch', ['a', 'b'], recorder.runner('batch'), priority=10)
+    future = scheduler.submit(recorder.runner('single'), 'x')
+    gate.set()
+
+    future.result(5)
+    assert done.wait(5)
+    assert recorder.order[0] == ('single', 'x')
+    assert scheduler.run(lambda value: value * 2, 21) == 42
+
+
+def test_single_download_error_is_returned_to_caller(scheduler):
+    def fail():
+        raise RuntimeError('下载失败')
+
+    with pytest.raises(RuntimeError):
+        scheduler.run(fail)
+    # 工作线程继续处理后续任务
+    assert scheduler.run(lambda: 'ok') == 'ok'
+
+
+def test_pause_stops_dispatch_until_resume(scheduler, gate):
+    recorder = Recorder()
+    done = scheduler.add_batch('batch', ['a', 'b', 'c'], recorder.runner('batch'), paused=True)
+    gate.set()
+
+    assert scheduler.run(lambda: None) is None
+    assert recorder.order == []
+    assert scheduler.get_status()['batches'][0]['paused']
+
+    assert scheduler.resume('batch')
+    assert done.wait(5)
+    assert [task_id for _, task_id in recorder.order] == ['a', 'b', 'c']
+    assert not scheduler.has_batch('batch')
+
+
+def test_pause_lets_in_flight_task_finish(scheduler):
+    release = threading.Event()
+    started = threading.Event()
+    order = []
+
+    def runner(task_id):
+        order.append(task_id)
+        if task_id == 'a':
+            started.set()
+            release.wait(5)
+
+    done = scheduler.add_batch('batch', ['a', 'b'], runner)
+    assert started.wait(5)
+    assert scheduler.pause('batch')
+    release.set()
+
+    assert scheduler.run(lambda: None) is None
+    assert order == ['a']
+    status = scheduler.get_status()['batches'][0]
+    assert status == {'batch_id': 'batch', 'priority': 0, 'paused': True, 'pending': 1, 'in_flight': 0}
+    assert not done.is_set()
+
+    assert scheduler.cancel('batch')
+    assert done.wait(5)
+    assert order == ['a']
+
+
+def test_cancel_drains_after_in_flight_task(scheduler):
+    release = threading.Event()
+    started = threading.Event()
+    order = []
+
+    def runner(task_id):
+        order.append(task_id)
+        started.set()
+        release.wait(5)
+
+    done = scheduler.add_batch('batch', ['a', 'b', 'c'], runner)
+    assert started.wait(5)
+    assert scheduler.cancel('batch')
+    # 正在执行的子任务结束前不算完成
+    assert not done.is_set()
+    assert scheduler.has_batch('batch')
+
+    release.set()
+    assert done.wait(5)
+    assert order == ['a']
+    assert not scheduler.has_batch('batch')
+    assert not scheduler.cancel('batch')
+
+
+def test_runner_error_does_not_stop_batch(scheduler):
+    order = []
+
+    def runner(task_id):
+        order.append(task_id)
+        if task_id == 'a':
+            raise RuntimeError('子任务异常')
+
+    assert scheduler.add_batch('batch', ['a', 'b'], runner).wait(5)
+    assert order == ['a', 'b']
+
+
+def test_empty_and_duplicate_batches(scheduler, gate):
+    assert scheduler.add_batch('empty', [], lambda task_id: None).is_set()
+    assert not scheduler.has_batch('empty')
+
+    scheduler.add_batch('batch', ['a'], lambda task_id: None)
+    with pytest.raises(ValueError):
+        scheduler.add_batch('batch', ['b'], lambda task_id: None)
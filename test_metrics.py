@@ -0,0 +1,123 @@
+"""
+运行指标测试：多进程快照的合并、已退出进程累计值的归档
+"""
+import os
+import time
+
+import pytest
+
+from utils import metrics as metrics_module
+from utils import serialization
+from utils.metrics import MetricsRegistry, RETIRED_FILE
+
+
+DEAD_PID = 2 ** 22 + 12345
+
+
+def make_registry(snapshot_dir):
+    registry = MetricsRegistry()
+    registry.snapshot_dir = snapshot_dir
+    registry.counter('jobs_total', '任务数', ('result',)).inc(1, result='ok')
+    registry.gauge('queue_depth', '队列长度').set(2)
+    return registry
+
+
+def write_process_snapshot(snapshot_dir, name, jobs, written_at):
+    families = {
+        'jobs_total': {'type': 'counter', 'help': '任务数', 'samples': [['jobs_total', {'result': 'ok'}, jobs]]},
+        'queue_depth': {'type': 'gauge', 'help': '队列长度', 'samples': [['queue_depth', {}, 5]]},
+    }
+    serialization.dump_file({'written_at': written_at, 'families': families}, snapshot_dir / name)
+
+
+def totals(registry):
+    families = registry.collect_all()
+    return families['jobs_total']['samples'][0][2], families['queue_depth']['samples'][0][2]
+
+
+@pytest.fixture
+def registry(tmp_path, monkeypatch):
+    monkeypatch.setattr(metrics_module, 'METRICS_FLUSH_INTERVAL', 3600)
+    registry = make_registry(tmp_path)
+    registry.start_snapshots()
+    yield registry
+    registry._stop_event.set()
+
+
+def test_snapshot_name_is_unique_per_instance(registry, tmp_path):
+    other = make_registry(tmp_path)
+    other.start_snapshots()
+    other._stop_event.set()
+
+    assert registry._snapshot_file() != other._snapshot_file()
+    assert registry._snapshot_file().name.split('-')[0] == other._snapshot_file().name.split('-')[0]
+
+
+def test_dead_process_counters_are_folded(registry, tmp_path):
+    old = time.time() - 4 * 3600
+    write_process_snapshot(tmp_path, f"{DEAD_PID}-aaaa.json", 10, old)
+    write_process_snapshot(tmp_path, f"{DEAD_PID}-bbbb.json", 5, old)
+    write_process_snapshot(tmp_path, "live-cccc.json", 3, time.time())
+
+    # 已退出进程只计入计数器，仪表只统计仍在写快照的进程
+    before = totals(registry)
+    assert before == (1 + 10 + 5 + 3, 2 + 5)
+
+    assert registry.fold_retired_snapshots() == 2
+    assert not (tmp_path / f"{DEAD_PID}-aaaa.json").exists()
+    assert (tmp_path / "live-cccc.json").exists()
+    assert totals(registry) == before
+
+    # 再次合并不会重复累加
+    write_process_snapshot(tmp_path, f"{DEAD_PID}-dddd.json", 7, old)
+    assert registry.fold_retired_snapshots() == 1
+    assert registry.fold_retired_snapshots() == 0
+    assert totals(registry) == (before[0] + 7, before[1])
+
+
+def test_folded_snapshot_left_behind_is_not_counted_twice(registry, tmp_path):
+    old = time.time() - 4 * 3600
+    write_process_snapshot(tmp_path, f"{DEAD_PID}-aaaa.json", 10, old)
+    registry.fold_retired_snapshots()
+
+    # 模拟删除快照之前读取：累计值文件已记录该快照，读取时跳过
+    write_process_snapshot(tmp_path, f"{DEAD_PID}-aaaa.json", 10, old)
+    assert totals(registry)[0] == 1 + 10
+
+    # 下次合并时删除残留的快照，快照删除后再清理记录
+    assert registry.fold_retired_snapshots() == 0
+    assert not (tmp_path / f"{DEAD_PID}-aaaa.json").exists()
+    registry.fold_retired_snapshots()
+    retired = serialization.loads((tmp_path / RETIRED_FILE).read_bytes())
+    assert retired['folded'] == []
+    assert totals(registry)[0] == 1 + 10
+
+
+def test_running_process_is_not_folded(registry, tmp_path):
+    old = time.time() - 4 * 3600
+    write_process_snapshot(tmp_path, f"{os.getppid()}-aaaa.json", 10, old)
+
+    assert registry.fold_retired_snapshots() == 0
+    assert (tmp_path / f"{os.getppid()}-aaaa.json").exists()
+
+
+@pytest.mark.parametrize('login_required, logged_in, token, authorization, status', [
+    (False, False, '', '', 200),
+    (True, False, '', '', 401),
+    (True, True, '', '', 200),
+    (True, False, 'secret', 'Bearer secret', 200),
+    (True, False, 'secret', 'Bearer wrong', 401),
+])
+def test_metrics_endpoint_auth(monkeypatch, login_required, logged_in, token, authorization, status):
+    import app as app_module
+
+    monkeypatch.setattr(app_module, 'METRICS_ENABLED', True)
+    monkeypatch.setattr(app_module, 'METRICS_TOKEN', token)
+    monkeypatch.setattr(app_module.auth_service, 'login_required', login_required)
+
+    with app_module.app.test_client() as client:
+        if logged_in:
+            with client.session_transaction() as session:
+                session['logged_in'] = True
+        response = client.get('/metrics', headers={'Authorization': authorization} if authorization else {})
+    assert response.status_code == status
@@ -0,0 +1,106 @@
+"""
+订阅检查测试：导入中途出错时保留已加入下载的进度
+"""
+import uuid
+from types import SimpleNamespace
+
+import pytest
+
+from models.subscription import Subscription, SourceType
+from services import subscription_service as subscription_module
+from services.subscription_service import SubscriptionService
+
+
+class FakeDownloadService:
+    def __init__(self, video_ids):
+        self.video_ids = video_ids
+
+    def iter_playlist_entries(self, url):
+        for video_id in self.video_ids:
+            yield {'url': f"https://www.bilibili.com/video/{video_id}"}
+
+
+class FakeBatchService:
+    """按 chunk_size 拆分导入，创建 fail_after 个子批量任务后抛出异常"""
+
+    def __init__(self, fail_after=None):
+        self.fail_after = fail_after
+        self.imported = []
+
+    def iter_import_batch_downloads(self, name, lines, chunk_size, priority=0, auto_edit_tags=True):
+        lines = list(lines)
+        for index in range(0, len(lines), chunk_size):
+            if self.fail_after is not None and index // chunk_size >= self.fail_after:
+                raise OSError('磁盘已满')
+            urls = lines[index:index + chunk_size]
+            self.imported.extend(urls)
+            yield SimpleNamespace(id=uuid.uuid4().hex, urls=urls)
+
+
+# UP主投稿列表按时间从新到旧排列，按从旧到新的顺序加入下载
+VIDEO_IDS = [f"BV1xx411c7m{i}" for i in range(5)]
+OLDEST_FIRST = VIDEO_IDS[::-1]
+
+
+@pytest.fixture
+def make_service(tmp_path, monkeypatch):
+    monkeypatch.setattr(subscription_module, 'BATCH_IMPORT_CHUNK_SIZE', 2)
+
+    def make(batch_service):
+        service = SubscriptionService(batch_service=batch_service, download_service=FakeDownloadService(VIDEO_IDS))
+        service.storage_path = tmp_path
+        subscription = Subscription(
+            source_type=SourceType.UPLOADER, source_id='1', url='https://space.bilibili.com/1/video', name='测试'
+        )
+        service._save_subscription(subscription)
+        return service, subscription.id
+    return make
+
+
+def test_failed_import_keeps_enqueued_videos(make_service):
+    batch_service = FakeBatchService(fail_after=1)
+    service, subscription_id = make_service(batch_service)
+
+    result = service.poll_subscription(subscription_id)
+    assert result['enqueued'] == 2
+    assert result['error'] == '磁盘已满'
+    assert len(result['batch_ids']) == 1
+
+    subscription = service.get_subscription(subscription_id)
+    assert subscription.seen_ids == OLDEST_FIRST[:2]
+    assert subscription.total_enqueued == 2
+    assert subscription.last_error == '磁盘已满'
+    # 导入未完成时不记录最新视频位置
+    assert subscription.high_water_mark == ''
+    assert subscription.last_batch_ids == result['batch_ids']
+
+    # 下次检查只加入剩余的视频
+    batch_service.fail_after = None
+    result = service.poll_subscription(subscription_id)
+    assert result['enqueued'] == 3
+    assert 'error' not in result
+    assert batch_service.imported == [f"https://www.bilibili.com/video/{video_id}" for video_id in OLDEST_FIRST]
+
+    subscription = service.get_subscription(subscription_id)
+    assert subscription.seen_ids == OLDEST_FIRST
+    assert subscription.total_enqueued == 5
+    assert subscription.last_error == ''
+    assert subscription.high_water_mark == VIDEO_IDS[0]
+
+
+def test_progress_is_saved_after_each_sub_batch(make_service):
+    batch_service = FakeBatchService()
+    service, subscription_id = make_service(batch_service)
+    saved = []
+    record_progress = service._record_progress
+
+    def spy(subscription_id, seen_ids, batch_ids):
+        record_progress(subscription_id, seen_ids, batch_ids)
+        saved.append(list(service.get_subscription(subscription_id).seen_ids))
+
+    service._record_progress = spy
+    result = service.poll_subscription(subscription_id)
+
+    assert result['enqueued'] == 5
+    assert saved == [OLDEST_FIRST[:2], OLDEST_FIRST[:4], OLDEST_FIRST]
+    assert service.get_subscription(subscription_id).total_enqueued == 5
@@ -0,0 +1,157 @@
+"""
+链接扫描测试：分享文本提取、标题中的av号、分P和去重合并
+"""
+import pytest
+
+from utils.url_scanner import URLScanner, URLScanResult
+
+
+@pytest.fixture
+def scanner():
+    return URLScanner()
+
+
+# 从客户端复制的分享文本和期望提取的下载地址
+SHARE_SAMPLES = [
+    ('【AV1编码实测 画质对比】 https://www.bilibili.com/video/BV1xx411c7mD?p=2',
+     'https://www.bilibili.com/video/BV1xx411c7mD?p=2'),
+    ('【AV1编码实测 画质对比-哔哩哔哩】 https://b23.tv/aBc1234',
+     'https://b23.tv/aBc1234'),
+    ('【【4K60帧】AV1 vs HEVC 对比-哔哩哔哩】 https://b23.tv/BV1xx411c7mD',
+     'https://www.bilibili.com/video/BV1xx411c7mD'),
+    ('[AV1 编码测试] https://www.bilibili.com/video/av170001/?share_source=copy_web&vd_source=1a2b3c',
+     'https://www.bilibili.com/video/av170001'),
+    ('https://www.bilibili.com/video/BV1xx411c7mD/?spm_id_from=333.1007.tianma.1-1-1.click&vd_source=1a2b3c',
+     'https://www.bilibili.com/video/BV1xx411c7mD'),
+    ('https://m.bilibili.com/video/BV1xx411c7mD?p=3&share_medium=android',
+     'https://www.bilibili.com/video/BV1xx411c7mD?p=3'),
+    ('AV1编码入门 BV1xx411c7mD', 'https://www.bilibili.com/video/BV1xx411c7mD'),
+    ('看看这个 av170001', 'https://www.bilibili.com/video/av170001'),
+    ('AV170001', 'https://www.bilibili.com/video/av170001'),
+    ('bv1xx411c7mD', 'https://www.bilibili.com/video/BV1xx411c7mD'),
+]
+
+
+@pytest.mark.parametrize('text, expected', SHARE_SAMPLES)
+def test_extract_first_from_share_text(scanner, text, expected):
+    assert scanner.extract_first(text).url == expected
+
+
+def test_link_is_preferred_over_earlier_bare_id(scanner):
+    text = 'BV1xx411c7mA 的续集 https://www.bilibili.com/video/BV1xx411c7mD'
+    assert scanner.extract_first(text).url == 'https://www.bilibili.com/video/BV1xx411c7mD'
+
+    # 第一行只有ID，第二行是链接：行号指向链接所在行
+    item = scanner.extract_first('BV1xx411c7mA\nhttps://b23.tv/aBc1234')
+    assert item.url == 'https://b23.tv/aBc1234'
+    assert item.line_number == 2
+
+
+@pytest.mark.parametrize('text', [
+    '【AV1编码实测】',
+    'AV1编码实测 画质对比',
+    '[BV1xx411c7mD 合集] 暂无链接',
+    'NAV123',
+    'av号：没有',
+])
+def test_titles_and_embedded_av_are_ignored(scanner, text):
+    assert scanner.extract_first(text) is None
+    assert scanner.scan_line(text) == []
+
+
+def test_scan_line_keeps_order_and_skips_ids_inside_links(scanner):
+    line = 'av170001 【AV1】 https://www.bilibili.com/video/BV1xx411c7mD?p=2 BV1xx411c7mA'
+    items = scanner.scan_line(line, 7)
+
+    assert [item.url for item in items] == [
+        'https://www.bilibili.com/video/av170001',
+        'https://www.bilibili.com/video/BV1xx411c7mD?p=2',
+        'https://www.bilibili.com/video/BV1xx411c7mA',
+    ]
+    assert all(item.line_number == 7 for item in items)
+
+
+def test_add_keeps_first_occurrence_order(scanner):
+    result = URLScanResult()
+    lines = [
+        'BV1xx411c7mB',
+        'https://www.bilibili.com/video/BV1xx411c7mA',
+        'bv1xx411c7mB',
+        'https://m.bilibili.com/video/BV1xx411c7mA/?share_source=copy',
+    ]
+    added = list(scanner.iter_scan(lines, result))
+
+    assert added == result.urls
+    assert result.url_list == [
+        'https://www.bilibili.com/video/BV1xx411c7mB',
+        'https://www.bilibili.com/video/BV1xx411c7mA',
+    ]
+    assert [entry['line_number'] for entry in result.merged] == [3, 4]
+    assert [entry['merged_into_line'] for entry in result.merged] == [1, 2]
+    assert result.merged[0]['content'] == 'bv1xx411c7mB'
+    assert result.merged[1]['url'] == 'https://www.bilibili.com/video/BV1xx411c7mA'
+
+
+def test_add_keeps_pages_separate(scanner):
+    result = scanner.scan('\n'.join([
+        'https://www.bilibili.com/video/BV1xx411c7mD',
+        'https://www.bilibili.com/video/BV1xx411c7mD?p=2',
+        'https://www.bilibili.com/video/BV1xx411c7mD?p=1',
+        'https://www.bilibili.com/video/BV1xx411c7mD?spm_id_from=333&p=2',
+    ]))
+
+    assert result.url_list == [
+        'https://www.bilibili.com/video/BV1xx411c7mD',
+        'https://www.bilibili.com/video/BV1xx411c7mD?p=2',
+    ]
+    assert [(entry['line_number'], entry['merged_into_line']) for entry in result.merged] == [(3, 1), (4, 2)]
+
+
+def test_short_link_with_video_id_merges_with_full_url(scanner):
+    result = scanner.scan('\n'.join([
+        '【合集】 https://b23.tv/BV1xx411c7mD',
+        'https://www.bilibili.com/video/BV1xx411c7mD?share_source=copy_web',
+        'https://b23.tv/aBc1234',
+        'https://b23.tv/aBc1234',
+        'https://b23.tv/xYz9876',
+    ]))
+
+    # 带视频ID的短链接按视频去重；其他短链接无法离线解析，只合并完全相同的链接
+    assert result.url_list == [
+        'https://www.bilibili.com/video/BV1xx411c7mD',
+        'https://b23.tv/aBc1234',
+        'https://b23.tv/xYz9876',
+    ]
+    assert result.merged == [
+        {
+            'line_number': 2,
+            'content': 'https://www.bilibili.com/video/BV1xx411c7mD?share_source=copy_web',
+            'merged_into_line': 1,
+            'url': 'https://www.bilibili.com/video/BV1xx411c7mD'
+        },
+        {
+            'line_number': 4,
+            'content': 'https://b23.tv/aBc1234',
+            'merged_into_line': 3,
+            'url': 'https://b23.tv/aBc1234'
+        },
+    ]
+
+
+def test_merged_lines_with_several_links_per_line(scanner):
+    result = scanner.scan('\n'.join([
+        '',
+        'av170001 BV1xx411c7mD',
+        '不是链接',
+        'https://www.bilibili.com/video/av170001 https://www.bilibili.com/video/BV1xx411c7mA',
+    ]))
+
+    assert result.total_lines == 4
+    assert len(result.urls) == 3
+    assert result.invalid_lines == [{'line_number': 3, 'content': '不是链接', 'reason': '不是有效的Bilibili URL'}]
+    assert [(entry['line_number'], entry['merged_into_line']) for entry in result.merged] == [(4, 2)]
+
+    summary = result.to_dict()
+    assert summary['total_valid'] == 3
+    assert summary['total_merged'] == 1
+    assert summary['total_invalid'] == 1
@@ -0,0 +1,20 @@
+"""
+tests 目录共用的夹具：临时曲库目录和索引
+"""
+import pytest
+
+from services.library_service import LibraryService
+
+
+@pytest.fixture
+def music_dir(tmp_path):
+    path = tmp_path / 'music'
+    path.mkdir()
+    return path
+
+
+@pytest.fixture
+def library(tmp_path, music_dir):
+    service = LibraryService(db_path=str(tmp_path / 'library.db'))
+    service.download_path = music_dir
+    return service
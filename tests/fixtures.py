@@ -0,0 +1,29 @@
+"""
+测试用的合成音频文件
+"""
+import os
+from pathlib import Path
+
+from mutagen.id3 import ID3, TALB, TCON, TIT2, TPE1
+
+# 一帧 MPEG-1 Layer III（128kbps、44.1kHz）静音数据，约26毫秒
+MP3_FRAME = b'\xff\xfb\x90\x64' + b'\x00' * 413
+
+ID3_FRAMES = {'title': TIT2, 'artist': TPE1, 'album': TALB, 'genre': TCON}
+
+
+def write_mp3(path, frames: int = 40, mtime_ns: int = None, **tags) -> Path:
+    """写入可被mutagen解析的MP3文件，tags 为 title/artist/album/genre"""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(MP3_FRAME * frames)
+
+    if tags:
+        id3 = ID3()
+        for name, value in tags.items():
+            id3.add(ID3_FRAMES[name](encoding=3, text=value))
+        id3.save(str(path))
+
+    if mtime_ns is not None:
+        os.utime(path, ns=(mtime_ns, mtime_ns))
+    return path
@@ -0,0 +1,182 @@
+"""
+本地Subsonic/Navidrome模拟服务器，用于测试扫描集成
+
+运行: python -m tests.subsonic_stub --port 4533 --username admin --password secret
+"""
+import json
+import time
+import hashlib
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import Dict, Any, List, Optional
+from urllib.parse import urlparse, parse_qs
+
+
+class SubsonicStubServer:
+    """Subsonic API模拟服务器
+
+    实现 ping / startScan / getScanStatus，校验token认证，记录收到的扫描请求，
+    并模拟一段时间的扫描过程。targeted为False时模拟不支持按目录扫描的旧版本服务器。
+    """
+
+    def __init__(self, username: str = 'admin', password: str = 'password',
+                 host: str = '127.0.0.1', port: int = 0,
+                 scan_duration: float = 0.5, targeted: bool = True):
+        self.username = username
+        self.password = password
+        self.scan_duration = scan_duration
+        self.targeted = targeted
+
+        self.scan_requests: List[Dict[str, Any]] = []
+        self.request_count = 0
+        self._scan_until = 0.0
+        self._lock = threading.Lock()
+
+        self.httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        """服务器地址"""
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def server_version(self) -> str:
+        """模拟的Navidrome版本"""
+        return '0.58.0 (stub)' if self.targeted else '0.53.3 (stub)'
+
+    @property
+    def scanning(self) -> bool:
+        """是否处于模拟扫描中"""
+        return time.monotonic() < self._scan_until
+
+    def start(self) -> 'SubsonicStubServer':
+        """在后台线程中启动"""
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """停止服务器"""
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def check_auth(self, params: Dict[str, List[str]]) -> bool:
+        """校验Subsonic token认证"""
+        username = params.get('u', [''])[0]
+        token = params.get('t', [''])[0]
+        salt = params.get('s', [''])[0]
+        expected = hashlib.md5((self.password + salt).encode('utf-8')).hexdigest()
+        return username == self.username and bool(salt) and token == expected
+
+    def handle(self, endpoint: str, params: Dict[str, List[str]]) -> Dict[str, Any]:
+        """处理Subsonic请求，返回subsonic-response内容"""
+        with self._lock:
+            self.request_count += 1
+
+        body: Dict[str, Any] = {
+            'status': 'ok',
+            'version': '1.16.1',
+            'type': 'navidrome',
+            'serverVersion': self.server_version,
+            'openSubsonic': True
+        }
+
+        if not self.check_auth(params):
+            body['status'] = 'failed'
+            body['error'] = {'code': 40, 'message': 'Wrong username or password'}
+            return body
+
+        if endpoint == 'ping':
+            return body
+
+        if endpoint == 'startScan':
+            targets = params.get('target', [])
+            if targets and not self.targeted:
+                body['status'] = 'failed'
+                body['error'] = {'code': 0, 'message': 'target parameter not supported'}
+                return body
+
+            with self._lock:
+                self.scan_requests.append({
+                    'full_scan': params.get('fullScan', ['false'])[0] == 'true',
+                    'targets': targets,
+                    'time': time.time()
+                })
+                self._scan_until = time.monotonic() + self.scan_duration
+
+        if endpoint in ('startScan', 'getScanStatus'):
+            body['scanStatus'] = {
+                'scanning': self.scanning,
+                'count': len(self.scan_requests)
+            }
+            return body
+
+        body['status'] = 'failed'
+        body['error'] = {'code': 70, 'message': f'Unknown endpoint: {endpoint}'}
+        return body
+
+    def _make_handler(self):
+        """创建请求处理类"""
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                parsed = urlparse(self.path)
+                if not parsed.path.startswith('/rest/'):
+                    self.send_error(404)
+                    return
+
+                endpoint = parsed.path[len('/rest/'):]
+                if endpoint.endswith('.view'):
+                    endpoint = endpoint[:-len('.view')]
+
+                body = server.handle(endpoint, parse_qs(parsed.query))
+                payload = json.dumps({'subsonic-response': body}).encode('utf-8')
+
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            do_POST = do_GET
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+def main():
+    """命令行入口"""
+    parser = argparse.ArgumentParser(description='Subsonic/Navidrome模拟服务器')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=4533)
+    parser.add_argument('--username', default='admin')
+    parser.add_argument('--password', default='password')
+    parser.add_argument('--scan-duration', type=float, default=5.0)
+    parser.add_argument('--no-targeted', action='store_true', help='模拟不支持按目录扫描的服务器')
+    args = parser.parse_args()
+
+    server = SubsonicStubServer(
+        username=args.username,
+        password=args.password,
+        host=args.host,
+        port=args.port,
+        scan_duration=args.scan_duration,
+        targeted=not args.no_targeted
+    )
+    print(f"Subsonic模拟服务器运行于 {server.url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == '__main__':
+    main()
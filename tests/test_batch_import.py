@@ -0,0 +1,123 @@
+"""
+流式导入接口测试：按块创建子批量任务、上传未读完时已开始创建任务、请求体大小上限
+"""
+import io
+
+import pytest
+from werkzeug.datastructures import FileStorage
+from werkzeug.test import encode_multipart
+
+from models.batch_download import BatchDownload
+from services.batch_download_service import BatchDownloadService
+from controllers import batch_controller as controller_module
+
+URLS = [f"https://www.bilibili.com/video/BV1xx41{i:05d}" for i in range(3000)]
+BODY = '\n'.join(URLS + ['不是链接', URLS[0]]).encode()
+
+
+class FakeBatchService:
+    """使用真实的分块导入逻辑，只记录创建的批量任务"""
+
+    iter_import_batch_downloads = BatchDownloadService.iter_import_batch_downloads
+
+    def __init__(self, stream=None):
+        # 请求体，创建任务时记录已读取的位置
+        self.stream = stream
+        self.batches = []
+        self.read_positions = []
+        self.started = []
+
+    def create_batch_download(self, request):
+        batch = BatchDownload(id='', name=request.name, urls=request.urls, priority=request.priority)
+        self.batches.append(batch)
+        if self.stream is not None:
+            self.read_positions.append(self.stream.tell())
+        return batch
+
+    def start_batch_download(self, batch_id):
+        self.started.append(batch_id)
+        return True
+
+
+@pytest.fixture
+def app_module(monkeypatch):
+    import app as app_module
+    monkeypatch.setattr(app_module.auth_service, 'login_required', False)
+    return app_module
+
+
+def post(app_module, service, body, content_type, query=''):
+    app_module.batch_controller.batch_service = service
+    with app_module.app.test_client() as client:
+        return client.post(
+            f'/api/batch/import{query}', input_stream=body, content_type=content_type,
+            content_length=len(body.getvalue())
+        )
+
+
+@pytest.fixture(autouse=True)
+def restore_batch_service(app_module):
+    original = app_module.batch_controller.batch_service
+    yield
+    app_module.batch_controller.batch_service = original
+
+
+def test_raw_body_is_split_into_chunks(app_module):
+    body = io.BytesIO(BODY)
+    service = FakeBatchService(body)
+    response = post(app_module, service, body, 'text/plain', '?name=收藏夹&chunk_size=1000&priority=3')
+
+    assert response.status_code == 201
+    data = response.get_json()['data']
+    assert [batch['name'] for batch in data['batches']] == ['收藏夹 #1', '收藏夹 #2', '收藏夹 #3']
+    assert [batch['total_tasks'] for batch in data['batches']] == [1000, 1000, 1000]
+    assert (data['total_valid'], data['total_invalid'], data['total_merged']) == (3000, 1, 1)
+    assert service.started == [batch.id for batch in service.batches]
+    assert all(batch.priority == 3 for batch in service.batches)
+    # 请求体还没读完时第一个子批量任务已经创建
+    assert service.read_positions[0] < len(BODY)
+
+
+def test_multipart_upload_is_parsed_from_the_stream(app_module):
+    boundary, payload = encode_multipart({
+        'name': '收藏夹', 'chunk_size': '1000', 'file': FileStorage(io.BytesIO(BODY), 'favlist.txt')
+    })
+    body = io.BytesIO(payload)
+    service = FakeBatchService(body)
+    response = post(app_module, service, body, f'multipart/form-data; boundary={boundary}')
+
+    assert response.status_code == 201
+    data = response.get_json()['data']
+    assert [batch['total_tasks'] for batch in data['batches']] == [1000, 1000, 1000]
+    assert data['batches'][0]['name'] == '收藏夹 #1'
+    assert service.read_positions[0] < len(payload)
+
+
+def test_multipart_without_file_is_rejected(app_module):
+    boundary, payload = encode_multipart({'name': '收藏夹'})
+    response = post(app_module, FakeBatchService(), io.BytesIO(payload), f'multipart/form-data; boundary={boundary}')
+    assert response.status_code == 400
+    assert response.get_json()['error'] == 'validation'
+
+
+def test_upload_file_name_is_default_batch_name(app_module):
+    boundary, payload = encode_multipart({'file': FileStorage(io.BytesIO(URLS[0].encode()), '我的收藏.txt')})
+    response = post(app_module, FakeBatchService(), io.BytesIO(payload), f'multipart/form-data; boundary={boundary}')
+    assert response.get_json()['data']['batches'][0]['name'] == '我的收藏 #1'
+
+
+@pytest.mark.parametrize('multipart', [False, True])
+def test_body_over_max_size_is_rejected(app_module, monkeypatch, multipart):
+    # 上限约为64KB
+    monkeypatch.setattr(controller_module, 'BATCH_IMPORT_MAX_SIZE', 1 / 16)
+    if multipart:
+        boundary, payload = encode_multipart({'file': FileStorage(io.BytesIO(BODY), 'favlist.txt')})
+        content_type = f'multipart/form-data; boundary={boundary}'
+    else:
+        payload, content_type = BODY, 'text/plain'
+    service = FakeBatchService()
+    response = post(app_module, service, io.BytesIO(payload), content_type)
+
+    assert response.status_code == 413
+    assert response.get_json()['error'] == 'too_large'
+    assert service.batches == []
@@ -0,0 +1,103 @@
+"""
+单个下载限制测试：下载前的时长/大小检查、下载中的大小限制和看门狗超时中止
+"""
+import sys
+import time
+
+import pytest
+from yt_dlp.utils import DownloadCancelled
+
+from services.download_service import DownloadGuard
+from utils.exceptions import DownloadLimitError
+
+MB = 1024 * 1024
+
+
+def make_guard(timeout=0, max_bytes=10 * MB, max_duration=600):
+    return DownloadGuard('https://www.bilibili.com/video/BV1xx411c7mD',
+                         timeout=timeout, max_bytes=max_bytes, max_duration=max_duration)
+
+
+def test_preflight_rejects_long_video():
+    with pytest.raises(DownloadLimitError) as exc_info:
+        make_guard().preflight({'duration': 601})
+    assert exc_info.value.reason == DownloadLimitError.TOO_LONG
+
+
+@pytest.mark.parametrize('info', [
+    {'duration': 60, 'filesize': 11 * MB},
+    {'duration': 60, 'requested_formats': [{'filesize': 6 * MB}, {'filesize_approx': 6 * MB}]},
+    # 没有文件大小时按码率（kbps）×时长估算
+    {'duration': 600, 'tbr': 160},
+])
+def test_preflight_rejects_large_estimate(info):
+    with pytest.raises(DownloadLimitError) as exc_info:
+        make_guard().preflight(info)
+    assert exc_info.value.reason == DownloadLimitError.TOO_LARGE
+
+
+def test_preflight_accepts_within_limits_and_unlimited():
+    make_guard().preflight({'duration': 600, 'filesize': 10 * MB})
+    make_guard(max_bytes=0, max_duration=0).preflight({'duration': 10 ** 6, 'filesize': 10 ** 12})
+
+
+def test_progress_hook_aborts_when_downloaded_bytes_exceed_limit():
+    guard = make_guard()
+    # 音视频分开下载时合计
+    guard.progress_hook({'status': 'downloading', 'filename': 'a.m4s', 'downloaded_bytes': 6 * MB})
+    with pytest.raises(DownloadCancelled):
+        guard.progress_hook({'status': 'downloading', 'filename': 'b.m4s', 'downloaded_bytes': 5 * MB})
+    assert guard.error.reason == DownloadLimitError.TOO_LARGE
+    assert guard.downloaded_bytes == 11 * MB
+
+
+def test_watchdog_kills_running_process():
+    guard = make_guard(timeout=0.3)
+    guard.start()
+    started = time.monotonic()
+    try:
+        with pytest.raises(DownloadCancelled):
+            guard.run_process([sys.executable, '-c', 'import time; time.sleep(30)'])
+    finally:
+        guard.stop()
+
+    assert time.monotonic() - started < 10
+    assert guard.timed_out
+    assert guard.error.reason == DownloadLimitError.TIMEOUT
+    assert guard._process is None
+
+
+def test_process_started_after_expiry_is_not_run():
+    guard = make_guard(timeout=60)
+    guard._expire()
+    with pytest.raises(DownloadCancelled):
+        guard.run_process([sys.executable, '-c', 'import time; time.sleep(30)'])
+    assert guard.error.reason == DownloadLimitError.TIMEOUT
+
+
+def test_retry_after_expiry_aborts_stalled_download():
+    guard = make_guard(timeout=0.1)
+    guard.start()
+    try:
+        # 网络读取超时后yt-dlp重试前调用
+        assert guard.retry_sleep(0) == 0
+        time.sleep(0.3)
+        with pytest.raises(DownloadCancelled):
+            guard.retry_sleep(1)
+    finally:
+        guard.stop()
+    assert guard.error.reason == DownloadLimitError.TIMEOUT
+
+
+def test_process_result_is_returned_within_deadline():
+    guard = make_guard(timeout=60)
+    guard.start()
+    try:
+        returncode, stderr = guard.run_process(
+            [sys.executable, '-c', 'import sys; sys.stderr.write("转换失败"); sys.exit(3)']
+        )
+    finally:
+        guard.stop()
+    assert returncode == 3
+    assert stderr == '转换失败'
+    assert guard.error is None
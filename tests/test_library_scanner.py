@@ -0,0 +1,91 @@
+"""
+曲库增量扫描测试：第二次扫描只重新解析修改、重命名、删除的文件，无法读取的目录被跳过
+"""
+import os
+
+import pytest
+
+from services.library_scanner import LibraryScanner
+from tests.fixtures import write_mp3
+
+
+@pytest.fixture
+def scanner(library, music_dir):
+    scanner = LibraryScanner(library)
+    scanner.download_path = music_dir
+    return scanner
+
+
+@pytest.fixture
+def parsed(library, monkeypatch):
+    """记录被mutagen重新解析的文件（相对路径）"""
+    paths = []
+    read_file_metadata = library.read_file_metadata
+
+    def spy(filepath, stat=None):
+        paths.append(library.relative_path(filepath))
+        return read_file_metadata(filepath, stat=stat)
+    monkeypatch.setattr(library, 'read_file_metadata', spy)
+    return paths
+
+
+def counts(result):
+    return {key: result[key] for key in ('scanned', 'added', 'updated', 'removed', 'unchanged', 'errors')}
+
+
+def test_second_scan_only_reindexes_changed_files(scanner, library, music_dir, parsed):
+    for name in ('keep', 'modify', 'rename', 'delete'):
+        write_mp3(music_dir / 'album' / f"{name}.mp3", title=name)
+
+    first = scanner.scan()
+    assert counts(first) == {'scanned': 4, 'added': 4, 'updated': 0, 'removed': 0, 'unchanged': 0, 'errors': 0}
+    assert sorted(parsed) == ['album/delete.mp3', 'album/keep.mp3', 'album/modify.mp3', 'album/rename.mp3']
+
+    parsed.clear()
+    modified = music_dir / 'album' / 'modify.mp3'
+    write_mp3(modified, title='modified', mtime_ns=os.stat(modified).st_mtime_ns + 10 ** 9)
+    os.rename(music_dir / 'album' / 'rename.mp3', music_dir / 'renamed.mp3')
+    os.remove(music_dir / 'album' / 'delete.mp3')
+
+    second = scanner.scan()
+    assert counts(second) == {'scanned': 3, 'added': 1, 'updated': 1, 'removed': 2, 'unchanged': 1, 'errors': 0}
+    assert sorted(parsed) == ['album/modify.mp3', 'renamed.mp3']
+    assert library.get_track('album/modify.mp3').title == 'modified'
+    assert library.get_track('renamed.mp3').title == 'rename'
+    assert library.get_track('album/rename.mp3') is None
+    assert library.get_track('album/delete.mp3') is None
+
+    # 没有变化时不解析任何文件
+    parsed.clear()
+    third = scanner.scan()
+    assert counts(third) == {'scanned': 3, 'added': 0, 'updated': 0, 'removed': 0, 'unchanged': 3, 'errors': 0}
+    assert parsed == []
+
+
+def test_unreadable_directory_is_skipped(scanner, library, music_dir, monkeypatch):
+    write_mp3(music_dir / 'public' / '1.mp3', title='公开')
+    write_mp3(music_dir / 'private' / '2.mp3', title='私有')
+    assert scanner.scan()['added'] == 2
+
+    private = music_dir / 'private'
+    write_mp3(private / '3.mp3', title='新增')
+    private.chmod(0)
+    if os.access(private, os.R_OK):
+        # 以root运行时权限位不生效，改为模拟读取失败
+        scandir = os.scandir
+
+        def deny(path='.'):
+            if os.path.abspath(path) == str(private.resolve()):
+                raise PermissionError(13, 'Permission denied', str(path))
+            return scandir(path)
+        monkeypatch.setattr(os, 'scandir', deny)
+
+    try:
+        result = scanner.scan()
+    finally:
+        private.chmod(0o755)
+
+    assert counts(result) == {'scanned': 1, 'added': 0, 'updated': 0, 'removed': 0, 'unchanged': 1, 'errors': 0}
+    # 无法读取的目录中已索引的文件保留原有记录
+    assert library.get_track('private/2.mp3').title == '私有'
+    assert library.get_track('private/3.mp3') is None
@@ -0,0 +1,113 @@
+"""
+曲库搜索测试：FTS5前缀/子串匹配、短词回退为LIKE、分页边界
+"""
+import pytest
+
+from services import library_service as library_module
+from services.library_service import LibraryService, FTS_SCHEMA
+from tests.fixtures import write_mp3
+
+TRACKS = [
+    ('周杰伦/晴天.mp3', {'title': '晴天', 'artist': '周杰伦', 'album': '叶惠美'}, 'BV1xx411c7mA'),
+    ('周杰伦/七里香.mp3', {'title': '七里香', 'artist': '周杰伦', 'album': '七里香'}, 'BV1xx411c7mB'),
+    ('Adele/Hello.mp3', {'title': 'Hello', 'artist': 'Adele', 'album': '25'}, ''),
+    ('Adele/Skyfall.mp3', {'title': 'Skyfall', 'artist': 'Adele', 'genre': 'Soundtrack'}, ''),
+    ('misc/100%_pure.mp3', {'title': '100% Pure', 'artist': 'Unknown'}, ''),
+]
+
+
+def index_tracks(library, music_dir):
+    for rel_path, tags, bvid in TRACKS:
+        path = write_mp3(music_dir / rel_path, **tags)
+        assert library.index_file(path, bvid=bvid) is not None
+
+
+def titles(result):
+    return sorted(item['title'] for item in result['items'])
+
+
+@pytest.fixture
+def indexed(library, music_dir):
+    index_tracks(library, music_dir)
+    return library
+
+
+def test_trigram_tokenizer_is_used(indexed):
+    assert indexed.tokenizer == 'trigram'
+
+
+@pytest.mark.parametrize('query, expected', [
+    # 前缀和词中间的子串（trigram）
+    ('Hel', ['Hello']),
+    ('kyfal', ['Skyfall']),
+    ('七里香', ['七里香']),
+    ('adele', ['Hello', 'Skyfall']),
+    ('BV1xx411c7mA', ['晴天']),
+    ('soundtrack', ['Skyfall']),
+    # 多个词同时匹配
+    ('Adele Sky', ['Skyfall']),
+])
+def test_fts_search(indexed, query, expected):
+    assert titles(indexed.search(query)) == expected
+
+
+@pytest.mark.parametrize('query, expected', [
+    # 少于3个字符的词回退为LIKE匹配
+    ('晴', ['晴天']),
+    ('杰伦', ['七里香', '晴天']),
+    ('惠美', ['晴天']),
+    ('25', ['Hello']),
+    # 短词和长词组合
+    ('周杰伦 晴', ['晴天']),
+    # LIKE通配符按字面匹配
+    ('%', ['100% Pure']),
+    ('_p', ['100% Pure']),
+])
+def test_short_terms_fall_back_to_like(indexed, query, expected):
+    assert titles(indexed.search(query)) == expected
+
+
+def test_unicode61_index_uses_prefix_match(tmp_path, music_dir, monkeypatch):
+    # SQLite < 3.34 没有trigram分词器时使用unicode61，按前缀匹配
+    def create_unicode61(self, conn):
+        conn.execute(FTS_SCHEMA.format(tokenizer='unicode61'))
+    monkeypatch.setattr(LibraryService, '_create_fts_table', create_unicode61)
+    library = LibraryService(db_path=str(tmp_path / 'unicode61.db'))
+    library.download_path = music_dir
+    index_tracks(library, music_dir)
+
+    assert library.tokenizer == 'unicode61'
+    assert titles(library.search('Hel')) == ['Hello']
+    assert titles(library.search('sky')) == ['Skyfall']
+    assert titles(library.search('kyfal')) == []
+
+
+def test_pagination_boundaries(indexed):
+    first = indexed.search(sort='title', per_page=2)
+    assert (first['total'], first['pages'], first['page']) == (5, 3, 1)
+    assert len(first['items']) == 2
+
+    pages = [indexed.search(sort='title', page=page, per_page=2)['items'] for page in (1, 2, 3)]
+    assert [len(items) for items in pages] == [2, 2, 1]
+    ordered = [item['title'] for items in pages for item in items]
+    assert ordered == sorted(ordered, key=str.lower)
+    assert len(set(ordered)) == 5
+
+    # 超出最后一页返回空列表，页码和每页数量限制在有效范围内
+    assert indexed.search(page=4, per_page=2)['items'] == []
+    assert indexed.search(page=0)['page'] == 1
+    assert indexed.search(per_page=0)['per_page'] == 1
+    assert indexed.search(per_page=10 ** 6)['per_page'] == library_module.LIBRARY_MAX_PAGE_SIZE
+
+
+def test_search_results_are_paginated(indexed):
+    result = indexed.search('周杰伦', per_page=1)
+    assert (result['total'], result['pages']) == (2, 2)
+    second = indexed.search('周杰伦', page=2, per_page=1)
+    assert {result['items'][0]['title'], second['items'][0]['title']} == {'晴天', '七里香'}
+
+
+def test_removed_file_is_not_found(indexed, music_dir):
+    assert indexed.remove_file(music_dir / 'Adele' / 'Hello.mp3')
+    assert indexed.search('Hello')['total'] == 0
+    assert titles(indexed.search('Adele')) == ['Skyfall']
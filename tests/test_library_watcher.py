@@ -0,0 +1,100 @@
+"""
+曲库目录监听测试：去抖合并、事件队列溢出后的重新扫描、定时扫描进行中时推迟重新扫描
+"""
+import time
+
+import pytest
+
+from services.library_scanner import LibraryScanner
+from services.library_watcher import LibraryWatcher
+from utils import inotify
+from tests.fixtures import write_mp3
+
+pytestmark = pytest.mark.skipif(not inotify.is_supported(), reason='当前平台不支持inotify')
+
+OVERFLOW = inotify.InotifyEvent(wd=-1, mask=inotify.IN_Q_OVERFLOW, cookie=0, name='')
+
+
+class FakeCoordinator:
+    def __init__(self):
+        self.requests = []
+
+    def request_scan(self, reason='', paths=None):
+        self.requests.append((time.monotonic(), sorted(paths) if paths is not None else None))
+        return True
+
+
+def wait_until(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.02)
+    return predicate()
+
+
+@pytest.fixture
+def watcher(library, music_dir):
+    scanner = LibraryScanner(library)
+    scanner.download_path = music_dir
+    watcher = LibraryWatcher(library, scanner, FakeCoordinator())
+    watcher.download_path = music_dir
+    watcher.debounce = 0.3
+    yield watcher
+    watcher.stop()
+
+
+def test_events_within_debounce_are_flushed_once(watcher, music_dir):
+    assert watcher.start()
+    paths = []
+    for index in range(3):
+        paths.append(str(write_mp3(music_dir / f"{index}.mp3", title=f"曲目{index}")))
+        last_event = time.monotonic()
+        time.sleep(0.1)
+
+    assert wait_until(lambda: watcher.scan_coordinator.requests)
+    time.sleep(0.5)
+    requests = watcher.scan_coordinator.requests
+    assert len(requests) == 1
+    # 最后一个事件之后至少等待一个安静期
+    assert requests[0][0] - last_event >= 0.25
+    assert requests[0][1] == paths
+    assert sorted(watcher.catalog) == ['0.mp3', '1.mp3', '2.mp3']
+    assert watcher.library_service.get_track('1.mp3').title == '曲目1'
+
+
+def test_overflow_rescans_the_library(watcher, music_dir):
+    # 监听启动前已存在、尚未索引的文件
+    write_mp3(music_dir / 'a' / '1.mp3')
+    write_mp3(music_dir / 'b' / '2.mp3')
+    assert watcher.start()
+    assert watcher.catalog == {}
+
+    watcher._handle_event(OVERFLOW)
+    assert wait_until(lambda: watcher.scan_coordinator.requests)
+    assert sorted(watcher.catalog) == ['a/1.mp3', 'b/2.mp3']
+    # 目录级变化不限定扫描目录
+    assert watcher.scan_coordinator.requests[0][1] is None
+    assert watcher.last_flush['rescan']
+
+
+def test_rescan_is_deferred_while_scheduled_scan_runs(watcher, music_dir):
+    write_mp3(music_dir / '1.mp3')
+    assert watcher.start()
+
+    # 定时扫描进行中
+    watcher.library_scanner._scan_lock.acquire()
+    try:
+        watcher._handle_event(OVERFLOW)
+        assert wait_until(lambda: watcher.last_flush)
+        assert not watcher.last_flush['rescan']
+        assert watcher.catalog == {}
+        assert watcher.scan_coordinator.requests == []
+        assert wait_until(lambda: watcher._pending_rescan)
+    finally:
+        watcher.library_scanner._scan_lock.release()
+
+    # 扫描结束后的下一个安静期重新扫描
+    assert wait_until(lambda: watcher.scan_coordinator.requests)
+    assert list(watcher.catalog) == ['1.mp3']
+    assert watcher.last_flush['rescan']
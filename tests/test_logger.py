@@ -0,0 +1,99 @@
+"""
+日志测试：JSONFormatter 输出的字段、消息模板、log_context 上下文字段和队列处理器
+"""
+import json
+import logging
+import sys
+import queue
+import threading
+
+import pytest
+
+from utils.logger import ContextFilter, JSONFormatter, TextFormatter, _QueueHandler, log_context
+
+
+def make_record(msg, *args, exc_info=None):
+    record = logging.LogRecord('services.test', logging.WARNING, __file__, 1, msg, args, exc_info)
+    ContextFilter().filter(record)
+    return record
+
+
+def through_queue(record):
+    """模拟 QueueHandler 入队和监听线程格式化"""
+    log_queue = queue.SimpleQueue()
+    _QueueHandler(log_queue).handle(record)
+    return log_queue.get_nowait()
+
+
+def test_json_fields():
+    data = json.loads(JSONFormatter().format(make_record("读取扫描请求失败: %s - %s", 'a.json', ValueError('损坏'))))
+
+    assert data['level'] == 'WARNING'
+    assert data['logger'] == 'services.test'
+    assert data['message'] == '读取扫描请求失败: a.json - 损坏'
+    assert data['msg'] == '读取扫描请求失败: %s - %s'
+    assert data['thread'] == threading.current_thread().name
+    assert 'T' in data['time']
+    assert 'batch_id' not in data
+
+
+def test_template_survives_the_queue():
+    # 监听线程看到的记录已经合并了参数，模板仍然保留
+    first = through_queue(make_record("已合并 %s 个扫描请求并触发Navidrome扫描", 3))
+    second = through_queue(make_record("已合并 %s 个扫描请求并触发Navidrome扫描", 5))
+
+    assert first.args is None
+    first_data, second_data = (json.loads(JSONFormatter().format(record)) for record in (first, second))
+    assert first_data['message'] == '已合并 3 个扫描请求并触发Navidrome扫描'
+    assert first_data['msg'] == second_data['msg'] == '已合并 %s 个扫描请求并触发Navidrome扫描'
+
+
+def test_log_context_fields_are_nested_and_reset():
+    with log_context(batch_id='batch-1'):
+        with log_context(task_id='task-1'):
+            inner = make_record("下载完成: %s", '晴天')
+        outer = make_record("批量任务完成")
+    after = make_record("空闲")
+
+    assert json.loads(JSONFormatter().format(inner))['batch_id'] == 'batch-1'
+    assert json.loads(JSONFormatter().format(inner))['task_id'] == 'task-1'
+    assert 'task_id' not in json.loads(JSONFormatter().format(outer))
+    assert 'batch_id' not in json.loads(JSONFormatter().format(after))
+    assert TextFormatter().format(inner).endswith('下载完成: 晴天 [batch_id=batch-1 task_id=task-1]')
+
+
+def test_log_context_is_per_thread():
+    records = {}
+
+    def worker(name):
+        with log_context(job_id=name):
+            records[name] = make_record("任务开始")
+
+    with log_context(job_id='main'):
+        threads = [threading.Thread(target=worker, args=(f"job-{index}",)) for index in range(2)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        main = make_record("主线程")
+
+    assert {name: record.context['job_id'] for name, record in records.items()} == {'job-0': 'job-0', 'job-1': 'job-1'}
+    assert main.context == {'job_id': 'main'}
+
+
+def test_exception_is_formatted():
+    try:
+        raise RuntimeError('转码失败')
+    except RuntimeError:
+        record = through_queue(make_record("下载失败: %s", 'BV1xx411c7mA', exc_info=sys.exc_info()))
+
+    data = json.loads(JSONFormatter().format(record))
+    assert data['message'] == '下载失败: BV1xx411c7mA'
+    assert 'RuntimeError: 转码失败' in data['exc_info']
+
+
+@pytest.mark.parametrize('value', [{'a': 1}, b'bytes'])
+def test_context_values_that_are_not_json_are_stringified(value):
+    with log_context(extra=value):
+        data = json.loads(JSONFormatter().format(make_record("上下文")))
+    assert data['extra'] == (value if isinstance(value, dict) else str(value))
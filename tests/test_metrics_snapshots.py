@@ -0,0 +1,110 @@
+"""
+多进程指标快照测试：两个进程写入快照，其中一个退出后合并到累计值，计数器和直方图不丢失也不重复计算
+"""
+import time
+
+import pytest
+
+from utils import metrics as metrics_module
+from utils import serialization
+from utils.metrics import MetricsRegistry, StageRecorder, STAGE_DURATION
+
+DEAD_PID = 2 ** 22 + 12345
+LIVE_PID = 2 ** 22 + 23456
+
+
+def make_process(snapshot_dir, pid, downloads, durations):
+    """模拟一个进程的注册表：下载计数和阶段耗时直方图"""
+    registry = MetricsRegistry()
+    registry.snapshot_dir = snapshot_dir
+    registry._instance = f"{pid}-abcd1234"
+    counter = registry.counter('downloads_total', '下载数', ('result',))
+    histogram = registry.histogram('stage_seconds', '阶段耗时', ('stage',), buckets=(1, 10))
+    for result, count in downloads.items():
+        counter.inc(count, result=result)
+    for seconds in durations:
+        histogram.observe(seconds, stage='download')
+    return registry
+
+
+def write_snapshot(registry, written_at):
+    registry.write_snapshot()
+    snapshot_file = registry._snapshot_file()
+    snapshot = serialization.loads(snapshot_file.read_bytes())
+    snapshot['written_at'] = written_at
+    serialization.dump_file(snapshot, snapshot_file)
+    return snapshot_file
+
+
+def samples(families, name):
+    return {
+        (sample_name, tuple(sorted(labels.items()))): value
+        for sample_name, labels, value in families[name]['samples']
+    }
+
+
+@pytest.fixture
+def collector(tmp_path, monkeypatch):
+    """合并快照的进程（后台执行进程），本身没有记录任何指标"""
+    monkeypatch.setattr(metrics_module, 'METRICS_FLUSH_INTERVAL', 3600)
+    # 模拟的两个进程号都不存在，存活与否只由快照时间区分
+    monkeypatch.setattr(metrics_module, '_process_alive', lambda pid: pid == LIVE_PID)
+    registry = MetricsRegistry()
+    registry.snapshot_dir = tmp_path
+    registry.start_snapshots()
+    yield registry
+    registry._stop_event.set()
+
+
+def test_exited_process_is_folded_without_double_counting(collector, tmp_path):
+    exited = make_process(tmp_path, DEAD_PID, {'ok': 10, 'error': 2}, [0.5, 5, 50])
+    live = make_process(tmp_path, LIVE_PID, {'ok': 3}, [0.5])
+    exited_file = write_snapshot(exited, time.time() - 4 * 3600)
+    write_snapshot(live, time.time())
+
+    before = collector.collect_all()
+    downloads = samples(before, 'downloads_total')
+    assert downloads == {
+        ('downloads_total', (('result', 'ok'),)): 13,
+        ('downloads_total', (('result', 'error'),)): 2,
+    }
+    stages = samples(before, 'stage_seconds')
+    assert stages[('stage_seconds_bucket', (('le', '1'), ('stage', 'download')))] == 2
+    assert stages[('stage_seconds_bucket', (('le', '10'), ('stage', 'download')))] == 3
+    assert stages[('stage_seconds_count', (('stage', 'download'),))] == 4
+    assert stages[('stage_seconds_sum', (('stage', 'download'),))] == 56
+
+    assert collector.fold_retired_snapshots() == 1
+    assert not exited_file.exists()
+    assert live._snapshot_file().exists()
+    assert samples(collector.collect_all(), 'downloads_total') == downloads
+    assert samples(collector.collect_all(), 'stage_seconds') == stages
+
+    # 重复合并、存活进程继续更新快照时不会重复累加已退出进程的值
+    assert collector.fold_retired_snapshots() == 0
+    live.counter('downloads_total', '下载数', ('result',)).inc(1, result='ok')
+    write_snapshot(live, time.time())
+    after = samples(collector.collect_all(), 'downloads_total')
+    assert after[('downloads_total', (('result', 'ok'),))] == 14
+    assert after[('downloads_total', (('result', 'error'),))] == 2
+
+    # 存活的进程不被合并
+    assert collector.fold_retired_snapshots() == 0
+    assert live._snapshot_file().exists()
+
+
+def test_stage_recorder_accumulates_and_observes_histogram():
+    def observed():
+        return samples({'stage': STAGE_DURATION.family()}, 'stage').get(
+            ('bilibili_stage_duration_seconds_count', (('stage', 'test-stage'),)), 0)
+
+    recorder = StageRecorder()
+    count = observed()
+    recorder.observe('test-stage', 0.25)
+    recorder.observe('test-stage', 0.5)
+    with pytest.raises(RuntimeError):
+        with recorder.time('test-stage'):
+            raise RuntimeError('失败的阶段同样计时')
+
+    assert 0.75 <= recorder.stages['test-stage'] < 1
+    assert observed() == count + 3
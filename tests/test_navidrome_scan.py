@@ -0,0 +1,303 @@
+"""
+Navidrome扫描集成测试（使用本地Subsonic模拟服务器）
+"""
+import time
+import hashlib
+
+import pytest
+
+from config import NAVIDROME_MAX_RETRIES, NAVIDROME_POOL_SIZE
+from services import navidrome_service as navidrome_module
+from services.navidrome_service import NavidromeService
+from services.scan_coordinator import ScanCoordinator
+from tests.subsonic_stub import SubsonicStubServer
+
+
+class LegacyVersionStub(SubsonicStubServer):
+    """报告支持定向扫描的版本，但拒绝target参数的服务器"""
+
+    @property
+    def server_version(self):
+        return '0.58.0 (stub)'
+
+
+def wait_until(predicate, timeout=5.0):
+    """等待条件成立"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.02)
+    return predicate()
+
+
+def make_service(stub, music_library):
+    service = NavidromeService()
+    service.base_url = stub.url
+    service.username = stub.username
+    service.password = stub.password
+    service.api_key = None
+    service.targeted_scan = True
+    service.library_id = 1
+    service.music_library = str(music_library)
+    service.cache_ttl = 0
+    service.invalidate_cache()
+    return service
+
+
+@pytest.fixture
+def stub():
+    server = SubsonicStubServer(username='admin', password='secret', scan_duration=0.3).start()
+    yield server
+    server.stop()
+
+
+def test_token_auth_uses_salted_md5(stub, tmp_path):
+    service = make_service(stub, tmp_path)
+    params = service._auth_params()
+
+    assert params['t'] == hashlib.md5(('secret' + params['s']).encode('utf-8')).hexdigest()
+    assert params['s'] != service._auth_params()['s']
+    assert stub.check_auth({'u': ['admin'], 't': [params['t']], 's': [params['s']]})
+    assert service.get_library_status()['status'] == 'ok'
+
+
+def test_wrong_password_is_rejected(stub, tmp_path):
+    service = make_service(stub, tmp_path)
+    service.password = 'wrong'
+
+    assert service.get_library_status()['status'] == 'error'
+    assert not service.trigger_scan()
+    assert stub.scan_requests == []
+
+
+def test_targeted_scan_sends_library_relative_folders(stub, tmp_path):
+    service = make_service(stub, tmp_path)
+
+    assert service.trigger_scan([str(tmp_path / 'Bilibili' / 'UP主'), str(tmp_path)])
+    assert stub.scan_requests[-1]['targets'] == ['1:', '1:Bilibili/UP主']
+    assert not stub.scan_requests[-1]['full_scan']
+
+
+def test_folder_outside_library_falls_back_to_quick_scan(stub, tmp_path):
+    service = make_service(stub, tmp_path / 'music')
+
+    assert service.trigger_scan([str(tmp_path / 'elsewhere')])
+    assert stub.scan_requests[-1]['targets'] == []
+
+
+def test_old_server_version_skips_targets(tmp_path):
+    server = SubsonicStubServer(username='admin', password='secret', targeted=False).start()
+    try:
+        service = make_service(server, tmp_path)
+        assert service.trigger_scan([str(tmp_path / 'Bilibili')])
+        assert [request['targets'] for request in server.scan_requests] == [[]]
+    finally:
+        server.stop()
+
+
+def test_rejected_targeted_scan_retries_without_targets(tmp_path):
+    server = LegacyVersionStub(username='admin', password='secret', targeted=False).start()
+    try:
+        service = make_service(server, tmp_path)
+        assert service.trigger_scan([str(tmp_path / 'Bilibili')])
+        # 第一次带target的请求被拒绝（不记录），随后的快速扫描成功
+        assert [request['targets'] for request in server.scan_requests] == [[]]
+    finally:
+        server.stop()
+
+
+def test_instances_share_pooled_session(stub, tmp_path):
+    first = make_service(stub, tmp_path)
+    second = make_service(stub, tmp_path)
+
+    assert first.session is second.session is navidrome_module.get_session()
+    adapter = first.session.get_adapter(stub.url)
+    assert adapter is first.session.get_adapter('https://navidrome.example')
+    assert adapter._pool_maxsize == NAVIDROME_POOL_SIZE
+    # 只重试连接错误
+    assert (adapter.max_retries.connect, adapter.max_retries.read, adapter.max_retries.status) == \
+        (NAVIDROME_MAX_RETRIES, 0, 0)
+
+    assert first.get_library_status()['status'] == 'ok'
+    assert second.get_library_status()['status'] == 'ok'
+    assert stub.request_count == 2
+
+
+def test_scan_status_is_cached_within_ttl(stub, tmp_path):
+    first = make_service(stub, tmp_path)
+    second = make_service(stub, tmp_path)
+    first.cache_ttl = second.cache_ttl = 0.5
+    try:
+        status = first.get_scan_status()
+        # 缓存由所有实例共享
+        assert second.get_scan_status() == status
+        assert first.get_scan_status() == status
+        assert stub.request_count == 1
+
+        time.sleep(0.6)
+        assert first.get_scan_status() == status
+        assert stub.request_count == 2
+
+        # 触发扫描后清除缓存，立即看到扫描中的状态
+        assert first.trigger_scan()
+        assert second.get_scan_status()['scanStatus']['scanning']
+    finally:
+        first.invalidate_cache()
+
+
+def make_coordinator(stub, music_library, debounce=0.2, max_delay=5.0):
+    coordinator = ScanCoordinator(make_service(stub, music_library))
+    coordinator.debounce = debounce
+    coordinator.max_delay = max_delay
+    coordinator.poll_interval = 0.05
+    return coordinator
+
+
+def test_coordinator_merges_folders_into_one_scan(stub, tmp_path):
+    coordinator = make_coordinator(stub, tmp_path)
+    for name in ('a/1.mp3', 'a/2.mp3', 'b/3.mp3'):
+        coordinator.request_scan('test', [str(tmp_path / name)])
+
+    assert wait_until(lambda: coordinator.total_scans == 1)
+    assert len(stub.scan_requests) == 1
+    assert stub.scan_requests[0]['targets'] == ['1:a', '1:b']
+    assert coordinator.last_scan_success
+    assert coordinator.get_status()['total_requests'] == 3
+
+
+def test_request_without_paths_scans_everything(stub, tmp_path):
+    coordinator = make_coordinator(stub, tmp_path)
+    coordinator.request_scan('test', [str(tmp_path / 'a/1.mp3')])
+    coordinator.request_scan('test')
+
+    assert wait_until(lambda: coordinator.total_scans == 1)
+    assert stub.scan_requests[0]['targets'] == []
+
+
+def test_debounce_waits_for_quiet_period(stub, tmp_path):
+    coordinator = make_coordinator(stub, tmp_path, debounce=0.3)
+    for index in range(4):
+        coordinator.request_scan('test', [str(tmp_path / f"{index}.mp3")])
+        last_request = time.time()
+        time.sleep(0.1)
+
+    assert wait_until(lambda: coordinator.total_scans == 1)
+    # 最后一次请求之后至少等待一个去抖窗口，期间的请求合并为一次扫描
+    assert stub.scan_requests[0]['time'] - last_request >= 0.25
+    assert len(stub.scan_requests) == 1
+
+
+def test_max_delay_bounds_continuous_requests(stub, tmp_path):
+    coordinator = make_coordinator(stub, tmp_path, debounce=0.3, max_delay=0.5)
+    deadline = time.monotonic() + 1.0
+    while time.monotonic() < deadline:
+        coordinator.request_scan('test', [str(tmp_path / 'a.mp3')])
+        time.sleep(0.05)
+
+    # 请求持续不断时，最长等待 max_delay 后也会扫描
+    assert coordinator.total_scans >= 1
+
+
+def test_scan_is_deferred_while_server_is_scanning(stub, tmp_path):
+    stub.scan_duration = 0.5
+    coordinator = make_coordinator(stub, tmp_path, debounce=0.05)
+    coordinator.request_scan('first', [str(tmp_path / 'a/1.mp3')])
+    assert wait_until(lambda: coordinator.total_scans == 1)
+
+    coordinator.request_scan('second', [str(tmp_path / 'b/2.mp3')])
+    assert wait_until(lambda: coordinator.total_scans == 2)
+    first, second = stub.scan_requests
+    assert second['time'] - first['time'] >= 0.5
+    assert second['targets'] == ['1:b']
+
+
+def test_forwarded_requests_merge_in_worker_coordinator(stub, tmp_path):
+    inbox = tmp_path / 'scan_requests'
+    worker = make_coordinator(stub, tmp_path / 'music')
+    worker.inbox_path = inbox
+    webs = [make_coordinator(stub, tmp_path / 'music') for _ in range(3)]
+    for index, web in enumerate(webs):
+        web.inbox_path = inbox
+        web.forward_requests = True
+        assert web.request_scan('标签更新', [str(tmp_path / 'music' / f"{index}" / 'a.mp3')])
+
+    # Web进程只写入请求文件，不自己触发扫描
+    time.sleep(0.3)
+    assert stub.scan_requests == []
+    assert len(list(inbox.glob('*.json'))) == 3
+
+    worker.request_scan('批量下载完成', [str(tmp_path / 'music' / '0' / 'b.mp3')])
+    assert worker.claim_forwarded_requests() == 3
+    assert list(inbox.glob('*.json')) == []
+
+    assert wait_until(lambda: worker.total_scans == 1)
+    time.sleep(0.3)
+    assert len(stub.scan_requests) == 1
+    assert stub.scan_requests[0]['targets'] == ['1:0', '1:1', '1:2']
+
+
+def test_forwarded_request_without_paths_scans_everything(stub, tmp_path):
+    worker = make_coordinator(stub, tmp_path)
+    web = make_coordinator(stub, tmp_path)
+    web.inbox_path = worker.inbox_path = tmp_path / 'scan_requests'
+    web.forward_requests = True
+
+    web.request_scan('手动')
+    worker.start_inbox()
+    try:
+        assert wait_until(lambda: worker.total_scans == 1)
+    finally:
+        worker.stop_inbox()
+    assert stub.scan_requests[0]['targets'] == []
+
+
+class FakeNavidrome:
+    """一直报告扫描中、可以让触发扫描抛出异常的Navidrome服务"""
+
+    def __init__(self, scanning=False, errors=0):
+        self.scanning = scanning
+        self.errors = errors
+        self.scans = []
+
+    def is_scanning(self):
+        return self.scanning
+
+    def trigger_scan(self, folders=None):
+        self.scans.append(folders)
+        if self.errors:
+            self.errors -= 1
+            raise ConnectionError('连接被重置')
+        return True
+
+
+def make_fake_coordinator(navidrome, max_delay=5.0):
+    coordinator = ScanCoordinator(navidrome)
+    coordinator.debounce = 0.05
+    coordinator.max_delay = max_delay
+    coordinator.poll_interval = 0.05
+    return coordinator
+
+
+def test_stuck_server_scan_delays_at_most_max_delay(tmp_path):
+    navidrome = FakeNavidrome(scanning=True)
+    coordinator = make_fake_coordinator(navidrome, max_delay=0.4)
+    started = time.monotonic()
+    coordinator.request_scan('test', [str(tmp_path / 'a.mp3')])
+
+    assert wait_until(lambda: coordinator.total_scans == 1)
+    assert 0.4 <= time.monotonic() - started < 3
+    assert navidrome.scans == [[str(tmp_path)]]
+
+
+def test_failed_trigger_does_not_stop_coordinator(tmp_path):
+    navidrome = FakeNavidrome(errors=1)
+    coordinator = make_fake_coordinator(navidrome)
+    coordinator.request_scan('first')
+    assert wait_until(lambda: coordinator.total_scans == 1)
+    assert coordinator.last_scan_success is False
+
+    coordinator.request_scan('second')
+    assert wait_until(lambda: coordinator.total_scans == 2)
+    assert coordinator.last_scan_success is True
+    assert navidrome.scans == [None, None]
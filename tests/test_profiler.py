@@ -0,0 +1,115 @@
+"""
+任务性能分析测试：运行时开关、热点摘要、保留数量（PROFILE_KEEP）和 /api/profiling 接口
+"""
+import time
+
+import pytest
+
+from utils import profiler as profiler_module
+from utils.profiler import JobProfiler
+
+
+def busy_stage():
+    """一个耗时可测的简单阶段"""
+    return sum(index * index for index in range(200000))
+
+
+@pytest.fixture
+def profiler(tmp_path, monkeypatch):
+    monkeypatch.setattr(profiler_module, 'PROFILE_ENABLED', False)
+    monkeypatch.setattr(profiler_module, 'PROFILE_TOP', 5)
+    return JobProfiler(str(tmp_path / 'profiles'))
+
+
+@pytest.fixture
+def client(profiler, monkeypatch):
+    import app as app_module
+    monkeypatch.setattr(app_module.auth_service, 'login_required', False)
+    monkeypatch.setattr(app_module.profiling_controller, 'profiler', profiler)
+    with app_module.app.test_client() as client:
+        yield client
+
+
+def run_job(profiler, job_id):
+    with profiler.profile('download', job_id):
+        busy_stage()
+
+
+def test_disabled_profiler_records_nothing(profiler):
+    assert not profiler.is_enabled()
+    run_job(profiler, 'job-1')
+    assert profiler.recent_jobs() == []
+
+
+def test_profiled_stage_saves_top_hotspots(profiler):
+    profiler.set_enabled(True)
+    with profiler.profile('download', 'job-1234567890abcdef'):
+        # 同一线程中嵌套的记录被忽略
+        with profiler.profile('tag', 'nested'):
+            busy_stage()
+
+    jobs = profiler.recent_jobs()
+    assert len(jobs) == 1
+    job = jobs[0]
+    assert (job['kind'], job['job_id']) == ('download', 'job-1234567890abcdef')
+    assert '-download-job-12345678-' in job['name']
+    assert job['wall_seconds'] > 0 and job['cpu_seconds'] > 0
+    assert (profiler.profile_dir / f"{job['name']}.prof").is_file()
+
+    hotspots = job['hotspots']
+    assert len(hotspots) == 5
+    assert [row['self_seconds'] for row in hotspots] == sorted(
+        (row['self_seconds'] for row in hotspots), reverse=True)
+    genexpr = next(row for row in hotspots if row['location'].startswith('test_profiler.py:'))
+    assert genexpr['calls'] > 1000
+    assert set(genexpr) == {'function', 'location', 'calls', 'self_seconds', 'cumulative_seconds'}
+
+
+def test_only_recent_profiles_are_kept(profiler, monkeypatch):
+    monkeypatch.setattr(profiler_module, 'PROFILE_KEEP', 2)
+    profiler.set_enabled(True)
+    for index in range(3):
+        run_job(profiler, f"job-{index}")
+        time.sleep(0.002)
+
+    assert [job['job_id'] for job in profiler.recent_jobs()] == ['job-2', 'job-1']
+    assert len(list(profiler.profile_dir.glob('*.prof'))) == 2
+    assert len(list(profiler.profile_dir.glob('*.json'))) == 2
+
+
+def test_profiling_api(profiler, client):
+    response = client.post('/api/profiling', json={'enabled': True})
+    assert response.status_code == 200
+    assert response.get_json() == {
+        'success': True, 'data': {'enabled': True, 'forced': False}, 'message': '性能分析已开启'
+    }
+    assert profiler.flag_file.exists()
+
+    run_job(profiler, 'job-a')
+    run_job(profiler, 'job-b')
+    data = client.get('/api/profiling').get_json()['data']
+    assert data['enabled'] and not data['forced']
+    assert data['profile_dir'] == str(profiler.profile_dir)
+    assert [job['job_id'] for job in data['recent']] == ['job-b', 'job-a']
+    assert data['aggregate']['jobs'] == 2
+    # 汇总热点合并两个任务的 .prof 文件
+    aggregated = next(row for row in data['aggregate']['hotspots'] if row['location'].startswith('test_profiler.py:'))
+    assert aggregated['calls'] == sum(
+        row['calls'] for job in data['recent'] for row in job['hotspots'] if row['location'] == aggregated['location']
+    )
+
+    assert [job['job_id'] for job in client.get('/api/profiling?limit=1').get_json()['data']['recent']] == ['job-b']
+    assert client.get('/api/profiling?limit=abc').status_code == 400
+    assert client.post('/api/profiling', json={'enabled': 'yes'}).status_code == 400
+
+    name = data['recent'][0]['name']
+    download = client.get(f'/api/profiling/{name}')
+    assert download.status_code == 200
+    assert download.data == (profiler.profile_dir / f"{name}.prof").read_bytes()
+    assert client.get('/api/profiling/missing').status_code == 404
+
+    response = client.post('/api/profiling', json={'enabled': False})
+    assert response.get_json()['data'] == {'enabled': False, 'forced': False}
+    assert not profiler.flag_file.exists()
+    run_job(profiler, 'job-c')
+    assert len(profiler.recent_jobs()) == 2
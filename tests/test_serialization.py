@@ -0,0 +1,135 @@
+"""
+序列化层测试：orjson和标准库后端的往返序列化、register_encoder 注册的类型编码器、Flask JSON提供者
+"""
+from dataclasses import dataclass
+from datetime import date, datetime
+
+import pytest
+from flask import Flask, jsonify, request
+
+from models.audio_file import AudioFile
+from models.batch_download import DownloadTask, TaskStatus
+from utils import serialization
+from utils.json_provider import FastJSONProvider
+
+BACKENDS = ['json', pytest.param('orjson', marks=pytest.mark.skipif(
+    serialization.orjson is None, reason='orjson未安装'))]
+
+
+@dataclass
+class Point:
+    x: int
+    y: int
+
+
+class Point3D(Point):
+    pass
+
+
+@pytest.fixture(params=BACKENDS)
+def backend(request, monkeypatch):
+    """切换到指定后端，测试结束后恢复"""
+    monkeypatch.setattr(serialization, '_backend', serialization.create_backend(request.param))
+    return request.param
+
+
+@pytest.fixture
+def encoders(monkeypatch):
+    """测试中注册的编码器不影响其他测试"""
+    monkeypatch.setattr(serialization, '_encoders', dict(serialization._encoders))
+
+
+def roundtrip(obj):
+    return serialization.loads(serialization.dumps(obj))
+
+
+def test_backend_is_selected(backend):
+    assert serialization.backend_name() == backend
+    assert isinstance(serialization.dumps({'a': 1}), bytes)
+
+
+def test_audio_file_roundtrip(backend, tmp_path):
+    audio = AudioFile(
+        filename='晴天.mp3', filepath=str(tmp_path / '晴天.mp3'), title='晴天', artist='周杰伦',
+        album='叶惠美', duration=269, cover_filename='晴天.jpg'
+    )
+    data = serialization.dumps(audio)
+
+    assert '周杰伦'.encode('utf-8') in data
+    assert AudioFile.from_dict(serialization.loads(data)) == audio
+
+
+def test_download_task_roundtrip(backend):
+    task = DownloadTask(
+        id='task-1', url='https://www.bilibili.com/video/BV1xx411c7mA', title='晴天',
+        status=TaskStatus.FAILED, error_message='超时', failure_reason='timeout',
+        created_at=1700000000.5, stage_timings={'resolve': 0.25}
+    )
+    data = roundtrip({'tasks': [task]})
+
+    assert data['tasks'][0]['status'] == 'failed'
+    restored = DownloadTask.from_dict(data['tasks'][0])
+    assert restored.status is TaskStatus.FAILED
+    assert restored.to_dict() == task.to_dict()
+
+
+def test_builtin_types(backend, tmp_path):
+    data = roundtrip({
+        'at': datetime(2024, 5, 1, 12, 30, 15), 'day': date(2024, 5, 1),
+        'path': tmp_path / 'a.mp3', 'status': TaskStatus.COMPLETED, 'ids': (1, 2), 1: 'int key'
+    })
+
+    assert data == {
+        'at': '2024-05-01T12:30:15', 'day': '2024-05-01', 'path': str(tmp_path / 'a.mp3'),
+        'status': 'completed', 'ids': [1, 2], '1': 'int key'
+    }
+    assert datetime.fromisoformat(data['at']) == datetime(2024, 5, 1, 12, 30, 15)
+
+
+def test_registered_encoder_is_used(backend, encoders):
+    # orjson对dataclass有内置转换，注册的编码器优先
+    serialization.register_encoder(Point, lambda point: [point.x, point.y])
+
+    assert roundtrip({'point': Point(1, 2)}) == {'point': [1, 2]}
+    # 子类沿用父类的编码器
+    assert roundtrip(Point3D(3, 4)) == [3, 4]
+
+
+def test_unknown_type_is_rejected(backend):
+    with pytest.raises(TypeError):
+        serialization.dumps(object())
+
+
+def test_backends_produce_identical_output(encoders):
+    if serialization.orjson is None:
+        pytest.skip('orjson未安装')
+    serialization.register_encoder(Point, lambda point: {'x': point.x, 'y': point.y})
+    task = DownloadTask(id='task-1', url='https://www.bilibili.com/video/BV1xx411c7mA', created_at=1.0)
+    obj = {'task': task, 'point': Point(1, 2), 'at': datetime(2024, 5, 1), '名称': '收藏夹'}
+
+    outputs = {name: serialization.create_backend(name).dumps(obj) for name in ('json', 'orjson')}
+    assert outputs['json'] == outputs['orjson']
+
+
+def test_unknown_backend_is_rejected():
+    with pytest.raises(ValueError):
+        serialization.create_backend('simplejson')
+
+
+def test_flask_provider_uses_backend(backend, tmp_path):
+    app = Flask(__name__)
+    app.json = FastJSONProvider(app)
+    audio = AudioFile(filename='a.mp3', filepath=str(tmp_path / 'a.mp3'), title='标题', artist='歌手')
+
+    @app.route('/echo', methods=['POST'])
+    def echo():
+        return jsonify({'received': request.get_json(), 'file': audio})
+
+    with app.test_client() as client:
+        response = client.post('/echo', json={'name': '收藏夹', 'at': datetime(2024, 5, 1)})
+
+    assert response.mimetype == 'application/json'
+    assert response.get_json() == {
+        'received': {'name': '收藏夹', 'at': '2024-05-01T00:00:00'},
+        'file': audio.to_dict()
+    }
@@ -0,0 +1,136 @@
+"""
+内存缓存工具模块
+"""
+import time
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+
+class LRUCache:
+    """线程安全的LRU/TTL缓存
+
+    超过条目上限或总权重上限时按最近最少使用顺序淘汰，超过TTL未访问的条目在读取时过期。
+    pinned 返回True的条目（例如运行中的任务）不会被淘汰或过期。
+    """
+
+    def __init__(self, max_entries: int, max_weight: int = 0, ttl: float = 0,
+                 weigher: Optional[Callable[[Any], int]] = None,
+                 pinned: Optional[Callable[[Any], bool]] = None):
+        self.max_entries = max_entries
+        self.max_weight = max_weight
+        self.ttl = ttl
+        self.weigher = weigher or (lambda value: 1)
+        self.pinned = pinned or (lambda value: False)
+
+        # {key: (value, 权重, 最后访问时间)}
+        self._entries: 'OrderedDict[Hashable, Tuple[Any, int, float]]' = OrderedDict()
+        self._weight = 0
+        self._lock = threading.RLock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._entries
+
+    def get(self, key: Hashable, validate: Optional[Callable[[Any], bool]] = None) -> Optional[Any]:
+        """读取缓存；validate返回False时视为未命中并移除条目"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            value, weight, accessed = entry
+            now = time.monotonic()
+            if self.ttl > 0 and now - accessed > self.ttl and not self.pinned(value):
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            if validate is not None and not validate(value):
+                self._remove(key)
+                self.misses += 1
+                return None
+
+            self._entries[key] = (value, weight, now)
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Hashable, value: Any):
+        """写入缓存并按需淘汰"""
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+            weight = self.weigher(value)
+            self._entries[key] = (value, weight, time.monotonic())
+            self._weight += weight
+            self._evict()
+
+    def pop(self, key: Hashable) -> Optional[Any]:
+        """移除并返回条目"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._remove(key)
+            return entry[0]
+
+    def clear(self):
+        """清空缓存"""
+        with self._lock:
+            self._entries.clear()
+            self._weight = 0
+
+    def _remove(self, key: Hashable):
+        """移除条目（调用方需持有锁）"""
+        _, weight, _ = self._entries.pop(key)
+        self._weight -= weight
+
+    def _over_limit(self) -> bool:
+        """是否超过容量上限"""
+        if len(self._entries) > self.max_entries:
+            return True
+        return self.max_weight > 0 and self._weight > self.max_weight
+
+    def _evict(self):
+        """从最久未使用的条目开始淘汰，跳过固定条目（调用方需持有锁）"""
+        if not self._over_limit():
+            return
+
+        for key in list(self._entries):
+            value = self._entries[key][0]
+            if self.pinned(value):
+                continue
+            self._remove(key)
+            self.evictions += 1
+            if not self._over_limit():
+                return
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取缓存统计信息"""
+        with self._lock:
+            pinned = sum(1 for value, _, _ in self._entries.values() if self.pinned(value))
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'pinned': pinned,
+                'weight': self._weight,
+                'max_entries': self.max_entries,
+                'max_weight': self.max_weight,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups * 100, 2) if lookups else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations
+            }
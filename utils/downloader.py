@@ -1,6 +1,5 @@
 import os
 import re
-import traceback
 import yt_dlp
 import logging
 from config import DOWNLOAD_PATH, TEMP_PATH
@@ -103,7 +102,7 @@ def download_bilibili_audio(url):
                     else:
                         cover_filename = os.path.basename(original_cover_path)
                 except Exception as e:
-                    logger.warning(f"封面下载失败: {str(e)}")
+                    logger.warning("封面下载失败: %s", e)
             
             return {
                 "status": "success",
@@ -116,7 +115,7 @@ def download_bilibili_audio(url):
                 "original_url": url
             }
     except Exception as e:
-        logger.error(f"下载失败: {str(e)}\n{traceback.format_exc()}")
+        logger.error("下载失败: %s", e, exc_info=True)
         # 清理可能的部分下载文件
         if 'final_filename' in locals() and os.path.exists(final_filename):
             os.remove(final_filename)
@@ -18,6 +18,18 @@ class DownloadError(BilibiliDownloaderError):
     pass
 
 
+class DownloadLimitError(DownloadError):
+    """下载超出限制（大小、时长或超时）而被中止"""
+    
+    TOO_LARGE = 'too_large'
+    TOO_LONG = 'too_long'
+    TIMEOUT = 'timeout'
+    
+    def __init__(self, reason: str, message: str):
+        super().__init__(message)
+        self.reason = reason
+
+
 class ValidationError(BilibiliDownloaderError):
     """输入验证错误"""
     pass
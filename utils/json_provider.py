@@ -0,0 +1,26 @@
+"""
+Flask JSON提供者模块
+"""
+from typing import Any
+
+from flask.json.provider import DefaultJSONProvider
+
+from utils import serialization
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """使用 utils.serialization 的JSON提供者
+
+    jsonify 和 request.get_json 与批量任务持久化共用同一个序列化后端和类型编码器，
+    响应体直接使用后端输出的bytes。
+    """
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        return serialization.dumps(obj).decode('utf-8')
+
+    def loads(self, s, **kwargs: Any) -> Any:
+        return serialization.loads(s)
+
+    def response(self, *args: Any, **kwargs: Any):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(serialization.dumps(obj), mimetype=self.mimetype)
@@ -1,90 +1,224 @@
 """
 日志配置模块
+
+所有日志经由根日志器上的 QueueHandler 放入内存队列，由 QueueListener 的后台线程写入文件和控制台，
+请求线程和下载线程不会因为磁盘I/O阻塞。通过 log_context 设置的任务ID等上下文会附加到每条日志上，
+LOG_FORMAT=json 时每行输出一个JSON对象。
 """
+import re
+import json
+import time
+import queue
+import atexit
 import logging
-import os
-from logging.handlers import RotatingFileHandler
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 from pathlib import Path
+from typing import Any, Dict, Iterator, Optional
+
+from config import LOG_LEVEL, LOG_FILE, LOG_MAX_SIZE, LOG_BACKUP_COUNT, LOG_FORMAT, LOG_PROGRESS_INTERVAL
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+# 当前线程（或协程）的日志上下文，例如 {'batch_id': ..., 'task_id': ...}
+_log_context: ContextVar[Dict[str, Any]] = ContextVar('log_context', default={})
+
+_listener: Optional[QueueListener] = None
+_setup_lock = threading.Lock()
+
+
+@contextmanager
+def log_context(**fields) -> Iterator[None]:
+    """在代码块内为日志附加上下文字段（可嵌套）"""
+    token = _log_context.set({**_log_context.get(), **fields})
+    try:
+        yield
+    finally:
+        _log_context.reset(token)
+
+
+class ContextFilter(logging.Filter):
+    """把日志上下文附加到记录上（在产生日志的线程中执行）"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.context = _log_context.get()
+        return True
+
+
+class JSONFormatter(logging.Formatter):
+    """每条日志输出为一行JSON（message 为格式化后的消息，msg 为未代入参数的模板，便于按模板聚合）"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            'time': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'msg': getattr(record, 'template', None) or str(record.msg),
+            'thread': record.threadName
+        }
+        data.update(getattr(record, 'context', None) or {})
+        if record.exc_info:
+            data['exc_info'] = self.formatException(record.exc_info)
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """文本格式，上下文字段追加在消息后"""
+
+    def __init__(self):
+        super().__init__(TEXT_FORMAT)
+
+    def format(self, record: logging.LogRecord) -> str:
+        text = super().format(record)
+        context = getattr(record, 'context', None)
+        if context:
+            text += ' [' + ' '.join(f"{key}={value}" for key, value in context.items()) + ']'
+        return text
+
+
+class _QueueHandler(QueueHandler):
+    """保留异常信息交给监听线程格式化
+
+    标准库的 QueueHandler 在产生日志的线程中就格式化消息和异常堆栈；内存队列不需要序列化记录，
+    这里只合并消息参数（原始模板保存在 template 中，作为JSON日志的 msg 字段），
+    堆栈格式化和JSON编码都在监听线程中进行。
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.template = str(record.msg)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+
+def setup_logging(level: str = LOG_LEVEL, log_file: Optional[str] = LOG_FILE,
+                  console: bool = False, fmt: str = LOG_FORMAT) -> QueueListener:
+    """配置进程的根日志器（每个进程只配置一次）
+
+    log_file 为空时不写文件；console 为True时同时输出到标准错误。
+    后台执行进程（worker.py）只输出到标准错误，由gunicorn主进程或systemd收集。
+    """
+    global _listener
+    with _setup_lock:
+        if _listener is not None:
+            return _listener
+
+        formatter = JSONFormatter() if fmt == 'json' else TextFormatter()
+        handlers = []
+        if log_file:
+            Path(log_file).parent.mkdir(parents=True, exist_ok=True)
+            file_handler = RotatingFileHandler(
+                log_file,
+                maxBytes=LOG_MAX_SIZE,
+                backupCount=LOG_BACKUP_COUNT,
+                encoding='utf-8'
+            )
+            file_handler.setFormatter(formatter)
+            handlers.append(file_handler)
+        if console:
+            console_handler = logging.StreamHandler()
+            console_handler.setFormatter(formatter)
+            handlers.append(console_handler)
+
+        log_queue: queue.SimpleQueue = queue.SimpleQueue()
+        queue_handler = _QueueHandler(log_queue)
+        queue_handler.addFilter(ContextFilter())
+
+        root = logging.getLogger()
+        root.setLevel(getattr(logging, level.upper(), logging.INFO))
+        root.addHandler(queue_handler)
+
+        _listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+        _listener.start()
+        atexit.register(_listener.stop)
+        return _listener
+
+
+class YtDlpLogger:
+    """交给yt-dlp的日志适配器
+
+    yt-dlp 把所有屏幕输出（包括每个数据块的下载进度行）都交给 debug；并行下载时进度行会刷屏，
+    这里每个下载线程每隔 interval 秒最多输出一条进度行，下载完成（100%）的进度行总是输出。
+    """
+
+    PROGRESS_PATTERN = re.compile(r'\[download\]\s+\d+(?:\.\d+)?%')
+
+    def __init__(self, logger: logging.Logger, interval: float = LOG_PROGRESS_INTERVAL):
+        self.logger = logger
+        self.interval = interval
+        self._last_progress: Dict[int, float] = {}
+
+    def debug(self, message: str):
+        if not self.logger.isEnabledFor(logging.DEBUG):
+            return
+        if self.PROGRESS_PATTERN.match(message) and not self._allow_progress(message):
+            return
+        self.logger.debug('%s', message)
+
+    def info(self, message: str):
+        self.logger.info('%s', message)
+
+    def warning(self, message: str):
+        self.logger.warning('%s', message)
+
+    def error(self, message: str):
+        self.logger.error('%s', message)
+
+    def _allow_progress(self, message: str) -> bool:
+        """进度行限流（按线程计时，各下载线程互不影响）"""
+        if '100%' in message:
+            return True
+        thread_id = threading.get_ident()
+        now = time.monotonic()
+        last = self._last_progress.get(thread_id)
+        if last is not None and now - last < self.interval:
+            return False
+        self._last_progress[thread_id] = now
+        return True
 
 
 class Logger:
     """日志管理器"""
-    
+
     def __init__(self, app=None):
         self.app = app
         if app:
             self.init_app(app)
-    
+
     def init_app(self, app):
-        """初始化日志配置"""
+        """初始化日志配置（需在首次访问 app.logger 之前调用，Flask 才不会再添加默认处理器）"""
         self.app = app
-        
-        # 创建日志目录
-        log_dir = Path('logs')
-        log_dir.mkdir(exist_ok=True)
-        
-        # 配置日志级别
-        log_level = getattr(app.config, 'LOG_LEVEL', 'INFO')
-        app.logger.setLevel(getattr(logging, log_level.upper(), logging.INFO))
-        
-        # 如果不在调试模式，添加文件处理器
-        if not app.debug:
-            self._add_file_handler(app)
-        
-        # 添加控制台处理器（开发环境）
-        if app.debug:
-            self._add_console_handler(app)
-    
-    def _add_file_handler(self, app):
-        """添加文件日志处理器"""
-        log_file = getattr(app.config, 'LOG_FILE', 'logs/app.log')
-        max_bytes = getattr(app.config, 'LOG_MAX_SIZE', 10 * 1024 * 1024)  # 10MB
-        backup_count = getattr(app.config, 'LOG_BACKUP_COUNT', 5)
-        
-        file_handler = RotatingFileHandler(
-            log_file,
-            maxBytes=max_bytes,
-            backupCount=backup_count
-        )
-        file_handler.setLevel(logging.ERROR)
-        
-        formatter = logging.Formatter(
-            '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-        )
-        file_handler.setFormatter(formatter)
-        
-        app.logger.addHandler(file_handler)
-    
-    def _add_console_handler(self, app):
-        """添加控制台日志处理器"""
-        console_handler = logging.StreamHandler()
-        console_handler.setLevel(logging.DEBUG)
-        
-        formatter = logging.Formatter(
-            '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+        setup_logging(
+            level=app.config.get('LOG_LEVEL', LOG_LEVEL),
+            log_file=app.config.get('LOG_FILE', LOG_FILE),
+            console=True,
+            fmt=app.config.get('LOG_FORMAT', LOG_FORMAT)
         )
-        console_handler.setFormatter(formatter)
-        
-        app.logger.addHandler(console_handler)
-    
+        app.logger.setLevel(logging.NOTSET)
+
     def log_error(self, message: str, exception: Exception = None):
         """记录错误日志"""
         if self.app:
             if exception:
-                self.app.logger.error(f"{message}: {str(exception)}", exc_info=True)
+                self.app.logger.error("%s: %s", message, exception, exc_info=True)
             else:
                 self.app.logger.error(message)
-    
+
     def log_warning(self, message: str):
         """记录警告日志"""
         if self.app:
             self.app.logger.warning(message)
-    
+
     def log_info(self, message: str):
         """记录信息日志"""
         if self.app:
             self.app.logger.info(message)
-    
+
     def log_debug(self, message: str):
         """记录调试日志"""
         if self.app:
@@ -0,0 +1,453 @@
+"""
+运行指标模块
+
+进程内的计数器、仪表和直方图，按Prometheus文本格式输出。多进程部署（BATCH_EXECUTOR=process）时
+每个进程定期把自己的指标快照写入 METRICS_DIR（文件名为进程号加随机后缀，进程号被复用也不会覆盖），
+/metrics 由任意一个Web进程合并所有快照后返回：计数器和直方图累加所有进程（包括已退出的进程），
+仪表只累加最近仍在写快照的进程。已退出进程的计数器和直方图由后台执行进程合并到
+_retired.json 后删除其快照，Web进程被反复回收时快照文件不会越积越多。
+"""
+import os
+import time
+import uuid
+import bisect
+import logging
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from utils import serialization
+from config import METRICS_DIR, METRICS_FLUSH_INTERVAL
+
+logger = logging.getLogger(__name__)
+
+# 阶段耗时直方图的桶（秒）：解析、打标签、触发扫描通常在秒级，下载和转码可能持续数分钟
+STAGE_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800)
+
+# 快照中的指标族 {名称: {'type', 'help', 'samples': [[样本名, 标签, 值], ...]}}
+Family = Dict[str, Any]
+
+# 已退出进程的累计值 {'folded': [已合并的快照文件名], 'families': {...}}
+RETIRED_FILE = '_retired.json'
+
+
+def _process_alive(pid: int) -> bool:
+    """进程是否仍在运行（Windows上无法安全检查，只按快照时间判断）"""
+    if os.name == 'nt':
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        return True
+    return True
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    """格式化标签 {a="1",b="2"}"""
+    if not labels:
+        return ''
+    parts = []
+    for key, value in labels.items():
+        value = str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+        parts.append(f'{key}="{value}"')
+    return '{' + ','.join(parts) + '}'
+
+
+def _format_value(value: float) -> str:
+    """格式化样本值"""
+    if value == float('inf'):
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class _Metric:
+    """指标基类"""
+
+    type = ''
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], Any] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, Any]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, '')) for name in self.labelnames)
+
+    def _labels(self, key: Tuple[str, ...]) -> Dict[str, str]:
+        return dict(zip(self.labelnames, key))
+
+    def samples(self) -> List[list]:
+        raise NotImplementedError
+
+    def family(self) -> Family:
+        """导出为指标族"""
+        return {'type': self.type, 'help': self.documentation, 'samples': self.samples()}
+
+
+class Counter(_Metric):
+    """只增不减的计数器"""
+
+    type = 'counter'
+
+    def inc(self, amount: float = 1, **labels):
+        """增加计数"""
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self) -> List[list]:
+        with self._lock:
+            return [[self.name, self._labels(key), value] for key, value in self._values.items()]
+
+
+class Gauge(_Metric):
+    """可增可减的仪表"""
+
+    type = 'gauge'
+
+    def set(self, value: float, **labels):
+        """设置当前值"""
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+    def inc(self, amount: float = 1, **labels):
+        """增加当前值"""
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        """减少当前值"""
+        self.inc(-amount, **labels)
+
+    def samples(self) -> List[list]:
+        with self._lock:
+            return [[self.name, self._labels(key), value] for key, value in self._values.items()]
+
+
+class Histogram(_Metric):
+    """直方图（累计桶、总和、次数）"""
+
+    type = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = STAGE_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        """记录一次观测值"""
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts = self._values.get(key)
+            if counts is None:
+                # [各桶（非累计）..., +Inf桶, 总和]
+                counts = self._values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            counts[index] += 1
+            counts[-1] += value
+
+    @contextmanager
+    def time(self, **labels) -> Iterator[None]:
+        """记录代码块的耗时（秒），代码块抛出异常时同样记录"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def samples(self) -> List[list]:
+        samples = []
+        with self._lock:
+            items = [(key, list(counts)) for key, counts in self._values.items()]
+        for key, counts in items:
+            labels = self._labels(key)
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                samples.append([f'{self.name}_bucket', {**labels, 'le': _format_value(bound)}, cumulative])
+            samples.append([f'{self.name}_sum', labels, counts[-1]])
+            samples.append([f'{self.name}_count', labels, cumulative])
+        return samples
+
+
+class MetricsRegistry:
+    """指标注册表
+
+    除了直接记录的指标，还可以注册采集函数，在导出时读取队列长度、缓存命中数等现有状态。
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: List[Callable[[], Dict[str, Family]]] = []
+        self._lock = threading.Lock()
+        self._snapshot_thread: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+        self._fold_retired = False
+        self._instance = ''
+        self.snapshot_dir = Path(METRICS_DIR)
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        """获取或创建计数器"""
+        return self._register(Counter(name, documentation, labelnames))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        """获取或创建仪表"""
+        return self._register(Gauge(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = STAGE_BUCKETS) -> Histogram:
+        """获取或创建直方图"""
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def register_collector(self, collector: Callable[[], Dict[str, Family]]):
+        """注册采集函数，返回 {名称: 指标族}"""
+        with self._lock:
+            self._collectors.append(collector)
+
+    def collect(self) -> Dict[str, Family]:
+        """导出本进程的所有指标"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+            collectors = list(self._collectors)
+
+        families = {metric.name: metric.family() for metric in metrics}
+        for collector in collectors:
+            try:
+                for name, family in collector().items():
+                    _merge_family(families, name, family)
+            except Exception as e:
+                logger.warning("采集指标失败: %s", e)
+        return families
+
+    def collect_all(self) -> Dict[str, Family]:
+        """合并本进程、其他进程快照和已退出进程累计值中的指标"""
+        families = self.collect()
+        if self._snapshot_thread is None:
+            return families
+
+        now = time.time()
+        own_file = self._snapshot_file()
+        snapshot_files = [path for path in self._iter_snapshot_files() if path != own_file]
+        retired = self._read_retired()
+        folded = set(retired['folded'])
+        for name, family in retired['families'].items():
+            _merge_family(families, name, family)
+
+        for snapshot_file in snapshot_files:
+            if snapshot_file.name in folded:
+                continue
+            snapshot = self._read_snapshot(snapshot_file)
+            if snapshot is None:
+                continue
+
+            # 长时间没有更新的进程已经退出，只保留累计值
+            alive = now - snapshot.get('written_at', 0) <= METRICS_FLUSH_INTERVAL * 3
+            for name, family in snapshot.get('families', {}).items():
+                if family.get('type') == 'gauge' and not alive:
+                    continue
+                _merge_family(families, name, family)
+        return families
+
+    def _iter_snapshot_files(self) -> Iterator[Path]:
+        """各进程的快照文件（不含已退出进程的累计值文件）"""
+        for snapshot_file in self.snapshot_dir.glob('*.json'):
+            if not snapshot_file.name.startswith('_'):
+                yield snapshot_file
+
+    def _read_snapshot(self, snapshot_file: Path) -> Optional[Dict[str, Any]]:
+        """读取快照，文件不存在或损坏时返回None"""
+        try:
+            with open(snapshot_file, 'rb') as f:
+                return serialization.loads(f.read())
+        except FileNotFoundError:
+            return None
+        except (OSError,) + serialization.DECODE_ERRORS as e:
+            logger.warning("读取指标快照失败: %s - %s", snapshot_file.name, e)
+            return None
+
+    def _read_retired(self) -> Dict[str, Any]:
+        """读取已退出进程的累计值"""
+        retired = self._read_snapshot(self.snapshot_dir / RETIRED_FILE) or {}
+        return {'folded': retired.get('folded', []), 'families': retired.get('families', {})}
+
+    def fold_retired_snapshots(self) -> int:
+        """把已退出进程的计数器和直方图合并到累计值文件并删除其快照，返回合并的快照数
+
+        只能由一个进程调用（后台执行进程）。先写入累计值文件（记录已合并的文件名，读取方跳过这些快照），
+        再删除快照文件，任何时刻读取都不会重复计算。
+        """
+        now = time.time()
+        own_file = self._snapshot_file()
+        retired = self._read_retired()
+        snapshot_files = {path.name: path for path in self._iter_snapshot_files() if path != own_file}
+        # 已删除的快照不再需要记录
+        folded = [name for name in retired['folded'] if name in snapshot_files]
+        families = retired['families']
+
+        newly_folded = []
+        for name, snapshot_file in snapshot_files.items():
+            if name in folded:
+                continue
+            snapshot = self._read_snapshot(snapshot_file)
+            if snapshot is None or now - snapshot.get('written_at', 0) <= METRICS_FLUSH_INTERVAL * 3:
+                continue
+            try:
+                pid = int(name.split('-', 1)[0])
+            except ValueError:
+                pid = 0
+            if pid and _process_alive(pid):
+                continue
+
+            for family_name, family in snapshot.get('families', {}).items():
+                if family.get('type') != 'gauge':
+                    _merge_family(families, family_name, family)
+            newly_folded.append(name)
+
+        if newly_folded or len(folded) != len(retired['folded']):
+            folded.extend(newly_folded)
+            serialization.dump_file(
+                {'written_at': now, 'folded': folded, 'families': families},
+                self.snapshot_dir / RETIRED_FILE
+            )
+        for name in folded:
+            try:
+                snapshot_files[name].unlink()
+            except OSError:
+                continue
+        if newly_folded:
+            logger.info("已合并 %s 个已退出进程的指标快照", len(newly_folded))
+        return len(newly_folded)
+
+    def render(self) -> str:
+        """按Prometheus文本格式输出"""
+        lines = []
+        for name, family in sorted(self.collect_all().items()):
+            lines.append(f"# HELP {name} {family['help']}")
+            lines.append(f"# TYPE {name} {family['type']}")
+            for sample_name, labels, value in family['samples']:
+                lines.append(f"{sample_name}{_format_labels(labels)} {_format_value(value)}")
+        return '\n'.join(lines) + '\n'
+
+    def start_snapshots(self, fold_retired: bool = False):
+        """启动快照线程（多进程部署时在每个进程中调用；fold_retired 只在后台执行进程中开启）"""
+        if self._snapshot_thread is not None and self._snapshot_thread.is_alive():
+            return
+
+        self.snapshot_dir.mkdir(parents=True, exist_ok=True)
+        self._instance = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._fold_retired = fold_retired
+        self._stop_event.clear()
+        self._snapshot_thread = threading.Thread(target=self._snapshot_worker, name='metrics-snapshot', daemon=True)
+        self._snapshot_thread.start()
+
+    def stop_snapshots(self):
+        """停止快照线程并写入最后一次快照"""
+        self._stop_event.set()
+        self.write_snapshot()
+
+    def _snapshot_worker(self):
+        """快照工作线程"""
+        while not self._stop_event.is_set():
+            self.write_snapshot()
+            if self._fold_retired:
+                try:
+                    self.fold_retired_snapshots()
+                except Exception as e:
+                    logger.warning("合并指标快照失败: %s", e)
+            self._stop_event.wait(METRICS_FLUSH_INTERVAL)
+
+    def _snapshot_file(self) -> Path:
+        return self.snapshot_dir / f"{self._instance or os.getpid()}.json"
+
+    def write_snapshot(self):
+        """把本进程的指标写入快照文件（原子替换）"""
+        snapshot_file = self._snapshot_file()
+        try:
+            serialization.dump_file({'written_at': time.time(), 'families': self.collect()}, snapshot_file)
+        except Exception as e:
+            logger.warning("写入指标快照失败: %s", e)
+
+
+def _merge_family(families: Dict[str, Family], name: str, family: Family):
+    """把指标族累加到 families 中（相同样本名和标签的值相加）"""
+    target = families.get(name)
+    if target is None:
+        families[name] = {'type': family['type'], 'help': family['help'], 'samples': list(family['samples'])}
+        return
+
+    index = {(sample[0], tuple(sorted(sample[1].items()))): sample for sample in target['samples']}
+    for sample_name, labels, value in family['samples']:
+        key = (sample_name, tuple(sorted(labels.items())))
+        existing = index.get(key)
+        if existing is None:
+            sample = [sample_name, dict(labels), value]
+            target['samples'].append(sample)
+            index[key] = sample
+        else:
+            existing[2] += value
+
+
+def gauge_family(name: str, documentation: str, samples: Iterable[Tuple[Dict[str, str], float]]) -> Family:
+    """用于采集函数的仪表指标族"""
+    return {'type': 'gauge', 'help': documentation, 'samples': [[name, labels, value] for labels, value in samples]}
+
+
+def counter_family(name: str, documentation: str, samples: Iterable[Tuple[Dict[str, str], float]]) -> Family:
+    """用于采集函数的计数器指标族"""
+    return {'type': 'counter', 'help': documentation, 'samples': [[name, labels, value] for labels, value in samples]}
+
+
+REGISTRY = MetricsRegistry()
+
+# 下载流水线各阶段：resolve（解析视频信息）、download（下载音频流）、transcode（转码为MP3）、
+# thumbnail（下载封面）、tag（写入标签）、scan（触发Navidrome扫描）
+STAGE_DURATION = REGISTRY.histogram(
+    'bilibili_stage_duration_seconds', '下载流水线各阶段耗时（秒）', ('stage',)
+)
+DOWNLOADED_BYTES = REGISTRY.counter(
+    'bilibili_downloaded_bytes_total', '下载的音视频流字节数'
+)
+DOWNLOADS = REGISTRY.counter(
+    'bilibili_downloads_total', '下载结果计数（error为失败原因或异常类型）', ('result', 'error')
+)
+CACHE_REQUESTS = REGISTRY.counter(
+    'bilibili_cache_requests_total', '缓存查询次数', ('cache', 'result')
+)
+
+
+class StageRecorder:
+    """一次下载的各阶段耗时（秒，单调时钟计时）和下载字节数，同时计入阶段耗时直方图"""
+
+    def __init__(self):
+        self.stages: Dict[str, float] = {}
+        self.downloaded_bytes = 0
+
+    def observe(self, stage: str, seconds: float):
+        """记录阶段耗时（同一阶段多次记录时累加）"""
+        STAGE_DURATION.observe(seconds, stage=stage)
+        self.stages[stage] = round(self.stages.get(stage, 0.0) + seconds, 3)
+
+    @contextmanager
+    def time(self, stage: str) -> Iterator[None]:
+        """记录代码块的耗时，代码块抛出异常时同样记录"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - started)
@@ -0,0 +1,80 @@
+"""
+multipart/form-data 请求体的流式解析
+"""
+from typing import BinaryIO, Dict, List, Optional
+
+from werkzeug.exceptions import RequestEntityTooLarge
+from werkzeug.sansio.multipart import Data, Epilogue, Event, Field, File, MultipartDecoder, NeedData
+
+# 每次从请求体读取的字节数、普通表单字段值的长度上限
+READ_SIZE = 64 * 1024
+MAX_FIELD_SIZE = 64 * 1024
+
+
+class MultipartFileStream:
+    """边读取请求体边解析，把指定字段上传的文件作为可读的二进制流
+
+    request.files 会先把整个上传写入临时文件再交给调用方；这里直接解析 request.stream，
+    读到多少文件内容就返回多少。文件之前的普通字段保存在 form 中，文件之后的字段不再读取。
+    请求体在文件结束前中断时 read 抛出 ValueError。
+    """
+
+    def __init__(self, stream: BinaryIO, boundary: bytes, field_name: str = 'file',
+                 read_size: int = READ_SIZE):
+        self._stream = stream
+        self._decoder = MultipartDecoder(boundary)
+        self._read_size = read_size
+        self._buffer = bytearray()
+        self._more_data = False
+        self.form: Dict[str, str] = {}
+        self.filename: Optional[str] = None
+        self._find_file(field_name)
+
+    def _next_event(self) -> Event:
+        """下一个解析事件，缓冲的数据不够时继续读取请求体"""
+        event = self._decoder.next_event()
+        while isinstance(event, NeedData):
+            self._decoder.receive_data(self._stream.read(self._read_size) or None)
+            event = self._decoder.next_event()
+        return event
+
+    def _find_file(self, field_name: str):
+        """解析到指定文件字段的开头，记录之前的普通字段"""
+        name: Optional[str] = None
+        value: List[bytes] = []
+        size = 0
+        while True:
+            event = self._next_event()
+            if isinstance(event, File) and event.name == field_name:
+                self.filename = event.filename
+                self._more_data = True
+                return
+            if isinstance(event, Field):
+                name, value, size = event.name, [], 0
+            elif isinstance(event, File):
+                # 其他文件字段跳过
+                name = None
+            elif isinstance(event, Data) and name is not None:
+                value.append(event.data)
+                size += len(event.data)
+                if size > MAX_FIELD_SIZE:
+                    raise RequestEntityTooLarge()
+                if not event.more_data:
+                    self.form[name] = b''.join(value).decode('utf-8', 'replace')
+                    name = None
+            elif isinstance(event, Epilogue):
+                return
+
+    def read(self, size: int = -1) -> bytes:
+        """读取文件内容，文件结束时返回空字节串"""
+        while self._more_data and (size < 0 or len(self._buffer) < size):
+            event = self._next_event()
+            if isinstance(event, Data):
+                self._buffer.extend(event.data)
+                self._more_data = event.more_data
+
+        if size < 0:
+            size = len(self._buffer)
+        data = bytes(self._buffer[:size])
+        del self._buffer[:size]
+        return data
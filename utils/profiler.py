@@ -0,0 +1,182 @@
+"""
+任务性能分析模块
+
+开启后每个下载任务（单个下载、批量子任务）和标签编辑在执行线程中用 cProfile 记录，
+结果写入 PROFILE_DIR：`.prof` 文件可用 pstats/snakeviz 打开，同名 `.json` 文件保存耗时和热点摘要。
+摘要文件由各进程分别写入，Web进程读取目录即可看到后台执行进程的任务。
+
+cProfile 只记录Python代码，FFmpeg等子进程的CPU时间不在其中；摘要中的 wall_seconds 与
+cpu_seconds（执行线程的CPU时间）之差可以看出任务在等待网络或子进程上花了多少时间。
+"""
+import os
+import json
+import time
+import pstats
+import cProfile
+import logging
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+from utils.serialization import write_atomic
+from config import PROFILE_ENABLED, PROFILE_DIR, PROFILE_TOP, PROFILE_HISTORY, PROFILE_KEEP
+
+logger = logging.getLogger(__name__)
+
+# 运行时开关：文件存在即启用（Web进程和后台执行进程共用）
+FLAG_FILE = 'enabled'
+
+
+def _hotspots(stats: pstats.Stats, limit: int) -> List[Dict[str, Any]]:
+    """按自身耗时排序的热点函数"""
+    rows = []
+    for (filename, line, function), (_, calls, self_time, cumulative, _) in stats.stats.items():
+        rows.append({
+            'function': function,
+            'location': f"{os.path.basename(filename)}:{line}" if line else filename,
+            'calls': calls,
+            'self_seconds': round(self_time, 4),
+            'cumulative_seconds': round(cumulative, 4)
+        })
+    rows.sort(key=lambda row: -row['self_seconds'])
+    return rows[:limit]
+
+
+class JobProfiler:
+    """按任务记录cProfile"""
+
+    def __init__(self, profile_dir: str = PROFILE_DIR):
+        self.profile_dir = Path(profile_dir)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    @property
+    def flag_file(self) -> Path:
+        return self.profile_dir / FLAG_FILE
+
+    @property
+    def is_forced(self) -> bool:
+        """是否由 PROFILE_ENABLED 始终开启"""
+        return PROFILE_ENABLED
+
+    def is_enabled(self) -> bool:
+        """环境变量 PROFILE_ENABLED 或运行时开关"""
+        return self.is_forced or self.flag_file.exists()
+
+    def set_enabled(self, enabled: bool):
+        """设置运行时开关（对所有进程生效，PROFILE_ENABLED=True 时无法关闭）"""
+        if enabled:
+            self.profile_dir.mkdir(parents=True, exist_ok=True)
+            self.flag_file.touch()
+        else:
+            self.flag_file.unlink(missing_ok=True)
+        logger.info("任务性能分析已%s", '开启' if enabled else '关闭')
+
+    @contextmanager
+    def profile(self, kind: str, job_id: str) -> Iterator[None]:
+        """记录代码块的性能数据（未开启或在同一线程中嵌套时不记录）"""
+        if getattr(self._local, 'active', False) or not self.is_enabled():
+            yield
+            return
+
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            # Python 3.12+ 的 cProfile 同一时间只能有一个在运行，其他并发任务不记录
+            yield
+            return
+
+        self._local.active = True
+        started_at = time.time()
+        wall_started = time.perf_counter()
+        cpu_started = time.thread_time()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            self._local.active = False
+            try:
+                self._save(profiler, kind, job_id, started_at,
+                           time.perf_counter() - wall_started, time.thread_time() - cpu_started)
+            except Exception as e:
+                logger.warning("保存性能分析结果失败: %s - %s", job_id, e)
+
+    def _save(self, profiler: cProfile.Profile, kind: str, job_id: str,
+              started_at: float, wall_seconds: float, cpu_seconds: float):
+        """写入 .prof 文件和摘要"""
+        self.profile_dir.mkdir(parents=True, exist_ok=True)
+        name = f"{int(started_at * 1000)}-{kind}-{job_id[:12]}-{os.getpid()}"
+        profiler.dump_stats(str(self.profile_dir / f"{name}.prof"))
+
+        summary = {
+            'name': name,
+            'kind': kind,
+            'job_id': job_id,
+            'started_at': started_at,
+            'wall_seconds': round(wall_seconds, 3),
+            'cpu_seconds': round(cpu_seconds, 3),
+            'hotspots': _hotspots(pstats.Stats(profiler), PROFILE_TOP)
+        }
+        write_atomic(self.profile_dir / f"{name}.json", json.dumps(summary, ensure_ascii=False).encode('utf-8'))
+
+        self._cleanup()
+
+    def _cleanup(self):
+        """只保留最近 PROFILE_KEEP 个任务的结果"""
+        with self._lock:
+            summaries = self._summary_files()
+            for summary_file in summaries[PROFILE_KEEP:]:
+                summary_file.unlink(missing_ok=True)
+                summary_file.with_suffix('.prof').unlink(missing_ok=True)
+
+    def _summary_files(self) -> List[Path]:
+        """摘要文件，按时间从新到旧（文件名以毫秒时间戳开头）"""
+        if not self.profile_dir.exists():
+            return []
+        return sorted(self.profile_dir.glob('*.json'), key=lambda path: path.name, reverse=True)
+
+    def recent_jobs(self, limit: int = PROFILE_HISTORY) -> List[Dict[str, Any]]:
+        """最近的任务摘要"""
+        jobs = []
+        for summary_file in self._summary_files()[:limit]:
+            try:
+                with open(summary_file, encoding='utf-8') as f:
+                    jobs.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+        return jobs
+
+    def aggregate_hotspots(self, limit: int = PROFILE_HISTORY, top: int = PROFILE_TOP) -> Dict[str, Any]:
+        """合并最近 limit 个任务的 .prof 文件，返回总的热点函数"""
+        stats: Optional[pstats.Stats] = None
+        jobs = 0
+        for summary_file in self._summary_files()[:limit]:
+            profile_file = summary_file.with_suffix('.prof')
+            try:
+                if stats is None:
+                    stats = pstats.Stats(str(profile_file))
+                else:
+                    stats.add(str(profile_file))
+                jobs += 1
+            except (OSError, EOFError, TypeError, ValueError):
+                continue
+
+        return {
+            'jobs': jobs,
+            'hotspots': _hotspots(stats, top) if stats else []
+        }
+
+    def get_status(self, limit: int = PROFILE_HISTORY) -> Dict[str, Any]:
+        """开关状态、最近的任务和汇总热点"""
+        return {
+            'enabled': self.is_enabled(),
+            'forced': self.is_forced,
+            'profile_dir': str(self.profile_dir),
+            'recent': self.recent_jobs(limit),
+            'aggregate': self.aggregate_hotspots(limit)
+        }
+
+
+PROFILER = JobProfiler()
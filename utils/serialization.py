@@ -0,0 +1,169 @@
+"""
+JSON序列化工具模块
+
+API响应和批量任务持久化共用同一个序列化层。后端由 JSON_BACKEND 选择：
+auto（默认，已安装orjson时使用orjson，否则使用标准库json）、orjson、json。
+
+模型通过 register_encoder 注册类型编码器，序列化时直接把模型对象交给后端，
+嵌套的对象（例如批量任务中的上千个子任务）由后端逐个编码，不需要先构建完整的嵌套字典。
+"""
+import os
+import json
+import tempfile
+from datetime import datetime, date
+from enum import Enum
+from pathlib import Path
+from typing import Any, Callable, Dict, Union
+
+from config import JSON_BACKEND
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - 可选依赖
+    orjson = None
+
+# 解析失败时抛出的异常类型（orjson.JSONDecodeError 是 ValueError 的子类）
+DECODE_ERRORS = (ValueError,)
+
+_encoders: Dict[type, Callable[[Any], Any]] = {}
+
+
+def register_encoder(cls: type, encoder: Callable[[Any], Any]):
+    """注册类型编码器，编码器返回可直接序列化的对象（dict/list/str等）"""
+    _encoders[cls] = encoder
+
+
+def _default(obj: Any) -> Any:
+    """后端无法直接序列化的对象"""
+    encoder = _encoders.get(type(obj))
+    if encoder is None:
+        for cls in type(obj).__mro__[1:]:
+            if cls in _encoders:
+                encoder = _encoders[cls]
+                break
+    if encoder is not None:
+        return encoder(obj)
+
+    if isinstance(obj, Enum):
+        return obj.value
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    if isinstance(obj, Path):
+        return str(obj)
+    if isinstance(obj, (set, frozenset, tuple)):
+        return list(obj)
+    if hasattr(obj, 'to_dict'):
+        return obj.to_dict()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+class JSONBackend:
+    """序列化后端基类"""
+
+    name = ''
+
+    def dumps(self, obj: Any) -> bytes:
+        raise NotImplementedError
+
+    def loads(self, data: Union[bytes, str]) -> Any:
+        raise NotImplementedError
+
+
+class StdlibBackend(JSONBackend):
+    """标准库json后端（紧凑输出，中文不转义）"""
+
+    name = 'json'
+
+    def dumps(self, obj: Any) -> bytes:
+        return json.dumps(obj, default=_default, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+    def loads(self, data: Union[bytes, str]) -> Any:
+        return json.loads(data)
+
+
+class OrjsonBackend(JSONBackend):
+    """orjson后端
+
+    dataclass交给类型编码器处理（而不是orjson的内置转换），保证两个后端输出一致。
+    """
+
+    name = 'orjson'
+
+    def __init__(self):
+        if orjson is None:
+            raise ImportError("orjson未安装")
+        self.option = orjson.OPT_PASSTHROUGH_DATACLASS | orjson.OPT_NON_STR_KEYS
+
+    def dumps(self, obj: Any) -> bytes:
+        return orjson.dumps(obj, default=_default, option=self.option)
+
+    def loads(self, data: Union[bytes, str]) -> Any:
+        return orjson.loads(data)
+
+
+BACKENDS = {
+    'json': StdlibBackend,
+    'orjson': OrjsonBackend
+}
+
+
+def create_backend(name: str = 'auto') -> JSONBackend:
+    """创建序列化后端，auto 时优先使用orjson"""
+    if name == 'auto':
+        name = 'orjson' if orjson is not None else 'json'
+    if name not in BACKENDS:
+        raise ValueError(f"未知的JSON序列化后端: {name}")
+    return BACKENDS[name]()
+
+
+_backend = create_backend(JSON_BACKEND)
+
+
+def set_backend(name: str) -> JSONBackend:
+    """切换序列化后端"""
+    global _backend
+    _backend = create_backend(name)
+    return _backend
+
+
+def backend_name() -> str:
+    """当前序列化后端名称"""
+    return _backend.name
+
+
+def dumps(obj: Any) -> bytes:
+    """序列化为UTF-8编码的JSON"""
+    return _backend.dumps(obj)
+
+
+def loads(data: Union[bytes, str]) -> Any:
+    """反序列化JSON"""
+    return _backend.loads(data)
+
+
+def write_atomic(path: Union[str, Path], data: bytes):
+    """原子写入文件：先写入同目录下唯一命名的临时文件，再替换目标文件
+
+    临时文件名由 mkstemp 生成，多个进程和线程同时写同一个文件时不会互相覆盖临时文件，
+    读取方只会看到某一次完整的写入。
+    """
+    path = Path(path)
+    fd, temp_name = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            # mkstemp 创建的文件权限为0600，改为与普通写入一致（Windows没有fchmod）
+            if hasattr(os, 'fchmod'):
+                os.fchmod(f.fileno(), 0o644)
+            f.write(data)
+        os.replace(temp_name, path)
+    except BaseException:
+        try:
+            os.unlink(temp_name)
+        except OSError:
+            pass
+        raise
+
+
+def dump_file(obj: Any, path: Union[str, Path]):
+    """序列化并原子写入JSON文件"""
+    write_atomic(path, dumps(obj))
@@ -5,7 +5,6 @@ from mutagen.id3 import ID3, APIC, TIT2, TPE1, TALB, TDRC, TRCK, TPE2, error
 from mutagen.mp3 import MP3
 import os
 from config import DOWNLOAD_PATH, DEFAULT_TAGS
-import traceback
 
 # 设置日志
 logger = logging.getLogger(__name__)
@@ -32,10 +31,10 @@ def get_audio_tags(filepath):
             return tags
         except error:
             # 如果ID3标签不存在，返回默认值
-            logger.warning(f"无法读取ID3标签: {filepath}")
+            logger.warning("无法读取ID3标签: %s", filepath)
             return DEFAULT_TAGS.copy()
     except Exception as e:
-        logger.error(f"读取标签失败: {str(e)}\n{traceback.format_exc()}")
+        logger.error("读取标签失败: %s", e, exc_info=True)
         return DEFAULT_TAGS.copy()
 
 def _get_tag_value(audio, tag_name):
@@ -98,10 +97,10 @@ def update_audio_tags(filepath, tags, cover_path=None):
         except Exception as e:
             # 恢复备份
             shutil.move(backup_path, filepath)
-            logger.error(f"更新标签失败: {str(e)}\n{traceback.format_exc()}")
+            logger.error("更新标签失败: %s", e, exc_info=True)
             return False
     except Exception as e:
-        logger.error(f"更新标签失败: {str(e)}\n{traceback.format_exc()}")
+        logger.error("更新标签失败: %s", e, exc_info=True)
         return False
 
 def _update_cover_image(filepath, cover_path):
@@ -127,5 +126,5 @@ def _update_cover_image(filepath, cover_path):
         audio.save()
         
     except Exception as e:
-        logger.error(f"更新封面失败: {str(e)}")
+        logger.error("更新封面失败: %s", e)
         raise
\ No newline at end of file
@@ -0,0 +1,224 @@
+"""
+Bilibili链接扫描模块
+
+用一个预编译的组合正则从任意粘贴文本中一次性提取所有视频链接、短链接、BV号和av号，
+一行中可以有多个链接。【】/[]标题中的文字不当作视频ID，av号需为小写或单独成词，
+避免把“AV1编码”之类的文字当成视频ID；只取第一个链接时完整链接和短链接优先。
+同一视频的不同写法（短链接除外）按规范ID合并，保留第一次出现的位置，被合并的行记录在结果中。扫描结果（URLScanResult）由控制器创建后直接传给批量下载请求和服务层，
+不再重复解析。
+"""
+import re
+import codecs
+from dataclasses import dataclass, field
+from typing import Any, BinaryIO, Dict, Iterable, Iterator, List, Optional, Tuple
+
+# 视频页面、短链接
+_LINK = (
+    r'(?P<page>https?://(?:www\.|m\.)?bilibili\.com/video/(?P<page_id>BV[0-9A-Za-z]{10}|av\d+)/?'
+    r'(?P<query>\?[^\s#【】\[\]<>"\'，。]*)?(?:#[^\s【】\[\]<>"\'，。]*)?)'
+    r'|(?P<short>https?://b23\.tv/[0-9A-Za-z]+)'
+)
+LINK_PATTERN = re.compile(_LINK, re.IGNORECASE)
+
+# 分享文本中的标题（【】或[]括起来且不含链接的部分）整体跳过，其中的文字不当作视频ID；
+# 标题之外的BV号、av号前后不能紧挨字母数字，av号需为小写，大写的AV号需前后都是空白
+SCAN_PATTERN = re.compile(
+    r'(?P<title>【[^】h]*(?:h(?!ttps?://)[^】h]*)*】|\[[^\]h]*(?:h(?!ttps?://)[^\]h]*)*\])'
+    r'|' + _LINK +
+    r'|(?<![0-9A-Za-z])(?P<bvid>BV[0-9A-Za-z]{10})(?![0-9A-Za-z])'
+    r'|(?<![0-9A-Za-z])(?P<avid>(?-i:av)\d+)(?![0-9A-Za-z])'
+    r'|(?<!\S)(?P<avid_token>av\d+)(?!\S)',
+    re.IGNORECASE
+)
+
+# 直接带视频ID的短链接路径
+SHORT_VIDEO_ID_PATTERN = re.compile(r'BV[0-9A-Za-z]{10}|av\d+', re.IGNORECASE)
+
+# 分P参数
+PAGE_PARAM_PATTERN = re.compile(r'(?:^\?|&)p=(\d+)')
+
+VIDEO_URL_PREFIX = 'https://www.bilibili.com/video/'
+
+# 流式读取时每次读取的字节数
+STREAM_READ_SIZE = 64 * 1024
+
+
+@dataclass
+class ExtractedURL:
+    """从输入中提取出的一个链接"""
+    url: str           # 规范化后的下载地址
+    video_id: str      # BV号、av号或短链接
+    line_number: int   # 所在行号（从1开始）
+    source: str        # 原始匹配文本
+    page: int = 1      # 分P序号
+
+    @property
+    def key(self) -> Tuple[str, int]:
+        """去重用的规范ID：视频ID + 分P（短链接无法离线解析，按链接本身去重）"""
+        return (self.video_id, self.page)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为字典"""
+        return {
+            'url': self.url,
+            'video_id': self.video_id,
+            'line_number': self.line_number,
+            'source': self.source,
+            'page': self.page
+        }
+
+
+@dataclass
+class URLScanResult:
+    """扫描结果（urls 已按规范ID去重，保持输入顺序）"""
+    urls: List[ExtractedURL] = field(default_factory=list)
+    invalid_lines: List[Dict[str, Any]] = field(default_factory=list)
+    merged: List[Dict[str, Any]] = field(default_factory=list)
+    total_lines: int = 0
+    _seen: Dict[Tuple[str, int], ExtractedURL] = field(default_factory=dict, repr=False)
+
+    @property
+    def url_list(self) -> List[str]:
+        """规范化后的下载地址列表（按输入顺序）"""
+        return [item.url for item in self.urls]
+
+    def add(self, item: ExtractedURL) -> bool:
+        """加入一个链接；与已有链接重复时记录合并并返回False"""
+        first = self._seen.get(item.key)
+        if first is not None:
+            self.merged.append({
+                'line_number': item.line_number,
+                'content': item.source,
+                'merged_into_line': first.line_number,
+                'url': first.url
+            })
+            return False
+
+        self._seen[item.key] = item
+        self.urls.append(item)
+        return True
+
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为字典"""
+        return {
+            'valid_urls': self.url_list,
+            'invalid_lines': self.invalid_lines,
+            'total_valid': len(self.urls),
+            'total_invalid': len(self.invalid_lines),
+            'merged_lines': self.merged,
+            'total_merged': len(self.merged),
+            'total_lines': self.total_lines
+        }
+
+
+def _normalize(match: 're.Match') -> ExtractedURL:
+    """把一个匹配转换为规范化的链接（行号由调用方填写）"""
+    source = match.group(0)
+    kind = match.lastgroup
+
+    page = 1
+    if kind == 'short':
+        # b23.tv/BV... 直接带视频ID，其余短链接需要跳转才能知道视频
+        video_id = source.rsplit('/', 1)[1]
+        if not SHORT_VIDEO_ID_PATTERN.fullmatch(video_id):
+            return ExtractedURL(url=source, video_id=source, line_number=0, source=source)
+    elif kind == 'page':
+        video_id = match.group('page_id')
+        page_match = PAGE_PARAM_PATTERN.search(match.group('query') or '')
+        page = int(page_match.group(1)) if page_match else 1
+    else:
+        video_id = source
+
+    if video_id[:2].lower() == 'bv':
+        video_id = 'BV' + video_id[2:]
+    else:
+        video_id = 'av' + video_id[2:]
+
+    url = VIDEO_URL_PREFIX + video_id
+    if page > 1:
+        url += f'?p={page}'
+    return ExtractedURL(url=url, video_id=video_id, line_number=0, source=source, page=page)
+
+
+class URLScanner:
+    """Bilibili链接扫描器"""
+
+    def scan_line(self, line: str, line_number: int = 0) -> List[ExtractedURL]:
+        """提取一行中的所有链接"""
+        items = []
+        for match in SCAN_PATTERN.finditer(line):
+            if match.lastgroup == 'title':
+                continue
+            item = _normalize(match)
+            item.line_number = line_number
+            items.append(item)
+        return items
+
+    def iter_scan(self, lines: Iterable[str], result: Optional[URLScanResult] = None,
+                  start_line: int = 1) -> Iterator[ExtractedURL]:
+        """逐行扫描，边扫描边产出去重后的链接；无效行和被合并的重复链接记录到 result"""
+        result = result if result is not None else URLScanResult()
+        for line_number, line in enumerate(lines, start_line):
+            result.total_lines += 1
+            line = line.strip()
+            if not line:
+                continue
+
+            items = self.scan_line(line, line_number)
+            if not items:
+                result.invalid_lines.append({
+                    'line_number': line_number,
+                    'content': line,
+                    'reason': '不是有效的Bilibili URL'
+                })
+                continue
+
+            for item in items:
+                if result.add(item):
+                    yield item
+
+    def scan(self, text: str) -> URLScanResult:
+        """扫描整段文本"""
+        result = URLScanResult()
+        if text:
+            for _ in self.iter_scan(text.splitlines(), result):
+                pass
+        return result
+
+    def extract_first(self, text: str) -> Optional[ExtractedURL]:
+        """提取文本中的第一个链接（完整链接和短链接优先于单独的BV号、av号）"""
+        if not text:
+            return None
+        match = LINK_PATTERN.search(text)
+        if not match:
+            match = next((m for m in SCAN_PATTERN.finditer(text) if m.lastgroup != 'title'), None)
+            if not match:
+                return None
+        item = _normalize(match)
+        item.line_number = text.count('\n', 0, match.start()) + 1
+        return item
+
+
+def iter_text_lines(stream: BinaryIO, encoding: str = 'utf-8-sig',
+                    read_size: int = STREAM_READ_SIZE) -> Iterator[str]:
+    """按块读取二进制流并逐行产出文本，不需要把整个输入读入内存"""
+    decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+    pending: List[str] = []
+
+    while True:
+        data = stream.read(read_size)
+        text = decoder.decode(data, final=not data)
+        if '\n' in text:
+            head, *lines, tail = text.split('\n')
+            pending.append(head)
+            yield ''.join(pending)
+            yield from lines
+            pending = [tail]
+        elif text:
+            pending.append(text)
+        if not data:
+            break
+
+    last = ''.join(pending)
+    if last:
+        yield last
@@ -4,7 +4,9 @@
 import re
 import os
 from pathlib import Path
-from typing import List, Optional
+from typing import List, Optional, Tuple
+
+from utils.url_scanner import URLScanner
 
 
 class URLValidator:
@@ -17,8 +19,25 @@ class URLValidator:
         r'^(av|AV)\d+$'
     ]
     
+    BVID_PATTERN = re.compile(r'(BV|bv)[a-zA-Z0-9]{10}')
+    
+    # 可订阅的来源：(来源类型, 正则, 交给yt-dlp的规范地址；None表示使用原地址)
+    SUBSCRIPTION_PATTERNS = [
+        ('uploader', re.compile(r'^https?://space\.bilibili\.com/(?P<id>\d+)(?:/(?:upload/)?video)?/?(?:[?#].*)?$'),
+         'https://space.bilibili.com/{id}/video'),
+        ('favorites', re.compile(r'^https?://space\.bilibili\.com/\d+/favlist\?(?:[^#]*&)?fid=(?P<id>\d+)'),
+         'https://www.bilibili.com/medialist/detail/ml{id}'),
+        ('favorites', re.compile(r'^https?://(?:www\.)?bilibili\.com/(?:medialist/detail|list)/ml(?P<id>\d+)'),
+         'https://www.bilibili.com/medialist/detail/ml{id}'),
+        ('series', re.compile(r'^https?://space\.bilibili\.com/\d+/channel/(?P<kind>collection|series)detail\?(?:[^#]*&)?sid=(?P<id>\d+)'),
+         None),
+        ('series', re.compile(r'^https?://space\.bilibili\.com/\d+/(?P<kind>lists)/(?P<id>\d+)'),
+         None),
+    ]
+    
     def __init__(self):
         self.compiled_patterns = [re.compile(pattern) for pattern in self.BILIBILI_PATTERNS]
+        self.scanner = URLScanner()
     
     def is_valid_bilibili_url(self, url: str) -> bool:
         """验证是否为有效的Bilibili URL"""
@@ -35,26 +54,39 @@ class URLValidator:
         return False
     
     def extract_bilibili_url(self, text: str) -> str:
-        """从文本中提取Bilibili URL"""
+        """从文本中提取第一个Bilibili URL（规范化后的地址）"""
+        item = self.scanner.extract_first(text)
+        return item.url if item else ""
+    
+    @classmethod
+    def parse_subscription_url(cls, url: str) -> Optional[Tuple[str, str, str]]:
+        """解析可订阅的来源地址，返回 (来源类型, 来源ID, 列表地址)，不支持时返回None"""
+        if not url or not isinstance(url, str):
+            return None
+        
+        url = url.strip()
+        for source_type, pattern, canonical in cls.SUBSCRIPTION_PATTERNS:
+            match = pattern.match(url)
+            if not match:
+                continue
+            groups = match.groupdict()
+            source_id = f"{groups['kind']}:{groups['id']}" if groups.get('kind') else groups['id']
+            list_url = canonical.format(id=groups['id']) if canonical else url.split('#')[0]
+            return source_type, source_id, list_url
+        
+        return None
+    
+    @classmethod
+    def extract_bvid(cls, text: str) -> str:
+        """从URL或视频ID中提取BV号"""
         if not text:
             return ""
         
-        # 分享文本模式
-        share_patterns = [
-            r'【.*?】\s*(https?://(www\.)?(bilibili\.com|b23\.tv)[^\s]+)',
-            r'\[.*?\]\s*(https?://(www\.)?(bilibili\.com|b23\.tv)[^\s]+)'
-        ]
-        
-        for pattern in share_patterns:
-            match = re.search(pattern, text)
-            if match:
-                return match.group(1).split('?')[0].split('#')[0]
-        
-        # 直接检查是否为URL
-        if self.is_valid_bilibili_url(text):
-            return text
+        match = cls.BVID_PATTERN.search(text)
+        if not match:
+            return ""
         
-        return ""
+        return 'BV' + match.group(0)[2:]
 
 
 class FileValidator:
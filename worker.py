@@ -0,0 +1,77 @@
+"""
+Bilibili音频下载器 - 后台执行进程
+
+多进程部署（BATCH_EXECUTOR=process）时运行单个下载、批量下载、订阅定时检查、曲库定时扫描和目录监听，
+使这些长时间运行的任务不受Web进程回收影响。
+
+运行: python worker.py（使用 gunicorn.conf.py 启动时默认由gunicorn主进程托管）
+"""
+import signal
+import logging
+import threading
+from dotenv import load_dotenv
+
+# 加载环境变量（需在导入配置之前）
+load_dotenv()
+
+from utils.logger import setup_logging
+from services.batch_executor import BatchExecutor
+from services.service_container import init_services
+from utils.metrics import REGISTRY
+from config import LIBRARY_WATCH, BATCH_EXECUTOR, METRICS_ENABLED
+
+logger = logging.getLogger('worker')
+
+
+def main():
+    """启动后台执行进程，直到收到SIGTERM/SIGINT"""
+    setup_logging(log_file=None, console=True)
+
+    if BATCH_EXECUTOR != 'process':
+        logger.warning("BATCH_EXECUTOR不是process，批量任务由Web进程执行，后台执行进程退出")
+        return
+
+    stop_event = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop_event.set())
+    signal.signal(signal.SIGINT, lambda *_: stop_event.set())
+
+    services = init_services(runs_batches=True)
+
+    executor = BatchExecutor(services.batch_service, services.download_job_service)
+    executor.start()
+
+    if METRICS_ENABLED:
+        # 由执行进程合并已退出进程的指标快照
+        REGISTRY.start_snapshots(fold_retired=True)
+
+    # 合并Web进程转交的Navidrome扫描请求
+    scan_coordinator = services.scan_coordinator
+    scan_coordinator.start_inbox()
+
+    subscription_service = services.subscription_service
+    subscription_service.start_schedule()
+
+    library_scanner = services.library_scanner
+    library_scanner.start_schedule()
+
+    library_watcher = None
+    if LIBRARY_WATCH:
+        library_watcher = services.library_watcher
+        library_watcher.start()
+
+    logger.info("后台执行进程已启动")
+    stop_event.wait()
+
+    executor.stop()
+    scan_coordinator.stop_inbox()
+    subscription_service.stop_schedule()
+    library_scanner.stop_schedule()
+    if library_watcher:
+        library_watcher.stop()
+    if METRICS_ENABLED:
+        REGISTRY.stop_snapshots()
+    logger.info("后台执行进程已停止")
+
+
+if __name__ == '__main__':
+    main()